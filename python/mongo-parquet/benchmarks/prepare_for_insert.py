@@ -0,0 +1,171 @@
+"""
+Benchmark of `MongoCollection.prepare_for_insert` on a synthetic `pages_metrics` frame,
+compared with the previous row-by-row implementation.
+
+Usage:
+    uv run python benchmarks/prepare_for_insert.py --rows 1000000
+"""
+
+import argparse
+import gc
+import time
+from datetime import datetime
+from typing import Any
+import polars as pl
+from bson import ObjectId
+from pymongo import MongoClient
+from mongo_parquet.schemas import MongoCollection
+from mongo_parquet.schemas.page_metrics import PagesMetricsModel
+from mongo_parquet.utils import convert_objectids
+
+
+def legacy_prepare_for_insert(
+    model: MongoCollection, df: pl.DataFrame, sort_id: bool = True
+) -> list[dict[str, Any]]:
+    """The previous implementation: `to_dicts()` and a Python loop over every key of every row."""
+    records: list[dict[str, Any]] = []
+
+    col_names = model.combined_schema().to_arrow().names
+
+    rows = df.sort("_id").to_dicts() if sort_id else df.to_dicts()
+
+    for row in rows:
+        record: dict[str, Any] = {}
+        for k, v in row.items():
+            if v is None and k not in model.default_values:
+                continue
+            elif v is None and k in model.default_values:
+                record[k] = model.default_values[k]
+
+            if k in model.objectid_fields:
+                record[k] = convert_objectids(v)
+            else:
+                record[k] = v
+
+        for col in col_names:
+            if (
+                col not in record or record[col] is None
+            ) and col in model.default_values:
+                record[col] = model.default_values[col]
+
+        records.append(record)
+
+    return records
+
+
+def synthetic_pages_metrics(rows: int, num_pages: int = 5_000) -> pl.DataFrame:
+    """
+    A reverse-transformed `pages_metrics` frame, as read from parquet before inserting.
+    Roughly 1 in 3 rows has search terms and activity map links, and 1 in 10 has no tasks.
+    """
+    schema = PagesMetricsModel(
+        MongoClient(connect=False)["benchmark"]
+    ).combined_schema()
+
+    page_ids = [ObjectId().binary for _ in range(num_pages)]
+    task_ids = [ObjectId().binary for _ in range(num_pages // 10)]
+
+    ids = [ObjectId().binary for _ in range(rows)]
+    pages = [page_ids[i % num_pages] for i in range(rows)]
+    tasks = [
+        None if i % 10 == 0 else [task_ids[i % len(task_ids)]] for i in range(rows)
+    ]
+
+    def searchterms(i: int):
+        if i % 3 != 0:
+            return None
+        return [
+            {"term": f"term {j}", "clicks": j, "position": 1.5, "_id": ids[i]}
+            for j in range(3)
+        ]
+
+    def activity_map(i: int):
+        if i % 3 != 1:
+            return None
+        return [
+            {"link": f"https://example.com/{j}", "clicks": j, "_id": ids[i]}
+            for j in range(3)
+        ]
+
+    columns: dict[str, Any] = {
+        "_id": ids,
+        "date": [datetime(2024, 1, 1 + i % 28) for i in range(rows)],
+        "url": [
+            f"https://www.canada.ca/en/page-{i % num_pages}.html" for i in range(rows)
+        ],
+        "page": pages,
+        "tasks": tasks,
+        "projects": [[task_ids[0]] if i % 4 == 0 else [] for i in range(rows)],
+        "ux_tests": [[] for _ in range(rows)],
+        "aa_searchterms": [searchterms(i) for i in range(rows)],
+        "activity_map": [activity_map(i) for i in range(rows)],
+        "gsc_searchterms": [None for _ in range(rows)],
+    }
+
+    df = pl.DataFrame(columns)
+
+    numeric_columns = [
+        pl.int_range(rows).mod(97 + i).alias(field.name)
+        for i, field in enumerate(schema.to_arrow())
+        if field.name not in columns
+    ]
+
+    return df.with_columns(numeric_columns).select(schema.to_arrow().names)
+
+
+def time_batches(label: str, df: pl.DataFrame, batch_size: int, fn) -> float:
+    """Time `fn` over every batch of `df`, as `insert_batches` would call it."""
+    elapsed = 0.0
+
+    for batch in df.iter_slices(batch_size):
+        gc.collect()
+        start = time.perf_counter()
+        fn(batch)
+        elapsed += time.perf_counter() - start
+
+    print(f"{label:>10}: {elapsed:8.2f}s ({df.height / elapsed:,.0f} docs/sec)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="Only run the current implementation",
+    )
+    args = parser.parse_args()
+
+    model = PagesMetricsModel(MongoClient(connect=False)["benchmark"])
+
+    print(f"Generating {args.rows:,} rows of synthetic pages_metrics data...")
+    df = synthetic_pages_metrics(args.rows)
+    print(f"{df.estimated_size('mb'):,.0f} MB in memory")
+
+    current = time_batches(
+        "columnar", df, args.batch_size, lambda batch: model.prepare_for_insert(batch)
+    )
+
+    if args.skip_legacy:
+        return
+
+    legacy = time_batches(
+        "legacy",
+        df,
+        args.batch_size,
+        lambda batch: legacy_prepare_for_insert(model, batch),
+    )
+
+    print(f"{legacy / current:.1f}x faster")
+
+    for batch in df.head(args.batch_size).iter_slices(10_000):
+        if model.prepare_for_insert(batch) != legacy_prepare_for_insert(model, batch):
+            raise AssertionError("Results differ between the two implementations")
+
+    print("✔️ Results are identical")
+
+
+if __name__ == "__main__":
+    main()
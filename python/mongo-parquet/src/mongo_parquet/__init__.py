@@ -5,17 +5,30 @@ This package provides utilities for working with MongoDB and converting data to
 """
 
 import datetime
+import os
+import threading
 from typing import Any, final
+import polars as pl
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.errors import OperationFailure
+from .catalog import DictionaryCatalog
+from .insert_pipeline import InsertPipeline
 from .io import MongoParquetIO
-from .mongo import MongoConfig
+from .journal import RunJournal
+from .mongo import MongoConfig, SplitMethod
 from .sampling import SamplingContext
-from .schemas import collection_models, MongoCollection
+from .scheduler import PartitionScheduler
+from .snapshots import Snapshot, SnapshotStore
+from .segments import BASE_SEGMENT, CompactionPolicy, compact_partition, segment_files
+from .schemas import collection_models, MongoCollection, ObjectIdFormat
 from .storage import StorageClient
 from . import schemas
-from .utils import SyncUtils
+from .url_index import INDEXED_MODELS, UrlIndex
+from .utils import format_timedelta, list_parquet_files, SyncUtils
+from .verify import Month, drifted_months, mongo_aggregates, parquet_aggregates
 from .views import ViewService
+from .watch import ChangeBuffer, Changes, ResumeTokenStore, consume, watch_pipeline
 
 
 def get_collection_models(
@@ -43,12 +56,23 @@ class MongoParquet:
         storage_client: StorageClient,
         sample: bool = True,
         sampling_context: SamplingContext | None = None,
+        scheduler: PartitionScheduler | None = None,
+        insert_pipeline: InsertPipeline | None = None,
+        id_format: ObjectIdFormat = "hex",
+        split_scans: int = 1,
+        split_method: SplitMethod = "timestamp",
     ):
         """
         Initialize MongoParquet with IO and sampling context.
 
         :param mongo_config: Configuration for MongoDB connection.
         :param storage_client: Client for handling storage operations.
+        :param scheduler: Scheduler for processing partitions concurrently. Defaults to serial processing.
+        :param insert_pipeline: Pipeline for inserting into MongoDB. Defaults to 4 writer threads.
+        :param id_format: The format ObjectIds are written in. Binary halves the size of id columns,
+                          and avoids encoding them on export and decoding them on import.
+        :param split_scans: The number of concurrent `_id` range cursors used to export large unpartitioned collections.
+        :param split_method: How to compute the `_id` ranges, "timestamp" or "bucket_auto".
         """
         self.mongo_config = mongo_config
         self.storage_client = storage_client
@@ -56,13 +80,25 @@ class MongoParquet:
         self.sample = sample
         self.sampling_context = sampling_context or SamplingContext()
 
-        self.io = MongoParquetIO(mongo_config, storage_client, self.sampling_context)
+        self.io = MongoParquetIO(
+            mongo_config,
+            storage_client,
+            self.sampling_context,
+            scheduler,
+            insert_pipeline,
+            split_scans=split_scans,
+            split_method=split_method,
+        )
 
         self.collection_models = get_collection_models(
             self.io.db.db,
             self.io.storage.target_dirpath(sample=self.sample, remote=False),
         )
 
+        for collection_model in self.collection_models:
+            for parquet_model in collection_model.parquet_models():
+                parquet_model.id_format = id_format
+
     def setup_sampling_context(
         self, callable: Callable[[dict[str, Any]], dict[str, Any]]
     ):
@@ -89,6 +125,7 @@ class MongoParquet:
         sample: bool | None = None,
         include: list[str] | None = None,
         exclude: list[str] | None = None,
+        resume: bool = False,
     ):
         """
         Export data from MongoDB to Parquet format.
@@ -96,7 +133,16 @@ class MongoParquet:
         :param sample: Whether to export sample data.
         :param include: List of collections to include in the export.
         :param exclude: List of collections to exclude from the export.
+        :param resume: Whether to resume an interrupted export, skipping the files and partitions it already wrote.
         """
+        root_dir_path = self.storage_client.target_dirpath(
+            sample=sample or self.sample, remote=False
+        )
+
+        journal = RunJournal(root_dir_path, "export", resume=resume)
+        # the segments that the export replaces are deleted from remote storage after the next upload
+        sync_utils = SyncUtils(root_dir_path)
+
         for model in self.collection_models:
             if include and model.collection not in include:
                 print(f"Skipping {model.collection} (not in include list)")
@@ -113,8 +159,15 @@ class MongoParquet:
             self.io.export_to_parquet(
                 model,
                 sample=sample or self.sample,
+                journal=journal,
+                sync_utils=sync_utils,
             )
 
+        sync_utils.save_manifest()
+        journal.clear()
+
+        self.commit_snapshot(root_dir_path, sample=sample or self.sample)
+
     def upload_to_remote(
         self,
         filepaths: list[str] | None = None,
@@ -122,7 +175,9 @@ class MongoParquet:
         cleanup_local: bool = False,
     ):
         """
-        Upload Parquet files to remote storage.
+        Upload Parquet files to remote storage, then the manifest of a snapshot of the remote files,
+        so that remote readers see the new files. After a full upload, the files deleted locally
+        (e.g. merged segments) are deleted from remote storage.
 
         :param filepaths: List of specific file paths to upload, relative to the src directory.
         :param sample: Whether to upload sample files.
@@ -134,6 +189,33 @@ class MongoParquet:
             cleanup_local=cleanup_local,
         )
 
+        root_dir_path = self.storage_client.target_dirpath(
+            sample=sample or self.sample, remote=False
+        )
+        sync_utils = SyncUtils(root_dir_path)
+
+        if filepaths is None:
+            # every file was uploaded, including the ones queued by syncs without uploads
+            sync_utils.clear_upload_queue()
+
+        # the local files that were cleaned up are only in the previous local snapshot
+        snapshot = (
+            SnapshotStore(root_dir_path).current()
+            if cleanup_local
+            else self.commit_snapshot(root_dir_path, sample=sample or self.sample)
+        )
+
+        # remote readers trust the current remote snapshot over listing the directories, so it lists
+        # the remote files, as the local ones may not all have been uploaded, or may have been cleaned up
+        _ = self.storage_client.upload_listed_snapshot(
+            snapshot.entries if snapshot is not None else {},
+            exclude=sync_utils.delete_queue,
+            sample=sample or self.sample,
+        )
+
+        if filepaths is None:
+            self.delete_pending_from_remote(sync_utils, sample=sample or self.sample)
+
     def import_to_mongo(
         self,
         sample: bool | None = None,
@@ -141,6 +223,7 @@ class MongoParquet:
         include: list[str] | None = None,
         exclude: list[str] | None = None,
         min_date: datetime.datetime | None = None,
+        resume: bool = False,
     ):
         """
         Import data from Parquet files back to MongoDB.
@@ -149,12 +232,21 @@ class MongoParquet:
         :param remote: Whether to import from remote storage.
         :param include: List of collections to include in the import.
         :param exclude: List of collections to exclude from the import.
+        :param resume: Whether to resume an interrupted import, skipping the partitions and batches it already inserted.
         """
         if include and exclude:
             raise ValueError(
                 "Cannot specify both include and exclude lists. Use one or the other."
             )
 
+        journal = RunJournal(
+            self.storage_client.target_dirpath(
+                sample=sample or self.sample, remote=False
+            ),
+            "import",
+            resume=resume,
+        )
+
         for model in self.collection_models:
             if include and model.collection not in include:
                 print(f"Skipping {model.collection} (not in include list)")
@@ -169,8 +261,11 @@ class MongoParquet:
                 sample=sample or self.sample,
                 remote=remote or False,
                 min_date=min_date,
+                journal=journal,
             )
 
+        journal.clear()
+
     def download_from_remote(
         self,
         sample: bool | None = None,
@@ -199,6 +294,13 @@ class MongoParquet:
             filenames, sample=sample or self.sample
         )
 
+        self.commit_snapshot(
+            self.storage_client.target_dirpath(
+                sample=sample or self.sample, remote=False
+            ),
+            sample=sample or self.sample,
+        )
+
     def bail_if_empty(self):
         """
         Check if the MongoDB database has any data.
@@ -216,14 +318,25 @@ class MongoParquet:
         exclude: list[str] | None = None,
         upload_on_success: bool = False,
         cleanup_temp_dir: bool = False,
+        use_checksums: bool = False,
+        append_segments: bool = False,
+        resume: bool = False,
+        index_urls: bool = False,
     ):
         """
-        Sync Parquet files with MongoDB by exporting fresh versions of smaller collections,
-        using incremental updates for larger collections, as well as ensuring referential integrity.
+        Sync Parquet files with MongoDB by merging the changed documents of smaller collections
+        (or exporting fresh versions of those without a change field), using incremental updates
+        for larger collections, as well as ensuring referential integrity.
 
         :param sample: Whether to use sample data.
         :param include: List of collections to include in the sync.
         :param exclude: List of collections to exclude from the sync.
+        :param use_checksums: Whether to checksum rewritten files, to avoid re-uploading files rewritten with the same contents.
+        :param append_segments: Whether to append the new data of partitioned collections as new segment files,
+                                instead of rewriting the partitions. Segments are merged by `compact_parquet`.
+        :param resume: Whether to resume an interrupted sync, skipping the collections and partitions it already synced.
+        :param index_urls: Whether to update the URL index used by `lookup_page_history`. It keeps copies of the
+                           per-page files sorted by URL, so it's only built when page histories are looked up.
         """
 
         self.bail_if_empty()
@@ -232,7 +345,14 @@ class MongoParquet:
             sample=sample or self.sample, remote=False
         )
 
-        sync_utils = SyncUtils(root_dir_path)
+        sync_utils = SyncUtils(
+            root_dir_path,
+            use_checksums=use_checksums,
+            append_segments=append_segments,
+        )
+
+        journal = RunJournal(root_dir_path, "sync", resume=resume)
+        failed: list[str] = []
 
         for model in self.collection_models:
             if include and model.collection not in include:
@@ -247,20 +367,33 @@ class MongoParquet:
                 print(f"Collection {model.collection} has no data, skipping export.")
                 continue
 
+            if journal.is_done(model.collection):
+                print(f"Already synced {model.collection}, skipping...")
+                continue
+
             if model.sync_type == "simple":
                 print(f"Performing simple sync for {model.collection}")
-                self.io.export_to_parquet(
-                    model,
-                    sample=sample or self.sample,
-                )
-                if upload_on_success:
-                    for parquet_model in [model.primary_model, *model.secondary_models]:
-                        target_filepath = self.storage_client.target_filepath(
-                            parquet_model.parquet_filename,
-                            sample=sample or False,
-                            remote=False,
-                        )
-                        sync_utils.queue_upload_if_changed(target_filepath)
+                try:
+                    self.io.sync_simple_parquet(
+                        model,
+                        sync_utils,
+                        sample=sample or self.sample,
+                    )
+                except Exception as e:
+                    print(f"Error occurred while syncing {model.collection}: {e}")
+                    failed.append(model.collection)
+                    continue
+
+                # queued even without uploads, so that a later run with uploads sends them
+                for parquet_model in [model.primary_model, *model.secondary_models]:
+                    target_filepath = self.storage_client.target_filepath(
+                        parquet_model.parquet_filename,
+                        sample=sample or False,
+                        remote=False,
+                    )
+                    sync_utils.queue_upload_if_changed(target_filepath)
+
+                self.io.complete_unit(journal, model.collection, sync_utils)
 
             elif model.sync_type == "incremental":
                 try:
@@ -269,31 +402,485 @@ class MongoParquet:
                         sync_utils,
                         sample=sample or self.sample,
                         cleanup_temp_dir=cleanup_temp_dir,
+                        journal=journal,
                     )
+                    self.io.complete_unit(journal, model.collection, sync_utils)
                 except Exception as e:
                     print(f"Error occurred while syncing {model.collection}: {e}")
+                    failed.append(model.collection)
+
+        if len(failed) == 0:
+            journal.clear()
+        else:
+            print(
+                f"⚠️ Failed to sync {', '.join(failed)}, run the sync again with --resume to retry them."
+            )
+
+        # keep the dictionaries up to date with the partitions written by this sync,
+        # so the views don't have to scan the full history
+        print("Refreshing the dictionary catalog...")
+        parquet_models = schemas.get_parquet_models(root_dir_path)
+        catalog = DictionaryCatalog(root_dir_path)
+        added = catalog.refresh(parquet_models)
+        print(f"Added {added} values to the dictionary catalog")
+
+        if index_urls:
+            print("Refreshing the URL index...")
+            indexed = UrlIndex(root_dir_path, catalog).refresh(parquet_models)
+            print(f"Indexed {indexed} new or changed files")
+
+        self.publish_changes(
+            root_dir_path,
+            sync_utils,
+            sample=sample or False,
+            upload_on_success=upload_on_success,
+        )
+
+    def watch(
+        self,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        max_changes: int = 10_000,
+        max_delay: datetime.timedelta = datetime.timedelta(seconds=30),
+        upload_on_success: bool = False,
+        append_segments: bool = False,
+        stop: threading.Event | None = None,
+    ):
+        """
+        Continuously sync the Parquet files with MongoDB from its change stream, flushing the changes as
+        micro-batches once `max_changes` documents changed, or the oldest change is `max_delay` old.
+        Change streams require a replica set, which can be a single node.
+
+        The watch resumes from the last flushed change. If there is none to resume from (or it's no longer in the oplog),
+        the change stream is opened before running a full sync, so that the changes made during the sync aren't missed.
+
+        :param include: List of collections to watch.
+        :param exclude: List of collections not to watch.
+        :param max_changes: The number of changed documents that triggers a flush.
+        :param max_delay: How long a change can be buffered before it triggers a flush.
+        :param upload_on_success: Whether to upload the files changed by each flush, along with its snapshot.
+        :param append_segments: Whether to append the inserted documents of partitioned collections as new segment files.
+        :param stop: An event to set to stop watching, e.g. from another thread. The buffered changes are flushed first.
+        """
+        if self.sample:
+            raise ValueError("Only the full data can be synced from the change stream.")
+
+        root_dir_path = self.storage_client.target_dirpath(sample=False, remote=False)
+
+        models = {
+            model.collection: model
+            for model in self.collection_models
+            if (not include or model.collection in include)
+            and not (exclude and model.collection in exclude)
+        }
+
+        pipeline = watch_pipeline(list(models))
+        token_store = ResumeTokenStore(root_dir_path)
+        resume_token = token_store.load()
+        stream = None
+
+        if resume_token is not None:
+            try:
+                stream = self.io.db.db.watch(
+                    pipeline, resume_after=resume_token, max_await_time_ms=1000
+                )
+                print("👀 Resuming the change stream from the last flushed change...")
+            except OperationFailure as e:
+                print(f"⚠️ Can't resume the change stream, syncing again: {e}")
+                token_store.clear()
+
+        if stream is None:
+            # opened before syncing so no change is missed: the changes the sync already
+            # wrote are delivered again, and applying them again doesn't add rows
+            stream = self.io.db.db.watch(pipeline, max_await_time_ms=1000)
+
+            self.sync_parquet_with_mongo(
+                sample=False,
+                include=list(models),
+                upload_on_success=upload_on_success,
+                append_segments=append_segments,
+            )
+
+        sync_utils = SyncUtils(root_dir_path, append_segments=append_segments)
+
+        def flush(changes: Changes):
+            flush_start_time = datetime.datetime.now()
+
+            for collection, collection_changes in changes.items():
+                self.io.apply_changes(
+                    models[collection], collection_changes, sync_utils
+                )
 
-        if upload_on_success and len(sync_utils.upload_queue) > 0:
-            print(f"Uploading {len(sync_utils.upload_queue)} updated files...")
-            self.storage_client.upload_to_remote(
-                sample=sample or False,
-                cleanup_local=False,
-                filepaths=sync_utils.upload_queue,
+            self.publish_changes(
+                root_dir_path, sync_utils, upload_on_success=upload_on_success
             )
 
-        sync_utils.upload_queue.clear()
+            print(
+                f"✅ Flushed the changes to {len(changes)} collections in {format_timedelta(datetime.datetime.now() - flush_start_time)}"
+            )
 
-    def recalculate_views(self, cleanup_temp_dir: bool = False):
+        print(f"👀 Watching {', '.join(models)} for changes...")
+
+        try:
+            if not consume(
+                stream,
+                ChangeBuffer(max_changes=max_changes, max_delay=max_delay),
+                flush,
+                token_store,
+                stop=stop,
+            ):
+                token_store.clear()
+        finally:
+            stream.close()
+
+    def verify_parquet(
+        self,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+        resync: bool = True,
+        upload_on_success: bool = False,
+    ) -> dict[str, list[Month]]:
+        """
+        Detect the months of incremental collections whose data drifted from MongoDB, e.g. because documents
+        of days that were already synced were corrected, and sync only those months again.
+
+        The row counts and the sums of the primary model's `checksum_fields` are compared by month,
+        aggregated with a `$group` in MongoDB, and from the Parquet footers and data.
+
+        :param include: List of collections to verify.
+        :param exclude: List of collections not to verify.
+        :param start: Only verify the data on or after this date.
+        :param end: Only verify the data before this date.
+        :param resync: Whether to sync the drifted months again, or only report them.
+        :param upload_on_success: Whether to upload the files that were synced again.
+        :return: The drifted months, by collection.
+        """
+        if self.sample:
+            # samples are cheap to export again
+            raise ValueError("Only the full data can be verified against MongoDB.")
+
+        root_dir_path = self.storage_client.target_dirpath(sample=False, remote=False)
+
+        sync_utils = SyncUtils(root_dir_path)
+        drifted: dict[str, list[Month]] = {}
+
+        for model in self.collection_models:
+            if include and model.collection not in include:
+                continue
+
+            if exclude and model.collection in exclude:
+                continue
+
+            if model.sync_type != "incremental":
+                continue
+
+            verify_start_time = datetime.datetime.now()
+            primary_model = model.primary_model
+
+            print(f"🔍 Verifying {primary_model.parquet_filename} against MongoDB...")
+
+            mongo = mongo_aggregates(
+                self.io.db.db[primary_model.collection],
+                self.io.sync_base_filter(primary_model),
+                primary_model.checksum_fields,
+                start=start,
+                end=end,
+            )
+            parquet = parquet_aggregates(
+                primary_model, primary_model.checksum_fields, start=start, end=end
+            )
+
+            months = drifted_months(mongo, parquet)
+
+            print(
+                f"Compared {len(mongo)} months of {model.collection} in {format_timedelta(datetime.datetime.now() - verify_start_time)}"
+            )
+
+            if not months:
+                continue
+
+            drifted[model.collection] = months
+
+            for year, month in months:
+                print(
+                    f"⚠️ {model.collection} {year}-{month:02d}: MongoDB {mongo.get((year, month), {})} != Parquet {parquet.get((year, month), {})}"
+                )
+
+            if resync:
+                self.io.resync_months(model, months, sync_utils)
+
+        if not resync or not drifted:
+            return drifted
+
+        self.publish_changes(
+            root_dir_path, sync_utils, upload_on_success=upload_on_success
+        )
+
+        return drifted
+
+    def compact_parquet(
+        self,
+        sample: bool | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        policy: CompactionPolicy | None = None,
+        upload_on_success: bool = False,
+    ):
+        """
+        Merge the segments appended to the partitions of incremental collections by
+        `sync_parquet_with_mongo(append_segments=True)`, for the partitions that reach a threshold of the policy.
+
+        :param sample: Whether to compact sample data.
+        :param include: List of collections to include.
+        :param exclude: List of collections to exclude.
+        :param policy: When to compact a partition. Defaults to `CompactionPolicy()`.
+        :param upload_on_success: Whether to upload the compacted files, and delete the merged segments from remote storage.
+        """
+        policy = policy or CompactionPolicy()
+
+        root_dir_path = self.storage_client.target_dirpath(
+            sample=sample or self.sample, remote=False
+        )
+
+        sync_utils = SyncUtils(root_dir_path)
+
+        for model in self.collection_models:
+            if include and model.collection not in include:
+                continue
+
+            if exclude and model.collection in exclude:
+                continue
+
+            for parquet_model in model.parquet_models():
+                dir_path = os.path.join(root_dir_path, parquet_model.parquet_filename)
+
+                if parquet_model.partition_by is None or not os.path.isdir(dir_path):
+                    continue
+
+                partition_dirs = sorted(
+                    {os.path.dirname(file) for file in list_parquet_files(dir_path)}
+                )
+
+                for partition_dir in partition_dirs:
+                    segments = segment_files(partition_dir)
+
+                    if not policy.should_compact(segments):
+                        continue
+
+                    print(
+                        f"🗜️ Compacting {len(segments)} segments of {os.path.relpath(partition_dir, root_dir_path)}..."
+                    )
+
+                    for deleted in compact_partition(
+                        partition_dir, layout=parquet_model.layout
+                    ):
+                        sync_utils.queue_file_delete(deleted)
+
+                    sync_utils.queue_upload_if_changed(
+                        os.path.join(partition_dir, BASE_SEGMENT)
+                    )
+
+        self.publish_changes(
+            root_dir_path,
+            sync_utils,
+            sample=sample or False,
+            upload_on_success=upload_on_success,
+        )
+
+    def optimize_layout(
+        self,
+        sample: bool | None = None,
+        include: list[str] | None = None,
+        exclude: list[str] | None = None,
+        upload_on_success: bool = False,
+    ):
+        """
+        Rewrite the existing Parquet files with the layout of their model (sort order, row group sizes
+        and page indexes), e.g. after the layout changed, or after merges that appended unsorted rows.
+        Files that already have the layout are skipped.
+
+        :param sample: Whether to rewrite sample data.
+        :param include: List of collections to include.
+        :param exclude: List of collections to exclude.
+        :param upload_on_success: Whether to upload the rewritten files.
+        """
+        root_dir_path = self.storage_client.target_dirpath(
+            sample=sample or self.sample, remote=False
+        )
+
+        sync_utils = SyncUtils(root_dir_path)
+
+        for model in self.collection_models:
+            if include and model.collection not in include:
+                continue
+
+            if exclude and model.collection in exclude:
+                continue
+
+            for parquet_model in model.parquet_models():
+                filepath = os.path.join(root_dir_path, parquet_model.parquet_filename)
+
+                if os.path.isdir(filepath):
+                    filepaths = list_parquet_files(filepath)
+                elif os.path.exists(filepath):
+                    filepaths = [filepath]
+                else:
+                    continue
+
+                print(
+                    f"📐 Optimizing the layout of {parquet_model.parquet_filename}..."
+                )
+
+                for file in filepaths:
+                    if parquet_model.layout.rewrite(file):
+                        print(f"Rewrote {os.path.relpath(file, root_dir_path)}")
+                        sync_utils.queue_upload_if_changed(file)
+
+        self.publish_changes(
+            root_dir_path,
+            sync_utils,
+            sample=sample or False,
+            upload_on_success=upload_on_success,
+        )
+
+    def publish_changes(
+        self,
+        root_dir_path: str,
+        sync_utils: SyncUtils,
+        sample: bool = False,
+        upload_on_success: bool = False,
+    ):
+        """
+        Save the queues of the files changed locally, commit a snapshot of them, and optionally
+        upload the changed files, the snapshot's manifest, and then delete the files that were deleted locally.
+
+        The upload queue is only cleared once the files are uploaded: until then, it is kept in the manifest
+        (which already records the files' new state), so that a later run with uploads sends them.
+
+        :param root_dir_path: The local data directory.
+        :param sync_utils: The SyncUtils instance with the upload and delete queues.
+        :param sample: Whether the data is the sample data.
+        :param upload_on_success: Whether to upload the changes to remote storage.
+        """
+        # persist the queues first, so that failed uploads and deletes are retried
+        sync_utils.save_manifest()
+
+        if upload_on_success:
+            if len(sync_utils.upload_queue) > 0:
+                print(f"Uploading {len(sync_utils.upload_queue)} updated files...")
+                self.storage_client.upload_to_remote(
+                    sample=sample,
+                    cleanup_local=False,
+                    filepaths=sync_utils.upload_queue,
+                )
+
+            sync_utils.clear_upload_queue()
+
+        self.commit_snapshot(root_dir_path, sample=sample, upload=upload_on_success)
+
+        if upload_on_success:
+            self.delete_pending_from_remote(sync_utils, sample=sample)
+
+    def commit_snapshot(
+        self, root_dir_path: str, sample: bool = False, upload: bool = False
+    ) -> Snapshot:
+        """
+        Commit a snapshot of the local Parquet files, which readers pin so that they never see
+        a directory that is being synced, and optionally upload its manifest, so that remote readers
+        get the files with a single read instead of listing the partition directories.
+
+        The manifest must only be uploaded after the files, and before any file is deleted from remote storage.
+
+        :param root_dir_path: The local data directory.
+        :param sample: Whether the data is the sample data.
+        :param upload: Whether to upload the manifest.
+        """
+        snapshot_store = SnapshotStore(root_dir_path)
+        snapshot = snapshot_store.commit()
+
+        if upload:
+            self.storage_client.upload_snapshot(
+                snapshot, snapshot_store.manifest_path(snapshot.id), sample=sample
+            )
+
+        return snapshot
+
+    def lookup_page_history(
+        self,
+        url: str,
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+        sample: bool | None = None,
+    ) -> dict[str, pl.DataFrame]:
+        """
+        Read the history of a page from the local Parquet files of the per-page models
+        (page metrics, GSC search terms and activity map). With the URL index built by syncs with `index_urls`,
+        only the row groups containing the URL are read. The files that aren't indexed are scanned instead.
+
+        :param url: The URL of the page.
+        :param start: Only include rows on or after this date.
+        :param end: Only include rows on or before this date.
+        :param sample: Whether to read the sample data.
+        :return: The rows of the page, by model name.
+        """
+        root_dir_path = self.storage_client.target_dirpath(
+            sample=sample or self.sample, remote=False
+        )
+        parquet_models = schemas.get_parquet_models(root_dir_path)
+        url_index = UrlIndex(root_dir_path)
+
+        return {
+            model_name: url_index.lookup(
+                parquet_models[model_name],  # pyright: ignore[reportArgumentType]
+                url,
+                start=start,
+                end=end,
+            )
+            for model_name in INDEXED_MODELS
+        }
+
+    def delete_pending_from_remote(self, sync_utils: SyncUtils, sample: bool = False):
+        """
+        Delete the files that were deleted locally (e.g. merged segments) from remote storage.
+        Only done after the uploads, so that remote readers never miss data.
+        """
+        if len(sync_utils.delete_queue) == 0:
+            return
+
+        print(f"Deleting {len(sync_utils.delete_queue)} files from remote storage...")
+        self.storage_client.delete_from_remote(sync_utils.delete_queue, sample=sample)
+        sync_utils.clear_delete_queue()
+
+    def recalculate_views(
+        self,
+        cleanup_temp_dir: bool = False,
+        incremental: bool = False,
+        batched: bool = False,
+    ):
         """
         Recalculate MongoDB materialized views to ensure they reflect the latest data.
+
+        :param cleanup_temp_dir: Whether to delete the temp files once the views are recalculated.
+        :param incremental: Whether to only recalculate the date ranges affected by data that changed
+                            since the views were last calculated.
+        :param batched: Whether to calculate all date ranges in one execution, so the data they have
+                        in common is only read once, instead of one date range at a time.
         """
-        view_service = ViewService(
-            self.io.db.db,
-            self.storage_client.target_dirpath(sample=self.sample, remote=False),
-            ".views_temp",
+        root_dir_path = self.storage_client.target_dirpath(
+            sample=self.sample, remote=False
         )
-        view_service.recalculate_pages_view()
-        view_service.recalculate_tasks_view()
+
+        # read from a pinned snapshot, so that a concurrent sync can't change the files mid-calculation
+        with SnapshotStore(root_dir_path).pin() as snapshot:
+            view_service = ViewService(
+                self.io.db.db,
+                root_dir_path,
+                ".views_temp",
+                read_dir_path=snapshot.dir_path,
+            )
+            view_service.recalculate_views(incremental=incremental, batched=batched)
 
         if cleanup_temp_dir:
             view_service.utils.cleanup_temp_dir()
@@ -301,11 +888,14 @@ class MongoParquet:
 
 __all__ = [
     "collection_models",
+    "CompactionPolicy",
     "get_collection_models",
+    "InsertPipeline",
     "MongoCollection",
     "MongoConfig",
     "MongoParquet",
     "MongoParquetIO",
+    "PartitionScheduler",
     "SamplingContext",
     "StorageClient",
     "schemas",
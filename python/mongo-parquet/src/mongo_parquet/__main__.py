@@ -1,10 +1,18 @@
 from logging import warning
 import os
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from pymongo.database import Database
-from mongo_parquet import MongoParquet, MongoConfig, SamplingContext, StorageClient
+from mongo_parquet import (
+    CompactionPolicy,
+    InsertPipeline,
+    MongoParquet,
+    MongoConfig,
+    PartitionScheduler,
+    SamplingContext,
+    StorageClient,
+)
 
 
 def main():
@@ -76,12 +84,100 @@ def main():
         help="Sync local Parquet files with the data in MongoDB.",
     )
 
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Continuously sync local Parquet files with MongoDB from its change stream. (requires a replica set)",
+    )
+
+    parser.add_argument(
+        "--watch-max-changes",
+        type=int,
+        default=10_000,
+        help="With --watch, flush the buffered changes once this many documents changed.",
+    )
+
+    parser.add_argument(
+        "--watch-max-delay",
+        type=float,
+        default=30,
+        help="With --watch, flush the buffered changes once the oldest is this many seconds old.",
+    )
+
+    parser.add_argument(
+        "--append-segments",
+        action="store_true",
+        help="With --sync-parquet or --watch, append new data to partitioned collections as new segment files instead of rewriting the partitions.",
+    )
+
+    parser.add_argument(
+        "--index-urls",
+        action="store_true",
+        help="With --sync-parquet, update the URL index used by lookup_page_history, which keeps copies of the per-page files sorted by URL.",
+    )
+
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Compare the monthly row counts and sums of incremental collections with MongoDB, and sync the months that differ again.",
+    )
+
+    parser.add_argument(
+        "--verify-since",
+        type=str,
+        help="With --verify, only verify the data on or after this date. (YYYY-MM-DD format)",
+    )
+
+    parser.add_argument(
+        "--report-only",
+        action="store_true",
+        help="With --verify, only report the months that differ, without syncing them again.",
+    )
+
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Merge the segments appended by --append-segments, for partitions that reach the compaction thresholds.",
+    )
+
+    parser.add_argument(
+        "--compact-max-segments",
+        type=int,
+        default=8,
+        help="With --compact, merge partitions with at least this many segments.",
+    )
+
+    parser.add_argument(
+        "--compact-max-age-days",
+        type=float,
+        default=7,
+        help="With --compact, merge partitions whose last segment is at least this old.",
+    )
+
+    parser.add_argument(
+        "--optimize-layout",
+        action="store_true",
+        help="Rewrite the existing Parquet files with their model's layout (sort order, row group sizes and page indexes).",
+    )
+
     parser.add_argument(
         "--recalculate-views",
         action="store_true",
         help="Recalculate the views (pages, tasks) using the current parquet files.",
     )
 
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --recalculate-views, only recalculate the date ranges affected by data that changed since the views were last calculated.",
+    )
+
+    parser.add_argument(
+        "--batch-views",
+        action="store_true",
+        help="With --recalculate-views, calculate all date ranges in one execution instead of one at a time.",
+    )
+
     parser.add_argument(
         "--sample-dir",
         type=str,
@@ -133,12 +229,90 @@ def main():
         help="Drop the collection before importing data.",
     )
 
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted export, sync or import, skipping the partitions and batches it already completed.",
+    )
+
     parser.add_argument(
         "--cleanup-temp-dir",
         action="store_true",
         help="Cleanup temporary directories after operations that use them.",
     )
 
+    parser.add_argument(
+        "--checksums",
+        action="store_true",
+        help="Checksum rewritten Parquet files during sync, so files rewritten with the same contents aren't uploaded again.",
+    )
+
+    parser.add_argument(
+        "--binary-ids",
+        action="store_true",
+        help="Store ObjectIds as 12-byte binary instead of hex strings when exporting/syncing. (changing the format of existing data requires exporting it again)",
+    )
+
+    parser.add_argument(
+        "--transfer-concurrency",
+        type=int,
+        default=8,
+        help="Number of files to upload/download concurrently.",
+    )
+
+    parser.add_argument(
+        "--remote-cache-dir",
+        type=str,
+        help="Local directory to cache the parts of remote files read by --from-remote.",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of partitions to export/sync concurrently.",
+    )
+
+    parser.add_argument(
+        "--max-cursors",
+        type=int,
+        help="Maximum number of concurrent MongoDB cursors when using multiple workers. (defaults to --workers)",
+    )
+
+    parser.add_argument(
+        "--split-scans",
+        type=int,
+        default=1,
+        help="Number of concurrent _id range cursors used to export large unpartitioned collections (e.g. urls, pages).",
+    )
+
+    parser.add_argument(
+        "--split-method",
+        choices=["timestamp", "bucket_auto"],
+        default="timestamp",
+        help="With --split-scans, how to split the _id ranges: evenly by ObjectId timestamp, or by $bucketAuto for even document counts.",
+    )
+
+    parser.add_argument(
+        "--partition-retries",
+        type=int,
+        default=2,
+        help="Number of times to retry a failed partition during export/sync.",
+    )
+
+    parser.add_argument(
+        "--insert-writers",
+        type=int,
+        default=4,
+        help="Number of threads inserting batches into MongoDB during import.",
+    )
+
+    parser.add_argument(
+        "--insert-queue-depth",
+        type=int,
+        help="Maximum number of encoded batches waiting to be inserted during import. (defaults to --insert-writers)",
+    )
+
     args = parser.parse_args()
 
     if args.include and args.exclude:
@@ -156,21 +330,36 @@ def main():
         actions_selected += 1
     if args.sync_parquet:
         actions_selected += 1
+    if args.watch:
+        actions_selected += 1
+    if args.verify:
+        actions_selected += 1
+    if args.compact:
+        actions_selected += 1
+    if args.optimize_layout:
+        actions_selected += 1
     if args.recalculate_views:
         actions_selected += 1
 
     if actions_selected == 0:
         print(
-            "No action specified. Use --export-from-mongo, --import-to-mongo, --sync-parquet, --upload-to-remote, or --download-from-remote."
+            "No action specified. Use --export-from-mongo, --import-to-mongo, --sync-parquet, --watch, --verify, --compact, --optimize-layout, --upload-to-remote, or --download-from-remote."
         )
         print("Use --help for more information.")
         return
 
     if actions_selected > 1:
-        # upload_to_remote is treated as an option when used with either export_from_mongo or sync_parquet, instead of an action
+        # upload_to_remote is treated as an option when used with export_from_mongo, sync_parquet, watch, verify, compact or optimize_layout, instead of an action
         if actions_selected == 2 and not (
-            (args.export_from_mongo and args.upload_to_remote)
-            or (args.sync_parquet and args.upload_to_remote)
+            args.upload_to_remote
+            and (
+                args.export_from_mongo
+                or args.sync_parquet
+                or args.watch
+                or args.verify
+                or args.compact
+                or args.optimize_layout
+            )
         ):
             print(
                 "⚠️ Multiple actions selected. Only one action can be performed at a time."
@@ -187,6 +376,23 @@ def main():
             "--drop flag is only applicable with --import-to-mongo. Ignoring --drop."
         )
 
+    if args.resume and not (
+        args.export_from_mongo or args.sync_parquet or args.import_to_mongo
+    ):
+        warning(
+            "--resume flag is only applicable with --export-from-mongo, --sync-parquet or --import-to-mongo. Ignoring --resume."
+        )
+
+    if args.index_urls and not args.sync_parquet:
+        warning(
+            "--index-urls flag is only applicable with --sync-parquet. Ignoring --index-urls."
+        )
+
+    if args.drop and args.resume and args.import_to_mongo:
+        warning(
+            "--drop would delete the documents inserted by the import being resumed. Ignoring --drop."
+        )
+
     db_name = args.db_name or "upd-test"
     sample_dir = args.sample_dir or "sample"
     data_dir = args.data_dir or "data"
@@ -195,16 +401,34 @@ def main():
         data_dir=data_dir,
         sample_dir=sample_dir,
         remote_storage_type=args.storage,
+        max_transfer_concurrency=args.transfer_concurrency,
+        remote_cache_dir=args.remote_cache_dir,
     )
 
     mongo_config = MongoConfig(
         db_name=db_name,
     )
 
+    scheduler = PartitionScheduler(
+        max_workers=args.workers,
+        max_cursors=args.max_cursors,
+        retries=args.partition_retries,
+    )
+
+    insert_pipeline = InsertPipeline(
+        writers=args.insert_writers,
+        queue_depth=args.insert_queue_depth,
+    )
+
     mp = MongoParquet(
         mongo_config=mongo_config,
         storage_client=storage_client,
         sample=args.sample,
+        scheduler=scheduler,
+        insert_pipeline=insert_pipeline,
+        id_format="binary" if args.binary_ids else "hex",
+        split_scans=args.split_scans,
+        split_method=args.split_method,
     )
 
     setup_sampling_context(
@@ -213,7 +437,9 @@ def main():
     )
 
     if args.export_from_mongo:
-        mp.export_from_mongo(include=args.include, exclude=args.exclude)
+        mp.export_from_mongo(
+            include=args.include, exclude=args.exclude, resume=args.resume
+        )
         if args.upload_to_remote:
             mp.upload_to_remote()
 
@@ -226,6 +452,10 @@ def main():
             exclude=args.exclude,
             upload_on_success=args.upload_to_remote,
             cleanup_temp_dir=args.cleanup_temp_dir,
+            use_checksums=args.checksums,
+            append_segments=args.append_segments,
+            resume=args.resume,
+            index_urls=args.index_urls,
         )
         if args.upload_to_remote:
             mp.upload_to_remote()
@@ -233,8 +463,55 @@ def main():
         timer_end()
         return
 
+    if args.watch:
+        mp.watch(
+            include=args.include,
+            exclude=args.exclude,
+            max_changes=args.watch_max_changes,
+            max_delay=timedelta(seconds=args.watch_max_delay),
+            upload_on_success=args.upload_to_remote,
+            append_segments=args.append_segments,
+        )
+        timer_end()
+        return
+
+    if args.verify:
+        mp.verify_parquet(
+            include=args.include,
+            exclude=args.exclude,
+            start=datetime.fromisoformat(args.verify_since)
+            if args.verify_since
+            else None,
+            resync=not args.report_only,
+            upload_on_success=args.upload_to_remote,
+        )
+        timer_end()
+        return
+
+    if args.compact:
+        mp.compact_parquet(
+            include=args.include,
+            exclude=args.exclude,
+            policy=CompactionPolicy(
+                max_segments=args.compact_max_segments,
+                max_age=timedelta(days=args.compact_max_age_days),
+            ),
+            upload_on_success=args.upload_to_remote,
+        )
+        timer_end()
+        return
+
+    if args.optimize_layout:
+        mp.optimize_layout(
+            include=args.include,
+            exclude=args.exclude,
+            upload_on_success=args.upload_to_remote,
+        )
+        timer_end()
+        return
+
     if args.import_to_mongo:
-        if args.drop:
+        if args.drop and not args.resume:
             drop_collections(mp.io.db.db)
 
         mp.import_to_mongo(
@@ -242,6 +519,7 @@ def main():
             include=args.include,
             exclude=args.exclude,
             min_date=datetime.fromisoformat(args.min_date) if args.min_date else None,
+            resume=args.resume,
         )
         timer_end()
         return
@@ -257,7 +535,11 @@ def main():
         return
 
     if args.recalculate_views:
-        mp.recalculate_views(cleanup_temp_dir=args.cleanup_temp_dir)
+        mp.recalculate_views(
+            cleanup_temp_dir=args.cleanup_temp_dir,
+            incremental=args.incremental,
+            batched=args.batch_views,
+        )
         timer_end()
         return
 
@@ -267,6 +549,10 @@ def main():
         or args.upload_to_remote
         or args.download_from_remote
         or args.sync_parquet
+        or args.watch
+        or args.verify
+        or args.compact
+        or args.optimize_layout
         or args.recalculate_views
     ):
         print("No action specified. Use one of the following:\r\n")
@@ -275,6 +561,10 @@ def main():
         print("\t--upload_to_remote (upload)")
         print("\t--download_from_remote (download)")
         print("\t--sync_parquet (sync)")
+        print("\t--watch (continuous sync)")
+        print("\t--verify (verify)")
+        print("\t--compact (compact)")
+        print("\t--optimize-layout (optimize layout)")
         print("\t--recalculate-views (recalculate)")
 
         print("Use --help for more information.")
@@ -0,0 +1,229 @@
+"""
+A persistent catalog of the distinct values (URLs, links, search terms) found in the Parquet files,
+used as stable categorical codes without rescanning the full history.
+"""
+
+import fcntl
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import final
+import polars as pl
+from .schemas import ParquetModels
+from .utils import list_parquet_files
+
+# dictionary name -> (model name, expression of the values) for every source of values
+DICTIONARY_SOURCES: dict[str, list[tuple[str, pl.Expr]]] = {
+    "urls": [
+        (model, pl.col("url"))
+        for model in (
+            "page_metrics",
+            "pages",
+            "activity_map",
+            "aa_searchterms",
+            "gsc_searchterms",
+            "feedback",
+        )
+    ],
+    "links": [("activity_map", pl.col("link"))],
+    "terms": [
+        ("aa_searchterms", pl.col("term").str.to_lowercase()),
+        ("gsc_searchterms", pl.col("term").str.to_lowercase()),
+    ],
+}
+
+
+def _model_files(path: str) -> list[str]:
+    if not os.path.isdir(path):
+        return [path] if os.path.exists(path) else []
+
+    return list_parquet_files(path)
+
+
+@final
+class DictionaryCatalog:
+    """
+    Append-only dictionaries of values, where the code of a value is its index in the dictionary.
+    Since values are never removed or reordered, the codes are stable across runs, and
+    `enum` gives an Enum type whose physical representation (u32) is the code.
+
+    The catalog keeps track of the size and mtime of the source files it has read,
+    so `refresh` only reads new or rewritten files.
+
+    Processes sharing the catalog save it one at a time, each appending its new values
+    after the values saved by the others since it read the dictionaries.
+    """
+
+    dir_name = "_catalog"
+    version = 1
+
+    def __init__(self, parquet_dir_path: str, read_dir_path: str | None = None):
+        """
+        :param parquet_dir_path: The directory of the Parquet files. The catalog is stored in a subdirectory.
+        :param read_dir_path: The directory the source files are read from, e.g. a pinned snapshot
+                              of the data directory. Defaults to `parquet_dir_path`.
+        """
+        self.parquet_dir_path = os.path.abspath(parquet_dir_path)
+        # the source files are tracked relative to it, so a snapshot's hard links match the files they link to
+        self.read_dir_path = os.path.abspath(read_dir_path or parquet_dir_path)
+        self.dir_path = os.path.join(self.parquet_dir_path, self.dir_name)
+        self.sources_path = os.path.join(self.dir_path, "sources.json")
+        self.lock_path = os.path.join(self.dir_path, ".lock")
+        self.dictionaries: dict[str, pl.Series] = {}
+        # dictionary name -> relative path -> size and mtime of the source files that were read
+        self.sources: dict[str, dict[str, dict[str, int]]] = self._load_sources()
+        self._changed: set[str] = set()
+
+    def _load_sources(self) -> dict[str, dict[str, dict[str, int]]]:
+        if not os.path.exists(self.sources_path):
+            return {}
+
+        with open(self.sources_path, "r") as f:
+            data = json.load(f)
+
+        if data.get("version") != self.version:
+            return {}
+
+        return data.get("files", {})
+
+    def dictionary_path(self, name: str) -> str:
+        return os.path.join(self.dir_path, f"{name}.arrow")
+
+    def _read_values(self, name: str) -> pl.Series:
+        path = self.dictionary_path(name)
+
+        if not os.path.exists(path):
+            return pl.Series("value", [], dtype=pl.String)
+
+        return pl.read_ipc(path, memory_map=False)["value"]
+
+    def values(self, name: str) -> pl.Series:
+        """
+        Get the values of a dictionary, in code order.
+        """
+        if name not in self.dictionaries:
+            self.dictionaries[name] = self._read_values(name)
+
+        return self.dictionaries[name]
+
+    def enum(self, name: str) -> pl.Enum:
+        """
+        Get an Enum of the values of a dictionary, whose physical values are the codes.
+        """
+        return pl.Enum(self.values(name))
+
+    def add(self, name: str, values: pl.Series) -> int:
+        """
+        Append the values that aren't in a dictionary yet.
+        Their codes are only final once the catalog is saved, as other processes may save values first.
+
+        :return: The number of values added.
+        """
+        existing = self.values(name)
+        new_values = values.cast(pl.String).drop_nulls().unique().sort()
+        new_values = new_values.filter(new_values.is_in(existing.implode()).not_())
+
+        if new_values.len() == 0:
+            return 0
+
+        self.dictionaries[name] = pl.concat([existing, new_values.alias("value")])
+        self._changed.add(name)
+
+        return new_values.len()
+
+    def refresh(self, parquet_models: ParquetModels) -> int:
+        """
+        Add the values of new or rewritten source files to the dictionaries, and save the catalog.
+
+        :param parquet_models: The models of the Parquet files, in `read_dir_path`.
+        :return: The number of values added.
+        """
+        added = 0
+
+        files_by_model = {
+            model_name: _model_files(
+                os.path.join(
+                    parquet_models[model_name].dir_path,  # pyright: ignore[reportTypedDictNotRequiredAccess]
+                    parquet_models[model_name].parquet_filename,  # pyright: ignore[reportTypedDictNotRequiredAccess]
+                )
+            )
+            for model_name in {
+                model_name
+                for model_sources in DICTIONARY_SOURCES.values()
+                for model_name, _ in model_sources
+            }
+        }
+
+        for name, model_sources in DICTIONARY_SOURCES.items():
+            previous_sources = self.sources.get(name, {})
+            sources: dict[str, dict[str, int]] = {}
+
+            for model_name, expr in model_sources:
+                for filepath in files_by_model[model_name]:
+                    key = os.path.relpath(filepath, self.read_dir_path)
+                    stat = os.stat(filepath)
+                    state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                    sources[key] = state
+
+                    if previous_sources.get(key) == state:
+                        continue
+
+                    values = (
+                        pl.scan_parquet(filepath, hive_partitioning=False)
+                        .select(expr.unique().alias("value"))
+                        .collect()["value"]
+                    )
+                    added += self.add(name, values)
+
+            self.sources[name] = sources
+
+        self.save()
+
+        return added
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the catalog, waiting for other processes to release it.
+        The lock is released when the file is closed, including when the process dies.
+        """
+        os.makedirs(self.dir_path, exist_ok=True)
+
+        with open(self.lock_path, "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def save(self):
+        """
+        Write the changed dictionaries, and the state of the source files, atomically replacing them.
+
+        The dictionaries are read again under a lock, so that the values saved by other processes
+        keep their codes, and the values added since they were read are appended after them.
+        """
+        with self._locked():
+            for name in sorted(self._changed):
+                saved = self._read_values(name)
+                values = self.values(name)
+                added = values.filter(values.is_in(saved.implode()).not_())
+
+                self.dictionaries[name] = pl.concat([saved, added])
+
+                path = self.dictionary_path(name)
+                self.dictionaries[name].to_frame("value").write_ipc(f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+
+            self._changed.clear()
+
+            with open(f"{self.sources_path}.tmp", "w") as f:
+                json.dump(
+                    {"version": self.version, "files": self.sources},
+                    f,
+                    indent=1,
+                    sort_keys=True,
+                )
+
+            os.replace(f"{self.sources_path}.tmp", self.sources_path)
+
+
+__all__ = ["DICTIONARY_SOURCES", "DictionaryCatalog"]
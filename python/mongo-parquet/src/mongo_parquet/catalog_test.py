@@ -0,0 +1,83 @@
+"""Tests for the dictionary catalog."""
+
+import polars as pl
+from .catalog import DictionaryCatalog
+from .schemas import get_parquet_models
+from .snapshots import SnapshotStore
+
+
+class TestDictionaryCatalog:
+    """Test that the codes of the values are kept as values are added and saved."""
+
+    def test_add_is_append_only(self, parquet_dir):
+        catalog = DictionaryCatalog(parquet_dir)
+
+        assert catalog.add("urls", pl.Series(["/b", "/a", None, "/a"])) == 2
+        assert catalog.add("urls", pl.Series(["/c", "/a"])) == 1
+        assert catalog.values("urls").to_list() == ["/a", "/b", "/c"]
+
+        catalog.save()
+
+        reloaded = DictionaryCatalog(parquet_dir)
+
+        assert reloaded.enum("urls") == pl.Enum(["/a", "/b", "/c"])
+        assert pl.Series(["/c", "/a"]).cast(
+            reloaded.enum("urls")
+        ).to_physical().to_list() == [2, 0]
+
+    def test_refresh_only_reads_changed_files(self, parquet_dir, write_metrics):
+        write_metrics(1, ["/b", "/a"])
+        models = get_parquet_models(parquet_dir)
+
+        assert DictionaryCatalog(parquet_dir).refresh(models) == 2
+
+        # unchanged files aren't read again
+        assert DictionaryCatalog(parquet_dir).refresh(models) == 0
+
+        # existing codes are kept when new values are found
+        write_metrics(2, ["/a", "/0"])
+        catalog = DictionaryCatalog(parquet_dir)
+
+        assert catalog.refresh(models) == 1
+        assert catalog.values("urls").to_list() == ["/a", "/b", "/0"]
+        assert catalog.values("links").len() == 0
+
+    def test_refresh_from_a_snapshot(self, parquet_dir, write_metrics):
+        """The files of a snapshot are the files of the data directory they link to, so they're not read again."""
+        write_metrics(1, ["/b", "/a"])
+        models = get_parquet_models(parquet_dir)
+
+        assert DictionaryCatalog(parquet_dir).refresh(models) == 2
+
+        snapshot = SnapshotStore(parquet_dir).commit()
+        catalog = DictionaryCatalog(parquet_dir, read_dir_path=snapshot.dir_path)
+
+        assert catalog.refresh(get_parquet_models(snapshot.dir_path)) == 0
+
+        # files written after the snapshot are only read from the data directory
+        write_metrics(2, ["/c"])
+        assert catalog.refresh(get_parquet_models(snapshot.dir_path)) == 0
+        assert DictionaryCatalog(parquet_dir).refresh(models) == 1
+
+    def test_save_appends_values_saved_by_other_processes(self, parquet_dir):
+        catalog = DictionaryCatalog(parquet_dir)
+        _ = catalog.add("urls", pl.Series(["/a"]))
+        catalog.save()
+
+        # both read the dictionary before either saves
+        first = DictionaryCatalog(parquet_dir)
+        second = DictionaryCatalog(parquet_dir)
+        _ = first.add("urls", pl.Series(["/b", "/c"]))
+        _ = second.add("urls", pl.Series(["/c", "/d"]))
+
+        first.save()
+        second.save()
+
+        # the codes saved first are kept, and only the other values are appended
+        assert second.values("urls").to_list() == ["/a", "/b", "/c", "/d"]
+        assert DictionaryCatalog(parquet_dir).values("urls").to_list() == [
+            "/a",
+            "/b",
+            "/c",
+            "/d",
+        ]
@@ -0,0 +1,89 @@
+"""Fixtures shared by the tests of the Parquet data directory."""
+
+import os
+from collections.abc import Callable
+from datetime import datetime
+import polars as pl
+import pytest
+from .layout import ParquetLayout
+
+type JanuaryRows = Callable[[int, int], pl.DataFrame]
+type WriteMetrics = Callable[..., str]
+type WriteDays = Callable[[str, int], str]
+
+
+@pytest.fixture
+def parquet_dir(tmp_path) -> str:
+    """The data directory, in a temporary directory."""
+    return str(tmp_path)
+
+
+@pytest.fixture
+def write_metrics(parquet_dir: str) -> WriteMetrics:
+    """
+    Write a partition of `pages_metrics.parquet` with a row per URL for the first 3 days of a month of 2024,
+    and `visits` numbering the rows. Returns the path of the file.
+    """
+
+    def write(
+        month: int, urls: list[str], layout: ParquetLayout | None = None
+    ) -> str:
+        path = os.path.join(
+            parquet_dir,
+            "pages_metrics.parquet",
+            "year=2024",
+            f"month={month}",
+            "0.parquet",
+        )
+        df = pl.DataFrame(
+            {
+                "date": [
+                    datetime(2024, month, day) for day in range(1, 4) for _ in urls
+                ],
+                "url": urls * 3,
+            },
+            schema_overrides={"date": pl.Datetime("ms")},
+        ).with_row_index("visits")
+
+        if layout is not None:
+            layout.write(df, path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            df.write_parquet(path)
+
+        return path
+
+    return write
+
+
+@pytest.fixture
+def january_rows() -> JanuaryRows:
+    """
+    Build a row per day of January 2024, from the `start` day up to the `end` day (excluded),
+    with the day as the number of `visits`.
+    """
+
+    def rows(start: int, end: int) -> pl.DataFrame:
+        return pl.DataFrame(
+            {"date": [datetime(2024, 1, day) for day in range(start, end)]}
+        ).with_columns(pl.col("date").dt.day().alias("visits"))
+
+    return rows
+
+
+@pytest.fixture
+def write_days(parquet_dir: str, january_rows: JanuaryRows) -> WriteDays:
+    """
+    Write a file with the rows of the first days of January 2024, replacing the previous file
+    (as syncs do) rather than overwriting it. Returns the path of the file.
+    """
+
+    def write(path: str, days: int) -> str:
+        filepath = os.path.join(parquet_dir, path)
+        temp_path = f"{filepath}.tmp"
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        january_rows(1, days + 1).write_parquet(temp_path)
+        os.replace(temp_path, filepath)
+        return filepath
+
+    return write
@@ -0,0 +1,173 @@
+"""
+Columnar conversion of DataFrames to MongoDB documents.
+
+Every column is converted to Python values in one pass, with ObjectIds, default values and
+key/value metadata handled per column, and documents are only assembled at the very end.
+This avoids walking every key of every row in Python, which is what `to_dicts()` followed
+by `convert_objectids` on each value amounts to.
+"""
+
+from typing import Any
+import polars as pl
+from polars.datatypes import DataTypeClass
+from bson import ObjectId
+
+
+def has_binary(dtype: pl.DataType | DataTypeClass) -> bool:
+    """
+    Whether a dtype is or contains Binary values. ObjectIds are the only binary values stored.
+    """
+    # nested dtypes can be given as classes, e.g. `pl.List(pl.Binary)`
+    dtype = dtype() if isinstance(dtype, type) else dtype
+
+    if isinstance(dtype, pl.Binary):
+        return True
+
+    if isinstance(dtype, (pl.List, pl.Array)):
+        return has_binary(dtype.inner)
+
+    if isinstance(dtype, pl.Struct):
+        return any(has_binary(field.dtype) for field in dtype.fields)
+
+    return False
+
+
+def series_to_python(series: pl.Series, convert_objectids: bool = False) -> list[Any]:
+    """
+    Convert a Series to a list of Python values.
+
+    :param series: The Series to convert.
+    :param convert_objectids: Whether to convert 12-byte binary values (at any depth) to ObjectIds.
+    :return: The Python values, with None for nulls.
+    """
+    dtype = series.dtype
+
+    if not convert_objectids or not has_binary(dtype):
+        return series.to_list()
+
+    if isinstance(dtype, pl.Array):
+        # converted like lists, which have the same values
+        return series_to_python(series.cast(pl.List(dtype.inner)), convert_objectids)
+
+    if isinstance(dtype, pl.Binary):
+        return [
+            ObjectId(value) if value is not None and len(value) == 12 else value
+            for value in series.to_list()
+        ]
+
+    if isinstance(dtype, pl.Struct):
+        names = [field.name for field in dtype.fields]
+        fields = [
+            series_to_python(series.struct.field(name), convert_objectids)
+            for name in names
+        ]
+        validity = series.is_not_null().to_list()
+
+        return [
+            dict(zip(names, row)) if is_valid else None
+            for row, is_valid in zip(zip(*fields), validity)
+        ]
+
+    # lists: convert the flattened values, then slice them back into lists
+    lengths = series.list.len()
+    values = series_to_python(series.filter(lengths > 0).explode(), convert_objectids)
+
+    results: list[Any] = []
+    offset = 0
+
+    for length in lengths.to_list():
+        if length is None:
+            results.append(None)
+            continue
+
+        results.append(values[offset : offset + length])
+        offset += length
+
+    return results
+
+
+def key_value_to_object(values: list[Any]) -> list[Any]:
+    """
+    Convert lists of {"k", "v"} structs to objects, e.g. for `metadata` fields,
+    which are stored as arrays since their keys are arbitrary.
+    """
+    return [
+        {
+            item["k"]: item["v"]
+            for item in value
+            if isinstance(item, dict) and "k" in item and "v" in item
+        }
+        if isinstance(value, list)
+        else value
+        for value in values
+    ]
+
+
+def dataframe_to_documents(
+    df: pl.DataFrame,
+    objectid_fields: list[str] | None = None,
+    default_values: dict[str, Any] | None = None,
+    key_value_fields: list[str] | None = None,
+    columns: list[str] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Convert a DataFrame to a list of MongoDB documents.
+
+    Null values are omitted from the documents, unless the field has a default value.
+
+    :param df: The data to convert.
+    :param objectid_fields: Top-level fields whose binary values (at any depth) are ObjectIds.
+    :param default_values: Default values for null or missing fields.
+    :param key_value_fields: Fields stored as lists of {"k", "v"} structs, to be converted to objects.
+    :param columns: All fields of the collection, used to add default values for missing columns.
+    :return: The documents, in the same order as the rows of the DataFrame.
+    """
+    objectid_fields = objectid_fields or []
+    default_values = default_values or {}
+    key_value_fields = key_value_fields or []
+
+    num_rows = df.height
+
+    if num_rows == 0:
+        return []
+
+    names: list[str] = []
+    values: list[list[Any]] = []
+
+    for series in df.iter_columns():
+        name = series.name
+        column_values = series_to_python(series, name in objectid_fields)
+
+        if name in key_value_fields:
+            column_values = key_value_to_object(column_values)
+
+        if name in default_values:
+            default = default_values[name]
+            column_values = [
+                default if value is None else value for value in column_values
+            ]
+
+        names.append(name)
+        values.append(column_values)
+
+    # defaults for fields that aren't in the data at all
+    for name in columns or []:
+        if name not in names and name in default_values:
+            names.append(name)
+            values.append([default_values[name]] * num_rows)
+
+    if len(names) == 0:
+        return [{} for _ in range(num_rows)]
+
+    return [
+        {name: value for name, value in zip(names, row) if value is not None}
+        for row in zip(*values)
+    ]
+
+
+__all__ = [
+    "dataframe_to_documents",
+    "has_binary",
+    "series_to_python",
+    "key_value_to_object",
+]
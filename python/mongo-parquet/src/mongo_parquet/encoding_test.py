@@ -0,0 +1,130 @@
+"""Tests for the columnar DataFrame to MongoDB document conversion."""
+
+from datetime import datetime
+import polars as pl
+from bson import ObjectId
+from .encoding import dataframe_to_documents
+
+ID_1 = ObjectId("65a1b2c3d4e5f60718293a4b")
+ID_2 = ObjectId("65a1b2c3d4e5f60718293a4c")
+TASK_ID = ObjectId("65a1b2c3d4e5f60718293a4d")
+
+
+def test_objectids_nested_and_top_level():
+    """Binary values in ObjectId fields are converted at any depth."""
+    df = pl.DataFrame(
+        {
+            "_id": [ID_1.binary, ID_2.binary],
+            "tasks": [[TASK_ID.binary], None],
+            "aa_searchterms": [
+                [{"term": "a", "clicks": 1, "_id": TASK_ID.binary}],
+                [],
+            ],
+            "checksum": [b"not-an-objectid-at-all", b"123456789012"],
+        }
+    )
+
+    docs = dataframe_to_documents(
+        df, objectid_fields=["_id", "tasks", "aa_searchterms"]
+    )
+
+    assert docs == [
+        {
+            "_id": ID_1,
+            "tasks": [TASK_ID],
+            "aa_searchterms": [{"term": "a", "clicks": 1, "_id": TASK_ID}],
+            "checksum": b"not-an-objectid-at-all",
+        },
+        {
+            "_id": ID_2,
+            "aa_searchterms": [],
+            "checksum": b"123456789012",
+        },
+    ]
+
+
+def test_nulls_and_default_values():
+    """Nulls are omitted unless there's a default, which also fills missing columns."""
+    df = pl.DataFrame(
+        {
+            "_id": [ID_1.binary, ID_2.binary],
+            "date": [datetime(2024, 1, 1), None],
+            "tasks": [None, [TASK_ID.binary]],
+            "page": [{"_id": TASK_ID.binary, "title": None}, None],
+        }
+    )
+
+    docs = dataframe_to_documents(
+        df,
+        objectid_fields=["_id", "tasks", "page"],
+        default_values={"tasks": [], "projects": []},
+        columns=["_id", "date", "tasks", "projects", "page"],
+    )
+
+    assert docs == [
+        {
+            "_id": ID_1,
+            "date": datetime(2024, 1, 1),
+            "tasks": [],
+            "page": {"_id": TASK_ID, "title": None},
+            "projects": [],
+        },
+        {
+            "_id": ID_2,
+            "tasks": [TASK_ID],
+            "projects": [],
+        },
+    ]
+
+
+def test_key_value_fields():
+    """Lists of {k, v} structs are converted to objects."""
+    df = pl.DataFrame(
+        {
+            "_id": [ID_1.binary, ID_2.binary, ID_1.binary],
+            "metadata": [
+                [{"k": "owner", "v": "ABC"}, {"k": "lang", "v": "en"}],
+                [],
+                None,
+            ],
+        }
+    )
+
+    docs = dataframe_to_documents(
+        df, objectid_fields=["_id"], key_value_fields=["metadata"]
+    )
+
+    assert docs == [
+        {"_id": ID_1, "metadata": {"owner": "ABC", "lang": "en"}},
+        {"_id": ID_2, "metadata": {}},
+        {"_id": ID_1},
+    ]
+
+
+def test_sliced_lists():
+    """List offsets are respected for sliced data."""
+    df = pl.DataFrame(
+        {
+            "_id": [ID_1.binary, ID_2.binary, ID_1.binary],
+            "tasks": [[ID_1.binary], [ID_2.binary, TASK_ID.binary], None],
+        }
+    ).slice(1, 2)
+
+    docs = dataframe_to_documents(df, objectid_fields=["_id", "tasks"])
+
+    assert docs == [{"_id": ID_2, "tasks": [ID_2, TASK_ID]}, {"_id": ID_1}]
+
+
+def test_fixed_size_arrays():
+    """Binary values in fixed-size arrays are converted like those in lists."""
+    df = pl.DataFrame(
+        {
+            "_id": [ID_1.binary, ID_2.binary],
+            "tasks": [[ID_2.binary, TASK_ID.binary], None],
+        },
+        schema={"_id": pl.Binary, "tasks": pl.Array(pl.Binary, 2)},
+    )
+
+    docs = dataframe_to_documents(df, objectid_fields=["_id", "tasks"])
+
+    assert docs == [{"_id": ID_1, "tasks": [ID_2, TASK_ID]}, {"_id": ID_2}]
@@ -0,0 +1,184 @@
+from collections.abc import Callable, Iterable
+from queue import Queue
+from threading import Event, Thread
+from time import perf_counter
+from typing import Any, final
+import polars as pl
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+from .schemas import MongoCollection
+
+
+@final
+class InsertStats:
+    """
+    Counters for documents inserted into a collection, which can be added together
+    to get the totals across partitions.
+    """
+
+    def __init__(self, docs: int = 0, bytes: int = 0, elapsed_secs: float = 0.0):
+        """
+        :param docs: The number of documents inserted.
+        :param bytes: The in-memory (Arrow) size of the inserted data.
+        :param elapsed_secs: The wall-clock time spent inserting.
+        """
+        self.docs = docs
+        self.bytes = bytes
+        self.elapsed_secs = elapsed_secs
+
+    def __add__(self, other: "InsertStats") -> "InsertStats":
+        return InsertStats(
+            self.docs + other.docs,
+            self.bytes + other.bytes,
+            self.elapsed_secs + other.elapsed_secs,
+        )
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.docs / self.elapsed_secs if self.elapsed_secs > 0 else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes / self.elapsed_secs if self.elapsed_secs > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.docs:,} docs in {self.elapsed_secs:.1f}s "
+            f"({self.docs_per_sec:,.0f} docs/sec, {self.bytes_per_sec / 1024**2:,.1f} MB/sec)"
+        )
+
+
+_DONE = object()
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def only_duplicates(error: BulkWriteError) -> bool:
+    """
+    Whether an unordered bulk insert only failed to insert documents that already exist.
+    """
+    write_errors = error.details.get("writeErrors", [])
+
+    return (
+        len(write_errors) > 0
+        and not error.details.get("writeConcernErrors")
+        and all(e.get("code") == DUPLICATE_KEY_ERROR for e in write_errors)
+    )
+
+
+@final
+class InsertPipeline:
+    """
+    Inserts batches into MongoDB with a producer/consumer pipeline:
+    the calling thread collects and encodes batches, while writer threads
+    send them with `insert_many(ordered=False)` over the client's shared connection pool.
+
+    The queue between the two is bounded, so the producer waits for the writers
+    instead of holding more than `queue_depth` encoded batches in memory.
+    """
+
+    def __init__(self, writers: int = 4, queue_depth: int | None = None):
+        """
+        :param writers: The number of writer threads.
+        :param queue_depth: The maximum number of encoded batches waiting to be written. Defaults to `writers`.
+        """
+        self.writers = max(1, writers)
+        self.queue_depth = max(1, queue_depth or self.writers)
+
+    def run(
+        self,
+        collection: Collection[Any],
+        collection_model: MongoCollection,
+        batches: Iterable[pl.DataFrame],
+        on_inserted: Callable[[int], None] | None = None,
+        ignore_duplicates: bool = False,
+    ) -> InsertStats:
+        """
+        Insert all batches into the collection.
+
+        If a write fails, no more batches are produced, and the error is raised
+        once the writers have stopped.
+
+        :param collection: The collection to insert into.
+        :param collection_model: The model used to encode the documents.
+        :param batches: The batches to insert. They're only collected as the queue has room for them.
+        :param on_inserted: Called with the index of each batch (in `batches`, counting empty ones) once it's inserted,
+                            in the order the writers finish them.
+        :param ignore_duplicates: Whether documents that already exist are skipped instead of failing the insert,
+                                  e.g. when resuming an import that was interrupted during a batch.
+        :return: The number of documents and bytes inserted, and the time it took.
+        """
+        queue: Queue[Any] = Queue(maxsize=self.queue_depth)
+        failed = Event()
+        errors: list[BaseException] = []
+
+        def write():
+            while True:
+                item = queue.get()
+
+                if item is _DONE:
+                    return
+
+                if failed.is_set():
+                    continue  # drain the queue so the producer isn't blocked
+
+                index, records = item
+
+                try:
+                    collection.insert_many(records, ordered=False)
+                except BulkWriteError as e:
+                    if not (ignore_duplicates and only_duplicates(e)):
+                        errors.append(e)
+                        failed.set()
+                        continue
+                except BaseException as e:
+                    errors.append(e)
+                    failed.set()
+                    continue
+                finally:
+                    del item, records
+
+                if on_inserted is not None:
+                    on_inserted(index)
+
+        threads = [
+            Thread(target=write, name=f"insert-{i}", daemon=True)
+            for i in range(self.writers)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        stats = InsertStats()
+        start = perf_counter()
+
+        try:
+            for index, batch in enumerate(batches):
+                if failed.is_set():
+                    break
+
+                if batch.is_empty():
+                    continue
+
+                stats.docs += batch.height
+                stats.bytes += int(batch.estimated_size())
+
+                queue.put(
+                    (index, collection_model.prepare_for_insert(batch, sort_id=False))
+                )
+        finally:
+            for _ in threads:
+                queue.put(_DONE)
+
+            for thread in threads:
+                thread.join()
+
+        stats.elapsed_secs = perf_counter() - start
+
+        if errors:
+            raise errors[0]
+
+        return stats
+
+
+__all__ = ["InsertPipeline", "InsertStats"]
@@ -0,0 +1,113 @@
+"""Tests for the insert pipeline."""
+
+import threading
+import time
+from typing import Any
+import polars as pl
+import pytest
+from pymongo.errors import BulkWriteError
+from .insert_pipeline import DUPLICATE_KEY_ERROR, InsertPipeline, InsertStats
+
+
+class FakeCollection:
+    def __init__(self, fail_after: int | None = None, delay_secs: float = 0):
+        self.lock = threading.Lock()
+        self.inserted: list[dict[str, Any]] = []
+        self.calls = 0
+        self.fail_after = fail_after
+        self.delay_secs = delay_secs
+
+    def insert_many(self, records: list[dict[str, Any]], ordered: bool = True):
+        assert not ordered
+        time.sleep(self.delay_secs)
+
+        with self.lock:
+            self.calls += 1
+            if self.fail_after is not None and self.calls > self.fail_after:
+                raise RuntimeError("write failed")
+            self.inserted.extend(records)
+
+
+class FakeModel:
+    def prepare_for_insert(self, df: pl.DataFrame, sort_id: bool = True):
+        return df.to_dicts()
+
+
+def batches(count: int, size: int = 10):
+    for i in range(count):
+        yield pl.DataFrame({"_id": range(i * size, (i + 1) * size)})
+
+
+def test_all_batches_inserted():
+    """Every document is inserted exactly once, and counted in the stats."""
+    collection = FakeCollection(delay_secs=0.01)
+
+    stats = InsertPipeline(writers=3).run(collection, FakeModel(), batches(10))  # pyright: ignore[reportArgumentType]
+
+    assert sorted(doc["_id"] for doc in collection.inserted) == list(range(100))
+    assert stats.docs == 100
+    assert stats.bytes > 0
+
+
+def test_failed_write_stops_producer():
+    """A failed write stops batches from being collected, and is raised."""
+    collection = FakeCollection(fail_after=1)
+    produced = {"count": 0}
+
+    def counted_batches():
+        for batch in batches(100):
+            produced["count"] += 1
+            yield batch
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        InsertPipeline(writers=1, queue_depth=1).run(
+            collection,  # pyright: ignore[reportArgumentType]
+            FakeModel(),  # pyright: ignore[reportArgumentType]
+            counted_batches(),
+        )
+
+    assert produced["count"] < 100
+
+
+def test_resumed_batches():
+    """Inserted batches are reported by index, and documents inserted before an interruption are skipped."""
+
+    class ResumedCollection(FakeCollection):
+        def insert_many(self, records: list[dict[str, Any]], ordered: bool = True):
+            if records[0]["_id"] == 20:
+                raise BulkWriteError(
+                    {"writeErrors": [{"code": DUPLICATE_KEY_ERROR}], "nInserted": 5}
+                )
+            super().insert_many(records, ordered)
+
+    collection = ResumedCollection()
+    inserted: list[int] = []
+
+    def resumed_batches():
+        for index, batch in enumerate(batches(4)):
+            yield pl.DataFrame() if index == 0 else batch
+
+    _ = InsertPipeline(writers=2).run(
+        collection,  # pyright: ignore[reportArgumentType]
+        FakeModel(),  # pyright: ignore[reportArgumentType]
+        resumed_batches(),
+        on_inserted=inserted.append,
+        ignore_duplicates=True,
+    )
+
+    assert sorted(inserted) == [1, 2, 3]
+    assert len(collection.inserted) == 20
+
+    with pytest.raises(BulkWriteError):
+        _ = InsertPipeline(writers=2).run(
+            ResumedCollection(),  # pyright: ignore[reportArgumentType]
+            FakeModel(),  # pyright: ignore[reportArgumentType]
+            batches(4),
+        )
+
+
+def test_stats_add_up():
+    total = InsertStats() + InsertStats(10, 100, 2.0) + InsertStats(30, 300, 2.0)
+
+    assert (total.docs, total.bytes, total.elapsed_secs) == (40, 400, 4.0)
+    assert total.docs_per_sec == 10
@@ -3,20 +3,33 @@ import os
 import re
 from copy import deepcopy
 from datetime import datetime, timedelta
-from time import sleep
-from typing import final
+from contextlib import contextmanager
+from functools import partial
+from collections.abc import Iterable, Iterator
+from typing import Any, final
 import polars as pl
 from pymongoarrow.monkey import patch_all
 from pymongo import MongoClient
-from .mongo import MongoConfig, MongoArrowClient
+from .insert_pipeline import InsertPipeline, InsertStats
+from .journal import RunJournal, partition_unit
+from .mongo import MongoConfig, MongoArrowClient, SplitMethod
 from .sampling import SamplingContext
+from .scheduler import PartitionScheduler
+from .segments import segment_files, write_segment
+from .upsert import (
+    changed_since_filter,
+    drop_unchanged,
+    stored_ids,
+    stored_watermark,
+    upsert_by_id,
+)
+from .verify import Month, in_months, month_filter, replace_months
+from .watch import ChangeType
 from .storage import StorageClient
-from .schemas import MongoCollection, ParquetModel
+from .schemas import MongoCollection, ParquetModel, id_format_of
 from .utils import (
     format_timedelta,
-    get_partition_values,
-    month_range,
-    year_range,
+    partition_range,
     SyncUtils,
 )
 
@@ -24,6 +37,60 @@ from .utils import (
 patch_all()
 
 
+def date_window_filter(
+    base_filter: dict[str, Any], start_date: datetime, end_date: datetime
+) -> dict[str, Any]:
+    """
+    Combine a query filter with an inclusive date window, replacing any existing date condition.
+    """
+    return {
+        **deepcopy(base_filter),
+        **{
+            "date": {
+                "$gte": start_date,
+                "$lte": end_date,
+            }
+        },
+    }
+
+
+def export_date_bounds(query_filter: dict[str, Any]) -> tuple[datetime, datetime]:
+    """
+    Get the date bounds of a full partitioned export from the query filter, if it has any.
+    """
+    start: datetime = query_filter.get("date", {}).get("$gte") or datetime(2020, 1, 1)
+    end: datetime = query_filter.get("date", {}).get("$lte") or datetime.now()
+
+    return start, end
+
+
+def partition_filepath(
+    parquet_model: ParquetModel, partition_start: datetime, filename: str = "0.parquet"
+) -> str:
+    """
+    Get the hive-partitioned path of a file, relative to the data directory.
+
+    :param parquet_model: The model representing the parquet output.
+    :param partition_start: Any date within the partition.
+    :param filename: The name of the file within the partition directory.
+    """
+    year = partition_start.strftime("%Y")
+    month = partition_start.strftime("%#m" if os.name == "nt" else "%-m")
+
+    partition_base_path = (
+        parquet_model.parquet_filename
+        if parquet_model.parquet_filename
+        else f"{parquet_model.collection}.parquet"
+    )
+
+    partition_path = f"{partition_base_path}/year={year}"
+
+    if parquet_model.partition_by == "month":
+        partition_path += f"/month={month}"
+
+    return f"{partition_path}/{filename}"
+
+
 @final
 class MongoParquetIO:
     """
@@ -35,11 +102,19 @@ class MongoParquetIO:
         mongo_config: MongoConfig,
         storage_client: StorageClient,
         sampling_context: SamplingContext,
+        scheduler: PartitionScheduler | None = None,
+        insert_pipeline: InsertPipeline | None = None,
+        split_scans: int = 1,
+        split_method: SplitMethod = "timestamp",
     ):
         """
         Initialize the MongoParquetIO with a MongoDB collection.
 
         :param mongo_config: The MongoDB configuration options.
+        :param scheduler: The scheduler for processing partitions. Defaults to serial processing.
+        :param insert_pipeline: The pipeline for inserting into MongoDB. Defaults to 4 writer threads.
+        :param split_scans: The number of concurrent `_id` range cursors used to export unpartitioned models.
+        :param split_method: How to compute the `_id` ranges. See `MongoArrowClient.id_boundaries`.
         """
         self.mongo_config = mongo_config
         self.db_name = mongo_config.db_name
@@ -54,6 +129,10 @@ class MongoParquetIO:
 
         self.storage = storage_client
         self.sampling_context = sampling_context
+        self.scheduler = scheduler or PartitionScheduler()
+        self.insert_pipeline = insert_pipeline or InsertPipeline()
+        self.split_scans = split_scans
+        self.split_method: SplitMethod = split_method
 
     def sync_incremental_parquet(
         self,
@@ -62,6 +141,7 @@ class MongoParquetIO:
         sample: bool | None = None,
         partition_filename: str = "0.parquet",  # default file name from polars partitioned write
         cleanup_temp_dir: bool = False,
+        journal: RunJournal | None = None,
     ):
         """
         Sync incremental changes from MongoDB to Parquet files.
@@ -69,6 +149,7 @@ class MongoParquetIO:
         :param collection_model: The model representing the MongoDB collection.
         :param sample: Whether to use a sample of the data.
         :param sync_filter: Date filter to apply for incremental sync.
+        :param journal: The journal of the sync, to skip the partitions already synced by an interrupted run.
         """
         sync_start_time = datetime.now()
         formatted_datetime = sync_start_time.strftime("%H:%M:%S")
@@ -91,275 +172,1218 @@ class MongoParquetIO:
             or {}
         ).get("date")
 
-        for parquet_model in [
-            collection_model.primary_model,
-            *collection_model.secondary_models,
-        ]:
-            parquet_start_time = datetime.now()
-            print(f"Processing {parquet_model.parquet_filename}...")
+        if collection_model.single_pass:
+            self.sync_single_pass(
+                collection_model,
+                sync_utils,
+                latest_mongo_date,
+                sample=sample,
+                partition_filename=partition_filename,
+                journal=journal,
+            )
+        else:
+            for parquet_model in collection_model.parquet_models():
+                self.sync_parquet_model(
+                    parquet_model,
+                    sync_utils,
+                    latest_mongo_date,
+                    sample=sample,
+                    partition_filename=partition_filename,
+                    journal=journal,
+                )
+
+        if cleanup_temp_dir:
+            print("Cleaning up temporary directory...")
+            sync_utils.cleanup_temp_dir()
+
+        collection_time_elapsed = datetime.now() - sync_start_time
+        sync_end_time = datetime.now()
+        formatted_end_datetime = sync_end_time.strftime("%H:%M:%S")
+
+        print(
+            f"✅ [{formatted_end_datetime}] Completed sync for {collection_model.collection} in {format_timedelta(collection_time_elapsed)}"
+        )
+
+    def sync_parquet_model(
+        self,
+        parquet_model: ParquetModel,
+        sync_utils: SyncUtils,
+        latest_mongo_date: datetime | None,
+        sample: bool | None = None,
+        partition_filename: str = "0.parquet",
+        journal: RunJournal | None = None,
+    ):
+        """
+        Sync the new data for a single parquet model, reading it from MongoDB on its own.
+
+        :param parquet_model: The model representing the parquet output.
+        :param sync_utils: The SyncUtils instance for backups and the upload queue.
+        :param latest_mongo_date: The latest date found in the MongoDB collection.
+        :param sample: Whether to use a sample of the data.
+        :param journal: The journal of the sync, to skip the partitions already synced by an interrupted run.
+        """
+        parquet_start_time = datetime.now()
+        print(f"Processing {parquet_model.parquet_filename}...")
+
+        # get latest date
+        latest_parquet_date: datetime = parquet_model.latest_date() or datetime.min
+
+        if journal is not None and parquet_model.partition_by is not None:
+            # partitions are synced concurrently, so the latest date of an interrupted sync
+            # can be past partitions that weren't synced yet
+            latest_parquet_date = journal.remember(
+                f"{parquet_model.parquet_filename}/latest_date", latest_parquet_date
+            )
+
+        if latest_mongo_date is None or latest_mongo_date <= latest_parquet_date:
+            print(
+                f"No new data found in MongoDB for parquet model: {parquet_model.parquet_filename}, skipping."
+            )
+            return
+
+        print(
+            f"Latest parquet date: {latest_parquet_date}, latest mongo date: {latest_mongo_date}"
+        )
+
+        self.prepare_sync(parquet_model, sync_utils)
+
+        base_filter = self.sync_base_filter(parquet_model, sample)
+
+        if parquet_model.partition_by is not None and not sample:
+
+            def sync_partition(start: datetime, end: datetime):
+                partition_label = (
+                    f"{start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')}"
+                )
+                unit = partition_unit(parquet_model.parquet_filename, start)
+                print(f"Processing {partition_label} for {parquet_model.collection}...")
+
+                partition_start_time = datetime.now()
+
+                with self.scheduler.cursor():
+                    new_data = self.db.find(
+                        parquet_model, date_window_filter(base_filter, start, end)
+                    )
+
+                if new_data is None or new_data.is_empty():  # pyright: ignore[reportUnnecessaryComparison]
+                    print(f"No data found for {start} - {end}, skipping...")
+                    self.complete_unit(journal, unit, sync_utils)
+                    return
+
+                print(f"Found {len(new_data)} new records for {partition_label}")
+
+                new_data = self.without_synced_dates(
+                    parquet_model,
+                    new_data,
+                    start,
+                    sample=sample,
+                    partition_filename=partition_filename,
+                )
+
+                if new_data.is_empty():
+                    print(f"{partition_label} is already synced, skipping...")
+                    self.complete_unit(journal, unit, sync_utils)
+                    return
+
+                self.merge_into_partition(
+                    parquet_model,
+                    new_data,
+                    start,
+                    sync_utils,
+                    sample=sample,
+                    partition_filename=partition_filename,
+                )
+
+                del new_data
+
+                self.complete_unit(journal, unit, sync_utils)
+
+                partition_time_elapsed = datetime.now() - partition_start_time
+
+                print(
+                    f"Processed {partition_label} in {format_timedelta(partition_time_elapsed)}"
+                )
+
+            self.scheduler.run(
+                (
+                    f"{parquet_model.parquet_filename} ({start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')})",
+                    partial(sync_partition, start, end),
+                )
+                for start, end in partition_range(
+                    parquet_model.partition_by,
+                    latest_parquet_date + timedelta(days=1),
+                    latest_mongo_date,
+                    exact_start_date=True,
+                )
+                if journal is None
+                or not journal.is_done(
+                    partition_unit(parquet_model.parquet_filename, start)
+                )
+            )
+
+            print(
+                f"Finished processing {parquet_model.parquet_filename} in {format_timedelta(datetime.now() - parquet_start_time)}"
+            )
+            return
+
+        new_data = self.db.find(
+            parquet_model,
+            filter={"date": {"$gt": latest_parquet_date}, **base_filter},
+        )
+
+        if new_data is None or new_data.is_empty():  # pyright: ignore[reportUnnecessaryComparison]
+            print("No new or updated records found, skipping...")
+            return
+
+        print(f"Found {len(new_data)} new or updated records")
+
+        self.append_to_file(parquet_model, new_data, sync_utils, sample=sample)
+
+        print(
+            f"Finished processing {parquet_model.parquet_filename} in {format_timedelta(datetime.now() - parquet_start_time)}"
+        )
+
+    def sync_single_pass(
+        self,
+        collection_model: MongoCollection,
+        sync_utils: SyncUtils,
+        latest_mongo_date: datetime | None,
+        sample: bool | None = None,
+        partition_filename: str = "0.parquet",
+        journal: RunJournal | None = None,
+    ):
+        """
+        Sync the new data for all of a collection's parquet models, reading each date window
+        from MongoDB once and deriving every model from the same result.
+
+        :param collection_model: The model representing the MongoDB collection.
+        :param sync_utils: The SyncUtils instance for backups and the upload queue.
+        :param latest_mongo_date: The latest date found in the MongoDB collection.
+        :param sample: Whether to use a sample of the data.
+        :param journal: The journal of the sync, to skip the partitions, and the models of a partition,
+            already synced by an interrupted run.
+        """
+        primary_model = collection_model.primary_model
+
+        latest_parquet_dates: dict[str, datetime] = {}
 
-            # get latest date
-            latest_parquet_date: datetime = parquet_model.latest_date() or datetime.min
+        for parquet_model in collection_model.parquet_models():
+            latest_parquet_date = parquet_model.latest_date() or datetime.min
+
+            if journal is not None and primary_model.partition_by is not None:
+                latest_parquet_date = journal.remember(
+                    f"{parquet_model.parquet_filename}/latest_date", latest_parquet_date
+                )
 
             if latest_mongo_date is None or latest_mongo_date <= latest_parquet_date:
                 print(
                     f"No new data found in MongoDB for parquet model: {parquet_model.parquet_filename}, skipping."
                 )
-                return
+                continue
 
             print(
-                f"Latest parquet date: {latest_parquet_date}, latest mongo date: {latest_mongo_date}"
+                f"Latest parquet date for {parquet_model.parquet_filename}: {latest_parquet_date}, latest mongo date: {latest_mongo_date}"
             )
 
-            incremental_filter = {
-                "date": {"$gt": latest_parquet_date},
+            latest_parquet_dates[parquet_model.parquet_filename] = latest_parquet_date
+
+            self.prepare_sync(parquet_model, sync_utils)
+
+        if latest_mongo_date is None or len(latest_parquet_dates) == 0:
+            return
+
+        parquet_models = [
+            parquet_model
+            for parquet_model in collection_model.parquet_models()
+            if parquet_model.parquet_filename in latest_parquet_dates
+        ]
+
+        base_filter = self.sync_base_filter(primary_model, sample)
+
+        # read from the earliest date that any of the models is missing
+        earliest_parquet_date = min(latest_parquet_dates.values())
+
+        if primary_model.partition_by is not None and not sample:
+            # same bounds as reading each model on its own: from the day after its latest date
+            predicates = {
+                filename: pl.col("date") >= latest_date + timedelta(days=1)
+                for filename, latest_date in latest_parquet_dates.items()
             }
 
-            sync_utils.ensure_temp_dirs()
+            def sync_partition(start: datetime, end: datetime):
+                partition_label = (
+                    f"{start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')}"
+                )
+                unit = partition_unit(collection_model.collection, start)
+                print(
+                    f"Processing {partition_label} for {collection_model.collection}..."
+                )
 
-            # Do initial processing/hashing for current/previous data
-            local_path = self.storage.target_filepath(
-                parquet_model.parquet_filename, remote=False
+                partition_start_time = datetime.now()
+
+                with self.scheduler.cursor():
+                    extracted = self.db.find_extraction(
+                        collection_model, date_window_filter(base_filter, start, end)
+                    )
+
+                if extracted.is_empty():
+                    print(f"No data found for {start} - {end}, skipping...")
+                    self.complete_unit(journal, unit, sync_utils)
+                    return
+
+                print(f"Found {len(extracted)} new records for {partition_label}")
+
+                new_data = collection_model.split_extraction(extracted, predicates)
+                del extracted
+
+                for parquet_model in parquet_models:
+                    model_unit = partition_unit(parquet_model.parquet_filename, start)
+
+                    if journal is not None and journal.is_done(model_unit):
+                        print(
+                            f"{parquet_model.parquet_filename} was already synced for {partition_label}, skipping..."
+                        )
+                        continue
+
+                    # the models merged by a failed attempt at the partition aren't merged again
+                    model_data = self.without_synced_dates(
+                        parquet_model,
+                        new_data[parquet_model.parquet_filename],
+                        start,
+                        sample=sample,
+                        partition_filename=partition_filename,
+                    )
+
+                    if model_data.is_empty():
+                        print(
+                            f"No new data for {parquet_model.parquet_filename} in {partition_label}, skipping..."
+                        )
+                        self.complete_unit(journal, model_unit, sync_utils)
+                        continue
+
+                    self.merge_into_partition(
+                        parquet_model,
+                        model_data,
+                        start,
+                        sync_utils,
+                        sample=sample,
+                        partition_filename=partition_filename,
+                    )
+
+                    # so that a resumed run only merges the models that weren't merged yet
+                    self.complete_unit(journal, model_unit, sync_utils)
+
+                del new_data
+
+                self.complete_unit(journal, unit, sync_utils)
+
+                print(
+                    f"Processed {partition_label} in {format_timedelta(datetime.now() - partition_start_time)}"
+                )
+
+            self.scheduler.run(
+                (
+                    f"{collection_model.collection} ({start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')})",
+                    partial(sync_partition, start, end),
+                )
+                for start, end in partition_range(
+                    primary_model.partition_by,
+                    earliest_parquet_date + timedelta(days=1),
+                    latest_mongo_date,
+                    exact_start_date=True,
+                )
+                if journal is None
+                or not journal.is_done(
+                    partition_unit(collection_model.collection, start)
+                )
+            )
+            return
+
+        extracted = self.db.find_extraction(
+            collection_model,
+            filter={"date": {"$gt": earliest_parquet_date}, **base_filter},
+        )
+
+        if extracted.is_empty():
+            print("No new or updated records found, skipping...")
+            return
+
+        print(f"Found {len(extracted)} new or updated records")
+
+        new_data = collection_model.split_extraction(
+            extracted,
+            {
+                filename: pl.col("date") > latest_date
+                for filename, latest_date in latest_parquet_dates.items()
+            },
+        )
+        del extracted
+
+        for parquet_model in parquet_models:
+            model_data = new_data[parquet_model.parquet_filename]
+
+            if model_data.is_empty():
+                print(
+                    f"No new or updated records for {parquet_model.parquet_filename}, skipping..."
+                )
+                continue
+
+            self.append_to_file(parquet_model, model_data, sync_utils, sample=sample)
+
+    def complete_unit(
+        self,
+        journal: RunJournal | None,
+        unit: str,
+        sync_utils: SyncUtils | None = None,
+    ):
+        """
+        Record a completed unit of work in the journal of the run, if there is one.
+
+        The manifest is saved first, so that the uploads queued for the unit aren't lost
+        if the run is interrupted, as a resumed run doesn't write the unit again.
+        """
+        if journal is None:
+            return
+
+        if sync_utils is not None:
+            sync_utils.save_manifest()
+
+        journal.mark_done(unit)
+
+    def prepare_sync(self, parquet_model: ParquetModel, sync_utils: SyncUtils):
+        """
+        Make sure the temp directories exist and record the state of the current data, to be able to
+        tell whether it was changed by the sync. Files unchanged since the last sync aren't read.
+
+        Raises a ValueError if the existing data stores ObjectIds in another format than the model,
+        as both can't be merged. Exporting the collection again changes the format of all its data.
+        """
+        stored_id_format = parquet_model.stored_id_format()
+
+        if stored_id_format is not None and stored_id_format != parquet_model.id_format:
+            raise ValueError(
+                f"{parquet_model.parquet_filename} stores ObjectIds as {stored_id_format}, but {parquet_model.id_format} was requested. Export the collection again to change the format."
             )
 
-            if os.path.exists(local_path):
-                hash_start_time = datetime.now()
+        sync_utils.ensure_temp_dirs()
+
+        local_path = self.storage.target_filepath(
+            parquet_model.parquet_filename, remote=False
+        )
 
-                print(f"Hashing {local_path}...")
+        if os.path.exists(local_path):
+            record_start_time = datetime.now()
 
-                sync_utils.add_hash(local_path)
+            print(f"Recording file state for {local_path}...")
 
-                print(f"Hashed {local_path} in {datetime.now() - hash_start_time}")
+            sync_utils.record_file_state(local_path)
 
-            base_filter = (
+            print(
+                f"Recorded file state for {local_path} in {format_timedelta(datetime.now() - record_start_time)}"
+            )
+
+    def sync_base_filter(
+        self, parquet_model: ParquetModel, sample: bool | None = None
+    ) -> dict[str, Any]:
+        """
+        Returns the model's filter (or sampling filter) without its date condition,
+        to be combined with the incremental date filters.
+        """
+        base_filter = deepcopy(
+            (
                 parquet_model.get_sampling_filter(self.sampling_context)
                 if sample
                 else parquet_model.filter
-            ) or {}
+            )
+            or {}
+        )
+
+        if base_filter.get("date") is not None:
+            base_filter.pop("date")
+
+        return base_filter
+
+    def merge_into_partition(
+        self,
+        parquet_model: ParquetModel,
+        new_data: pl.DataFrame,
+        partition_start: datetime,
+        sync_utils: SyncUtils,
+        sample: bool | None = None,
+        partition_filename: str = "0.parquet",
+    ):
+        """
+        Write new data to the partition containing `partition_start`, merging it with
+        the existing partition data if there is any, or appending it as a new segment
+        if `sync_utils.append_segments` is enabled.
+
+        If the write fails, the previous data is restored and the error is raised again,
+        so that the partition is retried and not recorded as synced.
+
+        :param parquet_model: The model representing the parquet output.
+        :param new_data: The transformed data to add to the partition.
+        :param partition_start: The start date of the partition.
+        :param sync_utils: The SyncUtils instance for backups and the upload queue.
+        :param sample: Whether to use a sample of the data.
+        """
+        merge_start_time = datetime.now()
+
+        filepath = partition_filepath(
+            parquet_model, partition_start, partition_filename
+        )
+        partition_path = os.path.dirname(filepath)
+
+        storage_filepath = self.storage.target_filepath(
+            filepath, sample=sample or False, remote=False
+        )
 
-            if base_filter.get("date") is not None:
-                base_filter.pop("date")
+        if sync_utils.append_segments and os.path.exists(storage_filepath):
+            segment_filepath = write_segment(
+                new_data,
+                os.path.dirname(storage_filepath),
+                layout=parquet_model.layout,
+            )
 
-            combined_filter = {**incremental_filter, **base_filter}
+            print(
+                f"Appended {len(new_data)} rows to {segment_filepath} in {format_timedelta(datetime.now() - merge_start_time)}"
+            )
 
-            if parquet_model.partition_by is not None and not sample:
+            # only the new segment is uploaded
+            sync_utils.queue_upload_if_changed(segment_filepath)
+            return
 
-                def create_filter(start_date: datetime, end_date: datetime):
-                    return {
-                        **deepcopy(combined_filter),
-                        **{
-                            "date": {
-                                "$gte": start_date,
-                                "$lte": end_date,
-                            }
-                        },
-                    }
+        if os.path.exists(storage_filepath):
+            try:
+                print(f"Backing up existing file {filepath} before overwriting...")
+                sync_utils.backup_file(filepath)
 
-                date_range_start_filter: datetime = latest_parquet_date + timedelta(
-                    days=1
+                print(
+                    f"Partition for {partition_path} exists with previous data, writing merged data to {filepath}..."
                 )
 
-                date_range_end_filter: datetime = latest_mongo_date
+                temp_storage_filepath = re.sub(
+                    r"\.parquet$", ".tmp.parquet", storage_filepath
+                )
+                print(f"Writing to temporary file {temp_storage_filepath}...")
 
-                if parquet_model.partition_by == "month":
-                    date_range_iter = month_range(
-                        date_range_start_filter,
-                        date_range_end_filter,
-                        exact_start_date=True,
-                    )
+                pl.concat(
+                    [
+                        pl.scan_parquet(storage_filepath),
+                        new_data.lazy(),
+                    ]
+                ).sink_parquet(
+                    temp_storage_filepath,
+                    **parquet_model.layout.sink_options(),
+                    engine="streaming",
+                    sync_on_close="all",
+                )
 
-                elif parquet_model.partition_by == "year":
-                    date_range_iter = year_range(
-                        date_range_start_filter,
-                        date_range_end_filter,
-                        exact_start_date=True,
-                    )
+                print(
+                    f"Replacing {storage_filepath} with temp file {temp_storage_filepath}..."
+                )
 
-                else:
-                    raise ValueError(
-                        f"Unsupported partitioning type: {parquet_model.partition_by}"
-                    )
+                os.replace(temp_storage_filepath, storage_filepath)
+
+                print(f"Successfully wrote to {storage_filepath}")
+            except Exception as e:
+                error(e)
+                sync_utils.restore_backup(filepath)
+                # so that the partition isn't recorded as synced, and is retried
+                raise
+        else:
+            print(f"Writing to {filepath}")
+            try:
+                self.storage.write_parquet(
+                    new_data,
+                    filepath,
+                    sample=sample or False,
+                    layout=parquet_model.layout,
+                )
+                print(f"Successfully wrote to {storage_filepath}")
+            except Exception as e:
+                error(e)
+                raise
+
+        print(
+            f"Updated {filepath} in {format_timedelta(datetime.now() - merge_start_time)}"
+        )
+
+        sync_utils.queue_upload_if_changed(storage_filepath)
+
+    def append_to_file(
+        self,
+        parquet_model: ParquetModel,
+        new_data: pl.DataFrame,
+        sync_utils: SyncUtils,
+        sample: bool | None = None,
+    ):
+        """
+        Append new data to an unpartitioned parquet file.
+        If the write fails, the previous file is restored and the error is raised again.
+
+        :param parquet_model: The model representing the parquet output.
+        :param new_data: The transformed data to append.
+        :param sync_utils: The SyncUtils instance for backups and the upload queue.
+        :param sample: Whether to use a sample of the data.
+        """
+        print(f"Backing up {parquet_model.parquet_filename}...")
+
+        sync_utils.backup_file(parquet_model.parquet_filename)
+
+        target_filepath = self.storage.target_filepath(
+            parquet_model.parquet_filename, sample=sample or False, remote=False
+        )
+
+        print(f"Appending new data to {target_filepath}...")
+
+        try:
+            temp_target_filepath = re.sub(
+                r"\.parquet$", ".tmp.parquet", target_filepath
+            )
+            print(f"Writing to temporary file {temp_target_filepath}...")
+
+            pl.concat([parquet_model.lf(hex_ids=False), new_data.lazy()]).sink_parquet(
+                temp_target_filepath,
+                **parquet_model.layout.sink_options(),
+                engine="streaming",
+                sync_on_close="all",
+            )
+
+            os.replace(temp_target_filepath, target_filepath)
+
+            print(f"Successfully wrote to {target_filepath}")
+        except Exception as e:
+            e.add_note(f"Error writing to {target_filepath}")
+            error(e)
+            sync_utils.restore_backup(parquet_model.parquet_filename)
+            raise
+
+        sync_utils.queue_upload_if_changed(target_filepath)
+
+    def sync_simple_parquet(
+        self,
+        collection_model: MongoCollection,
+        sync_utils: SyncUtils,
+        sample: bool | None = None,
+        batch_size: int = 50_000,
+    ):
+        """
+        Sync a simple collection by merging the documents changed since the last sync into its Parquet file by `_id`,
+        so that only the changed documents are read. The `_id`s of the collection are only read if its number of
+        documents doesn't match the number of rows after the merge, i.e. if documents were deleted.
+        This assumes that each document is stored as exactly one row, as for the primary models of simple
+        collections: for a model whose transform filters or explodes documents, deletions could go unnoticed.
+        The file isn't rewritten if the changed rows are identical to the stored rows, as for the documents at the watermark.
+
+        The collection is exported again instead if it has no `change_field`, several parquet models,
+        or no existing data to merge into, and when syncing a sample, as the sampling filter can change between syncs.
+
+        :param collection_model: The model representing the MongoDB collection.
+        :param sync_utils: The SyncUtils instance for backups.
+        :param sample: Whether to use a sample of the data.
+        :param batch_size: The maximum number of documents to read at a time.
+        """
+        parquet_model = collection_model.primary_model
+        change_field = collection_model.change_field
 
-                for start, end in date_range_iter:
-                    partition_label = (
-                        f"{start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')}"
+        target_filepath = self.storage.target_filepath(
+            parquet_model.parquet_filename, sample=sample or False, remote=False
+        )
+
+        watermark = (
+            stored_watermark(target_filepath, change_field)
+            if change_field is not None
+            and not sample
+            and not collection_model.secondary_models
+            and not parquet_model.pipeline
+            and os.path.isfile(target_filepath)
+            and parquet_model.stored_id_format() == parquet_model.id_format
+            else None
+        )
+
+        if change_field is None or watermark is None:
+            self.export_to_parquet(
+                collection_model,
+                sample=sample,
+                batch_size=batch_size,
+                sync_utils=sync_utils,
+            )
+            return
+
+        sync_start_time = datetime.now()
+        last_changed, last_id = watermark
+
+        print(
+            f"🔄 Merging documents of {collection_model.collection} changed since {last_changed} or created after {last_id}..."
+        )
+
+        changes = pl.concat(
+            self.db.find_batches(
+                parquet_model,
+                filter=changed_since_filter(
+                    parquet_model.filter, change_field, last_changed, last_id
+                ),
+                batch_size=batch_size,
+            ),
+            how="diagonal_relaxed",
+        )
+
+        existing = pl.scan_parquet(target_filepath)
+        changes = drop_unchanged(existing, changes)
+        deleted_ids: pl.Series | None = None
+
+        # the number of rows after merging the changes, counted without merging them
+        merged_height = (
+            existing.filter(~pl.col("_id").is_in(changes["_id"].implode()))
+            .select(pl.len())
+            .collect()
+            .item()
+            + changes.height
+        )
+
+        collection = self.db.db[parquet_model.collection]
+
+        if collection.count_documents(parquet_model.filter or {}) != merged_height:
+            print(
+                f"Looking for documents deleted from {collection_model.collection}..."
+            )
+
+            mongo_ids = stored_ids(
+                [
+                    doc["_id"]
+                    for doc in collection.find(
+                        parquet_model.filter or {},
+                        projection={"_id": 1},
+                        batch_size=batch_size,
                     )
-                    print(
-                        f"Processing {partition_label} for {parquet_model.collection}..."
+                ],
+                parquet_model.id_format,
+            ).to_frame()
+
+            deleted_ids = (
+                existing.select("_id")
+                .join(mongo_ids.lazy(), on="_id", how="anti")
+                .collect()["_id"]
+            )
+
+        if changes.is_empty() and (deleted_ids is None or deleted_ids.is_empty()):
+            print(f"No changes found in {collection_model.collection}, skipping.")
+            return
+
+        merged = upsert_by_id(existing, changes, parquet_model.layout, deleted_ids)
+
+        self.replace_with_merged(
+            parquet_model,
+            merged,
+            parquet_model.parquet_filename,
+            sync_utils,
+            sample=sample,
+        )
+
+        print(
+            f"Merged {len(changes)} changed and {0 if deleted_ids is None else len(deleted_ids)} deleted documents into {target_filepath} in {format_timedelta(datetime.now() - sync_start_time)}"
+        )
+
+    def replace_with_merged(
+        self,
+        parquet_model: ParquetModel,
+        merged: pl.DataFrame,
+        filepath: str,
+        sync_utils: SyncUtils,
+        sample: bool | None = None,
+    ):
+        """
+        Replace an existing Parquet file with merged data.
+
+        If the write fails, the previous file is restored and the error is raised again,
+        so that the file is not recorded as synced.
+
+        :param parquet_model: The model representing the parquet output.
+        :param merged: The merged data.
+        :param filepath: The path of the file, relative to the data directory.
+        :param sync_utils: The SyncUtils instance for backups.
+        :param sample: Whether to use a sample of the data.
+        """
+        sync_utils.ensure_temp_dirs()
+        sync_utils.backup_file(filepath)
+
+        try:
+            self.storage.write_parquet(
+                merged,
+                filepath,
+                sample=sample or False,
+                layout=parquet_model.layout,
+            )
+        except Exception as e:
+            error(e)
+            sync_utils.restore_backup(filepath)
+            raise
+
+    def apply_changes(
+        self,
+        collection_model: MongoCollection,
+        changes: dict[ChangeType, list[Any]],
+        sync_utils: SyncUtils,
+        batch_size: int = 50_000,
+    ):
+        """
+        Apply a micro-batch of changes from a change stream to the Parquet files of a collection.
+        The inserted and updated documents are read again from MongoDB, so the rows are the same as an export's.
+
+        Change streams deliver events at least once, so applying the same changes again must not add rows.
+        Unpartitioned files are merged by `_id`. In partitioned files, inserted documents that aren't stored yet
+        are added to the partition of their date (as a new segment if `sync_utils.append_segments` is enabled),
+        and the partitions of updated documents are merged by `_id`, which reads the whole partition. Deletes, and updates moving a document to
+        another partition, can't be located in partitioned files without reading all of them, so they're only
+        applied by the next export.
+
+        :param collection_model: The model representing the MongoDB collection.
+        :param changes: The `_id`s of the changed documents, by type of change.
+        :param sync_utils: The SyncUtils instance for backups and the upload queue.
+        :param batch_size: The maximum number of documents to read at a time.
+        """
+        inserted_ids = changes.get("insert", [])
+        updated_ids = changes.get("update", [])
+        deleted_ids = changes.get("delete", [])
+
+        print(
+            f"🔄 Applying {len(inserted_ids)} inserts, {len(updated_ids)} updates and {len(deleted_ids)} deletes to {collection_model.collection}..."
+        )
+
+        for parquet_model in collection_model.parquet_models():
+            target_filepath = self.storage.target_filepath(
+                parquet_model.parquet_filename, remote=False
+            )
+
+            if not os.path.exists(target_filepath):
+                print(
+                    f"{parquet_model.parquet_filename} hasn't been exported yet, skipping."
+                )
+                continue
+
+            if parquet_model.pipeline:
+                print(
+                    f"{parquet_model.parquet_filename} is read with a pipeline, which can't be filtered by _id, skipping."
+                )
+                continue
+
+            if parquet_model.stored_id_format() != parquet_model.id_format:
+                print(
+                    f"{parquet_model.parquet_filename} stores ObjectIds in another format, skipping. Export the collection again to change the format."
+                )
+                continue
+
+            base_filter = self.sync_base_filter(parquet_model)
+            changed_ids = [*inserted_ids, *updated_ids]
+            id_filter = {"_id": {"$in": changed_ids}}
+
+            rows = (
+                pl.concat(
+                    self.db.find_batches(
+                        parquet_model,
+                        filter={"$and": [base_filter, id_filter]}
+                        if base_filter
+                        else id_filter,
+                        batch_size=batch_size,
+                    ),
+                    how="diagonal_relaxed",
+                )
+                if changed_ids
+                else None
+            )
+
+            if parquet_model.partition_by is None:
+                if (rows is None or rows.is_empty()) and not deleted_ids:
+                    continue
+
+                existing = pl.scan_parquet(target_filepath)
+                merged = upsert_by_id(
+                    existing,
+                    rows if rows is not None else existing.head(0).collect(),
+                    parquet_model.layout,
+                    stored_ids(deleted_ids, parquet_model.id_format),
+                )
+
+                self.replace_with_merged(
+                    parquet_model, merged, parquet_model.parquet_filename, sync_utils
+                )
+                sync_utils.queue_upload_if_changed(target_filepath)
+
+                continue
+
+            if deleted_ids:
+                print(
+                    f"⚠️ {len(deleted_ids)} deleted documents can't be removed from the partitions of {parquet_model.parquet_filename}."
+                )
+
+            if rows is None or rows.is_empty():
+                continue
+
+            is_updated = pl.col("_id").is_in(
+                stored_ids(updated_ids, parquet_model.id_format).implode()
+            )
+
+            partitions = rows.with_columns(
+                pl.col("date")
+                .dt.truncate("1mo" if parquet_model.partition_by == "month" else "1y")
+                .alias("_partition"),
+                is_updated.alias("_updated"),
+            ).filter(pl.col("_partition").is_not_null())
+
+            for (partition_start,), partition_rows in partitions.partition_by(
+                "_partition", as_dict=True
+            ).items():
+                has_updates = partition_rows["_updated"].any()
+                partition_rows = partition_rows.drop("_partition", "_updated")
+
+                if not has_updates:
+                    partition_rows = self.without_stored_rows(
+                        parquet_model, partition_rows, partition_start
                     )
 
-                    partition_start_time = datetime.now()
-                    new_data = self.db.find(parquet_model, create_filter(start, end))
+                    if not partition_rows.is_empty():
+                        self.merge_into_partition(
+                            parquet_model, partition_rows, partition_start, sync_utils
+                        )
+                    continue
+
+                self.upsert_partition(
+                    parquet_model, partition_rows, partition_start, sync_utils
+                )
+
+    def without_synced_dates(
+        self,
+        parquet_model: ParquetModel,
+        rows: pl.DataFrame,
+        partition_start: datetime,
+        sample: bool | None = None,
+        partition_filename: str = "0.parquet",
+    ) -> pl.DataFrame:
+        """
+        Drop the rows dated on or before the latest date stored in a partition, so that syncing
+        a partition again (when it's retried, or when an interrupted run is resumed) doesn't merge
+        the rows of the models that were already merged a second time.
+
+        Syncs only add the days after the latest synced date, so any stored row on or after
+        those days was written by an earlier attempt. Only the `date` column is read.
+
+        :param parquet_model: The model representing the parquet output.
+        :param rows: The transformed rows of the partition.
+        :param partition_start: The start date of the partition.
+        :param sample: Whether to use a sample of the data.
+        :return: The rows that are newer than the stored rows of the partition.
+        """
+        filepath = self.storage.target_filepath(
+            partition_filepath(parquet_model, partition_start, partition_filename),
+            sample=sample or False,
+            remote=False,
+        )
+        files = segment_files(os.path.dirname(filepath))
+
+        if filepath not in files and os.path.exists(filepath):
+            files.append(filepath)
+
+        if not files:
+            return rows
+
+        stored_max_date: datetime | None = (
+            pl.scan_parquet(files, hive_partitioning=False)
+            .select(pl.col("date").max())
+            .collect()
+            .item()
+        )
+
+        if stored_max_date is None:
+            return rows
+
+        return rows.filter(pl.col("date") > stored_max_date)
+
+    def without_stored_rows(
+        self,
+        parquet_model: ParquetModel,
+        rows: pl.DataFrame,
+        partition_start: datetime,
+    ) -> pl.DataFrame:
+        """
+        Drop the rows whose `_id` is already stored in a partition, so that inserts delivered again
+        by a change stream aren't appended twice. Only the `_id` column of the segments is read.
+
+        :param parquet_model: The model representing the parquet output.
+        :param rows: The transformed rows of the inserted documents.
+        :param partition_start: The start date of the partition.
+        :return: The rows that aren't stored in the partition yet.
+        """
+        filepath = partition_filepath(parquet_model, partition_start)
+        segments = segment_files(
+            os.path.dirname(self.storage.target_filepath(filepath, remote=False))
+        )
+
+        if not segments:
+            return rows
+
+        stored = (
+            pl.scan_parquet(segments, hive_partitioning=False).select("_id").collect()
+        )
+
+        return rows.join(stored, on="_id", how="anti")
+
+    def upsert_partition(
+        self,
+        parquet_model: ParquetModel,
+        rows: pl.DataFrame,
+        partition_start: datetime,
+        sync_utils: SyncUtils,
+    ):
+        """
+        Merge rows into a partition by `_id`, replacing its segments with a single `0.parquet`.
+
+        :param parquet_model: The model representing the parquet output.
+        :param rows: The transformed rows of the changed documents.
+        :param partition_start: The start date of the partition.
+        :param sync_utils: The SyncUtils instance for backups and the upload queue.
+        """
+        filepath = partition_filepath(parquet_model, partition_start)
+        storage_filepath = self.storage.target_filepath(filepath, remote=False)
+        segments = segment_files(os.path.dirname(storage_filepath))
+
+        if not segments:
+            self.merge_into_partition(parquet_model, rows, partition_start, sync_utils)
+            return
+
+        merged = upsert_by_id(
+            pl.scan_parquet(segments, hive_partitioning=False),
+            rows,
+            parquet_model.layout,
+        )
+
+        self.replace_partition(parquet_model, merged, partition_start, sync_utils)
 
-                    if new_data is None or new_data.is_empty():  # pyright: ignore[reportUnnecessaryComparison]
-                        print(f"No data found for {start} - {end}, skipping...")
-                        continue
+    def replace_partition(
+        self,
+        parquet_model: ParquetModel,
+        merged: pl.DataFrame,
+        partition_start: datetime,
+        sync_utils: SyncUtils,
+    ):
+        """
+        Replace the segments of a partition with a single `0.parquet` of merged data,
+        or delete them if there is no data left.
 
-                    print(f"Found {len(new_data)} new records")
+        :param parquet_model: The model representing the parquet output.
+        :param merged: The merged data of the whole partition.
+        :param partition_start: The start date of the partition.
+        :param sync_utils: The SyncUtils instance for backups, and the upload and delete queues.
+        """
+        filepath = partition_filepath(parquet_model, partition_start)
+        storage_filepath = self.storage.target_filepath(filepath, remote=False)
+        segments = segment_files(os.path.dirname(storage_filepath))
+
+        if merged.is_empty():
+            for segment in segments:
+                os.remove(segment)
+                sync_utils.queue_file_delete(segment)
+            return
 
-                    year = start.strftime("%Y")
-                    month = start.strftime("%#m" if os.name == "nt" else "%-m")
+        if not os.path.exists(storage_filepath):
+            # the base segment was compacted away, there's nothing to back up
+            self.storage.write_parquet(merged, filepath, layout=parquet_model.layout)
+        else:
+            self.replace_with_merged(parquet_model, merged, filepath, sync_utils)
 
-                    partition_base_path = (
-                        parquet_model.parquet_filename
-                        if parquet_model.parquet_filename
-                        else f"{parquet_model.collection}.parquet"
-                    )
+        # the merged rows of the other segments are now in the base segment
+        for segment in segments:
+            if segment != storage_filepath:
+                os.remove(segment)
+                sync_utils.queue_file_delete(segment)
 
-                    partition_path = f"{partition_base_path}/year={year}"
+        sync_utils.queue_upload_if_changed(storage_filepath)
 
-                    if parquet_model.partition_by == "month":
-                        partition_path += f"/month={month}"
+    @contextmanager
+    def replacing_partition(
+        self,
+        filepaths: Iterable[str],
+        sample: bool | None = None,
+        sync_utils: SyncUtils | None = None,
+    ) -> Iterator[None]:
+        """
+        Delete the segments of a partition once it has been exported again. Otherwise, the segments appended
+        since it was last written would be read along with the exported rows, and could have ObjectIds
+        in a different format.
 
-                    filepath = f"{partition_path}/{partition_filename}"
+        The export replaces `0.parquet` through a temp file, so nothing is deleted until it succeeds: if it
+        raises, the partition keeps all of its segments. The segments the export didn't write again are then
+        deleted and queued to be deleted from remote storage, and the ones it wrote are queued to be uploaded.
 
-                    storage_filepath = self.storage.target_filepath(
-                        filepath, sample=sample or False, remote=False
-                    )
+        :param filepaths: The paths of the partition's files to export, relative to the data directory.
+        :param sample: Whether the partition is in the sample data.
+        :param sync_utils: The SyncUtils instance, to delete the segments from remote storage too.
+        """
+        exported: set[str] = set()
+        # the inodes and modification times of the segments, to tell the ones the export replaced
+        existing: dict[str, tuple[int, int]] = {}
 
-                    if os.path.exists(storage_filepath):
-                        try:
-                            print(
-                                f"Backing up existing file {filepath} before overwriting..."
-                            )
-                            sync_utils.backup_file(filepath)
+        for filepath in filepaths:
+            storage_filepath = self.storage.target_filepath(
+                filepath, sample=sample or False, remote=False
+            )
+            exported.add(storage_filepath)
 
-                            print(
-                                f"Partition for {partition_path} exists with previous data, writing merged data to {filepath}..."
-                            )
+            for segment in segment_files(os.path.dirname(storage_filepath)):
+                stat = os.stat(segment)
+                existing[segment] = (stat.st_ino, stat.st_mtime_ns)
 
-                            temp_storage_filepath = re.sub(
-                                r"\.parquet$", ".tmp.parquet", storage_filepath
-                            )
-                            print(
-                                f"Writing to temporary file {temp_storage_filepath}..."
-                            )
+        yield
 
-                            pl.concat(
-                                [
-                                    pl.scan_parquet(storage_filepath),
-                                    new_data.lazy(),
-                                ]
-                            ).sink_parquet(
-                                temp_storage_filepath,
-                                compression_level=7,
-                                engine="streaming",
-                                sync_on_close="all",
-                            )
+        for segment, state in existing.items():
+            if segment in exported and os.path.exists(segment):
+                stat = os.stat(segment)
 
-                            print(
-                                f"Replacing {storage_filepath} with temp file {temp_storage_filepath}..."
-                            )
+                if (stat.st_ino, stat.st_mtime_ns) != state:
+                    if sync_utils is not None:
+                        sync_utils.queue_upload_if_changed(segment)
+                    continue
 
-                            os.replace(temp_storage_filepath, storage_filepath)
-
-                            print(f"Successfully wrote to {storage_filepath}")
-                        except Exception as e:
-                            error(e)
-                            sync_utils.restore_backup(filepath)
-                    else:
-                        print(f"Writing to {filepath}")
-                        try:
-                            self.storage.write_parquet(
-                                new_data,
-                                filepath,
-                                sample=sample or False,
-                            )
-                            print(f"Successfully wrote to {storage_filepath}")
-                        except Exception as e:
-                            error(e)
+            if os.path.exists(segment):
+                os.remove(segment)
 
-                    print(
-                        f"Updated {filepath} in {format_timedelta(datetime.now() - partition_start_time)}"
-                    )
+            if sync_utils is not None:
+                sync_utils.queue_file_delete(segment)
 
-                    sync_utils.queue_upload_if_changed(filepath)
+    def resync_months(
+        self,
+        collection_model: MongoCollection,
+        months: list[Month],
+        sync_utils: SyncUtils,
+        batch_size: int = 50_000,
+    ):
+        """
+        Replace the rows of some months in the Parquet files of a collection with the documents read again
+        from MongoDB, e.g. the months found to have drifted by `verify_parquet`.
 
-                    del new_data
-                    print("")
+        Each parquet model reads the documents of the months on its own, even for single-pass collections,
+        as the months to sync again are usually few.
 
-                    partition_time_elapsed = datetime.now() - partition_start_time
+        :param collection_model: The model representing the MongoDB collection.
+        :param months: The (year, month) pairs to sync again.
+        :param sync_utils: The SyncUtils instance for backups, and the upload and delete queues.
+        :param batch_size: The maximum number of documents to read at a time.
+        """
+        for parquet_model in collection_model.parquet_models():
+            target_filepath = self.storage.target_filepath(
+                parquet_model.parquet_filename, remote=False
+            )
 
-                    print(
-                        f"Processed {partition_label} in {format_timedelta(partition_time_elapsed)}"
-                    )
+            if "date" not in parquet_model.schema or parquet_model.pipeline:
+                print(
+                    f"{parquet_model.parquet_filename} can't be synced by month, skipping."
+                )
+                continue
 
+            if parquet_model.stored_id_format() not in (None, parquet_model.id_format):
                 print(
-                    f"Finished processing {parquet_model.parquet_filename} in {format_timedelta(datetime.now() - parquet_start_time)}"
+                    f"{parquet_model.parquet_filename} stores ObjectIds in another format, skipping. Export the collection again to change the format."
                 )
                 continue
 
-            new_data = self.db.find(
-                parquet_model,
-                filter=combined_filter,
+            print(
+                f"🔄 Syncing {len(months)} months of {parquet_model.parquet_filename} again..."
             )
 
-            if new_data is None or new_data.is_empty():  # pyright: ignore[reportUnnecessaryComparison]
-                print("No new or updated records found, skipping...")
-                return
-
-            print(f"Found {len(new_data)} new or updated records")
-
-            print(f"Backing up {parquet_model.parquet_filename}...")
+            sync_start_time = datetime.now()
+            base_filter = self.sync_base_filter(parquet_model)
 
-            sync_utils.backup_file(parquet_model.parquet_filename)
-
-            target_filepath = self.storage.target_filepath(
-                parquet_model.parquet_filename, sample=sample or False, remote=False
+            rows = pl.concat(
+                self.db.find_batches(
+                    parquet_model,
+                    filter={"$and": [base_filter, month_filter(months)]}
+                    if base_filter
+                    else month_filter(months),
+                    batch_size=batch_size,
+                ),
+                how="diagonal_relaxed",
             )
 
-            print(f"Appending new data to {target_filepath}...")
-
-            try:
-                temp_target_filepath = re.sub(
-                    r"\.parquet$", ".tmp.parquet", target_filepath
-                )
-                print(f"Writing to temporary file {temp_target_filepath}...")
-
-                pl.concat(
-                    [parquet_model.lf(), new_data.lazy()], rechunk=True
-                ).sink_parquet(
-                    temp_target_filepath,
-                    compression_level=7,
-                    engine="streaming",
-                    sync_on_close="all",
-                )
+            if parquet_model.partition_by is None:
+                if not os.path.exists(target_filepath):
+                    self.storage.write_parquet(
+                        rows.sort("date", maintain_order=True),
+                        parquet_model.parquet_filename,
+                        layout=parquet_model.layout,
+                    )
+                else:
+                    self.replace_with_merged(
+                        parquet_model,
+                        replace_months(
+                            pl.scan_parquet(target_filepath),
+                            rows,
+                            months,
+                            parquet_model.layout,
+                        ),
+                        parquet_model.parquet_filename,
+                        sync_utils,
+                    )
 
-                os.replace(temp_target_filepath, target_filepath)
+                sync_utils.queue_upload_if_changed(target_filepath)
+            else:
+                months_by_partition: dict[datetime, list[Month]] = {}
 
-                print(f"Successfully wrote to {target_filepath}")
-            except Exception as e:
-                error(e.add_note(f"Error writing to {target_filepath}"))
-                sync_utils.restore_backup(parquet_model.parquet_filename)
+                for year, month in months:
+                    partition_start = datetime(
+                        year, month if parquet_model.partition_by == "month" else 1, 1
+                    )
+                    months_by_partition.setdefault(partition_start, []).append(
+                        (year, month)
+                    )
 
-            sync_utils.queue_upload_if_changed(target_filepath)
+                for partition_start, partition_months in months_by_partition.items():
+                    segments = segment_files(
+                        os.path.dirname(
+                            self.storage.target_filepath(
+                                partition_filepath(parquet_model, partition_start),
+                                remote=False,
+                            )
+                        )
+                    )
+                    partition_rows = rows.filter(in_months(partition_months))
+
+                    self.replace_partition(
+                        parquet_model,
+                        replace_months(
+                            pl.scan_parquet(segments, hive_partitioning=False),
+                            partition_rows,
+                            partition_months,
+                            parquet_model.layout,
+                        )
+                        if segments
+                        else parquet_model.layout.sort(partition_rows),
+                        partition_start,
+                        sync_utils,
+                    )
 
             print(
-                f"Finished processing {parquet_model.parquet_filename} in {format_timedelta(datetime.now() - parquet_start_time)}"
+                f"Synced {len(rows)} rows of {parquet_model.parquet_filename} again in {format_timedelta(datetime.now() - sync_start_time)}"
             )
 
-        if cleanup_temp_dir:
-            print("Cleaning up temporary directory...")
-            sync_utils.cleanup_temp_dir()
-
-        collection_time_elapsed = datetime.now() - sync_start_time
-        sync_end_time = datetime.now()
-        formatted_end_datetime = sync_end_time.strftime("%H:%M:%S")
-
-        print(
-            f"✅ [{formatted_end_datetime}] Completed sync for {collection_model.collection} in {format_timedelta(collection_time_elapsed)}"
-        )
-
     def export_to_parquet(
         self,
         collection_model: MongoCollection,
         sample: bool | None = None,
+        batch_size: int = 50_000,
+        journal: RunJournal | None = None,
+        sync_utils: SyncUtils | None = None,
     ):
         """
         Export data from a MongoDB collection to Parquet format.
 
+        Data is streamed from MongoDB and written in batches, so memory usage is bounded by `batch_size`.
+        The sorted batches of files written in more than one batch are then merged by the model's `sort_by` columns,
+        so they have the same row order (and row group statistics) as if they were written at once.
+
         :param collection_model: The model representing the MongoDB collection.
         :param sample: Whether to export a sample of the data.
+        :param batch_size: The maximum number of documents to read and write at a time.
+        :param journal: The journal of the export, to skip the files and partitions already written by an interrupted run.
+        :param sync_utils: The SyncUtils instance, to delete the replaced segments of partitions from remote storage.
         """
         print(f"📤 Exporting {collection_model.collection} to Parquet...")
 
@@ -369,138 +1393,323 @@ class MongoParquetIO:
                 f"Collection {collection_model.collection} does not exist in the database."
             )
 
-        for parquet_model in [
-            collection_model.primary_model,
-            *collection_model.secondary_models,
-        ]:
+        if collection_model.single_pass:
+            self.export_single_pass(
+                collection_model,
+                sample=sample,
+                batch_size=batch_size,
+                journal=journal,
+                sync_utils=sync_utils,
+            )
+            return
+
+        for parquet_model in collection_model.parquet_models():
             if not sample and parquet_model.partition_by is not None:
                 self.export_partitioned(
                     parquet_model,
                     sample=sample,
+                    batch_size=batch_size,
+                    journal=journal,
+                    sync_utils=sync_utils,
                 )
                 continue
 
+            if journal is not None and journal.is_done(parquet_model.parquet_filename):
+                print(f"Already exported {parquet_model.parquet_filename}, skipping...")
+                continue
+
             print(f"Exporting {parquet_model.parquet_filename}...")
 
-            df = self.db.find(
-                parquet_model,
-                filter=parquet_model.get_sampling_filter(self.sampling_context)
+            query_filter = (
+                parquet_model.get_sampling_filter(self.sampling_context)
                 if sample
-                else parquet_model.filter,
+                else parquet_model.filter
             )
 
-            self.storage.write_parquet(
-                df,
+            batches = (
+                self.db.find_batches_split(
+                    parquet_model,
+                    filter=query_filter,
+                    batch_size=batch_size,
+                    splits=self.split_scans,
+                    method=self.split_method,
+                )
+                if self.split_scans > 1 and not sample
+                else self.db.find_batches(
+                    parquet_model,
+                    filter=query_filter,
+                    batch_size=batch_size,
+                )
+            )
+
+            self.storage.write_parquet_batches(
+                batches,
                 parquet_model.parquet_filename,
                 sample=sample or False,
+                layout=parquet_model.layout,
+                sort_by=parquet_model.sort_by,
+                sort_descending=parquet_model.sort_descending,
             )
 
-    def export_partitioned(
+            self.complete_unit(journal, parquet_model.parquet_filename)
+
+    def export_single_pass(
         self,
-        parquet_model: ParquetModel,
+        collection_model: MongoCollection,
         sample: bool | None = None,
         filename: str = "0.parquet",  # default file name from polars partitioned write
-        delay_secs: int | float = 0.3,
+        batch_size: int = 50_000,
+        journal: RunJournal | None = None,
+        sync_utils: SyncUtils | None = None,
     ):
         """
-        Export data from a MongoDB collection to partitioned Parquet format.
+        Export all of a collection's parquet models, reading each date window from MongoDB
+        once and deriving every model from the same batches.
 
-        :param parquet_model: The model representing the parquet output.
+        :param collection_model: The model representing the MongoDB collection.
         :param sample: Whether to export a sample of the data.
+        :param batch_size: The maximum number of documents to read and write at a time.
+        :param journal: The journal of the export, to skip the files and partitions already written by an interrupted run.
+        :param sync_utils: The SyncUtils instance, to delete the replaced segments of partitions from remote storage.
         """
-        print(f"📤 Exporting {parquet_model.collection} to partitioned Parquet...")
-
-        # Ensure the collection exists in the database
-        if not self.db.db.list_collection_names():
-            raise ValueError(
-                f"Collection {parquet_model.collection} does not exist in the database."
-            )
+        primary_model = collection_model.primary_model
 
         query_filter = (
-            parquet_model.get_sampling_filter(self.sampling_context)
+            primary_model.get_sampling_filter(self.sampling_context)
             if sample
-            else parquet_model.filter
+            else primary_model.filter
         ) or {}
 
-        def create_filter(start_date: datetime, end_date: datetime):
-            return {
-                **deepcopy(query_filter),
-                **{
-                    "date": {
-                        "$gte": start_date,
-                        "$lte": end_date,
-                    }
+        if sample or primary_model.partition_by is None:
+            if journal is not None and journal.is_done(collection_model.collection):
+                print(f"Already exported {collection_model.collection}, skipping...")
+                return
+
+            print(
+                f"Exporting {', '.join(model.parquet_filename for model in collection_model.parquet_models())}..."
+            )
+
+            self.write_extraction_batches(
+                collection_model,
+                self.db.find_extraction_batches(
+                    collection_model, query_filter, batch_size=batch_size
+                ),
+                {
+                    model.parquet_filename: model.parquet_filename
+                    for model in collection_model.parquet_models()
                 },
-            }
+                sample=sample,
+            )
+
+            self.complete_unit(journal, collection_model.collection)
+            return
 
-        date_range_start_filter: datetime = query_filter.get("date", {}).get(
-            "$gte"
-        ) or datetime(2020, 1, 1)
+        print(f"📤 Exporting {collection_model.collection} to partitioned Parquet...")
 
-        date_range_end_filter: datetime = (
-            query_filter.get("date", {}).get("$lte") or datetime.now()
-        )
+        date_range_start, date_range_end = export_date_bounds(query_filter)
 
-        if parquet_model.partition_by == "month":
-            date_range_iter = month_range(
-                date_range_start_filter, date_range_end_filter
+        def export_partition(start: datetime, end: datetime):
+            partition_label = (
+                f"{start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')}"
             )
+            print(f"Processing {partition_label}")
 
-        elif parquet_model.partition_by == "year":
-            date_range_iter = year_range(date_range_start_filter, date_range_end_filter)
+            start_time = datetime.now()
 
-        else:
-            raise ValueError(
-                f"Unsupported partitioning type: {parquet_model.partition_by}"
+            filepaths = {
+                model.parquet_filename: partition_filepath(model, start, filename)
+                for model in collection_model.parquet_models()
+            }
+
+            with (
+                self.replacing_partition(filepaths.values(), sample, sync_utils),
+                self.scheduler.cursor(),
+            ):
+                num_records = self.write_extraction_batches(
+                    collection_model,
+                    self.db.find_extraction_batches(
+                        collection_model,
+                        date_window_filter(query_filter, start, end),
+                        batch_size=batch_size,
+                    ),
+                    filepaths,
+                    sample=sample,
+                    write_empty=False,
+                )
+
+            self.complete_unit(
+                journal, partition_unit(collection_model.collection, start)
             )
 
-        for start, end in date_range_iter:
+            if num_records == 0:
+                print(f"No data found for {start} - {end}, skipping...")
+                return
+
             print(
-                f"Processing {start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')}"
+                f"Wrote {num_records} records for {partition_label} in {format_timedelta(datetime.now() - start_time)}"
             )
 
-            start_time = datetime.now()
-            df = self.db.find(parquet_model, create_filter(start, end))
+        self.scheduler.run(
+            (
+                f"{collection_model.collection} ({start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')})",
+                partial(export_partition, start, end),
+            )
+            for start, end in partition_range(
+                primary_model.partition_by, date_range_start, date_range_end
+            )
+            if journal is None
+            or not journal.is_done(partition_unit(collection_model.collection, start))
+        )
 
-            if df is None or df.is_empty():  # pyright: ignore[reportUnnecessaryComparison]
-                print(f"No data found for {start} - {end}, skipping...")
-                continue
+    def write_extraction_batches(
+        self,
+        collection_model: MongoCollection,
+        batches: Iterable[pl.DataFrame],
+        filepaths: dict[str, str],
+        sample: bool | None = None,
+        write_empty: bool = True,
+    ) -> int:
+        """
+        Split batches of a single-pass extraction into each parquet model, and write them
+        incrementally to their respective files.
+
+        :param collection_model: The model representing the MongoDB collection.
+        :param batches: Untransformed batches from `find_extraction_batches`.
+        :param filepaths: The output file path for each model, keyed by parquet filename.
+        :param sample: Whether to write to the sample directory.
+        :param write_empty: Whether to write files for models without any data.
+        :return: The number of documents read.
+        """
+        parquet_models = {
+            parquet_model.parquet_filename: parquet_model
+            for parquet_model in collection_model.parquet_models()
+        }
+
+        writers = {
+            parquet_filename: self.storage.batch_writer(
+                filepath,
+                sample=sample or False,
+                write_empty=write_empty,
+                layout=parquet_models[parquet_filename].layout,
+                sort_by=parquet_models[parquet_filename].sort_by,
+                sort_descending=parquet_models[parquet_filename].sort_descending,
+            )
+            for parquet_filename, filepath in filepaths.items()
+        }
+
+        num_records = 0
+
+        try:
+            for batch in batches:
+                num_records += len(batch)
+
+                for parquet_filename, df in collection_model.split_extraction(
+                    batch
+                ).items():
+                    writers[parquet_filename].write(df)
+        except Exception:
+            for writer in writers.values():
+                writer.abort()
+            raise
 
-            print(f"Found {len(df)} records")
+        for writer in writers.values():
+            if writer.close() > 0:
+                print(f"📤 Wrote {writer.num_rows} rows to {writer.filepath}")
+
+        return num_records
+
+    def export_partitioned(
+        self,
+        parquet_model: ParquetModel,
+        sample: bool | None = None,
+        filename: str = "0.parquet",  # default file name from polars partitioned write
+        batch_size: int = 50_000,
+        journal: RunJournal | None = None,
+        sync_utils: SyncUtils | None = None,
+    ):
+        """
+        Export data from a MongoDB collection to partitioned Parquet format.
 
-            year = start.strftime("%Y")
-            month = start.strftime("%#m" if os.name == "nt" else "%-m")
+        The existing segments of each partition are deleted before it is written, including the ones
+        appended by syncs with `append_segments`, so that they aren't read along with the exported data.
 
-            self.storage.target_filepath(filename, sample=sample or False, remote=False)
+        :param parquet_model: The model representing the parquet output.
+        :param sample: Whether to export a sample of the data.
+        :param batch_size: The maximum number of documents to read and write at a time.
+        :param journal: The journal of the export, to skip the partitions already written by an interrupted run.
+        :param sync_utils: The SyncUtils instance, to delete the replaced segments from remote storage.
+        """
+        print(f"📤 Exporting {parquet_model.collection} to partitioned Parquet...")
 
-            partition_base_path = (
-                parquet_model.parquet_filename
-                if parquet_model.parquet_filename
-                else f"{parquet_model.collection}.parquet"
+        # Ensure the collection exists in the database
+        if not self.db.db.list_collection_names():
+            raise ValueError(
+                f"Collection {parquet_model.collection} does not exist in the database."
             )
 
-            partition_path = f"{partition_base_path}/year={year}"
+        query_filter = (
+            parquet_model.get_sampling_filter(self.sampling_context)
+            if sample
+            else parquet_model.filter
+        ) or {}
+
+        date_range_start, date_range_end = export_date_bounds(query_filter)
 
-            if parquet_model.partition_by == "month":
-                partition_path += f"/month={month}"
+        def export_partition(start: datetime, end: datetime):
+            partition_label = (
+                f"{start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')}"
+            )
+            print(f"Processing {partition_label}")
 
-            filepath = f"{partition_path}/{filename}"
+            start_time = datetime.now()
 
-            print(f"Writing to {filepath}")
+            filepath = partition_filepath(parquet_model, start, filename)
 
-            self.storage.write_parquet(
-                df,
-                filepath,
-                sample=sample or False,
+            with (
+                self.replacing_partition([filepath], sample, sync_utils),
+                self.scheduler.cursor(),
+            ):
+                num_records = self.storage.write_parquet_batches(
+                    self.db.find_batches(
+                        parquet_model,
+                        date_window_filter(query_filter, start, end),
+                        batch_size=batch_size,
+                    ),
+                    filepath,
+                    sample=sample or False,
+                    write_empty=False,
+                    layout=parquet_model.layout,
+                    sort_by=parquet_model.sort_by,
+                    sort_descending=parquet_model.sort_descending,
+                )
+
+            self.complete_unit(
+                journal, partition_unit(parquet_model.parquet_filename, start)
             )
 
-            print(f"Done in {format_timedelta(datetime.now() - start_time)}")
+            if num_records == 0:
+                print(f"No data found for {start} - {end}, skipping...")
+                return
 
-            del df
-            print(f"waiting {delay_secs} seconds")
+            print(
+                f"Wrote {num_records} records to {filepath} in {format_timedelta(datetime.now() - start_time)}"
+            )
 
-            sleep(delay_secs)
-            print("")
+        self.scheduler.run(
+            (
+                f"{parquet_model.parquet_filename} ({start.strftime('%Y-%m-%d')} - {end.strftime('%Y-%m-%d')})",
+                partial(export_partition, start, end),
+            )
+            for start, end in partition_range(
+                parquet_model.partition_by,  # pyright: ignore[reportArgumentType]
+                date_range_start,
+                date_range_end,
+            )
+            if journal is None
+            or not journal.is_done(
+                partition_unit(parquet_model.parquet_filename, start)
+            )
+        )
 
     def import_from_parquet(
         self,
@@ -509,6 +1718,7 @@ class MongoParquetIO:
         remote: bool | None = None,
         batch_size: int | None = 50_000,
         min_date: datetime | None = None,
+        journal: RunJournal | None = None,
     ):
         """
         Insert batches of data into a MongoDB collection.
@@ -517,6 +1727,7 @@ class MongoParquetIO:
         :param sample: Whether to use a sample of the data.
         :param remote: Whether to read data from a remote source.
         :param batch_size: The number of records to insert in each batch.
+        :param journal: The journal of the import, to skip the partitions and batches already inserted by an interrupted run.
         """
         start_time = datetime.now()
         formatted_datetime = start_time.strftime("%H:%M:%S")
@@ -525,6 +1736,16 @@ class MongoParquetIO:
         )
         is_partitioned = collection_model.primary_model.partition_by is not None
 
+        if journal is not None:
+            if journal.is_done(collection_model.collection):
+                print(f"Already imported {collection_model.collection}, skipping...")
+                return
+
+            # the batches recorded in the journal depend on the batch size
+            batch_size = journal.remember(
+                f"{collection_model.collection}/batch_size", batch_size
+            )
+
         # create collection if it doesn't exist
         if (
             collection_model.primary_model.collection
@@ -532,8 +1753,8 @@ class MongoParquetIO:
         ):
             self.db.db.create_collection(collection_model.collection)
 
-        def read_df(model: ParquetModel):
-            return self.storage.scan_parquet(
+        def read_df(model: ParquetModel) -> tuple[ParquetModel, pl.LazyFrame]:
+            lf = self.storage.scan_parquet(
                 model.parquet_filename,
                 sample=sample or False,
                 remote=remote or False,
@@ -541,35 +1762,41 @@ class MongoParquetIO:
                 min_date=min_date,
             )
 
-        primary_df = read_df(collection_model.primary_model)
-        secondary_dfs = (
-            [read_df(model) for model in collection_model.secondary_models]
-            if len(collection_model.secondary_models) != 0
-            else []
-        )
+            # the ObjectIds are decoded according to the format of the files, whichever it is
+            return model.with_id_format(id_format_of(lf.collect_schema())), lf
+
+        primary_model, primary_df = read_df(collection_model.primary_model)
+        secondary_reads = [read_df(model) for model in collection_model.secondary_models]
+        secondary_models = [model for model, _ in secondary_reads]
+        secondary_dfs = [df for _, df in secondary_reads]
 
         if sample or not is_partitioned:
-            primary_df = collection_model.primary_model.reverse_transform(primary_df)
-            self.insert_batches(
+            primary_df = primary_model.reverse_transform(primary_df)
+            stats = self.insert_batches(
                 primary_df,
                 [
                     model.reverse_transform(df)
-                    for model, df in zip(
-                        collection_model.secondary_models, secondary_dfs
-                    )
+                    for model, df in zip(secondary_models, secondary_dfs)
                 ],
                 collection_model,
                 batch_size=batch_size,
+                journal=journal,
+                unit=collection_model.collection,
             )
+            self.complete_unit(journal, collection_model.collection)
             print(
-                f"Import completed in {format_timedelta(datetime.now() - start_time)}"
+                f"Import completed in {format_timedelta(datetime.now() - start_time)}: {stats}"
             )
             return
 
+        # from the file listing, rather than reading the partition columns of every file
         partition_values = (
-            get_partition_values(
-                primary_df,
-                collection_model.primary_model.partition_by,  # type: ignore
+            self.storage.partition_values(
+                collection_model.primary_model.parquet_filename,
+                collection_model.primary_model.partition_by,
+                sample=sample or False,
+                remote=remote or False,
+                min_date=min_date,
             )
             if is_partitioned and collection_model.primary_model.partition_by
             else None
@@ -584,10 +1811,17 @@ class MongoParquetIO:
 
         print(f"Found {len(partition_values)} partitions to process.")
 
+        total_stats = InsertStats()
+
         for partition in partition_values:
             month_str = f"-{partition.get('month', '')}" if "month" in partition else ""
             partition_str = f"{partition['year']}{month_str}"
-            start_time = datetime.now()
+            partition_start_time = datetime.now()
+            unit = f"{collection_model.collection}/{partition_str}"
+
+            if journal is not None and journal.is_done(unit):
+                print(f"Already imported partition {partition_str}, skipping...")
+                continue
 
             print(f"Processing partition: {partition_str}")
 
@@ -595,9 +1829,7 @@ class MongoParquetIO:
             partition_filter = [pl.col(col).eq(val) for col, val in partition.items()]
 
             partition_primary_df = primary_df.filter(*partition_filter)
-            partition_primary_df = collection_model.primary_model.reverse_transform(
-                partition_primary_df
-            )
+            partition_primary_df = primary_model.reverse_transform(partition_primary_df)
 
             if (
                 partition_primary_df is None  # pyright: ignore[reportUnnecessaryComparison]
@@ -611,69 +1843,118 @@ class MongoParquetIO:
             ]
             partition_secondary_dfs = [
                 model.reverse_transform(df)
-                for model, df in zip(
-                    collection_model.secondary_models, partition_secondary_dfs
-                )
+                for model, df in zip(secondary_models, partition_secondary_dfs)
             ]
 
-            self.insert_batches(
+            total_stats += self.insert_batches(
                 partition_primary_df,
                 partition_secondary_dfs,
                 collection_model,
                 batch_size=batch_size,
+                journal=journal,
+                unit=unit,
             )
 
+            self.complete_unit(journal, unit)
+
             print(
-                f"Import for partition {partition_str} completed in {format_timedelta(datetime.now() - start_time)}"
+                f"Import for partition {partition_str} completed in {format_timedelta(datetime.now() - partition_start_time)}"
             )
 
-    def insert_batches(
+        self.complete_unit(journal, collection_model.collection)
+
+        print(
+            f"Import of {collection_model.collection} completed in {format_timedelta(datetime.now() - start_time)}: {total_stats}"
+        )
+
+    def iter_insert_batches(
         self,
         primary_df: pl.LazyFrame,
         secondary_dfs: list[pl.LazyFrame],
         collection_model: MongoCollection,
         batch_size: int | None = 50_000,
-    ):
-        print(f"Inserting data into {collection_model.collection} collection...")
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Yield consecutive batches of the assembled data, sorted by `_id`.
+
+        The sources are scanned and joined once by the streaming engine, rather than
+        re-running the sort and joins for each batch.
+        """
+        df = collection_model.assemble(
+            primary_df.sort("_id"),
+            secondary_dfs=secondary_dfs if len(secondary_dfs) > 0 else None,
+        )
 
-        # Ensure primary_df is sorted by _id
-        primary_df = primary_df.clone().sort("_id")
+        if batch_size is None:
+            batch_df = df.collect(engine="streaming")
 
-        len_df = 0
+            if not batch_df.is_empty():
+                yield batch_df
 
-        while True:
-            if batch_size is None:
-                batch_primary_df = primary_df
-            else:
-                batch_primary_df = primary_df.slice(len_df, batch_size)
+            return
 
-            df = collection_model.assemble(
-                batch_primary_df,
-                secondary_dfs=secondary_dfs if len(secondary_dfs) > 0 else None,
-            )
+        for batch_df in df.collect_batches(
+            chunk_size=batch_size, maintain_order=True, lazy=True
+        ):
+            if batch_df.is_empty():
+                continue
 
-            batch_df = df.collect(engine="streaming")
+            yield batch_df
 
-            if batch_df is None or (batch_df.is_empty() and len_df == 0):  # pyright: ignore[reportUnnecessaryComparison]
-                print(
-                    f"No data found for {collection_model.primary_model.collection}, skipping..."
-                )
-                return
+    def insert_batches(
+        self,
+        primary_df: pl.LazyFrame,
+        secondary_dfs: list[pl.LazyFrame],
+        collection_model: MongoCollection,
+        batch_size: int | None = 50_000,
+        journal: RunJournal | None = None,
+        unit: str | None = None,
+    ) -> InsertStats:
+        """
+        Insert the assembled data into the collection, in batches.
 
-            if batch_df.is_empty():
-                break
+        :param journal: The journal of the import, recording each inserted batch as `<unit>/<index>`.
+                        The batches recorded by an interrupted run are skipped, and the documents of a batch
+                        that was partially inserted are skipped instead of failing the insert.
+        :param unit: The unit of the journal that the batches belong to, e.g. the partition.
+        """
+        print(f"Inserting data into {collection_model.collection} collection...")
+
+        batches = self.iter_insert_batches(
+            primary_df, secondary_dfs, collection_model, batch_size
+        )
+
+        if journal is None:
+            stats = self.insert_pipeline.run(
+                self.db.db[collection_model.collection], collection_model, batches
+            )
+        else:
+            journal_unit = unit or collection_model.collection
 
-            self.db.insert_many(collection_model, batch_df)
+            def batch_unit(index: int) -> str:
+                return f"{journal_unit}/{index}"
 
-            len_df += len(batch_df)
+            stats = self.insert_pipeline.run(
+                self.db.db[collection_model.collection],
+                collection_model,
+                (
+                    # empty batches are skipped, but keep the indexes of the next ones
+                    pl.DataFrame() if journal.is_done(batch_unit(index)) else batch
+                    for index, batch in enumerate(batches)
+                ),
+                on_inserted=lambda index: journal.mark_done(batch_unit(index)),
+                ignore_duplicates=journal.resume,
+            )
 
-            # free memory
-            del batch_df
+        if stats.docs == 0:
+            print(
+                f"No data found for {collection_model.primary_model.collection}, skipping..."
+            )
+            return stats
 
-            if batch_size is None:
-                break
+        print(f"Inserted {stats} into {collection_model.collection}")
 
-        print(f"Inserted {len_df} records into {collection_model.collection}")
+        return stats
 
 
 __all__ = [
@@ -0,0 +1,583 @@
+"""Tests for the import and sync paths of MongoParquetIO that don't need a MongoDB server."""
+
+import os
+import random
+from datetime import datetime
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, Literal, final, override
+import polars as pl
+import pytest
+from bson import ObjectId, encode
+from pyarrow import int32, timestamp
+from polars.testing import assert_frame_equal
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongoarrow.api import Schema
+from .io import MongoParquetIO
+from .journal import RunJournal, partition_unit
+from .mongo import MongoConfig, iter_polars_batches
+from .sampling import SamplingContext
+from .scheduler import PartitionScheduler
+from .schemas import AnyFrame, MongoCollection, ParquetModel
+from .schemas.gsc_searchterms import GSCSearchTerms
+from .schemas.overall_metrics import OverallMetricsModel
+from .schemas.pages_list import PagesListModel
+from .storage import StorageClient
+from .utils import SyncUtils
+from .watch import ChangeType
+
+
+@pytest.fixture
+def io() -> MongoParquetIO:
+    # neither client connects until it's used
+    return MongoParquetIO(
+        MongoConfig("test"), StorageClient("data", "sample", "s3"), SamplingContext()
+    )
+
+
+def overall_metrics(
+    count: int,
+) -> tuple[MongoCollection, pl.LazyFrame, list[pl.LazyFrame]]:
+    """The primary and secondary data of overall_metrics, read back from Parquet for import."""
+    model = OverallMetricsModel(MongoClient(connect=False)["test"])
+    collection = model.client
+    rng = random.Random(0)
+
+    def terms() -> list[dict[str, Any]]:
+        return [
+            {
+                "term": f"term {i}",
+                "clicks": rng.randint(0, 9),
+                "position": 1.5,
+                "num_searches": 1,
+                "_id": ObjectId(),
+            }
+            for i in range(rng.randint(0, 3))
+        ]
+
+    docs = [
+        {
+            "_id": ObjectId(),
+            "date": datetime(2024, 1, 1 + i % 28),
+            "visits": i,
+            "aa_searchterms_en": terms(),
+            "aa_searchterms_fr": terms(),
+        }
+        for i in range(count)
+    ]
+    rng.shuffle(docs)
+
+    raw = pl.concat(
+        iter_polars_batches(
+            collection,
+            [b"".join(encode(doc) for doc in docs)],
+            model.extraction_schema(),
+        )
+    )
+
+    stored = model.split_extraction(raw)
+
+    primary_df = model.primary_model.reverse_transform(
+        stored[model.primary_model.parquet_filename].lazy()
+    )
+    secondary_dfs = [
+        secondary_model.reverse_transform(
+            stored[secondary_model.parquet_filename].lazy()
+        )
+        for secondary_model in model.secondary_models
+    ]
+
+    return model, primary_df, secondary_dfs
+
+
+def test_insert_batches_scan_once_matches_per_batch(io: MongoParquetIO):
+    model, primary_df, secondary_dfs = overall_metrics(250)
+    batch_size = 60
+
+    # the batches as they were assembled before, one slice of the primary data at a time
+    sorted_primary_df = primary_df.sort("_id")
+    per_batch = [
+        model.assemble(
+            sorted_primary_df.slice(offset, batch_size), secondary_dfs
+        ).collect(engine="streaming")
+        for offset in range(0, 250, batch_size)
+    ]
+
+    batches = list(io.iter_insert_batches(primary_df, secondary_dfs, model, batch_size))
+
+    assert all(0 < len(batch) <= batch_size for batch in batches)
+    assert_frame_equal(pl.concat(batches), pl.concat(per_batch))
+    # the same documents are inserted, in the same order
+    assert [doc for batch in batches for doc in model.prepare_for_insert(batch)] == [
+        doc for batch in per_batch for doc in model.prepare_for_insert(batch)
+    ]
+
+
+def test_export_partitioned_replaces_segments(tmp_path, monkeypatch):
+    data_dir = os.path.join(tmp_path, "data")
+    io = MongoParquetIO(
+        MongoConfig("test"),
+        StorageClient(data_dir, os.path.join(tmp_path, "sample"), "s3"),
+        SamplingContext(),
+    )
+    model = GSCSearchTerms(data_dir)
+    model.filter = {
+        "date": {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 2, 29)}
+    }
+
+    def partition_dir(month: int) -> str:
+        return os.path.join(
+            data_dir, model.parquet_filename, "year=2024", f"month={month}"
+        )
+
+    # segments of earlier syncs with `append_segments`, with ids in another format
+    for month in (1, 2):
+        os.makedirs(partition_dir(month))
+
+        for segment in ("0.parquet", "1.parquet"):
+            pl.DataFrame(
+                {"date": [datetime(2024, month, 1)], "_id": [b"old"]}
+            ).write_parquet(os.path.join(partition_dir(month), segment))
+
+    def find_batches(
+        parquet_model: Any, filter: dict[str, Any], batch_size: int
+    ) -> Iterator[pl.DataFrame]:
+        # only January has data now
+        rows = (
+            [
+                {
+                    "date": datetime(2024, 1, 2),
+                    "url": "https://www.canada.ca",
+                    "clicks": 1,
+                    "_id": "new",
+                }
+            ]
+            if filter["date"]["$gte"].month == 1
+            else []
+        )
+
+        yield pl.DataFrame(
+            rows,
+            schema={
+                "date": pl.Datetime("ms"),
+                "url": pl.String,
+                "clicks": pl.Int32,
+                "_id": pl.String,
+            },
+        )
+
+    monkeypatch.setattr(io.db.db, "list_collection_names", lambda: [model.collection])
+    monkeypatch.setattr(io.db, "find_batches", find_batches)
+
+    sync_utils = SyncUtils(data_dir)
+    io.export_partitioned(model, sync_utils=sync_utils)
+
+    assert os.listdir(partition_dir(1)) == ["0.parquet"]
+    assert pl.read_parquet(partition_dir(1))["_id"].to_list() == ["new"]
+    assert os.listdir(partition_dir(2)) == []
+
+    prefix = f"{model.parquet_filename}/year=2024"
+    # the rewritten segment is uploaded instead of deleted
+    assert sync_utils.upload_queue == [f"{prefix}/month=1/0.parquet"]
+    assert sorted(sync_utils.delete_queue) == [
+        f"{prefix}/month=1/1.parquet",
+        f"{prefix}/month=2/0.parquet",
+        f"{prefix}/month=2/1.parquet",
+    ]
+
+
+def test_failed_export_keeps_partition_segments(tmp_path, monkeypatch):
+    data_dir = os.path.join(tmp_path, "data")
+    io = MongoParquetIO(
+        MongoConfig("test"),
+        StorageClient(data_dir, os.path.join(tmp_path, "sample"), "s3"),
+        SamplingContext(),
+        PartitionScheduler(retries=0, retry_delay_secs=0),
+    )
+    model = GSCSearchTerms(data_dir)
+    model.filter = {
+        "date": {"$gte": datetime(2024, 1, 1), "$lte": datetime(2024, 1, 31)}
+    }
+    partition_dir = os.path.join(
+        data_dir, model.parquet_filename, "year=2024", "month=1"
+    )
+    os.makedirs(partition_dir)
+
+    existing = pl.DataFrame({"date": [datetime(2024, 1, 1)], "_id": ["a"]})
+
+    for segment in ("0.parquet", "1.parquet"):
+        existing.write_parquet(os.path.join(partition_dir, segment))
+
+    def find_batches(
+        parquet_model: Any, filter: dict[str, Any], batch_size: int
+    ) -> Iterator[pl.DataFrame]:
+        yield pl.DataFrame(
+            {"date": [datetime(2024, 1, 2)], "url": ["https://www.canada.ca"]}
+        )
+        raise ConnectionError("primary stepped down")
+
+    monkeypatch.setattr(io.db.db, "list_collection_names", lambda: [model.collection])
+    monkeypatch.setattr(io.db, "find_batches", find_batches)
+
+    sync_utils = SyncUtils(data_dir)
+
+    with pytest.raises(Exception):
+        io.export_partitioned(model, sync_utils=sync_utils)
+
+    assert sorted(os.listdir(partition_dir)) == ["0.parquet", "1.parquet"]
+    assert_frame_equal(
+        pl.read_parquet(os.path.join(partition_dir, "0.parquet")), existing
+    )
+    assert sync_utils.delete_queue == []
+
+
+def test_failed_partition_write_is_retried_and_not_journaled(tmp_path, monkeypatch):
+    data_dir = os.path.join(tmp_path, "data")
+    io = MongoParquetIO(
+        MongoConfig("test"),
+        StorageClient(data_dir, os.path.join(tmp_path, "sample"), "s3"),
+        SamplingContext(),
+        PartitionScheduler(retries=1, retry_delay_secs=0),
+    )
+    model = GSCSearchTerms(data_dir)
+    filepath = os.path.join(
+        data_dir, model.parquet_filename, "year=2024", "month=1", "0.parquet"
+    )
+    os.makedirs(os.path.dirname(filepath))
+
+    existing = pl.DataFrame(
+        {
+            "date": [datetime(2024, 1, 10)],
+            "url": ["https://www.canada.ca"],
+            "clicks": [1],
+            "_id": ["a"],
+        }
+    )
+    existing.write_parquet(filepath)
+
+    reads = 0
+
+    def find(parquet_model: Any, filter: dict[str, Any]) -> pl.DataFrame:
+        nonlocal reads
+        reads += 1
+        # can't be merged with the existing rows
+        return pl.DataFrame({"date": [datetime(2024, 1, 15)], "url": [1]})
+
+    monkeypatch.setattr(model, "latest_date", lambda: datetime(2024, 1, 10))
+    monkeypatch.setattr(io.db, "find", find)
+
+    sync_utils = SyncUtils(data_dir)
+    journal = RunJournal(data_dir, "sync")
+
+    with pytest.raises(Exception):
+        io.sync_parquet_model(model, sync_utils, datetime(2024, 1, 20), journal=journal)
+
+    assert reads == 2
+    assert not journal.is_done(
+        partition_unit(model.parquet_filename, datetime(2024, 1, 11))
+    )
+    # the backup of the partition was restored
+    assert_frame_equal(pl.read_parquet(filepath), existing)
+
+
+@final
+class SiteVisits(ParquetModel):
+    collection: str = "site_metrics"
+    parquet_filename: str = "site_visits.parquet"
+    partition_by = "month"
+    schema: Schema = Schema(
+        {"_id": ObjectId, "date": timestamp("ms"), "visits": int32()}
+    )
+
+    @override
+    def transform(self, df: AnyFrame) -> AnyFrame:
+        return df.with_columns(self.encode_id(pl.col("_id")))
+
+    @override
+    def reverse_transform(self, df: AnyFrame) -> AnyFrame:
+        return df.with_columns(self.decode_id(pl.col("_id")))
+
+
+@final
+class SiteClicks(ParquetModel):
+    collection: str = "site_metrics"
+    parquet_filename: str = "site_clicks.parquet"
+    partition_by = "month"
+    schema: Schema = Schema(
+        {"_id": ObjectId, "date": timestamp("ms"), "clicks": int32()}
+    )
+
+    @override
+    def transform(self, df: AnyFrame) -> AnyFrame:
+        return df.with_columns(self.encode_id(pl.col("_id")))
+
+    @override
+    def reverse_transform(self, df: AnyFrame) -> AnyFrame:
+        return df.with_columns(self.decode_id(pl.col("_id")))
+
+
+@final
+class SiteMetricsModel(MongoCollection):
+    collection = "site_metrics"
+    sync_type = "incremental"
+    single_pass = True
+    primary_model = SiteVisits()
+    secondary_models = [SiteClicks()]
+
+
+def site_metrics(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, scheduler: PartitionScheduler
+) -> tuple[MongoParquetIO, SiteMetricsModel]:
+    """
+    A single-pass collection with a row synced on January 10, 2024 for each model,
+    and a new document on January 15 in MongoDB.
+    """
+    data_dir = os.path.join(tmp_path, "data")
+    io = MongoParquetIO(
+        MongoConfig("test"),
+        StorageClient(data_dir, os.path.join(tmp_path, "sample"), "s3"),
+        SamplingContext(),
+        scheduler,
+    )
+    collection_model = SiteMetricsModel(MongoClient(connect=False)["test"], data_dir)
+
+    for parquet_model in collection_model.parquet_models():
+        filepath = os.path.join(
+            data_dir,
+            parquet_model.parquet_filename,
+            "year=2024",
+            "month=1",
+            "0.parquet",
+        )
+        os.makedirs(os.path.dirname(filepath))
+        collection_model.split_extraction(
+            pl.DataFrame(
+                {
+                    "_id": [ObjectId().binary],
+                    "date": [datetime(2024, 1, 10)],
+                    "visits": [1],
+                    "clicks": [1],
+                },
+                schema_overrides={"date": pl.Datetime("ms")},
+            )
+        )[parquet_model.parquet_filename].write_parquet(filepath)
+
+    extracted = pl.DataFrame(
+        {
+            "_id": [ObjectId().binary],
+            "date": [datetime(2024, 1, 15)],
+            "visits": [2],
+            "clicks": [2],
+        },
+        schema_overrides={"date": pl.Datetime("ms")},
+    )
+
+    monkeypatch.setattr(
+        io.db, "find_extraction", lambda collection_model, filter: extracted
+    )
+
+    return io, collection_model
+
+
+def stored_rows(parquet_model: ParquetModel) -> int:
+    return (
+        pl.scan_parquet(
+            os.path.join(parquet_model.dir_path, parquet_model.parquet_filename)
+        )
+        .select(pl.len())
+        .collect()
+        .item()
+    )
+
+
+def test_single_pass_partition_retry_merges_each_model_once(tmp_path, monkeypatch):
+    """Retrying a partition doesn't merge the models already merged by the failed attempt."""
+    io, collection_model = site_metrics(
+        tmp_path, monkeypatch, PartitionScheduler(retries=1, retry_delay_secs=0)
+    )
+    merge_into_partition = io.merge_into_partition
+    failures = 0
+
+    def merge_or_fail(parquet_model: ParquetModel, *args: Any, **kwargs: Any):
+        nonlocal failures
+        if parquet_model.parquet_filename == "site_clicks.parquet" and failures == 0:
+            failures += 1
+            raise OSError("write failed")
+        merge_into_partition(parquet_model, *args, **kwargs)
+
+    monkeypatch.setattr(io, "merge_into_partition", merge_or_fail)
+
+    io.sync_single_pass(
+        collection_model,
+        SyncUtils(collection_model.parquet_dir_path),
+        datetime(2024, 1, 15),
+    )
+
+    assert failures == 1
+    for parquet_model in collection_model.parquet_models():
+        assert stored_rows(parquet_model) == 2
+
+
+def test_resumed_single_pass_sync_skips_merged_models(tmp_path, monkeypatch):
+    """A run interrupted after merging the first model only merges the others when it's resumed."""
+    io, collection_model = site_metrics(tmp_path, monkeypatch, PartitionScheduler())
+    merge_into_partition = io.merge_into_partition
+    merged: list[str] = []
+    resumed = False
+
+    def merge_or_interrupt(parquet_model: ParquetModel, *args: Any, **kwargs: Any):
+        if parquet_model.parquet_filename == "site_clicks.parquet" and not resumed:
+            raise KeyboardInterrupt
+        merged.append(parquet_model.parquet_filename)
+        merge_into_partition(parquet_model, *args, **kwargs)
+
+    monkeypatch.setattr(io, "merge_into_partition", merge_or_interrupt)
+
+    data_dir = collection_model.parquet_dir_path
+
+    journal = RunJournal(data_dir, "sync")
+
+    with pytest.raises(KeyboardInterrupt):
+        io.sync_single_pass(
+            collection_model,
+            SyncUtils(data_dir),
+            datetime(2024, 1, 15),
+            journal=journal,
+        )
+
+    assert merged == ["site_visits.parquet"]
+    assert journal.is_done(partition_unit("site_visits.parquet", datetime(2024, 1, 11)))
+    assert not journal.is_done(
+        partition_unit(collection_model.collection, datetime(2024, 1, 11))
+    )
+
+    merged.clear()
+    resumed = True
+
+    io.sync_single_pass(
+        collection_model,
+        SyncUtils(data_dir),
+        datetime(2024, 1, 15),
+        journal=RunJournal(data_dir, "sync", resume=True),
+    )
+
+    assert merged == ["site_clicks.parquet"]
+    for parquet_model in collection_model.parquet_models():
+        assert stored_rows(parquet_model) == 2
+
+
+def test_sync_simple_parquet_skips_unchanged_documents(tmp_path, monkeypatch, capsys):
+    data_dir = os.path.join(tmp_path, "data")
+    os.makedirs(data_dir)
+    io = MongoParquetIO(
+        MongoConfig("test"),
+        StorageClient(data_dir, os.path.join(tmp_path, "sample"), "s3"),
+        SamplingContext(),
+    )
+    model = PagesListModel(MongoClient(connect=False)["test"], data_dir)
+    parquet_model = model.primary_model
+
+    docs = [
+        {
+            "_id": ObjectId(),
+            "url": f"https://www.canada.ca/page-{i}",
+            "title": f"Page {i}",
+            "lang": "en",
+            "updatedAt": datetime(2024, 1, 1 + i),
+            "createdAt": datetime(2024, 1, 1),
+        }
+        for i in range(3)
+    ]
+
+    def read(docs: list[dict[str, Any]]) -> pl.DataFrame:
+        return parquet_model.transform(
+            pl.concat(
+                iter_polars_batches(
+                    model.client,
+                    [b"".join(encode(doc) for doc in docs)],
+                    parquet_model.schema,
+                )
+            )
+        )
+
+    filepath = os.path.join(data_dir, parquet_model.parquet_filename)
+    read(docs).write_parquet(filepath)
+
+    # the document at the watermark always matches the filter
+    monkeypatch.setattr(
+        Collection, "find_raw_batches", lambda *_, **__: [encode(docs[-1])]
+    )
+    monkeypatch.setattr(Collection, "count_documents", lambda *_, **__: len(docs))
+
+    sync_utils = SyncUtils(data_dir)
+    io.sync_simple_parquet(model, sync_utils)
+
+    assert "No changes found" in capsys.readouterr().out
+    assert sync_utils.upload_queue == []
+
+    # changed in the same millisecond
+    docs[-1]["title"] = "Page 2, updated"
+    io.sync_simple_parquet(model, sync_utils)
+
+    assert_frame_equal(pl.read_parquet(filepath), read(docs))
+
+    def write_parquet(*_: Any, **__: Any):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(io.storage, "write_parquet", write_parquet)
+    stored = pl.read_parquet(filepath)
+    docs[-1]["title"] = "Page 2, updated again"
+
+    # raised so the collection isn't journaled as synced, after restoring the file
+    with pytest.raises(OSError):
+        io.sync_simple_parquet(model, sync_utils)
+
+    assert_frame_equal(pl.read_parquet(filepath), stored)
+
+
+@pytest.mark.parametrize("append_segments", [False, True])
+def test_apply_changes_skips_replayed_inserts(tmp_path, monkeypatch, append_segments):
+    data_dir = os.path.join(tmp_path, "data")
+    io = MongoParquetIO(
+        MongoConfig("test"),
+        StorageClient(data_dir, os.path.join(tmp_path, "sample"), "s3"),
+        SamplingContext(),
+    )
+
+    class SearchTermsModel(MongoCollection):
+        collection = "pages_metrics"
+        sync_type: Literal["simple", "incremental"] = "incremental"
+        primary_model = GSCSearchTerms()
+
+    model = SearchTermsModel(MongoClient(connect=False)["test"], data_dir)
+    partition_dir = os.path.join(
+        data_dir, model.primary_model.parquet_filename, "year=2024", "month=1"
+    )
+    os.makedirs(partition_dir)
+
+    def rows(ids: list[str], day: int) -> pl.DataFrame:
+        return pl.DataFrame(
+            {
+                "date": [datetime(2024, 1, day)] * len(ids),
+                "url": ["https://www.canada.ca"] * len(ids),
+                "clicks": [1] * len(ids),
+                "_id": ids,
+            }
+        )
+
+    rows(["a"], 10).write_parquet(os.path.join(partition_dir, "0.parquet"))
+
+    # "a" was already written by the sync the change stream was opened before
+    monkeypatch.setattr(
+        io.db, "find_batches", lambda *_, **__: iter([rows(["a", "b"], 12)])
+    )
+
+    sync_utils = SyncUtils(data_dir, append_segments=append_segments)
+    inserted: dict[ChangeType, list[Any]] = {"insert": [ObjectId(), ObjectId()]}
+
+    # the same insert events, delivered again after a failed flush
+    io.apply_changes(model, inserted, sync_utils)
+    io.apply_changes(model, inserted, sync_utils)
+
+    assert sorted(pl.read_parquet(partition_dir)["_id"].to_list()) == ["a", "b"]
@@ -0,0 +1,118 @@
+"""
+A durable journal of the units of work (partitions, batches of inserts) completed by an export, sync or import run,
+so that an interrupted run can be resumed from where it stopped instead of starting over.
+
+The journal is an append-only JSON lines file in the `_journal` subdirectory of the data directory, written and
+synced to disk as each unit completes. It's deleted once the run completes, so only interrupted runs leave one.
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Any, TypeVar, final
+from bson import json_util
+
+JOURNAL_DIR_NAME = "_journal"
+
+T = TypeVar("T")
+
+# dates are naive UTC, like the ones read from MongoDB and Parquet
+_json_options = json_util.JSONOptions(tz_aware=False)
+
+
+def partition_unit(name: str, partition_start: datetime) -> str:
+    """
+    The unit of work of a partition of a model or collection, e.g. `pages_metrics.parquet/2024-01-01`.
+    """
+    return f"{name}/{partition_start:%Y-%m-%d}"
+
+
+@final
+class RunJournal:
+    """
+    The journal of a run, e.g. "export" or "import". A run without `resume` starts a new journal.
+    """
+
+    def __init__(self, parquet_dir_path: str, run: str, resume: bool = False):
+        """
+        :param parquet_dir_path: The data directory.
+        :param run: The name of the run, one journal being kept per name.
+        :param resume: Whether to resume the journal of the previous (interrupted) run.
+        """
+        self.path = os.path.join(parquet_dir_path, JOURNAL_DIR_NAME, f"{run}.jsonl")
+        self.resume = resume
+        self.done: set[str] = set()
+        self.values: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        if not resume:
+            self.clear()
+            return
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    entry = json_util.loads(line, json_options=_json_options)
+                except ValueError:
+                    # the last line of a journal interrupted while writing it
+                    continue
+
+                if "done" in entry:
+                    self.done.add(entry["done"])
+                elif "key" in entry:
+                    self.values[entry["key"]] = entry["value"]
+
+        print(f"⏯️ Resuming {run}: {len(self.done)} units already completed")
+
+    def _append(self, entry: dict[str, Any]):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            with open(self.path, "a") as f:
+                f.write(json_util.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def is_done(self, unit: str) -> bool:
+        return unit in self.done
+
+    def mark_done(self, unit: str):
+        """
+        Record that a unit of work completed, once its results are durable.
+        """
+        self._append({"done": unit})
+
+        with self._lock:
+            self.done.add(unit)
+
+    def remember(self, key: str, value: T) -> T:
+        """
+        Record a value the units of the run depend on, e.g. the date a sync starts from,
+        or get the value recorded by the run being resumed.
+        """
+        with self._lock:
+            if key in self.values:
+                return self.values[key]
+
+            self.values[key] = value
+
+        self._append({"key": key, "value": value})
+
+        return value
+
+    def clear(self):
+        """
+        Delete the journal, once the run completed.
+        """
+        with self._lock:
+            self.done.clear()
+            self.values.clear()
+
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+__all__ = ["JOURNAL_DIR_NAME", "RunJournal", "partition_unit"]
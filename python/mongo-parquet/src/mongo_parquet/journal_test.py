@@ -0,0 +1,41 @@
+"""Tests for the run journal."""
+
+import os
+from datetime import datetime
+from .journal import RunJournal, partition_unit
+
+
+def test_resume_skips_completed_units(tmp_path):
+    journal = RunJournal(str(tmp_path), "import")
+
+    assert journal.remember("batch_size", 1000) == 1000
+    assert journal.remember("latest_date", datetime(2024, 1, 31)) == datetime(
+        2024, 1, 31
+    )
+
+    journal.mark_done(partition_unit("pages_metrics.parquet", datetime(2024, 1, 1)))
+    journal.mark_done("pages/0")
+
+    # a line partially written when the run was interrupted
+    with open(journal.path, "a") as f:
+        _ = f.write('{"done": "pages/')
+
+    resumed = RunJournal(str(tmp_path), "import", resume=True)
+
+    assert resumed.is_done("pages_metrics.parquet/2024-01-01")
+    assert resumed.is_done("pages/0")
+    assert not resumed.is_done("pages/1")
+    assert resumed.remember("batch_size", 50_000) == 1000
+    assert resumed.remember("latest_date", datetime.min) == datetime(2024, 1, 31)
+
+    resumed.clear()
+
+    assert not os.path.exists(resumed.path)
+    assert not RunJournal(str(tmp_path), "import", resume=True).is_done("pages/0")
+
+
+def test_new_run_discards_journal(tmp_path):
+    RunJournal(str(tmp_path), "export").mark_done("pages.parquet")
+
+    assert not RunJournal(str(tmp_path), "export").is_done("pages.parquet")
+    assert not RunJournal(str(tmp_path), "export", resume=True).is_done("pages.parquet")
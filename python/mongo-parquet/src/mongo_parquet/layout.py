@@ -0,0 +1,204 @@
+"""
+The physical layout of Parquet files: row order, row group and page sizes, and indexes.
+
+Rows clustered by the columns that views filter on (`date`, then `url`), in row groups and pages
+with min/max statistics and column indexes, let readers skip the data that can't match a filter
+instead of decompressing whole files.
+"""
+
+import os
+import re
+from typing import Any, TypedDict, final
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+DEFAULT_ROW_GROUP_SIZE = 128 * 1024
+
+
+class SinkOptions(TypedDict, total=False):
+    """The options of polars' `write_parquet`/`sink_parquet` that a layout sets."""
+
+    compression_level: int
+    row_group_size: int
+    data_page_size: int
+
+
+@final
+class ParquetLayout:
+    """
+    How the files of a Parquet model are written.
+
+    Bloom filters aren't supported by the Parquet writers available (pyarrow/polars),
+    so point lookups on `url` rely on the sort order and the page index instead.
+    """
+
+    def __init__(
+        self,
+        sort_by: list[str] | None = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+        data_page_size: int | None = None,
+        dictionary_page_size_limit: int | None = None,
+        page_index: bool = True,
+        compression_level: int = 7,
+    ):
+        """
+        :param sort_by: The columns to sort (cluster) the rows by, in ascending order.
+        :param row_group_size: The maximum number of rows per row group.
+        :param data_page_size: The target size of data pages, in bytes. Smaller pages make the page index more selective.
+        :param dictionary_page_size_limit: The size a column's dictionary can reach before falling back to plain encoding,
+                                           e.g. to keep the `url`/`term` columns dictionary encoded.
+        :param page_index: Whether to write the column and offset indexes (per-page min/max statistics).
+        :param compression_level: The zstd compression level.
+        """
+        self.sort_by = sort_by or []
+        self.row_group_size = row_group_size
+        self.data_page_size = data_page_size
+        self.dictionary_page_size_limit = dictionary_page_size_limit
+        self.page_index = page_index
+        self.compression_level = compression_level
+
+    def sort_columns(self, columns: list[str]) -> list[str]:
+        """
+        Get the sort columns that exist in a file's columns.
+        """
+        # a sort key is only useful if all the keys before it are also present
+        sort_columns: list[str] = []
+
+        for column in self.sort_by:
+            if column not in columns:
+                break
+            sort_columns.append(column)
+
+        return sort_columns
+
+    def sort(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Sort the rows by the sort columns, keeping the existing order of equal rows.
+        """
+        sort_columns = self.sort_columns(df.columns)
+
+        if not sort_columns:
+            return df
+
+        return df.sort(sort_columns, maintain_order=True)
+
+    def writer_options(self, schema: pa.Schema | None = None) -> dict[str, Any]:
+        """
+        Options for `pyarrow.parquet.ParquetWriter`/`write_table`. The sorting columns are only
+        recorded in the file metadata if a `schema` is given, i.e. if the rows are known to be sorted.
+        """
+        options: dict[str, Any] = {
+            "compression": "zstd",
+            "compression_level": self.compression_level,
+            "write_page_index": self.page_index,
+        }
+
+        if self.data_page_size is not None:
+            options["data_page_size"] = self.data_page_size
+
+        if self.dictionary_page_size_limit is not None:
+            options["dictionary_pagesize_limit"] = self.dictionary_page_size_limit
+
+        if schema is not None and (sort_columns := self.sort_columns(schema.names)):
+            options["sorting_columns"] = pq.SortingColumn.from_ordering(
+                schema, [(column, "ascending") for column in sort_columns]
+            )
+
+        return options
+
+    def sink_options(self) -> SinkOptions:
+        """
+        Options for polars' `write_parquet`/`sink_parquet`, for streaming writes.
+        Polars doesn't write page indexes, so these only set the compression and sizes.
+        """
+        options: SinkOptions = {
+            "compression_level": self.compression_level,
+            "row_group_size": self.row_group_size,
+        }
+
+        if self.data_page_size is not None:
+            options["data_page_size"] = self.data_page_size
+
+        return options
+
+    def write(self, df: pl.DataFrame, path: str):
+        """
+        Sort and write a DataFrame to a Parquet file with this layout.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        table = self.sort(df).to_arrow()
+
+        pq.write_table(
+            table,
+            path,
+            row_group_size=self.row_group_size,
+            **self.writer_options(table.schema),
+        )
+
+    def is_applied(self, path: str) -> bool:
+        """
+        Whether a Parquet file was written with this layout, i.e. doesn't need to be rewritten.
+        """
+        metadata = pq.ParquetFile(path).metadata
+
+        if metadata.num_row_groups == 0:
+            return True
+
+        first_row_group = metadata.row_group(0)
+        sort_columns = self.sort_columns(metadata.schema.names)
+
+        if sort_columns:
+            sorting = first_row_group.sorting_columns
+            names = [
+                metadata.schema.column(column.column_index).name for column in sorting
+            ]
+
+            if names != sort_columns or any(column.descending for column in sorting):
+                return False
+
+        if self.page_index and not first_row_group.column(0).has_column_index:
+            return False
+
+        return all(
+            metadata.row_group(i).num_rows <= self.row_group_size
+            for i in range(metadata.num_row_groups)
+        )
+
+    def rewrite(self, path: str) -> bool:
+        """
+        Rewrite a Parquet file with this layout, unless it already has it.
+        The file is written to a temp file first, which then replaces it.
+
+        :return: Whether the file was rewritten.
+        """
+        if self.is_applied(path):
+            return False
+
+        temp_path = re.sub(r"\.parquet$", ".tmp.parquet", path)
+
+        self.write(pl.read_parquet(path, hive_partitioning=False), temp_path)
+        os.replace(temp_path, path)
+
+        return True
+
+
+DEFAULT_LAYOUT = ParquetLayout()
+
+DATE_URL_LAYOUT = ParquetLayout(
+    sort_by=["date", "url"],
+    row_group_size=64 * 1024,
+    data_page_size=256 * 1024,
+    dictionary_page_size_limit=8 * 1024**2,
+)
+"""For the daily metrics by URL, which views filter by date range and URL"""
+
+
+__all__ = [
+    "DATE_URL_LAYOUT",
+    "DEFAULT_LAYOUT",
+    "DEFAULT_ROW_GROUP_SIZE",
+    "ParquetLayout",
+    "SinkOptions",
+]
@@ -0,0 +1,51 @@
+"""Tests for the Parquet file layouts."""
+
+from datetime import datetime
+import polars as pl
+import pyarrow.parquet as pq
+from polars.testing import assert_frame_equal
+from .layout import ParquetLayout
+
+
+def metrics() -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "date": [datetime(2024, 1, day) for day in (3, 1, 2, 1, 3, 2)],
+            "url": ["/b", "/b", "/a", "/a", "/a", "/b"],
+            "visits": [1, 2, 3, 4, 5, 6],
+        }
+    )
+
+
+layout = ParquetLayout(sort_by=["date", "url"], row_group_size=2)
+
+
+def test_write(tmp_path):
+    path = str(tmp_path / "metrics.parquet")
+    layout.write(metrics(), path)
+
+    metadata = pq.ParquetFile(path).metadata
+
+    assert metadata.num_row_groups == 3
+    assert [
+        column.column_index for column in metadata.row_group(0).sorting_columns
+    ] == [0, 1]
+    assert metadata.row_group(0).column(1).has_column_index
+    assert_frame_equal(pl.read_parquet(path), metrics().sort("date", "url"))
+
+
+def test_sort_columns_are_a_prefix():
+    assert layout.sort_columns(["url", "visits"]) == []
+    assert layout.sort_columns(["visits", "date"]) == ["date"]
+    assert_frame_equal(layout.sort(metrics().drop("date")), metrics().drop("date"))
+
+
+def test_rewrite(tmp_path):
+    path = str(tmp_path / "metrics.parquet")
+    metrics().write_parquet(path)
+
+    assert not layout.is_applied(path)
+    assert layout.rewrite(path)
+    assert layout.is_applied(path)
+    assert not layout.rewrite(path)
+    assert_frame_equal(pl.read_parquet(path), metrics().sort("date", "url"))
@@ -1,12 +1,21 @@
 import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full, Queue
+from threading import Event
 import polars as pl
+from bson import ObjectId
 from pymongoarrow.api import (
+    Schema,
     find_polars_all,
     aggregate_polars_all,
+    _arrow_to_polars,  # pyright: ignore[reportPrivateUsage]
 )
+from pymongoarrow.context import PyMongoArrowContext
 from pymongo import MongoClient
+from pymongo.collection import Collection
 from pymongoarrow.monkey import patch_all
-from typing import final
+from typing import Any, Literal, final
 import urllib.parse
 
 from .schemas import MongoCollection, ParquetModel
@@ -14,6 +23,60 @@ from .utils import ensure_dataframe
 
 patch_all()
 
+type SplitMethod = Literal["timestamp"] | Literal["bucket_auto"]
+
+
+def id_range_filter(
+    filter: dict[str, Any] | None, start: Any = None, end: Any = None
+) -> dict[str, Any]:
+    """
+    Restrict a filter to the documents with `start <= _id < end`. A bound of None is open.
+    """
+    id_conditions: dict[str, Any] = {}
+
+    if start is not None:
+        id_conditions["$gte"] = start
+    if end is not None:
+        id_conditions["$lt"] = end
+
+    if not id_conditions:
+        return filter or {}
+
+    id_filter = {"_id": id_conditions}
+
+    return {"$and": [filter, id_filter]} if filter else id_filter
+
+
+def iter_polars_batches(
+    collection: Collection[Any],
+    raw_batches: Iterable[bytes],
+    schema: Schema,
+) -> Iterator[pl.DataFrame]:
+    """
+    Convert the raw BSON batches of a cursor to DataFrames, one batch at a time.
+    At least one DataFrame is always yielded, which is empty if the cursor has no results.
+
+    :param collection: The collection the cursor is for.
+    :param raw_batches: A raw batch cursor, e.g. from `find_raw_batches`.
+    :param schema: The schema of the results.
+    """
+    has_results = False
+
+    for raw_batch in raw_batches:
+        context = PyMongoArrowContext(schema, codec_options=collection.codec_options)
+        context.process_bson_stream(raw_batch)
+        df = ensure_dataframe(_arrow_to_polars(context.finish()))
+
+        if df.is_empty():
+            continue
+
+        has_results = True
+        yield df
+
+    if not has_results:
+        context = PyMongoArrowContext(schema, codec_options=collection.codec_options)
+        yield ensure_dataframe(_arrow_to_polars(context.finish()))
+
 
 @final
 class MongoConfig:
@@ -118,6 +181,282 @@ class MongoArrowClient:
 
         return results
 
+    def find_extraction(
+        self,
+        model: MongoCollection,
+        filter: dict[str, Any] | None = None,
+    ) -> pl.DataFrame:
+        """
+        Read the documents for all of a collection's parquet models in a single query.
+        The results are untransformed, and are meant to be passed to `model.split_extraction`.
+
+        :param model: The model representing the MongoDB collection.
+        :param filter: The filter to use instead of the primary model's filter.
+        :return: A DataFrame with the union of all the parquet models' fields.
+        """
+        results = find_polars_all(
+            self.db[model.collection],
+            filter or model.primary_model.filter,
+            schema=model.extraction_schema(),
+        )
+
+        return ensure_dataframe(results)
+
+    def find_batches(
+        self,
+        model: ParquetModel,
+        filter: dict[str, Any] | None = None,
+        batch_size: int = 50_000,
+        id_range: tuple[Any, Any] | None = None,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Find all documents matching the query and yield them as transformed batches,
+        so that only one batch needs to be held in memory at a time.
+
+        :param model: The model to use for the query.
+        :param filter: The filter to use instead of the model's filter.
+        :param batch_size: The maximum number of documents per batch.
+        :param id_range: Only find the documents with `start <= _id < end`, in `_id` order.
+        :return: An iterator of transformed DataFrames. (at least one, which may be empty)
+        """
+        collection = self.db[model.collection]
+        start, end = id_range or (None, None)
+
+        if model.pipeline:
+            pipeline = model.pipeline
+
+            if id_range is not None:
+                pipeline = [
+                    {"$match": id_range_filter(None, start, end)},
+                    {"$sort": {"_id": 1}},
+                    *pipeline,
+                ]
+
+            raw_batches = collection.aggregate_raw_batches(
+                pipeline, batchSize=batch_size
+            )
+
+        elif model.use_aggregation:
+            pipeline = []
+
+            if filter or model.filter or id_range is not None:
+                pipeline.append(
+                    {"$match": id_range_filter(filter or model.filter, start, end)}
+                )
+
+            if id_range is not None:
+                pipeline.append({"$sort": {"_id": 1}})
+
+            pipeline.append({"$project": model.projection})
+
+            raw_batches = collection.aggregate_raw_batches(
+                pipeline, batchSize=batch_size
+            )
+
+        else:
+            raw_batches = collection.find_raw_batches(
+                # sample filter needs to be passed explicitly
+                id_range_filter(filter or model.filter, start, end),
+                projection=model.projection or model.schema._get_projection(),  # pyright: ignore[reportPrivateUsage]
+                batch_size=batch_size,
+                sort=[("_id", 1)] if id_range is not None else None,
+            )
+
+        for df in iter_polars_batches(collection, raw_batches, model.schema):
+            if model.transform:  # pyright: ignore[reportUnnecessaryComparison]
+                yield model.transform(df)
+            else:
+                yield df
+
+    def id_boundaries(
+        self,
+        collection_name: str,
+        filter: dict[str, Any] | None,
+        splits: int,
+        method: SplitMethod = "timestamp",
+    ) -> list[Any]:
+        """
+        Get the `_id` values splitting the documents matching a filter into (at most) `splits` ranges.
+
+        :param collection_name: The name of the collection.
+        :param filter: The filter of the documents.
+        :param splits: The number of ranges.
+        :param method: "timestamp" splits the time between the ObjectIds of the first and last documents evenly,
+                       which only takes two index lookups, but gives uneven ranges if documents weren't created at
+                       a steady rate. "bucket_auto" uses `$bucketAuto` for ranges with about as many documents each,
+                       at the cost of reading every matching `_id`.
+        :return: The sorted boundaries, i.e. `splits - 1` values or fewer.
+        """
+        collection = self.db[collection_name]
+
+        if splits < 2:
+            return []
+
+        if method == "bucket_auto":
+            buckets = list(
+                collection.aggregate(
+                    [
+                        {"$match": filter or {}},
+                        {"$bucketAuto": {"groupBy": "$_id", "buckets": splits}},
+                    ]
+                )
+            )
+
+            return [bucket["_id"]["min"] for bucket in buckets[1:]]
+
+        first = collection.find_one(filter or {}, {"_id": 1}, sort=[("_id", 1)])
+        last = collection.find_one(filter or {}, {"_id": 1}, sort=[("_id", -1)])
+
+        if (
+            first is None
+            or last is None
+            or not isinstance(first["_id"], ObjectId)
+            or not isinstance(last["_id"], ObjectId)
+        ):
+            return []
+
+        first_time = first["_id"].generation_time
+        step = (last["_id"].generation_time - first_time) / splits
+
+        return sorted(
+            {
+                boundary
+                for i in range(1, splits)
+                if first["_id"]
+                < (boundary := ObjectId.from_datetime(first_time + step * i))
+                <= last["_id"]
+            }
+        )
+
+    def find_batches_split(
+        self,
+        model: ParquetModel,
+        filter: dict[str, Any] | None = None,
+        batch_size: int = 50_000,
+        splits: int = 4,
+        method: SplitMethod = "timestamp",
+        prefetch: int = 2,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Like `find_batches`, but reading `splits` ranges of `_id`s on concurrent cursors,
+        for large collections where a single cursor is the bottleneck.
+
+        The batches are yielded in `_id` order. Each range is read ahead of the one being yielded
+        by at most `prefetch` batches (plus the one being read), so at most
+        `splits * (prefetch + 1)` batches are held in memory at once.
+
+        :param model: The model to use for the query.
+        :param filter: The filter to use instead of the model's filter.
+        :param batch_size: The maximum number of documents per batch, for each cursor.
+        :param splits: The number of ranges, and of concurrent cursors.
+        :param method: How to compute the boundaries of the ranges. See `id_boundaries`.
+        :param prefetch: The number of batches each range can read ahead.
+        :return: An iterator of transformed DataFrames. (at least one, which may be empty)
+        """
+        boundaries = self.id_boundaries(
+            model.collection,
+            # the pipeline's own filter only applies after its first stage
+            None if model.pipeline else filter or model.filter,
+            splits,
+            method,
+        )
+
+        if not boundaries:
+            yield from self.find_batches(model, filter, batch_size=batch_size)
+            return
+
+        id_ranges = list(zip([None, *boundaries], [*boundaries, None]))
+
+        print(
+            f"Reading {model.collection} in {len(id_ranges)} _id ranges concurrently..."
+        )
+
+        # the batches of each range, then None when the range is done, or the error that stopped it
+        queues: list[Queue[pl.DataFrame | BaseException | None]] = [
+            Queue(maxsize=prefetch) for _ in id_ranges
+        ]
+        # set when the consumer stops, so that the readers blocked on a full queue can exit
+        stopped = Event()
+
+        def put(queue: Queue[pl.DataFrame | BaseException | None], item: Any) -> bool:
+            while not stopped.is_set():
+                try:
+                    queue.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+
+            return False
+
+        def read_range(
+            id_range: tuple[Any, Any],
+            queue: Queue[pl.DataFrame | BaseException | None],
+        ):
+            try:
+                for df in self.find_batches(
+                    model, filter, batch_size=batch_size, id_range=id_range
+                ):
+                    if not put(queue, df):
+                        return
+            except BaseException as e:
+                _ = put(queue, e)
+                return
+
+            _ = put(queue, None)
+
+        empty: pl.DataFrame | None = None
+        has_results = False
+
+        with ThreadPoolExecutor(
+            max_workers=len(id_ranges), thread_name_prefix="split-scan"
+        ) as executor:
+            try:
+                for id_range, queue in zip(id_ranges, queues):
+                    _ = executor.submit(read_range, id_range, queue)
+
+                for queue in queues:
+                    while (item := queue.get()) is not None:
+                        if isinstance(item, BaseException):
+                            raise item
+
+                        if item.is_empty():
+                            empty = item
+                            continue
+
+                        has_results = True
+                        yield item
+            finally:
+                stopped.set()
+
+        # like `find_batches`, yield an empty batch with the schema if there are no results
+        if not has_results and empty is not None:
+            yield empty
+
+    def find_extraction_batches(
+        self,
+        model: MongoCollection,
+        filter: dict[str, Any] | None = None,
+        batch_size: int = 50_000,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Streaming version of `find_extraction`, yielding untransformed batches.
+
+        :param model: The model representing the MongoDB collection.
+        :param filter: The filter to use instead of the primary model's filter.
+        :param batch_size: The maximum number of documents per batch.
+        :return: An iterator of DataFrames. (at least one, which may be empty)
+        """
+        collection = self.db[model.collection]
+        schema = model.extraction_schema()
+
+        raw_batches = collection.find_raw_batches(
+            filter or model.primary_model.filter,
+            projection=schema._get_projection(),  # pyright: ignore[reportPrivateUsage]
+            batch_size=batch_size,
+        )
+
+        yield from iter_polars_batches(collection, raw_batches, schema)
+
     def insert_many(
         self,
         model: MongoCollection,
@@ -139,4 +478,6 @@ class MongoArrowClient:
 __all__ = [
     "MongoConfig",
     "MongoArrowClient",
+    "SplitMethod",
+    "id_range_filter",
 ]
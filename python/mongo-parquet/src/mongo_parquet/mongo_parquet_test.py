@@ -0,0 +1,72 @@
+"""Tests for the MongoParquet steps that don't need a MongoDB server or remote storage."""
+
+import os
+import polars as pl
+import pytest
+from . import MongoParquet
+from .mongo import MongoConfig
+from .storage import StorageClient
+from .utils import SyncUtils
+
+
+@pytest.fixture
+def mongo_parquet(tmp_path) -> MongoParquet:
+    return MongoParquet(
+        MongoConfig("test"),
+        StorageClient(
+            os.path.join(tmp_path, "data"), os.path.join(tmp_path, "sample"), "s3"
+        ),
+        sample=False,
+    )
+
+
+def test_publish_changes_keeps_the_queue_until_uploaded(
+    mongo_parquet: MongoParquet, tmp_path, monkeypatch
+):
+    root_dir_path = os.path.join(tmp_path, "data")
+    os.makedirs(root_dir_path)
+    uploaded: list[str] = []
+    deleted: list[str] = []
+
+    monkeypatch.setattr(
+        mongo_parquet.storage_client,
+        "upload_to_remote",
+        lambda filepaths, **_: uploaded.extend(filepaths),
+    )
+    monkeypatch.setattr(
+        mongo_parquet.storage_client, "upload_snapshot", lambda *_, **__: None
+    )
+    monkeypatch.setattr(
+        mongo_parquet.storage_client,
+        "delete_from_remote",
+        lambda filepaths, **_: deleted.extend(filepaths),
+    )
+
+    filepath = os.path.join(root_dir_path, "pages.parquet")
+    segment_filepath = os.path.join(root_dir_path, "1.parquet")
+
+    pl.DataFrame({"a": [1]}).write_parquet(filepath)
+    pl.DataFrame({"a": [2]}).write_parquet(segment_filepath)
+
+    sync_utils = SyncUtils(root_dir_path)
+    sync_utils.queue_upload_if_changed(filepath)
+    os.remove(segment_filepath)
+    sync_utils.queue_file_delete(segment_filepath)
+
+    mongo_parquet.publish_changes(root_dir_path, sync_utils)
+
+    assert uploaded == [] and deleted == []
+
+    # the file's new state is recorded, but it's still queued for the next run with uploads
+    sync_utils = SyncUtils(root_dir_path)
+    sync_utils.queue_upload_if_changed(filepath)
+
+    assert sync_utils.upload_queue == ["pages.parquet"]
+    assert sync_utils.delete_queue == ["1.parquet"]
+
+    mongo_parquet.publish_changes(root_dir_path, sync_utils, upload_on_success=True)
+
+    assert uploaded == ["pages.parquet"]
+    assert deleted == ["1.parquet"]
+    assert SyncUtils(root_dir_path).upload_queue == []
+    assert SyncUtils(root_dir_path).delete_queue == []
@@ -0,0 +1,91 @@
+"""Tests for the MongoDB query helpers."""
+
+import threading
+import time
+from collections.abc import Generator, Iterator
+from typing import Any
+import polars as pl
+import pytest
+from bson import ObjectId
+from pymongo import MongoClient
+from .mongo import MongoArrowClient, id_range_filter
+from .schemas import ParquetModel
+from .schemas.gsc_searchterms import GSCSearchTerms
+
+
+def test_id_range_filter():
+    start, end = ObjectId(), ObjectId()
+
+    assert id_range_filter(None) == {}
+    assert id_range_filter({"a": 1}) == {"a": 1}
+    assert id_range_filter(None, start=start) == {"_id": {"$gte": start}}
+    assert id_range_filter({"_id": {"$in": [end]}}, start, end) == {
+        "$and": [
+            {"_id": {"$in": [end]}},
+            {"_id": {"$gte": start, "$lt": end}},
+        ]
+    }
+
+
+@pytest.mark.parametrize("prefetch", [1, 3])
+def test_find_batches_split_bounds_lookahead(monkeypatch, prefetch):
+    client = MongoArrowClient(MongoClient(connect=False), "test")
+    splits, batches_per_range = 4, 10
+    lock = threading.Lock()
+    read = 0
+
+    def find_batches(
+        model: ParquetModel,
+        filter: dict[str, Any] | None = None,
+        batch_size: int = 50_000,
+        id_range: tuple[Any, Any] | None = None,
+    ) -> Iterator[pl.DataFrame]:
+        nonlocal read
+        assert id_range is not None
+
+        for i in range(batches_per_range):
+            with lock:
+                read += 1
+            yield pl.DataFrame({"range": [id_range[0] or 0], "batch": [i]})
+
+    monkeypatch.setattr(client, "id_boundaries", lambda *_: list(range(1, splits)))
+    monkeypatch.setattr(client, "find_batches", find_batches)
+
+    yielded: list[pl.DataFrame] = []
+
+    for df in client.find_batches_split(
+        GSCSearchTerms(), splits=splits, prefetch=prefetch
+    ):
+        # let the readers fill their queues before the batch is released
+        time.sleep(0.005)
+        yielded.append(df)
+
+        with lock:
+            assert read - len(yielded) <= splits * (prefetch + 1)
+
+    # the ranges are yielded in order, each of them in order
+    assert pl.concat(yielded).rows() == [
+        (start, i) for start in range(splits) for i in range(batches_per_range)
+    ]
+
+
+def test_find_batches_split_stops_readers_when_closed(monkeypatch):
+    client = MongoArrowClient(MongoClient(connect=False), "test")
+
+    def find_batches(*_: Any, **__: Any) -> Iterator[pl.DataFrame]:
+        while True:
+            yield pl.DataFrame({"a": [1]})
+
+    monkeypatch.setattr(client, "id_boundaries", lambda *_: [1, 2])
+    monkeypatch.setattr(client, "find_batches", find_batches)
+
+    batches = client.find_batches_split(GSCSearchTerms(), prefetch=1)
+    assert isinstance(batches, Generator)
+    _ = next(batches)
+
+    # the readers of the endless ranges exit instead of blocking the executor's shutdown
+    batches.close()
+
+    assert not any(
+        thread.name.startswith("split-scan") for thread in threading.enumerate()
+    )
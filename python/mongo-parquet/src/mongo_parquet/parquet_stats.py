@@ -0,0 +1,106 @@
+"""
+Helpers for reading Parquet footer metadata, without reading any of the data pages.
+"""
+
+from datetime import datetime
+from typing import Any
+import pyarrow.parquet as pq
+
+
+def column_index(metadata: pq.FileMetaData, column: str) -> int | None:
+    """
+    Get the index of a top-level, non-nested column in the file's column chunks.
+    """
+    for i in range(metadata.num_columns):
+        if metadata.schema.column(i).path == column:
+            return i
+
+    return None
+
+
+def row_group_min_max(
+    metadata: pq.FileMetaData, row_group: int, column: str
+) -> tuple[Any, Any]:
+    """
+    Get the min and max statistics of a column in a row group.
+
+    :return: (min, max), or (None, None) if the column or its statistics are missing.
+    """
+    index = column_index(metadata, column)
+
+    if index is None:
+        return None, None
+
+    statistics = metadata.row_group(row_group).column(index).statistics
+
+    if statistics is None or not statistics.has_min_max:
+        return None, None
+
+    return statistics.min, statistics.max
+
+
+def file_min_max(metadata: pq.FileMetaData, column: str) -> tuple[Any, Any]:
+    """
+    Get the min and max statistics of a column across all row groups.
+
+    :return: (min, max), or (None, None) if no row group has statistics for the column.
+    """
+    mins: list[Any] = []
+    maxes: list[Any] = []
+
+    for row_group in range(metadata.num_row_groups):
+        row_group_min, row_group_max = row_group_min_max(metadata, row_group, column)
+
+        if row_group_min is not None:
+            mins.append(row_group_min)
+        if row_group_max is not None:
+            maxes.append(row_group_max)
+
+    return (min(mins) if mins else None, max(maxes) if maxes else None)
+
+
+def _serialize(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def footer_stats(filepath: str, date_column: str = "date") -> dict[str, Any]:
+    """
+    Read the row counts and `date` statistics of a Parquet file from its footer.
+
+    :param filepath: The path to the Parquet file.
+    :param date_column: The column to get min/max statistics for.
+    :return: JSON-serializable stats, with dates as ISO strings.
+    """
+    metadata = pq.read_metadata(filepath)
+    date_min, date_max = file_min_max(metadata, date_column)
+
+    row_groups: list[dict[str, Any]] = []
+
+    for i in range(metadata.num_row_groups):
+        row_group_min, row_group_max = row_group_min_max(metadata, i, date_column)
+
+        row_groups.append(
+            {
+                "num_rows": metadata.row_group(i).num_rows,
+                "date_min": _serialize(row_group_min),
+                "date_max": _serialize(row_group_max),
+            }
+        )
+
+    return {
+        "num_rows": metadata.num_rows,
+        "num_row_groups": metadata.num_row_groups,
+        "date_min": _serialize(date_min),
+        "date_max": _serialize(date_max),
+        "row_groups": row_groups,
+    }
+
+
+__all__ = [
+    "column_index",
+    "row_group_min_max",
+    "file_min_max",
+    "footer_stats",
+]
@@ -0,0 +1,256 @@
+"""
+Scan Parquet files directly from remote storage, reading only the footers, row groups
+and hive partitions needed by the query instead of downloading everything first.
+"""
+
+import os
+import re
+from datetime import date, datetime
+import fsspec
+import polars as pl
+import pyarrow as pa
+import pyarrow.dataset as ds
+from fsspec import AbstractFileSystem
+from pyarrow.fs import FSSpecHandler, PyFileSystem
+from .transfer import strip_protocol
+
+# the partition columns written by `get_partition_path`
+HIVE_PARTITION_SCHEMA = pa.schema([("year", pa.int64()), ("month", pa.int64())])
+
+
+def hive_partition_values(relative_path: str) -> dict[str, int]:
+    """
+    Get the year/month partition values from the path of a file in a partitioned dataset.
+
+    :param relative_path: The file path, relative to the dataset's root directory.
+    :return: e.g. {"year": 2024, "month": 3}, or {} if the file isn't partitioned.
+    """
+    values: dict[str, int] = {}
+
+    for segment in relative_path.replace("\\", "/").split("/"):
+        match = re.fullmatch(r"(year|month)=(\d+)", segment)
+
+        if match:
+            values[match.group(1)] = int(match.group(2))
+
+    return values
+
+
+def partition_may_match(
+    partition: dict[str, int],
+    min_date: datetime | date | None,
+    max_date: datetime | date | None = None,
+) -> bool:
+    """
+    Check whether a partition can contain data between `min_date` and `max_date` (inclusive).
+    """
+    if "year" not in partition:
+        return True
+
+    # (year, month) tuples compare chronologically, and a yearly partition spans all months
+    first = (partition["year"], partition.get("month", 1))
+    last = (partition["year"], partition.get("month", 12))
+
+    if min_date is not None and last < (min_date.year, min_date.month):
+        return False
+
+    if max_date is not None and first > (max_date.year, max_date.month):
+        return False
+
+    return True
+
+
+def prune_partitions(
+    files: list[str],
+    root_path: str,
+    min_date: datetime | date | None,
+    max_date: datetime | date | None = None,
+) -> list[str]:
+    """
+    Filter out the files of partitions that can't contain data between `min_date` and `max_date`,
+    using only their paths.
+    """
+    if min_date is None and max_date is None:
+        return files
+
+    return [
+        file
+        for file in files
+        if partition_may_match(
+            hive_partition_values(os.path.relpath(file, root_path)),
+            min_date,
+            max_date,
+        )
+    ]
+
+
+def partition_values_from_paths(
+    files: list[str], root_path: str, partition_by: str
+) -> list[dict[str, int]]:
+    """
+    Get the sorted, unique partition values of a partitioned dataset from the paths of its files,
+    without reading them.
+
+    :param partition_by: "month" for year/month partitions, or "year".
+    :return: e.g. [{"year": 2024, "month": 1}, {"year": 2024, "month": 2}]
+    """
+    columns = ["year", "month"] if partition_by == "month" else ["year"]
+    values: set[tuple[int, ...]] = set()
+
+    for file in files:
+        partition = hive_partition_values(os.path.relpath(file, root_path))
+
+        if all(column in partition for column in columns):
+            values.add(tuple(partition[column] for column in columns))
+
+    return [dict(zip(columns, value)) for value in sorted(values)]
+
+
+def find_parquet_files(fs: AbstractFileSystem, root_path: str) -> list[str]:
+    """
+    List the Parquet files under a path of a remote filesystem, excluding temporary files.
+
+    :return: The sorted file paths, or an empty list if the path doesn't exist.
+    """
+    try:
+        return sorted(
+            file
+            for file in fs.find(root_path, withdirs=False)
+            if file.endswith(".parquet") and not file.endswith(".tmp.parquet")
+        )
+    except FileNotFoundError:
+        return []
+
+
+def cached_filesystem(fs: AbstractFileSystem, cache_dir: str) -> AbstractFileSystem:
+    """
+    Wrap a remote filesystem in a local block cache, so that footers and row groups
+    that were already read are not fetched again by later scans.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    return fsspec.filesystem("blockcache", fs=fs, cache_storage=cache_dir)
+
+
+def _min_date_scalar(
+    min_date: datetime | date, data_type: pa.DataType
+) -> "pa.Scalar[pa.DataType]":
+    if pa.types.is_date(data_type):
+        value = min_date.date() if isinstance(min_date, datetime) else min_date
+        return pa.scalar(value, type=data_type)
+
+    value = (
+        min_date
+        if isinstance(min_date, datetime)
+        else datetime(min_date.year, min_date.month, min_date.day)
+    )
+
+    return pa.scalar(value.replace(hour=0, minute=0, second=0, microsecond=0)).cast(
+        data_type
+    )
+
+
+def unified_schema(dataset: ds.FileSystemDataset, hive_partitioning: bool) -> pa.Schema:
+    """
+    Get the schema of all the files of a dataset, reading only their footers,
+    followed by the partition columns if the dataset is hive-partitioned.
+
+    Columns missing from some of the files are read as nulls, and integer or float columns
+    are widened to the largest type found.
+    """
+    return pa.unify_schemas(
+        [
+            *(fragment.physical_schema for fragment in dataset.get_fragments()),
+            *([HIVE_PARTITION_SCHEMA] if hive_partitioning else []),
+        ],
+        promote_options="permissive",
+    )
+
+
+def scan_remote_parquet(
+    fs: AbstractFileSystem,
+    remote_path: str,
+    hive_partitioning: bool = False,
+    min_date: datetime | date | None = None,
+    cache_dir: str | None = None,
+    files: list[str] | None = None,
+) -> pl.LazyFrame | None:
+    """
+    Lazily scan a Parquet file, or a directory of partitioned Parquet files, from a remote filesystem.
+
+    Partitions are pruned by path before anything is read, and the `date >= min_date` filter
+    is applied to the dataset, so row groups are skipped using their footer statistics.
+    Filters on the partition columns are pushed down by Polars when the scan is collected.
+
+    :param fs: The remote filesystem.
+    :param remote_path: The path of the file or directory, including the container.
+    :param hive_partitioning: Whether to add the year/month partition columns.
+    :param min_date: Only include rows on or after this date.
+    :param cache_dir: A local directory to cache the blocks read from the remote filesystem.
+    :param files: The files under the path, e.g. from a snapshot manifest, instead of listing them.
+    :return: The LazyFrame, or None if there are no files.
+    """
+    root_path = strip_protocol(fs, remote_path)
+
+    if files is None:
+        files = find_parquet_files(fs, root_path)
+
+    if len(files) == 0:
+        return None
+
+    # if every partition is pruned, keep one for the schema: the date filter excludes its rows
+    files = (
+        prune_partitions(files, root_path, min_date if hive_partitioning else None)
+        or files[-1:]
+    )
+
+    scan_fs = cached_filesystem(fs, cache_dir) if cache_dir else fs
+    # the stubs declare FSSpecHandler abstract, but it implements every FileSystemHandler method
+    filesystem = PyFileSystem(FSSpecHandler(scan_fs))  # pyright: ignore[reportAbstractUsage]
+    partitioning = (
+        ds.partitioning(HIVE_PARTITION_SCHEMA, flavor="hive")
+        if hive_partitioning
+        else None
+    )
+
+    dataset = ds.dataset(
+        files,
+        filesystem=filesystem,
+        format="parquet",
+        partitioning=partitioning,
+        partition_base_dir=root_path,
+    )
+
+    if len(files) > 1:
+        # the schema of a dataset is inferred from its first file only, which would drop
+        # the columns added to the model since the oldest partition was written
+        dataset = ds.dataset(
+            files,
+            schema=unified_schema(dataset, hive_partitioning),
+            filesystem=filesystem,
+            format="parquet",
+            partitioning=partitioning,
+            partition_base_dir=root_path,
+        )
+
+    date_index = dataset.schema.get_field_index("date")
+
+    if min_date is not None and date_index != -1:
+        dataset = dataset.filter(
+            ds.field("date")
+            >= _min_date_scalar(min_date, dataset.schema.field(date_index).type)
+        )
+
+    return pl.scan_pyarrow_dataset(dataset)
+
+
+__all__ = [
+    "cached_filesystem",
+    "find_parquet_files",
+    "hive_partition_values",
+    "partition_may_match",
+    "partition_values_from_paths",
+    "prune_partitions",
+    "scan_remote_parquet",
+    "unified_schema",
+]
@@ -0,0 +1,160 @@
+"""Tests for remote scans, using the local filesystem as the "remote"."""
+
+import os
+from datetime import datetime
+import polars as pl
+import pytest
+from fsspec.implementations.local import LocalFileSystem
+from .remote_scan import (
+    hive_partition_values,
+    partition_values_from_paths,
+    prune_partitions,
+    scan_remote_parquet,
+)
+
+
+class RecordingFileSystem(LocalFileSystem):
+    """Records the files that are opened."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened: list[str] = []
+
+    def _open(self, path, *args, **kwargs):
+        self.opened.append(self._strip_protocol(path))
+        return super()._open(path, *args, **kwargs)
+
+
+@pytest.fixture
+def remote_dir(tmp_path):
+    for year, month in ((2023, 12), (2024, 1), (2024, 2)):
+        path = tmp_path / "metrics.parquet" / f"year={year}" / f"month={month}"
+        os.makedirs(path)
+        pl.DataFrame(
+            {
+                "date": [datetime(year, month, day) for day in range(1, 11)],
+                "visits": list(range(10)),
+            }
+        ).write_parquet(path / "0.parquet", row_group_size=5)
+
+    return tmp_path
+
+
+def test_hive_partition_values():
+    assert hive_partition_values("year=2024/month=3/0.parquet") == {
+        "year": 2024,
+        "month": 3,
+    }
+    assert hive_partition_values("year=2024/0.parquet") == {"year": 2024}
+    assert hive_partition_values("0.parquet") == {}
+
+
+def test_partition_values_from_paths():
+    files = [
+        "/data/x.parquet/year=2024/month=10/0.parquet",
+        "/data/x.parquet/year=2024/month=2/0.parquet",
+        "/data/x.parquet/year=2024/month=2/1.parquet",
+        "/data/x.parquet/_SUCCESS.parquet",
+    ]
+
+    assert partition_values_from_paths(files, "/data/x.parquet", "month") == [
+        {"year": 2024, "month": 2},
+        {"year": 2024, "month": 10},
+    ]
+    assert partition_values_from_paths(files, "/data/x.parquet", "year") == [
+        {"year": 2024}
+    ]
+
+
+def test_prune_partitions():
+    files = [
+        "/data/x.parquet/year=2023/month=12/0.parquet",
+        "/data/x.parquet/year=2024/month=1/0.parquet",
+        "/data/x.parquet/year=2024/month=10/0.parquet",
+        "/data/x.parquet/year=2025/month=1/0.parquet",
+    ]
+
+    assert prune_partitions(files, "/data/x.parquet", datetime(2024, 2, 15)) == [
+        "/data/x.parquet/year=2024/month=10/0.parquet",
+        "/data/x.parquet/year=2025/month=1/0.parquet",
+    ]
+    assert prune_partitions(files, "/data/x.parquet", None) == files
+    assert prune_partitions(
+        files, "/data/x.parquet", datetime(2024, 1, 31), datetime(2024, 10, 1)
+    ) == [
+        "/data/x.parquet/year=2024/month=1/0.parquet",
+        "/data/x.parquet/year=2024/month=10/0.parquet",
+    ]
+    assert prune_partitions(
+        ["/data/x.parquet/year=2024/0.parquet"],
+        "/data/x.parquet",
+        None,
+        datetime(2024, 6, 1),
+    ) == ["/data/x.parquet/year=2024/0.parquet"]
+
+
+def test_pruned_partitions_are_not_read(remote_dir):
+    fs = RecordingFileSystem()
+
+    lf = scan_remote_parquet(
+        fs,
+        str(remote_dir / "metrics.parquet"),
+        hive_partitioning=True,
+        min_date=datetime(2024, 1, 8),
+    )
+
+    assert lf is not None
+
+    df = lf.collect()
+
+    assert df["date"].min() == datetime(2024, 1, 8)
+    assert df.height == 3 + 10
+    assert df.select("year", "month").unique().sort("month").rows() == [
+        (2024, 1),
+        (2024, 2),
+    ]
+    assert not any("year=2023" in path for path in fs.opened)
+
+
+def test_every_partition_pruned(remote_dir):
+    lf = scan_remote_parquet(
+        LocalFileSystem(),
+        str(remote_dir / "metrics.parquet"),
+        hive_partitioning=True,
+        min_date=datetime(2025, 1, 1),
+    )
+
+    assert lf is not None
+    assert lf.collect().columns == ["date", "visits", "year", "month"]
+    assert lf.collect().is_empty()
+
+
+def test_missing_file(tmp_path):
+    assert scan_remote_parquet(LocalFileSystem(), str(tmp_path / "none")) is None
+
+
+def test_columns_added_to_newer_partitions(remote_dir):
+    """The columns of every file are scanned, not only the columns of the first file."""
+    path = remote_dir / "metrics.parquet" / "year=2024" / "month=3"
+    os.makedirs(path)
+    pl.DataFrame(
+        {
+            "date": [datetime(2024, 3, 1)],
+            "visits": [1],
+            "views": [2],
+        }
+    ).write_parquet(path / "0.parquet")
+
+    lf = scan_remote_parquet(
+        LocalFileSystem(),
+        str(remote_dir / "metrics.parquet"),
+        hive_partitioning=True,
+        min_date=datetime(2024, 2, 10),
+    )
+
+    assert lf is not None
+
+    df = lf.collect()
+
+    assert df.columns == ["date", "visits", "views", "year", "month"]
+    assert df.sort("date")["views"].to_list() == [None, 2]
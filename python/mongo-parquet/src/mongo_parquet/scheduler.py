@@ -0,0 +1,117 @@
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import BoundedSemaphore
+from time import sleep
+from typing import TypeVar, final
+
+T = TypeVar("T")
+
+
+@final
+class PartitionScheduler:
+    """
+    Runs independent partition tasks (e.g. one month of an export) on a bounded pool of
+    worker threads, with a separate cap on the number of concurrent MongoDB cursors.
+
+    Threads are enough here, since pymongoarrow and polars release the GIL for the heavy lifting.
+    With `max_workers=1`, tasks run serially in the calling thread.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_cursors: int | None = None,
+        retries: int = 2,
+        retry_delay_secs: int | float = 5,
+    ):
+        """
+        :param max_workers: The number of partitions to process concurrently.
+        :param max_cursors: The maximum number of concurrent MongoDB cursors. Defaults to `max_workers`.
+        :param retries: The number of times to retry a failed partition.
+        :param retry_delay_secs: The delay before the first retry, increasing with each attempt.
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_cursors = max(1, max_cursors or self.max_workers)
+        self.retries = max(0, retries)
+        self.retry_delay_secs = retry_delay_secs
+        self._cursor_semaphore = BoundedSemaphore(self.max_cursors)
+
+    @contextmanager
+    def cursor(self) -> Iterator[None]:
+        """
+        Hold one of the MongoDB cursor slots for the duration of the context.
+        """
+        with self._cursor_semaphore:
+            yield
+
+    def run_task(self, label: str, task: Callable[[], T]) -> T:
+        """
+        Run a task, retrying it if it raises.
+
+        :param label: A label for the task, used for logging.
+        :param task: The task to run.
+        :return: The task's return value.
+        """
+        attempt = 0
+
+        while True:
+            try:
+                return task()
+            except Exception as e:
+                if attempt >= self.retries:
+                    raise
+
+                attempt += 1
+                delay_secs = self.retry_delay_secs * attempt
+
+                print(
+                    f"⚠️ {label} failed: {e}. Retrying in {delay_secs} seconds ({attempt}/{self.retries})..."
+                )
+                sleep(delay_secs)
+
+    def run(self, tasks: Iterable[tuple[str, Callable[[], T]]]) -> list[T]:
+        """
+        Run all tasks and wait for them to complete.
+
+        Every task runs to completion (or failure) even if another task fails,
+        after which the first error is raised.
+
+        :param tasks: (label, task) tuples.
+        :return: The return values of the tasks, in the same order as the tasks.
+        """
+        task_list = list(tasks)
+
+        if self.max_workers == 1 or len(task_list) <= 1:
+            return [self.run_task(label, task) for label, task in task_list]
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="partition"
+        ) as executor:
+            futures = [
+                executor.submit(self.run_task, label, task) for label, task in task_list
+            ]
+
+        results: list[T] = []
+        failed: list[tuple[str, BaseException]] = []
+
+        for (label, _), future in zip(task_list, futures):
+            exception = future.exception()
+
+            if exception is not None:
+                failed.append((label, exception))
+                continue
+
+            results.append(future.result())
+
+        if len(failed) > 0:
+            label, exception = failed[0]
+            exception.add_note(
+                f"{len(failed)} of {len(task_list)} tasks failed: {', '.join(label for label, _ in failed)}"
+            )
+            raise exception
+
+        return results
+
+
+__all__ = ["PartitionScheduler"]
@@ -0,0 +1,83 @@
+"""Tests for the partition scheduler."""
+
+import threading
+import time
+import pytest
+from .scheduler import PartitionScheduler
+
+
+def test_results_keep_task_order():
+    """Results are returned in task order, regardless of completion order."""
+    scheduler = PartitionScheduler(max_workers=4)
+
+    def task(i: int):
+        time.sleep(0.01 * (5 - i))
+        return i
+
+    results = scheduler.run((f"task {i}", lambda i=i: task(i)) for i in range(5))
+
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_serial_runs_in_calling_thread():
+    """With a single worker, tasks run in the calling thread."""
+    scheduler = PartitionScheduler(max_workers=1)
+    main_thread = threading.current_thread()
+
+    results = scheduler.run(
+        (f"task {i}", lambda: threading.current_thread()) for i in range(3)
+    )
+
+    assert all(thread is main_thread for thread in results)
+
+
+def test_failed_task_is_retried():
+    """A task that fails fewer times than the retry limit succeeds."""
+    scheduler = PartitionScheduler(max_workers=2, retries=2, retry_delay_secs=0)
+    attempts = {"count": 0}
+
+    def flaky():
+        attempts["count"] += 1
+        if attempts["count"] < 3:
+            raise RuntimeError("transient")
+        return "ok"
+
+    assert scheduler.run([("flaky", flaky)]) == ["ok"]
+    assert attempts["count"] == 3
+
+
+def test_failure_raised_after_all_tasks_complete():
+    """Other tasks still run to completion when one task fails."""
+    scheduler = PartitionScheduler(max_workers=3, retries=0)
+    completed: list[int] = []
+
+    def task(i: int):
+        if i == 0:
+            raise ValueError("boom")
+        time.sleep(0.01)
+        completed.append(i)
+
+    with pytest.raises(ValueError, match="boom"):
+        scheduler.run((f"task {i}", lambda i=i: task(i)) for i in range(4))
+
+    assert sorted(completed) == [1, 2, 3]
+
+
+def test_cursor_limit():
+    """No more than `max_cursors` tasks hold a cursor at the same time."""
+    scheduler = PartitionScheduler(max_workers=6, max_cursors=2)
+    lock = threading.Lock()
+    active = {"current": 0, "max": 0}
+
+    def task():
+        with scheduler.cursor():
+            with lock:
+                active["current"] += 1
+                active["max"] = max(active["max"], active["current"])
+            time.sleep(0.02)
+            with lock:
+                active["current"] -= 1
+
+    scheduler.run((f"task {i}", task) for i in range(8))
+
+    assert active["max"] == 2
@@ -1,5 +1,12 @@
 from typing import TypedDict
-from .lib import AnyFrame, MongoCollection, ParquetModel
+from .lib import (
+    AnyFrame,
+    MongoCollection,
+    ObjectIdFormat,
+    ParquetModel,
+    id_format_of,
+    ids_to_hex,
+)
 from .aa_item_ids import AAItemIds, AAItemIdsModel  # noqa: E402
 from .aa_searchterms import AASearchTerms  # noqa: E402
 from .activity_map import ActivityMap  # noqa: E402
@@ -111,7 +118,10 @@ def get_parquet_models(dir_path: str | None = None) -> ParquetModels:
 __all__ = [
     "AnyFrame",
     "collection_models",
+    "ObjectIdFormat",
     "ParquetModel",
+    "id_format_of",
+    "ids_to_hex",
     "ParquetModels",
     "get_parquet_models",
     "MongoCollection",
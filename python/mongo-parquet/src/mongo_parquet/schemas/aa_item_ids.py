@@ -26,17 +26,17 @@ class AAItemIds(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("page").bin.encode("hex"),
-            pl.col("pages").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            self.encode_id(pl.col("page")),
+            pl.col("pages").list.eval(self.encode_id(pl.element())),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("page").str.decode("hex"),
-            pl.col("pages").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            self.decode_id(pl.col("page")),
+            pl.col("pages").list.eval(self.decode_id(pl.element())),
         )
 
 
@@ -4,6 +4,7 @@ import polars as pl
 from pymongoarrow.api import Schema
 from pyarrow import float32, string, timestamp, list_, float64, int32, struct
 from pymongoarrow.types import ObjectIdType
+from ..layout import DATE_URL_LAYOUT
 from .lib import AnyFrame, ParquetModel
 from ..sampling import SamplingContext
 from .utils import get_sample_ids, get_sample_date_range_filter
@@ -13,7 +14,10 @@ from .utils import get_sample_ids, get_sample_date_range_filter
 class AASearchTerms(ParquetModel):
     collection: str = "pages_metrics"
     parquet_filename: str = "pages_metrics_aa_searchterms.parquet"
+    sort_by = ["date", "url", "clicks"]
+    sort_descending = [False, False, True]
     partition_by = "month"
+    layout = DATE_URL_LAYOUT
     filter = {"aa_searchterms": {"$exists": True}}
     projection: dict[str, Any] | None = None
     schema: Schema = Schema(
@@ -64,12 +68,12 @@ class AASearchTerms(ParquetModel):
             .with_columns(pl.col("aa_searchterms").struct.unnest())
             .drop("aa_searchterms")
             .with_columns(
-                pl.col("_doc_id").bin.encode("hex"),
-                pl.col("_id").bin.encode("hex"),
-                pl.col("page").bin.encode("hex"),
-                pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-                pl.col("projects").list.eval(pl.element().bin.encode("hex")),
-                pl.col("ux_tests").list.eval(pl.element().bin.encode("hex")),
+                self.encode_id(pl.col("_doc_id")),
+                self.encode_id(pl.col("_id")),
+                self.encode_id(pl.col("page")),
+                pl.col("tasks").list.eval(self.encode_id(pl.element())),
+                pl.col("projects").list.eval(self.encode_id(pl.element())),
+                pl.col("ux_tests").list.eval(self.encode_id(pl.element())),
                 pl.col("position").round(4).cast(pl.Float32),
             )
             .rename(
@@ -78,8 +82,7 @@ class AASearchTerms(ParquetModel):
                     "_id": "_term_id",
                 }
             )
-            .sort("clicks", descending=True)
-            .sort("date", "url")
+            .pipe(self.sort)
         )
 
     @override
@@ -87,13 +90,13 @@ class AASearchTerms(ParquetModel):
         return (
             df.select(
                 [
-                    pl.col("_id").str.decode("hex"),
+                    self.decode_id(pl.col("_id")),
                     pl.struct(
                         [
                             pl.col("term"),
                             pl.col("clicks"),
                             pl.col("position"),
-                            pl.col("_term_id").str.decode("hex").alias("_id"),
+                            self.decode_id(pl.col("_term_id")).alias("_id"),
                         ]
                     ).alias("aa_searchterms"),
                 ]
@@ -4,6 +4,7 @@ from pymongoarrow.api import Schema
 from bson import ObjectId
 from pyarrow import string, timestamp, list_, int32, struct
 from pymongoarrow.types import ObjectIdType
+from ..layout import DATE_URL_LAYOUT
 from .lib import AnyFrame, ParquetModel
 from .utils import get_sample_ids, get_sample_date_range_filter
 from ..sampling import SamplingContext
@@ -14,7 +15,10 @@ from copy import deepcopy
 class ActivityMap(ParquetModel):
     collection: str = "pages_metrics"
     parquet_filename: str = "pages_metrics_activity_map.parquet"
+    sort_by = ["date", "url", "clicks"]
+    sort_descending = [False, False, True]
     partition_by = "month"
+    layout = DATE_URL_LAYOUT
     filter = {"activity_map": {"$exists": True}}
     projection: dict[str, Any] | None = None
     schema: Schema = Schema(
@@ -72,12 +76,12 @@ class ActivityMap(ParquetModel):
             .with_columns(pl.col("activity_map").struct.unnest())
             .drop("activity_map")
             .with_columns(
-                pl.col("_doc_id").bin.encode("hex"),
-                pl.col("_id").bin.encode("hex"),
-                pl.col("page").bin.encode("hex"),
-                pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-                pl.col("projects").list.eval(pl.element().bin.encode("hex")),
-                pl.col("ux_tests").list.eval(pl.element().bin.encode("hex")),
+                self.encode_id(pl.col("_doc_id")),
+                self.encode_id(pl.col("_id")),
+                self.encode_id(pl.col("page")),
+                pl.col("tasks").list.eval(self.encode_id(pl.element())),
+                pl.col("projects").list.eval(self.encode_id(pl.element())),
+                pl.col("ux_tests").list.eval(self.encode_id(pl.element())),
             )
             .rename(
                 {
@@ -85,7 +89,7 @@ class ActivityMap(ParquetModel):
                     "_id": "_link_id",
                 }
             )
-            .sort("date", "url", "clicks", descending=[False, False, True])
+            .pipe(self.sort)
         )
 
     @override
@@ -93,12 +97,12 @@ class ActivityMap(ParquetModel):
         return (
             df.select(
                 [
-                    pl.col("_id").str.decode("hex"),
+                    self.decode_id(pl.col("_id")),
                     pl.struct(
                         [
                             pl.col("link"),
                             pl.col("clicks"),
-                            pl.col("_link_id").str.decode("hex").alias("_id"),
+                            self.decode_id(pl.col("_link_id")).alias("_id"),
                         ]
                     ).alias("activity_map"),
                 ]
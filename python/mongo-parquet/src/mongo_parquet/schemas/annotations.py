@@ -11,6 +11,7 @@ from ..sampling import SamplingContext
 class Annotations(ParquetModel):
     collection: str = "annotations"
     parquet_filename: str = "annotations.parquet"
+    sort_by = ["event_date"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -32,11 +33,11 @@ class Annotations(ParquetModel):
 
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
-        return df.with_columns(pl.col("_id").bin.encode("hex")).sort("event_date")
+        return df.with_columns(self.encode_id(pl.col("_id"))).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
-        return df.with_columns(pl.col("_id").str.decode("hex"))
+        return df.with_columns(self.decode_id(pl.col("_id")))
 
     @override
     def get_sampling_filter(self, sampling_context: SamplingContext):
@@ -16,6 +16,7 @@ class Calldrivers(ParquetModel):
     parquet_filename: str = "calldrivers.parquet"
     filter = None
     projection = None
+    checksum_fields = ["calls"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -39,18 +40,18 @@ class Calldrivers(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-            pl.col("projects").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.encode_id(pl.element())),
+            pl.col("projects").list.eval(self.encode_id(pl.element())),
             pl.col("impact").round(4).cast(pl.Float32),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
-            pl.col("projects").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
+            pl.col("projects").list.eval(self.decode_id(pl.element())),
             pl.col("impact"),
         )
 
@@ -39,13 +39,13 @@ class CustomReportsRegistry(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
+            self.encode_id(pl.col("_id")),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
+            self.decode_id(pl.col("_id")),
         )
 
     @override
@@ -28,16 +28,16 @@ class GcTasksMappings(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.encode_id(pl.element())),
             pl.col("date_mapped").cast(pl.Datetime),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
             pl.col("date_mapped"),
         )
 
@@ -4,6 +4,7 @@ from pymongoarrow.api import Schema
 from bson import ObjectId
 from pyarrow import string, timestamp, list_, bool_
 from pymongoarrow.types import ObjectIdType
+from ..layout import DATE_URL_LAYOUT
 from .lib import AnyFrame, MongoCollection, ParquetModel
 from .utils import get_sample_date_range_filter
 from ..sampling import SamplingContext
@@ -14,6 +15,8 @@ from copy import deepcopy
 class GcTss(ParquetModel):
     collection: str = "gc_tasks"
     parquet_filename: str = "gc_tasks.parquet"
+    sort_by = ["date", "url"]
+    layout = DATE_URL_LAYOUT
     filter = None
     projection = None
     schema: Schema = Schema(
@@ -51,15 +54,15 @@ class GcTss(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-        ).sort("date", "url")
+            self.encode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.encode_id(pl.element())),
+        ).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
         )
 
     @override
@@ -4,6 +4,7 @@ from pymongoarrow.api import Schema
 from bson import ObjectId
 from pyarrow import string, timestamp, list_, float64, int32, struct
 from pymongoarrow.types import ObjectIdType
+from ..layout import DATE_URL_LAYOUT
 from .lib import AnyFrame, ParquetModel
 from .utils import get_sample_ids, get_sample_date_range_filter
 from ..sampling import SamplingContext
@@ -14,7 +15,10 @@ from copy import deepcopy
 class GSCSearchTerms(ParquetModel):
     collection: str = "pages_metrics"
     parquet_filename: str = "pages_metrics_gsc_searchterms.parquet"
+    sort_by = ["date", "url", "clicks"]
+    sort_descending = [False, False, True]
     partition_by = "month"
+    layout = DATE_URL_LAYOUT
     filter = {}
     schema: Schema = Schema(
         {
@@ -68,12 +72,12 @@ class GSCSearchTerms(ParquetModel):
             .with_columns(pl.col("gsc_searchterms").struct.unnest())
             .drop("gsc_searchterms")
             .with_columns(
-                pl.col("_doc_id").bin.encode("hex"),
-                pl.col("_id").bin.encode("hex"),
-                pl.col("page").bin.encode("hex"),
-                pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-                pl.col("projects").list.eval(pl.element().bin.encode("hex")),
-                pl.col("ux_tests").list.eval(pl.element().bin.encode("hex")),
+                self.encode_id(pl.col("_doc_id")),
+                self.encode_id(pl.col("_id")),
+                self.encode_id(pl.col("page")),
+                pl.col("tasks").list.eval(self.encode_id(pl.element())),
+                pl.col("projects").list.eval(self.encode_id(pl.element())),
+                pl.col("ux_tests").list.eval(self.encode_id(pl.element())),
                 pl.col("ctr").round(4).cast(pl.Float32),
                 pl.col("position").round(4).cast(pl.Float32),
             )
@@ -83,8 +87,7 @@ class GSCSearchTerms(ParquetModel):
                     "_id": "_term_id",
                 }
             )
-            .sort("clicks", descending=True)
-            .sort("date", "url")
+            .pipe(self.sort)
         )
 
     @override
@@ -92,7 +95,7 @@ class GSCSearchTerms(ParquetModel):
         return (
             df.select(
                 [
-                    pl.col("_id").str.decode("hex"),
+                    self.decode_id(pl.col("_id")),
                     pl.struct(
                         [
                             pl.col("term"),
@@ -100,7 +103,7 @@ class GSCSearchTerms(ParquetModel):
                             pl.col("ctr"),
                             pl.col("impressions"),
                             pl.col("position"),
-                            pl.col("_term_id").str.decode("hex").alias("_id"),
+                            self.decode_id(pl.col("_term_id")).alias("_id"),
                         ]
                     ).alias("gsc_searchterms"),
                 ]
@@ -1,8 +1,11 @@
 import abc
 import os
+from copy import copy
 from datetime import datetime
 import polars as pl
 import pyarrow
+import pyarrow.parquet as pq
+from polars.datatypes import DataTypeClass
 from pymongo.database import Database
 from pymongo.collection import Collection
 from pymongoarrow.api import Schema
@@ -10,18 +13,76 @@ from typing import (
     Any,
     Callable,
     Literal,
+    Self,
     TypeVar,
     overload,
 )
 from ..sampling import SamplingContext
-from ..utils import convert_objectids, get_partition_values
+from ..encoding import dataframe_to_documents, has_binary
+from ..layout import DEFAULT_LAYOUT, ParquetLayout
+from ..parquet_stats import file_min_max
+from ..remote_scan import (
+    hive_partition_values,
+    partition_values_from_paths,
+    prune_partitions,
+)
+from ..utils import get_partition_values, list_parquet_files
 
 
 type PartitionBy = Literal["month"] | Literal["year"]
 
+type ObjectIdFormat = Literal["hex"] | Literal["binary"]
+"""How ObjectIds are stored: as 24-char hex strings, or as their 12 raw bytes"""
+
 AnyFrame = TypeVar("AnyFrame", pl.DataFrame, pl.LazyFrame)
 
 
+def binary_to_hex(expr: pl.Expr, dtype: pl.DataType | DataTypeClass) -> pl.Expr:
+    """
+    Convert the Binary values of an expression (including nested ones) to hex strings.
+    """
+    dtype = dtype() if isinstance(dtype, type) else dtype
+
+    if isinstance(dtype, pl.Binary):
+        return expr.bin.encode("hex")
+
+    if isinstance(dtype, pl.List) and has_binary(dtype.inner):
+        return expr.list.eval(binary_to_hex(pl.element(), dtype.inner))
+
+    if isinstance(dtype, pl.Struct) and has_binary(dtype):
+        return expr.struct.with_fields(
+            [
+                binary_to_hex(pl.field(field.name), field.dtype)
+                for field in dtype.fields
+                if has_binary(field.dtype)
+            ]
+        )
+
+    return expr
+
+
+def id_format_of(schema: pl.Schema) -> ObjectIdFormat:
+    """
+    Detect the ObjectId format of stored data from its schema.
+    """
+    return "binary" if any(has_binary(dtype) for dtype in schema.dtypes()) else "hex"
+
+
+def ids_to_hex(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Convert binary ObjectIds to hex strings, so that data stored in either format can be read the same way.
+    """
+    schema = lf.collect_schema()
+    columns = [name for name, dtype in schema.items() if has_binary(dtype)]
+
+    if not columns:
+        return lf
+
+    return lf.with_columns(
+        [binary_to_hex(pl.col(name), schema[name]) for name in columns]
+    )
+
+
 class ParquetModel(abc.ABC):
     collection: str
     schema: Schema
@@ -37,11 +98,53 @@ class ParquetModel(abc.ABC):
     end: datetime | None = None
     pipeline: list[dict[str, Any]] | None = None
     partition_by: PartitionBy | None = None
+    id_format: ObjectIdFormat = "hex"
+    """The format ObjectIds are written in. Reading with `lf()` supports both formats."""
+    layout: ParquetLayout = DEFAULT_LAYOUT
+    """How the Parquet files are written: sort order, row group sizes and indexes."""
+    checksum_fields: list[str] = []
+    """Numeric fields whose monthly sums are compared with MongoDB, along with the row counts, to detect drift"""
+    sort_by: list[str] = []
+    """The columns `transform` sorts the rows by. The batches of files exported in several batches are merged by them once written"""
+    sort_descending: bool | list[bool] = False
 
     def __init__(self, dir_path: str | None = None):
         if dir_path:
             self.dir_path = dir_path
 
+    def sort(self, df: AnyFrame) -> AnyFrame:
+        """
+        Sort the rows by `sort_by`, keeping the existing order of equal rows, so that sorting
+        batches that were already sorted gives the same result as sorting all the rows at once.
+        """
+        if not self.sort_by:
+            return df
+
+        return df.sort(
+            self.sort_by, descending=self.sort_descending, maintain_order=True
+        )
+
+    def with_id_format(self, id_format: ObjectIdFormat) -> Self:
+        """
+        Returns a copy of the model that reads and writes ObjectIds in another format,
+        e.g. to read files stored in a format other than the configured one.
+        """
+        model = copy(self)
+        model.id_format = id_format
+        return model
+
+    def encode_id(self, expr: pl.Expr) -> pl.Expr:
+        """
+        Convert ObjectIds (12-byte binary) to the storage format.
+        """
+        return expr.bin.encode("hex") if self.id_format == "hex" else expr
+
+    def decode_id(self, expr: pl.Expr) -> pl.Expr:
+        """
+        Convert ObjectIds from the storage format back to 12-byte binary.
+        """
+        return expr.str.decode("hex") if self.id_format == "hex" else expr
+
     @overload
     def transform(self, df: pl.DataFrame) -> pl.DataFrame: ...
 
@@ -72,25 +175,75 @@ class ParquetModel(abc.ABC):
         """
         return self.filter
 
-    def lf(self, dir_path: str | None = None) -> pl.LazyFrame:
+    def lf(
+        self,
+        dir_path: str | None = None,
+        hex_ids: bool = True,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> pl.LazyFrame:
         """
         Returns a LazyFrame for the Parquet file(s), with hive partitioning if applicable.
+
+        When a date window is given, only the partitions that can overlap it are listed,
+        and the `date` filter skips the row groups whose footer statistics are outside of it.
+
+        :param dir_path: The directory of the Parquet file(s), if not the model's.
+        :param hex_ids: Whether to convert ObjectIds stored as binary to hex strings,
+                        so that the data is the same regardless of the storage format.
+        :param start: Only include rows on or after this date.
+        :param end: Only include rows on or before this date.
         """
         read_path = os.path.join(dir_path or self.dir_path, self.parquet_filename)
-        is_dir = os.path.isdir(read_path)
+        hive_partitioning = self.partition_by is not None and os.path.isdir(read_path)
+        source: str | list[str] = read_path
+
+        if hive_partitioning and (start is not None or end is not None):
+            files = list_parquet_files(read_path)
+            # if every partition is pruned, keep one for the schema: the date filter excludes its rows
+            source = (
+                prune_partitions(files, read_path, start, end)
+                or files[-1:]
+                or read_path
+            )
 
-        return pl.scan_parquet(
-            read_path, hive_partitioning=self.partition_by is not None and is_dir
-        )
+        lf = pl.scan_parquet(source, hive_partitioning=hive_partitioning)
+
+        if start is not None:
+            lf = lf.filter(pl.col("date") >= start)
+
+        if end is not None:
+            lf = lf.filter(pl.col("date") <= end)
+
+        return ids_to_hex(lf) if hex_ids else lf
+
+    def stored_id_format(self) -> ObjectIdFormat | None:
+        """
+        Returns the ObjectId format of the existing Parquet file(s), or None if there are none.
+        """
+        read_path = os.path.join(self.dir_path, self.parquet_filename)
+
+        if not os.path.exists(read_path):
+            return None
+
+        return id_format_of(self.lf(hex_ids=False).collect_schema())
 
     def get_partition_values(self) -> list[dict[str, int]] | None:
         """
         Returns a dictionary of partition values if the model is partitioned.
+        They are derived from the directory listing, without reading any of the files.
         """
         if self.partition_by is None:
             return None
 
-        return get_partition_values(self.lf(), self.partition_by)
+        read_path = os.path.join(self.dir_path, self.parquet_filename)
+
+        if not os.path.isdir(read_path):
+            return get_partition_values(self.lf(), self.partition_by)
+
+        return partition_values_from_paths(
+            list_parquet_files(read_path), read_path, self.partition_by
+        )
 
     def iter_partitions(self, callback: Callable[[pl.LazyFrame], None]):
         partition_values = self.get_partition_values()
@@ -115,7 +268,48 @@ class ParquetModel(abc.ABC):
     def latest_date(self) -> datetime | None:
         """
         Returns the latest date found in the parquet file(s).
+
+        It is read from the footer statistics of the newest non-empty partition, so it takes
+        the same time however many partitions there are. The data is only read if the
+        statistics are missing.
         """
+        read_path = os.path.join(self.dir_path, self.parquet_filename)
+        files_by_partition: dict[tuple[int, int], list[str]] = {}
+
+        if self.partition_by is not None and os.path.isdir(read_path):
+            for file in list_parquet_files(read_path):
+                partition = hive_partition_values(os.path.relpath(file, read_path))
+                key = (partition.get("year", 0), partition.get("month", 0))
+                files_by_partition.setdefault(key, []).append(file)
+        elif os.path.isfile(read_path):
+            files_by_partition[(0, 0)] = [read_path]
+
+        for key in sorted(files_by_partition, reverse=True):
+            maxes: list[datetime] = []
+
+            for file in files_by_partition[key]:
+                metadata = pq.read_metadata(file)
+
+                if metadata.num_rows == 0:
+                    continue
+
+                _, date_max = file_min_max(metadata, "date")
+
+                if date_max is None:
+                    # no statistics, fall back to reading the data
+                    return (
+                        self.lf().select(pl.col("date").max()).collect()["date"].item()
+                    )
+
+                maxes.append(
+                    date_max
+                    if isinstance(date_max, datetime)
+                    else datetime(date_max.year, date_max.month, date_max.day)
+                )
+
+            if maxes:
+                return max(maxes)
+
         return self.lf().select(pl.col("date").max()).collect()["date"].item()
 
 
@@ -126,6 +320,11 @@ class MongoCollection(abc.ABC):
     sync_type: Literal["simple", "incremental"]
     primary_model: ParquetModel
     secondary_models: list[ParquetModel] = []
+    change_field: str | None = None
+    """A date field updated whenever a document changes. Simple syncs of collections with one only read the documents
+    changed since the last sync and merge them into the existing Parquet file, instead of exporting the collection again"""
+    single_pass: bool = False
+    """Derive all parquet models from a single read of the collection, instead of one read per model"""
     objectid_fields: list[str] = [
         "_id",
         "task",
@@ -153,11 +352,16 @@ class MongoCollection(abc.ABC):
         "calldriversEnquiry": [],
         "callsByTopic": [],
     }
+    key_value_fields: list[str] = []
+    """Fields stored as arrays of {k, v} structs, which are converted back to objects on insert"""
 
     def __init__(self, db: Database[Any], parquet_dir_path: str | None = None):
         self.client = db[self.collection]
         if parquet_dir_path:
             self.parquet_dir_path = parquet_dir_path
+        # the models are declared on the class, so they're copied before they're configured
+        self.primary_model = copy(self.primary_model)
+        self.secondary_models = [copy(model) for model in self.secondary_models]
         self.primary_model.dir_path = self.parquet_dir_path
         for model in self.secondary_models:
             model.dir_path = self.parquet_dir_path
@@ -202,43 +406,82 @@ class MongoCollection(abc.ABC):
 
         return Schema.from_arrow(combined)
 
-    def prepare_for_insert(
-        self, df: pl.DataFrame, sort_id: bool = True
-    ) -> list[dict[str, Any]]:
+    def parquet_models(self) -> list[ParquetModel]:
         """
-        Prepares the data for insertion into MongoDB.
-        This method should be overridden by models that require specific transformations.
+        Returns the primary model followed by the secondary models.
+        """
+        return [self.primary_model, *self.secondary_models]
+
+    def extraction_schema(self) -> Schema:
         """
-        records: list[dict[str, Any]] = []
+        Returns the union of the full schemas of all parquet models, used to read
+        the collection once for all models when `single_pass` is enabled.
+        """
+        return Schema.from_arrow(
+            pyarrow.unify_schemas(
+                [model.schema.to_arrow() for model in self.parquet_models()]
+            )
+        )
 
-        col_names = self.combined_schema().to_arrow().names
+    def split_extraction(
+        self,
+        df: pl.DataFrame,
+        predicates: dict[str, pl.Expr] | None = None,
+    ) -> dict[str, pl.DataFrame]:
+        """
+        Derives every parquet model from a single extraction of the collection.
 
-        rows = df.sort("_id").to_dicts() if sort_id else df.to_dicts()
+        Only `{"field": {"$exists": True}}` model filters can be applied client-side,
+        any other filter means the model can't be extracted in a single pass.
+        They're applied as `is_not_null()`, since the extraction can't tell a missing field from an explicit null:
+        unlike `$exists`, documents where the field is null are excluded. This only gives the same rows as reading
+        each model on its own because the transforms of these models drop the rows where the field is null.
 
-        for row in rows:
-            record: dict[str, Any] = {}
-            for k, v in row.items():
-                if v is None and k not in self.default_values:
-                    continue
-                elif v is None and k in self.default_values:
-                    record[k] = self.default_values[k]
+        :param df: The untransformed data read using `extraction_schema()`.
+        :param predicates: Optional additional row filters, keyed by parquet filename.
+        :return: The transformed data for each model, keyed by parquet filename.
+        """
+        results: dict[str, pl.DataFrame] = {}
 
-                if k in self.objectid_fields:
-                    record[k] = convert_objectids(v)
-                else:
-                    record[k] = v
+        for model in self.parquet_models():
+            filters: list[pl.Expr] = []
 
-            for col in col_names:
-                if (
-                    col not in record or record[col] is None
-                ) and col in self.default_values:
-                    record[col] = self.default_values[col]
+            for field, condition in (model.filter or {}).items():
+                if condition != {"$exists": True}:
+                    raise ValueError(
+                        f"Filter on `{field}` for {model.parquet_filename} is not supported for single-pass extraction."
+                    )
+                filters.append(pl.col(field).is_not_null())
 
-            records.append(record)
+            if predicates and model.parquet_filename in predicates:
+                filters.append(predicates[model.parquet_filename])
 
-        del rows
+            model_df = df.select(model.schema.to_arrow().names)
 
-        return records
+            if filters:
+                model_df = model_df.filter(*filters)
+
+            results[model.parquet_filename] = model.transform(model_df)
+
+        return results
+
+    def prepare_for_insert(
+        self, df: pl.DataFrame, sort_id: bool = True
+    ) -> list[dict[str, Any]]:
+        """
+        Prepares the data for insertion into MongoDB.
+        The conversion is done column by column, see `dataframe_to_documents`.
+        """
+        if sort_id:
+            df = df.sort("_id")
+
+        return dataframe_to_documents(
+            df,
+            objectid_fields=self.objectid_fields,
+            default_values=self.default_values,
+            key_value_fields=self.key_value_fields,
+            columns=self.combined_schema().to_arrow().names,
+        )
 
     def sync_refs(self):
         """
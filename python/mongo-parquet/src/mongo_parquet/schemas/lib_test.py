@@ -0,0 +1,217 @@
+"""Tests for the ObjectId storage formats of the Parquet models."""
+
+import os
+from datetime import datetime
+from typing import Any
+import polars as pl
+from bson import ObjectId, encode
+from pymongo import MongoClient
+from pymongoarrow.api import Schema
+from polars.testing import assert_frame_equal
+from ..mongo import iter_polars_batches
+from .lib import ObjectIdFormat, id_format_of
+from .aa_searchterms import AASearchTerms
+from .overall_metrics import OverallMetricsModel
+from .projects import Projects
+
+
+def raw_projects() -> pl.DataFrame:
+    ids = [ObjectId().binary for _ in range(4)]
+
+    return pl.DataFrame(
+        {
+            "_id": [ids[0]],
+            "title": ["Project"],
+            "ux_tests": [[ids[1]]],
+            "pages": [[ids[2], ids[3]]],
+            "tasks": [[]],
+            "attachments": [
+                [
+                    {
+                        "id": "a",
+                        "url": None,
+                        "filename": "a.pdf",
+                        "type": None,
+                        "size": 1,
+                        "storage_url": None,
+                        "_id": ids[1],
+                    }
+                ]
+            ],
+        },
+        schema_overrides={"tasks": pl.List(pl.Binary)},
+    )
+
+
+raw_projects_df = raw_projects()
+
+
+def write(model: Projects, id_format: ObjectIdFormat):
+    os.makedirs(model.dir_path, exist_ok=True)
+    model.id_format = id_format
+    model.transform(raw_projects_df).write_parquet(
+        os.path.join(model.dir_path, model.parquet_filename)
+    )
+
+
+def test_binary_ids_read_as_hex(tmp_path):
+    hex_model = Projects(str(tmp_path / "hex"))
+    binary_model = Projects(str(tmp_path / "binary"))
+
+    write(hex_model, "hex")
+    write(binary_model, "binary")
+
+    assert hex_model.stored_id_format() == "hex"
+    assert binary_model.stored_id_format() == "binary"
+    assert id_format_of(binary_model.lf().collect_schema()) == "hex"
+
+    assert_frame_equal(binary_model.lf().collect(), hex_model.lf().collect())
+
+
+def test_binary_ids_round_trip(tmp_path):
+    model = Projects(str(tmp_path))
+    write(model, "binary")
+
+    stored = model.lf(hex_ids=False).collect()
+
+    assert_frame_equal(
+        model.reverse_transform(stored).select(raw_projects_df.columns),
+        raw_projects_df,
+        check_dtypes=False,
+    )
+
+
+def test_id_format_is_configured_per_collection_model():
+    db = MongoClient(connect=False)["test"]
+    model = OverallMetricsModel(db)
+    other = OverallMetricsModel(db)
+
+    model.primary_model.id_format = "binary"
+    reader = other.primary_model.with_id_format("binary")
+
+    assert reader.id_format == "binary"
+    assert other.primary_model.id_format == "hex"
+    assert all(
+        parquet_model.id_format == "hex" for parquet_model in other.parquet_models()
+    )
+
+
+def test_lf_date_window_prunes_partitions(tmp_path):
+    model = AASearchTerms(str(tmp_path))
+
+    for year, month in ((2023, 12), (2024, 1), (2024, 2)):
+        path = os.path.join(
+            model.dir_path, model.parquet_filename, f"year={year}", f"month={month}"
+        )
+        os.makedirs(path)
+        pl.DataFrame(
+            {"date": [datetime(year, month, day) for day in range(1, 11)]}
+        ).write_parquet(os.path.join(path, "0.parquet"))
+
+    window = model.lf(start=datetime(2024, 1, 3), end=datetime(2024, 1, 5)).collect()
+
+    assert window["date"].to_list() == [datetime(2024, 1, day) for day in (3, 4, 5)]
+    assert window["month"].unique().to_list() == [1]
+    assert model.lf(start=datetime(2030, 1, 1)).collect().is_empty()
+    assert model.lf(end=datetime(2023, 12, 31)).collect().height == 10
+
+
+def test_latest_date_and_partition_values_from_metadata(tmp_path):
+    model = AASearchTerms(str(tmp_path))
+
+    for year, month, days in (
+        (2023, 12, 31),
+        (2024, 2, 10),
+        (2024, 10, 5),
+        (2024, 11, 0),
+    ):
+        path = os.path.join(
+            model.dir_path, model.parquet_filename, f"year={year}", f"month={month}"
+        )
+        os.makedirs(path)
+        pl.DataFrame(
+            {"date": [datetime(year, month, day) for day in range(1, days + 1)]},
+            schema={"date": pl.Datetime("ms")},
+        ).write_parquet(os.path.join(path, "0.parquet"))
+
+    assert model.get_partition_values() == [
+        {"year": 2023, "month": 12},
+        {"year": 2024, "month": 2},
+        {"year": 2024, "month": 10},
+        {"year": 2024, "month": 11},
+    ]
+    # the newest partition is empty, and month=10 sorts before month=2 as a string
+    assert model.latest_date() == datetime(2024, 10, 5)
+    assert (
+        model.latest_date()
+        == model.lf().select(pl.col("date").max()).collect()["date"].item()
+    )
+
+
+def decode(docs: list[dict[str, Any]], schema: Schema) -> pl.DataFrame:
+    """Decode documents the way they're read from MongoDB."""
+    collection = MongoClient(connect=False)["test"]["overall_metrics"]
+
+    return pl.concat(
+        iter_polars_batches(collection, [b"".join(encode(doc) for doc in docs)], schema)
+    )
+
+
+def test_split_extraction_matches_per_model_reads():
+    model = OverallMetricsModel(MongoClient(connect=False)["test"])
+
+    def terms(count: int) -> list[dict[str, Any]]:
+        return [
+            {
+                "term": f"term {i}",
+                "clicks": i,
+                "position": 1.23456,
+                "num_searches": i * 2,
+                "_id": ObjectId(),
+            }
+            for i in range(count)
+        ]
+
+    docs: list[dict[str, Any]] = [
+        {"_id": ObjectId(), "date": datetime(2024, 1, 2), "visits": 1},
+        {
+            "_id": ObjectId(),
+            "date": datetime(2024, 1, 1),
+            "visits": 2,
+            "aa_searchterms_en": terms(3),
+            "gsc_searchterms": [],
+        },
+        {
+            "_id": ObjectId(),
+            "date": datetime(2024, 1, 3),
+            "visits": 3,
+            "aa_searchterms_en": None,
+            "aa_searchterms_fr": terms(2),
+        },
+        # matched by `$exists`, but not by the `is_not_null()` of the extraction
+        {
+            "_id": ObjectId(),
+            "date": datetime(2024, 1, 4),
+            "visits": 4,
+            "aa_searchterms_en": None,
+            "aa_searchterms_fr": None,
+            "gsc_searchterms": None,
+        },
+    ]
+
+    extracted = model.split_extraction(decode(docs, model.extraction_schema()))
+
+    assert [len(df) for df in extracted.values()] == [4, 3, 2, 0]
+
+    for parquet_model in model.parquet_models():
+        # the model's filter, applied by MongoDB when each model is read on its own
+        matching = [
+            doc
+            for doc in docs
+            if all(field in doc for field in (parquet_model.filter or {}))
+        ]
+
+        assert_frame_equal(
+            extracted[parquet_model.parquet_filename],
+            parquet_model.transform(decode(matching, parquet_model.schema)),
+        )
@@ -14,6 +14,8 @@ from copy import deepcopy
 class OverallAASearchTermsEn(ParquetModel):
     collection: str = "overall_metrics"
     parquet_filename: str = "overall_metrics_aa_searchterms_en.parquet"
+    sort_by = ["date", "clicks"]
+    sort_descending = [False, True]
     filter = {"aa_searchterms_en": {"$exists": True}}
     schema: Schema = Schema(
         {
@@ -60,8 +62,8 @@ class OverallAASearchTermsEn(ParquetModel):
             .with_columns(pl.col("aa_searchterms_en").struct.unnest())
             .drop("aa_searchterms_en")
             .with_columns(
-                pl.col("_doc_id").bin.encode("hex"),
-                pl.col("_id").bin.encode("hex"),
+                self.encode_id(pl.col("_doc_id")),
+                self.encode_id(pl.col("_id")),
                 pl.col("position").round(4).cast(pl.Float32),
             )
             .rename(
@@ -70,8 +72,7 @@ class OverallAASearchTermsEn(ParquetModel):
                     "_id": "_term_id",
                 }
             )
-            .sort("clicks", descending=True)
-            .sort("date")
+            .pipe(self.sort)
         )
 
     @override
@@ -79,14 +80,14 @@ class OverallAASearchTermsEn(ParquetModel):
         return (
             df.select(
                 [
-                    pl.col("_id").str.decode("hex"),
+                    self.decode_id(pl.col("_id")),
                     pl.struct(
                         [
                             pl.col("term"),
                             pl.col("clicks"),
                             pl.col("num_searches"),
                             pl.col("position"),
-                            pl.col("_term_id").str.decode("hex").alias("_id"),
+                            self.decode_id(pl.col("_term_id")).alias("_id"),
                         ]
                     ).alias("aa_searchterms_en"),
                 ]
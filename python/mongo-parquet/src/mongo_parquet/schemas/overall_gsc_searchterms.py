@@ -15,6 +15,8 @@ from copy import deepcopy
 class OverallGSCSearchTerms(ParquetModel):
     collection: str = "overall_metrics"
     parquet_filename: str = "overall_metrics_gsc_searchterms.parquet"
+    sort_by = ["date", "clicks"]
+    sort_descending = [False, True]
     filter = {"gsc_searchterms": {"$exists": True}}
     schema: Schema = Schema(
         {
@@ -63,8 +65,8 @@ class OverallGSCSearchTerms(ParquetModel):
             .with_columns(pl.col("gsc_searchterms").struct.unnest())
             .drop("gsc_searchterms")
             .with_columns(
-                pl.col("_doc_id").bin.encode("hex"),
-                pl.col("_id").bin.encode("hex"),
+                self.encode_id(pl.col("_doc_id")),
+                self.encode_id(pl.col("_id")),
                 pl.col("ctr").round(4).cast(pl.Float32),
                 pl.col("position").round(4).cast(pl.Float32),
             )
@@ -74,8 +76,7 @@ class OverallGSCSearchTerms(ParquetModel):
                     "_id": "_term_id",
                 }
             )
-            .sort("clicks", descending=True)
-            .sort("date")
+            .pipe(self.sort)
         )
 
     @override
@@ -83,7 +84,7 @@ class OverallGSCSearchTerms(ParquetModel):
         return (
             df.select(
                 [
-                    pl.col("_id").str.decode("hex"),
+                    self.decode_id(pl.col("_id")),
                     pl.struct(
                         [
                             pl.col("term"),
@@ -91,7 +92,7 @@ class OverallGSCSearchTerms(ParquetModel):
                             pl.col("ctr"),
                             pl.col("impressions"),
                             pl.col("position"),
-                            pl.col("_term_id").str.decode("hex").alias("_id"),
+                            self.decode_id(pl.col("_term_id")).alias("_id"),
                         ]
                     ).alias("gsc_searchterms"),
                 ]
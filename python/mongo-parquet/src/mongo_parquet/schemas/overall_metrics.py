@@ -16,6 +16,8 @@ from copy import deepcopy
 class OverallMetrics(ParquetModel):
     collection: str = "overall_metrics"
     parquet_filename: str = "overall_metrics.parquet"
+    sort_by = ["date"]
+    checksum_fields = ["visits", "views", "dyf_yes", "dyf_no", "gsc_total_clicks"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -62,15 +64,15 @@ class OverallMetrics(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
+            self.encode_id(pl.col("_id")),
             pl.col("average_time_spent").round(4).cast(pl.Float32),
             pl.col("bouncerate").round(4).cast(pl.Float32),
-        ).sort("date")
+        ).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
+            self.decode_id(pl.col("_id")),
         )
 
     @override
@@ -88,6 +90,7 @@ class OverallMetrics(ParquetModel):
 class OverallMetricsModel(MongoCollection):
     collection = "overall_metrics"
     sync_type: Literal["simple", "incremental"] = "incremental"
+    single_pass = True
     primary_model = OverallMetrics()
     secondary_models = [
         OverallAASearchTermsEn(),
@@ -4,6 +4,7 @@ from pymongoarrow.api import Schema
 from bson import ObjectId
 from pyarrow import int64, string, timestamp, list_, float64, int32
 from pymongoarrow.types import ObjectIdType
+from ..layout import DATE_URL_LAYOUT
 from .lib import AnyFrame, MongoCollection, ParquetModel
 from .aa_searchterms import AASearchTerms
 from .activity_map import ActivityMap
@@ -17,7 +18,10 @@ from copy import deepcopy
 class PageMetrics(ParquetModel):
     collection: str = "pages_metrics"
     parquet_filename: str = "pages_metrics.parquet"
+    sort_by = ["date", "url"]
     partition_by = "month"
+    layout = DATE_URL_LAYOUT
+    checksum_fields = ["visits", "views", "dyf_yes", "dyf_no", "gsc_total_clicks"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -70,25 +74,25 @@ class PageMetrics(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("page").bin.encode("hex"),
-            pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-            pl.col("projects").list.eval(pl.element().bin.encode("hex")),
-            pl.col("ux_tests").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            self.encode_id(pl.col("page")),
+            pl.col("tasks").list.eval(self.encode_id(pl.element())),
+            pl.col("projects").list.eval(self.encode_id(pl.element())),
+            pl.col("ux_tests").list.eval(self.encode_id(pl.element())),
             pl.col("average_time_spent").round(4).cast(pl.Float32),
             pl.col("bouncerate").round(4).cast(pl.Float32),
             pl.col("gsc_total_ctr").round(4).cast(pl.Float32),
             pl.col("gsc_total_position").round(4).cast(pl.Float32),
-        ).sort("date", "url")
+        ).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("page").str.decode("hex"),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
-            pl.col("projects").list.eval(pl.element().str.decode("hex")),
-            pl.col("ux_tests").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            self.decode_id(pl.col("page")),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
+            pl.col("projects").list.eval(self.decode_id(pl.element())),
+            pl.col("ux_tests").list.eval(self.decode_id(pl.element())),
         )
 
     @override
@@ -108,6 +112,7 @@ class PageMetrics(ParquetModel):
 class PagesMetricsModel(MongoCollection):
     collection = "pages_metrics"
     sync_type: Literal["simple", "incremental"] = "incremental"
+    single_pass = True
     primary_model = PageMetrics()
     secondary_models = [
         AASearchTerms(),
@@ -1,5 +1,5 @@
 from copy import deepcopy
-from typing import Any, Literal, final, override
+from typing import Literal, final, override
 import polars as pl
 from pymongoarrow.api import Schema
 from pyarrow import bool_, string, struct, timestamp, list_
@@ -7,7 +7,6 @@ from pymongoarrow.types import ObjectIdType
 from .lib import AnyFrame, MongoCollection, ParquetModel
 from ..sampling import SamplingContext
 from .utils import get_sample_ids
-from ..utils import array_to_object, convert_objectids
 
 
 @final
@@ -74,19 +73,19 @@ class Pages(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
-            pl.col("projects").list.eval(pl.element().bin.encode("hex")),
-            pl.col("ux_tests").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.encode_id(pl.element())),
+            pl.col("projects").list.eval(self.encode_id(pl.element())),
+            pl.col("ux_tests").list.eval(self.encode_id(pl.element())),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
-            pl.col("projects").list.eval(pl.element().str.decode("hex")),
-            pl.col("ux_tests").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
+            pl.col("projects").list.eval(self.decode_id(pl.element())),
+            pl.col("ux_tests").list.eval(self.decode_id(pl.element())),
         )
 
     @override
@@ -104,35 +103,6 @@ class Pages(ParquetModel):
 class PagesModel(MongoCollection):
     collection = "pages"
     sync_type: Literal["simple", "incremental"] = "simple"
+    change_field = "lastModified"
     primary_model = Pages()
-
-    @override
-    def prepare_for_insert(self, df: pl.DataFrame, sort_id: bool = True):
-        records: list[dict[str, Any]] = []
-
-        col_names = self.combined_schema().to_arrow().names
-
-        for row in df.sort("_id").to_dicts():
-            record: dict[str, Any] = {}
-            for k, v in row.items():
-                if k == "metadata":
-                    v = array_to_object(v)
-                    record[k] = v
-                    continue
-                if v is None and k not in self.default_values:
-                    continue
-                elif v is None and k in self.default_values:
-                    record[k] = self.default_values[k]
-
-                if k in self.objectid_fields:
-                    record[k] = convert_objectids(v)
-                else:
-                    record[k] = v
-
-            for col in col_names:
-                if col not in record and col in self.default_values:
-                    record[col] = self.default_values[col]
-
-            records.append(record)
-
-        return records
+    key_value_fields = ["metadata"]
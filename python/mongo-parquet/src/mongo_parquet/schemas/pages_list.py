@@ -32,7 +32,7 @@ class PagesList(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
+            self.encode_id(pl.col("_id")),
             pl.col("updatedAt").cast(pl.Datetime),
             pl.col("createdAt").cast(pl.Datetime),
             pl.col("lang").fill_null("").str.strip_chars(),  # normalize empty/null lang
@@ -41,7 +41,7 @@ class PagesList(ParquetModel):
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
+            self.decode_id(pl.col("_id")),
         )
 
     @override
@@ -53,4 +53,5 @@ class PagesList(ParquetModel):
 class PagesListModel(MongoCollection):
     collection = "pages_list"
     sync_type: Literal["simple", "incremental"] = "simple"
+    change_field = "updatedAt"
     primary_model = PagesList()
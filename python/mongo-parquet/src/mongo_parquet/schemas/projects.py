@@ -43,16 +43,16 @@ class Projects(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
+            self.encode_id(pl.col("_id")),
             pl.col("ux_tests")
             .cast(pl.List(pl.Binary))
-            .list.eval(pl.element().bin.encode("hex")),
+            .list.eval(self.encode_id(pl.element())),
             pl.col("pages")
             .cast(pl.List(pl.Binary))
-            .list.eval(pl.element().bin.encode("hex")),
+            .list.eval(self.encode_id(pl.element())),
             pl.col("tasks")
             .cast(pl.List(pl.Binary))
-            .list.eval(pl.element().bin.encode("hex")),
+            .list.eval(self.encode_id(pl.element())),
             pl.col("attachments").list.eval(
                 pl.struct(
                     [
@@ -62,7 +62,7 @@ class Projects(ParquetModel):
                         pl.element().struct.field("type").cast(pl.String),
                         pl.element().struct.field("size").cast(pl.Int32),
                         pl.element().struct.field("storage_url").cast(pl.String),
-                        pl.element().struct.field("_id").bin.encode("hex"),
+                        self.encode_id(pl.element().struct.field("_id")),
                     ]
                 )
             ),
@@ -71,10 +71,10 @@ class Projects(ParquetModel):
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("ux_tests").list.eval(pl.element().str.decode("hex")),
-            pl.col("pages").list.eval(pl.element().str.decode("hex")),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            pl.col("ux_tests").list.eval(self.decode_id(pl.element())),
+            pl.col("pages").list.eval(self.decode_id(pl.element())),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
             pl.col("attachments").list.eval(
                 pl.struct(
                     [
@@ -84,7 +84,7 @@ class Projects(ParquetModel):
                         pl.element().struct.field("type"),
                         pl.element().struct.field("size"),
                         pl.element().struct.field("storage_url"),
-                        pl.element().struct.field("_id").str.decode("hex"),
+                        self.decode_id(pl.element().struct.field("_id")),
                     ]
                 )
             ),
@@ -13,6 +13,7 @@ from .utils import get_sample_ids, get_sample_date_range_filter
 class Readability(ParquetModel):
     collection: str = "readability"
     parquet_filename: str = "readability.parquet"
+    sort_by = ["_id"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -48,15 +49,15 @@ class Readability(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("page").bin.encode("hex"),
-        ).sort("_id")
+            self.encode_id(pl.col("_id")),
+            self.encode_id(pl.col("page")),
+        ).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("page").str.decode("hex"),
+            self.decode_id(pl.col("_id")),
+            self.decode_id(pl.col("page")),
         )
 
     @override
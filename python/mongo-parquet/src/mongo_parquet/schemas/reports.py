@@ -12,6 +12,7 @@ from ..sampling import SamplingContext
 class Reports(ParquetModel):
     collection: str = "reports"
     parquet_filename: str = "reports.parquet"
+    sort_by = ["date"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -58,15 +59,15 @@ class Reports(ParquetModel):
                 pl.element().struct.field("filename").cast(pl.String),
                 pl.element().struct.field("size").cast(pl.Int32),
                 pl.element().struct.field("storage_url").cast(pl.String),
-                pl.element().struct.field("_id").bin.encode("hex"),
+                self.encode_id(pl.element().struct.field("_id")),
             ]
         )
 
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
+            self.encode_id(pl.col("_id")),
             pl.col("en_attachment").list.eval(attachment_field),
             pl.col("fr_attachment").list.eval(attachment_field),
-        ).sort("date")
+        ).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
@@ -77,12 +78,12 @@ class Reports(ParquetModel):
                 pl.element().struct.field("filename"),
                 pl.element().struct.field("size"),
                 pl.element().struct.field("storage_url"),
-                pl.element().struct.field("_id").str.decode("hex"),
+                self.decode_id(pl.element().struct.field("_id")),
             ]
         )
 
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
+            self.decode_id(pl.col("_id")),
             pl.col("en_attachment").list.eval(attachment_field),
             pl.col("fr_attachment").list.eval(attachment_field),
         )
@@ -96,4 +97,5 @@ class Reports(ParquetModel):
 class ReportsModel(MongoCollection):
     collection = "reports"
     sync_type: Literal["simple", "incremental"] = "simple"
+    change_field = "updatedAt"
     primary_model = Reports()
@@ -11,6 +11,7 @@ from ..sampling import SamplingContext
 class SearchAssessment(ParquetModel):
     collection: str = "search_assessment"
     parquet_filename: str = "search_assessment.parquet"
+    sort_by = ["_id"]
     schema: Schema = Schema(
         {
             "_id": ObjectId,
@@ -28,11 +29,11 @@ class SearchAssessment(ParquetModel):
 
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
-        return df.with_columns(pl.col("_id").bin.encode("hex")).sort("_id")
+        return df.with_columns(self.encode_id(pl.col("_id"))).pipe(self.sort)
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
-        return df.with_columns(pl.col("_id").str.decode("hex"))
+        return df.with_columns(self.decode_id(pl.col("_id")))
 
     @override
     def get_sampling_filter(self, sampling_context: SamplingContext):
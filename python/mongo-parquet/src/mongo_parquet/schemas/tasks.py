@@ -57,19 +57,19 @@ class Tasks(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("ux_tests").list.eval(pl.element().bin.encode("hex")),
-            pl.col("projects").list.eval(pl.element().bin.encode("hex")),
-            pl.col("pages").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            pl.col("ux_tests").list.eval(self.encode_id(pl.element())),
+            pl.col("projects").list.eval(self.encode_id(pl.element())),
+            pl.col("pages").list.eval(self.encode_id(pl.element())),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("ux_tests").list.eval(pl.element().str.decode("hex")),
-            pl.col("projects").list.eval(pl.element().str.decode("hex")),
-            pl.col("pages").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            pl.col("ux_tests").list.eval(self.decode_id(pl.element())),
+            pl.col("projects").list.eval(self.decode_id(pl.element())),
+            pl.col("pages").list.eval(self.decode_id(pl.element())),
         )
 
     @override
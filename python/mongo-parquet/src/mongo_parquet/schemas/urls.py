@@ -1,11 +1,10 @@
-from typing import Any, Literal, final, override
+from typing import Literal, final, override
 import polars as pl
 from pymongoarrow.api import Schema
 from bson import ObjectId
 from pyarrow import bool_, string, timestamp, list_, struct
 from .lib import AnyFrame, MongoCollection, ParquetModel
 from ..sampling import SamplingContext
-from ..utils import array_to_object, convert_objectids
 
 
 @final
@@ -85,15 +84,15 @@ class Urls(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("page").bin.encode("hex"),
+            self.encode_id(pl.col("_id")),
+            self.encode_id(pl.col("page")),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("page").str.decode("hex"),
+            self.decode_id(pl.col("_id")),
+            self.decode_id(pl.col("page")),
         )
 
     @override
@@ -105,35 +104,6 @@ class Urls(ParquetModel):
 class UrlsModel(MongoCollection):
     collection = "urls"
     sync_type: Literal["simple", "incremental"] = "simple"
+    change_field = "last_checked"
     primary_model = Urls()
-
-    @override
-    def prepare_for_insert(self, df: pl.DataFrame, sort_id: bool = True):
-        records: list[dict[str, Any]] = []
-
-        col_names = self.combined_schema().to_arrow().names
-
-        for row in df.sort("_id").to_dicts():
-            record: dict[str, Any] = {}
-            for k, v in row.items():
-                if k == "metadata":
-                    v = array_to_object(v)
-                    record[k] = v
-                    continue
-                if v is None and k not in self.default_values:
-                    continue
-                elif v is None and k in self.default_values:
-                    record[k] = self.default_values[k]
-
-                if k in self.objectid_fields:
-                    record[k] = convert_objectids(v)
-                else:
-                    record[k] = v
-
-            for col in col_names:
-                if col not in record and col in self.default_values:
-                    record[col] = self.default_values[col]
-
-            records.append(record)
-
-        return records
+    key_value_fields = ["metadata"]
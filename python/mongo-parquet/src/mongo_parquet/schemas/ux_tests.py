@@ -49,19 +49,19 @@ class UxTests(ParquetModel):
     @override
     def transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").bin.encode("hex"),
-            pl.col("project").bin.encode("hex"),
-            pl.col("pages").list.eval(pl.element().bin.encode("hex")),
-            pl.col("tasks").list.eval(pl.element().bin.encode("hex")),
+            self.encode_id(pl.col("_id")),
+            self.encode_id(pl.col("project")),
+            pl.col("pages").list.eval(self.encode_id(pl.element())),
+            pl.col("tasks").list.eval(self.encode_id(pl.element())),
         )
 
     @override
     def reverse_transform(self, df: AnyFrame) -> AnyFrame:
         return df.with_columns(
-            pl.col("_id").str.decode("hex"),
-            pl.col("project").str.decode("hex"),
-            pl.col("pages").list.eval(pl.element().str.decode("hex")),
-            pl.col("tasks").list.eval(pl.element().str.decode("hex")),
+            self.decode_id(pl.col("_id")),
+            self.decode_id(pl.col("project")),
+            pl.col("pages").list.eval(self.decode_id(pl.element())),
+            pl.col("tasks").list.eval(self.decode_id(pl.element())),
         )
 
     @override
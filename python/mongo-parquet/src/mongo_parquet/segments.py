@@ -0,0 +1,172 @@
+"""
+Append-only segments for the partitions of incremental models: each sync writes its new rows
+to a new segment file (`1.parquet`, `2.parquet`, ...) next to the partition's `0.parquet`,
+instead of rewriting the whole partition. Segments are merged back into `0.parquet` by compaction.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta
+from typing import final
+import polars as pl
+from .layout import ParquetLayout, SinkOptions
+
+BASE_SEGMENT = "0.parquet"
+
+_segment_pattern = re.compile(r"^(\d+)\.parquet$")
+
+
+def segment_files(partition_dir: str) -> list[str]:
+    """
+    Get the segment files of a partition, in the order they were written.
+    """
+    if not os.path.isdir(partition_dir):
+        return []
+
+    numbered = [
+        (int(match.group(1)), file)
+        for file in os.listdir(partition_dir)
+        if (match := _segment_pattern.match(file))
+    ]
+
+    return [os.path.join(partition_dir, file) for _, file in sorted(numbered)]
+
+
+def next_segment_path(partition_dir: str) -> str:
+    """
+    Get the path of the next segment to write in a partition.
+    """
+    segments = segment_files(partition_dir)
+
+    if not segments:
+        return os.path.join(partition_dir, BASE_SEGMENT)
+
+    last = _segment_pattern.match(os.path.basename(segments[-1]))
+    assert last is not None
+
+    return os.path.join(partition_dir, f"{int(last.group(1)) + 1}.parquet")
+
+
+def write_segment(
+    df: pl.DataFrame,
+    partition_dir: str,
+    compression_level: int = 7,
+    layout: ParquetLayout | None = None,
+) -> str:
+    """
+    Write new rows to the next segment of a partition. The segment is written to a temp file first,
+    so a failed write never leaves a partial segment to be read.
+
+    :param layout: The layout to write the segment with. Overrides `compression_level`.
+    :return: The path of the new segment.
+    """
+    os.makedirs(partition_dir, exist_ok=True)
+
+    segment_path = next_segment_path(partition_dir)
+    temp_path = re.sub(r"\.parquet$", ".tmp.parquet", segment_path)
+
+    if layout is not None:
+        layout.write(df, temp_path)
+    else:
+        df.write_parquet(temp_path, compression_level=compression_level)
+
+    os.replace(temp_path, segment_path)
+
+    return segment_path
+
+
+@final
+class CompactionPolicy:
+    """
+    When to merge the segments of a partition. A partition with more than one segment
+    is compacted as soon as any of the thresholds is reached.
+    """
+
+    def __init__(
+        self,
+        max_segments: int = 8,
+        max_appended_bytes: int = 64 * 1024**2,
+        max_age: timedelta | None = timedelta(days=7),
+    ):
+        """
+        :param max_segments: The number of segments.
+        :param max_appended_bytes: The total size of the segments appended after the first one.
+        :param max_age: The time since the last segment was written, i.e. the partition
+                        is no longer being appended to (e.g. the month is over).
+        """
+        self.max_segments = max_segments
+        self.max_appended_bytes = max_appended_bytes
+        self.max_age = max_age
+
+    def should_compact(self, segments: list[str], now: datetime | None = None) -> bool:
+        if len(segments) < 2:
+            return False
+
+        if len(segments) >= self.max_segments:
+            return True
+
+        if sum(os.path.getsize(segment) for segment in segments[1:]) >= (
+            self.max_appended_bytes
+        ):
+            return True
+
+        if self.max_age is not None:
+            last_written = datetime.fromtimestamp(os.path.getmtime(segments[-1]))
+
+            return (now or datetime.now()) - last_written >= self.max_age
+
+        return False
+
+
+def compact_partition(
+    partition_dir: str,
+    compression_level: int = 7,
+    layout: ParquetLayout | None = None,
+) -> list[str]:
+    """
+    Merge the segments of a partition into `0.parquet`, keeping the order of the rows.
+
+    The merged file replaces `0.parquet` before the other segments are deleted, so an interrupted
+    compaction can duplicate rows, but never lose any.
+
+    :param layout: The row group sizes to write the merged file with. Overrides `compression_level`.
+    :return: The paths of the deleted segments.
+    """
+    segments = segment_files(partition_dir)
+
+    if len(segments) < 2:
+        return []
+
+    base_path = os.path.join(partition_dir, BASE_SEGMENT)
+    temp_path = os.path.join(partition_dir, "0.tmp.parquet")
+
+    options: SinkOptions = (
+        layout.sink_options()
+        if layout is not None
+        else {"compression_level": compression_level}
+    )
+
+    pl.scan_parquet(segments, hive_partitioning=False).sink_parquet(
+        temp_path,
+        **options,
+        engine="streaming",
+        sync_on_close="all",
+    )
+
+    os.replace(temp_path, base_path)
+
+    deleted = [segment for segment in segments if segment != base_path]
+
+    for segment in deleted:
+        os.remove(segment)
+
+    return deleted
+
+
+__all__ = [
+    "CompactionPolicy",
+    "compact_partition",
+    "next_segment_path",
+    "segment_files",
+    "write_segment",
+]
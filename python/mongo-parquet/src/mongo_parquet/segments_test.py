@@ -0,0 +1,68 @@
+"""Tests for append segments and their compaction."""
+
+import os
+from datetime import datetime, timedelta
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from .segments import (
+    CompactionPolicy,
+    compact_partition,
+    next_segment_path,
+    segment_files,
+    write_segment,
+)
+
+
+class TestSegments:
+    """Test that segments are written and compacted in the order they were appended."""
+
+    @pytest.fixture
+    def partition_dir(self, parquet_dir) -> str:
+        return os.path.join(parquet_dir, "year=2024", "month=1")
+
+    def test_write_segments(self, partition_dir, january_rows):
+        assert next_segment_path(partition_dir).endswith("0.parquet")
+
+        for start in range(1, 12):
+            write_segment(january_rows(start, start + 1), partition_dir)
+
+        names = [os.path.basename(file) for file in segment_files(partition_dir)]
+
+        # numeric order, not lexicographic
+        assert names[:3] == ["0.parquet", "1.parquet", "2.parquet"]
+        assert names[-1] == "10.parquet"
+        assert not any(
+            file.endswith(".tmp.parquet") for file in os.listdir(partition_dir)
+        )
+
+    def test_compact_partition(self, partition_dir, january_rows):
+        for start, end in ((1, 5), (5, 7), (7, 12)):
+            write_segment(january_rows(start, end), partition_dir)
+
+        assert len(compact_partition(partition_dir)) == 2
+        assert [os.path.basename(file) for file in segment_files(partition_dir)] == [
+            "0.parquet"
+        ]
+        assert_frame_equal(
+            pl.read_parquet(segment_files(partition_dir)), january_rows(1, 12)
+        )
+        assert compact_partition(partition_dir) == []
+
+    def test_compaction_policy(self, partition_dir, january_rows):
+        write_segment(january_rows(1, 5), partition_dir)
+
+        policy = CompactionPolicy(max_segments=3, max_age=timedelta(days=1))
+
+        assert not policy.should_compact(segment_files(partition_dir))
+
+        write_segment(january_rows(5, 6), partition_dir)
+        segments = segment_files(partition_dir)
+
+        assert not policy.should_compact(segments)
+        assert policy.should_compact(segments, now=datetime.now() + timedelta(days=2))
+        assert CompactionPolicy(max_appended_bytes=1).should_compact(segments)
+
+        write_segment(january_rows(6, 7), partition_dir)
+
+        assert policy.should_compact(segment_files(partition_dir))
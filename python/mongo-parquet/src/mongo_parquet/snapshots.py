@@ -0,0 +1,304 @@
+"""
+Snapshots of the Parquet data directory, so that readers see a consistent set of files
+while a sync, compaction or upload changes them.
+
+Files are never rewritten in place, only replaced (written to a temp file, then moved into place),
+so a hard link to a file keeps its contents when it is replaced. A snapshot is a tree of hard links
+to the files as they were when it was committed, and a manifest listing them with their row counts
+and `date` statistics. Readers pin a snapshot while they use it, and snapshots that are
+neither pinned nor among the latest are garbage-collected.
+"""
+
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, final
+from .sync_manifest import SyncManifest
+
+SNAPSHOTS_DIR_NAME = "_snapshots"
+CURRENT_FILENAME = "CURRENT"
+
+
+def data_files(parquet_dir_path: str) -> list[str]:
+    """
+    List the Parquet files of a data directory, relative to it, skipping the directories
+    of metadata (e.g. `_snapshots`, `_catalog`) and temp files.
+    """
+    files: list[str] = []
+
+    for root, dirs, filenames in os.walk(parquet_dir_path):
+        dirs[:] = [name for name in dirs if not name.startswith(("_", "."))]
+
+        files.extend(
+            os.path.relpath(os.path.join(root, file), parquet_dir_path)
+            for file in filenames
+            if file.endswith(".parquet") and not file.endswith(".tmp.parquet")
+        )
+
+    return sorted(files)
+
+
+def new_snapshot_id() -> str:
+    """
+    Get the id of a new snapshot, which sorts after the ids of the snapshots committed before it.
+    """
+    return datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+
+@final
+class Snapshot:
+    """
+    The files of the data directory at the time a snapshot was committed.
+    """
+
+    def __init__(self, snapshot_id: str, dir_path: str, entries: dict[str, Any]):
+        """
+        :param snapshot_id: The id of the snapshot, which sorts in commit order.
+        :param dir_path: The directory of the hard links, with the same layout as the data directory.
+        :param entries: The manifest entries of the files, by path relative to the data directory.
+        """
+        self.id = snapshot_id
+        self.dir_path = dir_path
+        self.entries = entries
+
+    def files(self, filename: str) -> list[str]:
+        """
+        Get the files of a Parquet file or partitioned directory, relative to the data directory.
+        """
+        prefix = filename.rstrip(os.sep) + os.sep
+
+        return sorted(
+            path for path in self.entries if path == filename or path.startswith(prefix)
+        )
+
+    def num_rows(self, filename: str) -> int:
+        return sum(
+            self.entries[path].get("num_rows", 0) for path in self.files(filename)
+        )
+
+
+@final
+class SnapshotStore:
+    """
+    Commits, pins and garbage-collects the snapshots of a data directory, stored in its `_snapshots` subdirectory.
+    """
+
+    def __init__(
+        self,
+        parquet_dir_path: str,
+        keep: int = 3,
+        max_pin_age: timedelta = timedelta(days=1),
+    ):
+        """
+        :param parquet_dir_path: The data directory.
+        :param keep: The number of latest snapshots kept by garbage collection, pinned or not.
+        :param max_pin_age: How long a pin is honoured, in case the process holding it didn't release it.
+        """
+        self.parquet_dir_path = os.path.abspath(parquet_dir_path)
+        self.dir_path = os.path.join(self.parquet_dir_path, SNAPSHOTS_DIR_NAME)
+        self.pins_dir_path = os.path.join(self.dir_path, "pins")
+        self.keep = keep
+        self.max_pin_age = max_pin_age
+
+    def snapshot_dir_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.dir_path, snapshot_id)
+
+    def manifest_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.dir_path, f"{snapshot_id}.json")
+
+    def snapshot_ids(self) -> list[str]:
+        """
+        Get the ids of the committed snapshots, oldest first.
+        """
+        if not os.path.isdir(self.dir_path):
+            return []
+
+        return sorted(
+            file.removesuffix(".json")
+            for file in os.listdir(self.dir_path)
+            if file.endswith(".json")
+        )
+
+    def load(self, snapshot_id: str) -> Snapshot | None:
+        manifest_path = self.manifest_path(snapshot_id)
+
+        if not os.path.exists(manifest_path):
+            return None
+
+        with open(manifest_path, "r") as f:
+            data = json.load(f)
+
+        return Snapshot(
+            snapshot_id, self.snapshot_dir_path(snapshot_id), data.get("files", {})
+        )
+
+    def current_id(self) -> str | None:
+        current_path = os.path.join(self.dir_path, CURRENT_FILENAME)
+
+        if not os.path.exists(current_path):
+            return None
+
+        with open(current_path, "r") as f:
+            return f.read().strip() or None
+
+    def current(self) -> Snapshot | None:
+        """
+        Get the latest committed snapshot.
+        """
+        snapshot_id = self.current_id()
+
+        return self.load(snapshot_id) if snapshot_id else None
+
+    def commit(self) -> Snapshot:
+        """
+        Snapshot the current files of the data directory, make it the current snapshot,
+        and garbage-collect the old ones.
+
+        The footers of the files are only read for files that changed since the previous snapshot.
+        """
+        snapshot_id = new_snapshot_id()
+        snapshot_dir_path = self.snapshot_dir_path(snapshot_id)
+        previous = self.current()
+
+        print(f"📸 Committing snapshot {snapshot_id}...")
+
+        linked: list[str] = []
+
+        for path in data_files(self.parquet_dir_path):
+            link_path = os.path.join(snapshot_dir_path, path)
+            os.makedirs(os.path.dirname(link_path), exist_ok=True)
+
+            try:
+                os.link(os.path.join(self.parquet_dir_path, path), link_path)
+            except FileNotFoundError:
+                # deleted since it was listed
+                continue
+            except OSError:
+                # e.g. a filesystem without hard links
+                shutil.copy2(os.path.join(self.parquet_dir_path, path), link_path)
+
+            linked.append(path)
+
+        # entries are relative to the links, whose stats are those of the files they link to
+        manifest = SyncManifest(snapshot_dir_path, self.manifest_path(snapshot_id))
+
+        if previous is not None:
+            manifest.entries = {
+                path: previous.entries[path]
+                for path in linked
+                if path in previous.entries
+            }
+
+        for path in linked:
+            _ = manifest.update(os.path.join(snapshot_dir_path, path))
+
+        manifest.save()
+
+        current_path = os.path.join(self.dir_path, CURRENT_FILENAME)
+
+        with open(f"{current_path}.tmp", "w") as f:
+            f.write(snapshot_id)
+
+        os.replace(f"{current_path}.tmp", current_path)
+
+        print(f"Committed snapshot {snapshot_id} of {len(linked)} files")
+
+        _ = self.gc()
+
+        return Snapshot(snapshot_id, snapshot_dir_path, manifest.entries)
+
+    @contextmanager
+    def pin(self) -> Iterator[Snapshot]:
+        """
+        Pin the current snapshot (committing one if there is none), so that it isn't
+        garbage-collected while it is being read.
+        """
+        os.makedirs(self.pins_dir_path, exist_ok=True)
+
+        while True:
+            snapshot = self.current() or self.commit()
+            pin_path = os.path.join(
+                self.pins_dir_path, f"{snapshot.id}.{uuid.uuid4().hex}"
+            )
+
+            with open(pin_path, "w") as f:
+                f.write(str(os.getpid()))
+
+            # unless it was garbage-collected before the pin was written
+            if os.path.isdir(snapshot.dir_path) or not snapshot.entries:
+                break
+
+            os.remove(pin_path)
+
+        try:
+            yield snapshot
+        finally:
+            try:
+                os.remove(pin_path)
+            except FileNotFoundError:
+                pass
+
+    def pinned_ids(self) -> set[str]:
+        """
+        Get the ids of the pinned snapshots, removing the pins that are too old to be honoured.
+        """
+        if not os.path.isdir(self.pins_dir_path):
+            return set()
+
+        pinned: set[str] = set()
+        oldest = time.time() - self.max_pin_age.total_seconds()
+
+        for file in os.listdir(self.pins_dir_path):
+            pin_path = os.path.join(self.pins_dir_path, file)
+
+            try:
+                if os.path.getmtime(pin_path) < oldest:
+                    os.remove(pin_path)
+                    continue
+            except FileNotFoundError:
+                continue
+
+            pinned.add(file.split(".")[0])
+
+        return pinned
+
+    def gc(self) -> list[str]:
+        """
+        Delete the snapshots that are neither pinned, current, nor among the latest `keep`.
+        The data files are only deleted by the filesystem once no snapshot links to them.
+
+        :return: The ids of the deleted snapshots.
+        """
+        snapshot_ids = self.snapshot_ids()
+        kept = (
+            set(snapshot_ids[-self.keep :] if self.keep > 0 else [])
+            | self.pinned_ids()
+            | {self.current_id()}
+        )
+        deleted = [
+            snapshot_id for snapshot_id in snapshot_ids if snapshot_id not in kept
+        ]
+
+        for snapshot_id in deleted:
+            os.remove(self.manifest_path(snapshot_id))
+            shutil.rmtree(self.snapshot_dir_path(snapshot_id), ignore_errors=True)
+
+        if deleted:
+            print(f"🗑️  Deleted {len(deleted)} old snapshots")
+
+        return deleted
+
+
+__all__ = [
+    "CURRENT_FILENAME",
+    "SNAPSHOTS_DIR_NAME",
+    "Snapshot",
+    "SnapshotStore",
+    "data_files",
+    "new_snapshot_id",
+]
@@ -0,0 +1,53 @@
+"""Tests for the snapshots of the data directory."""
+
+import os
+import polars as pl
+from .snapshots import SnapshotStore, data_files
+
+
+class TestSnapshotStore:
+    """Test that snapshots keep the files they list until they're garbage collected."""
+
+    def test_snapshot_keeps_replaced_files(self, parquet_dir, write_days):
+        partition = os.path.join(
+            "pages_metrics.parquet", "year=2024", "month=1", "0.parquet"
+        )
+        write_days(partition, 3)
+        write_days("tasks.parquet", 1)
+
+        store = SnapshotStore(parquet_dir)
+        snapshot = store.commit()
+
+        assert snapshot.files("pages_metrics.parquet") == [partition]
+        assert snapshot.num_rows("pages_metrics.parquet") == 3
+        assert snapshot.entries[partition]["date_max"].startswith("2024-01-03")
+        assert data_files(parquet_dir) == [partition, "tasks.parquet"]
+
+        # a sync replaces the partition and deletes a file
+        write_days(partition, 10)
+        os.remove(os.path.join(parquet_dir, "tasks.parquet"))
+
+        assert pl.read_parquet(os.path.join(snapshot.dir_path, partition)).height == 3
+        assert os.path.exists(os.path.join(snapshot.dir_path, "tasks.parquet"))
+
+        latest = store.commit()
+
+        assert store.current_id() == latest.id
+        assert latest.num_rows("pages_metrics.parquet") == 10
+        assert latest.files("tasks.parquet") == []
+
+    def test_gc_keeps_pinned_snapshots(self, parquet_dir, write_days):
+        write_days("tasks.parquet", 1)
+
+        store = SnapshotStore(parquet_dir, keep=1)
+
+        with store.pin() as pinned:
+            for _ in range(3):
+                _ = store.commit()
+
+            assert os.path.isdir(pinned.dir_path)
+            assert len(store.snapshot_ids()) == 2
+
+        assert store.gc() == [pinned.id]
+        assert not os.path.exists(pinned.dir_path)
+        assert store.snapshot_ids() == [store.current_id()]
@@ -1,11 +1,31 @@
 import os
+from collections.abc import Collection, Iterable, Iterator
 from datetime import datetime
 import json
-from typing import Literal, final
+import re
+from typing import Any, Literal, cast, final
 import adlfs
 import fsspec
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 import s3fs
+from .layout import DEFAULT_ROW_GROUP_SIZE, ParquetLayout
+from .remote_scan import (
+    find_parquet_files,
+    partition_values_from_paths,
+    prune_partitions,
+    scan_remote_parquet,
+)
+from .snapshots import (
+    CURRENT_FILENAME,
+    SNAPSHOTS_DIR_NAME,
+    Snapshot,
+    data_files,
+    new_snapshot_id,
+)
+from .transfer import TransferEngine, strip_protocol
+from .utils import ensure_dataframe, list_parquet_files
 
 
 def get_aws_config_value(key: str) -> str | None:
@@ -64,6 +84,301 @@ class RemoteStorageConfig:
             self.fs = s3_fs
 
 
+SORT_MERGE_CHUNK_SIZE = 8192
+"""The number of rows of each batch held in memory at once when merging sorted batches."""
+
+
+def _sorts_before(
+    sort_by: list[str],
+    descending: list[bool],
+    row: dict[str, Any],
+    schema: pl.Schema,
+    inclusive: bool = False,
+) -> pl.Expr:
+    """
+    Whether rows come before `row` when sorted by `sort_by` with Polars' default null order (nulls first),
+    or are equal to it if `inclusive` is set.
+    """
+    before = pl.lit(inclusive)
+
+    # built from the last column, e.g. a < x | (a == x & (b < y | (b == y & inclusive)))
+    for column, column_descending in reversed(list(zip(sort_by, descending))):
+        value = pl.lit(row[column], dtype=schema[column])
+
+        if row[column] is None:
+            column_before = pl.lit(False)
+        else:
+            column_before = pl.col(column).is_null() | (
+                pl.col(column) > value if column_descending else pl.col(column) < value
+            )
+
+        before = column_before.fill_null(False) | (
+            pl.col(column).eq_missing(value) & before
+        )
+
+    return before
+
+
+@final
+class ParquetBatchWriter:
+    """
+    Writes DataFrames to a Parquet file incrementally, one or more row groups per batch,
+    so that the full dataset never needs to be held in memory.
+
+    Data is written to a temporary file, which replaces the target file when the writer is closed.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        compression_level: int = 7,
+        write_empty: bool = True,
+        layout: ParquetLayout | None = None,
+        sort_by: list[str] | None = None,
+        sort_descending: bool | list[bool] = False,
+    ):
+        """
+        :param filepath: The path of the Parquet file to write.
+        :param compression_level: The zstd compression level.
+        :param write_empty: Whether to write a file if no rows were written.
+        :param layout: The row group sizes and indexes to write.
+        :param sort_by: The columns the rows of each batch are already sorted by, e.g. `ParquetModel.sort_by`.
+                        If more than one batch is written, the sorted batches are merged when the writer is closed,
+                        so the file has the same rows in the same order as if it was written at once.
+        :param sort_descending: Whether each of the `sort_by` columns is sorted in descending order.
+        """
+        self.filepath = filepath
+        self.temp_filepath = f"{filepath}.tmp"
+        self.compression_level = compression_level
+        self.layout = layout
+        self.sort_by = sort_by or []
+        self.sort_descending = (
+            sort_descending
+            if isinstance(sort_descending, list)
+            else [sort_descending] * len(self.sort_by)
+        )
+        self.write_empty = write_empty
+        self.num_rows = 0
+        self.num_batches = 0
+        self._batch_num_rows: list[int] = []
+        self._writer: pq.ParquetWriter | None = None
+        self._schema: pa.Schema | None = None
+        self._empty_table: pa.Table | None = None
+
+    def write(self, df: pl.DataFrame):
+        """
+        Write a batch of data to the file.
+        """
+        table = df.to_arrow()
+
+        if table.num_rows == 0:
+            if self._empty_table is None:
+                self._empty_table = table
+            return
+
+        if self._writer is None or self._schema is None:
+            os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(
+                self.temp_filepath,
+                table.schema,
+                **self._writer_options(table.schema),
+            )
+        elif table.schema != self._schema:
+            table = table.cast(self._schema)
+
+        self._writer.write_table(
+            table,
+            row_group_size=self.layout.row_group_size if self.layout else None,
+        )
+        self.num_rows += table.num_rows
+        self.num_batches += 1
+        self._batch_num_rows.append(table.num_rows)
+
+    def _writer_options(self, schema: pa.Schema | None = None) -> dict[str, Any]:
+        if self.layout is None:
+            return {"compression": "zstd", "compression_level": self.compression_level}
+
+        # the rows are only known to be sorted by the layout's columns if they're sorted at all
+        return self.layout.writer_options(schema if self.sort_by else None)
+
+    def _sorted(self, df: pl.DataFrame) -> pl.DataFrame:
+        return df.sort(
+            self.sort_by, descending=self.sort_descending, maintain_order=True
+        )
+
+    def _merged_batches(self, parquet_file: pq.ParquetFile) -> Iterator[pl.DataFrame]:
+        """
+        Merge the rows of the batches in the temporary file, each of which is already sorted,
+        reading `SORT_MERGE_CHUNK_SIZE` rows of each batch at a time.
+
+        The batch whose current chunk ends first bounds the rows that can be written: none of the rows
+        left to read can come before the last row of its chunk. The rows of each chunk up to that row are
+        sorted together and yielded, so every row is only sorted once. Equal rows stay in the order of
+        their batches, as when sorting all the rows at once.
+        """
+        runs: list[Iterator[pl.DataFrame]] = []
+        row_group = 0
+
+        for num_rows in self._batch_num_rows:
+            # each batch is written as whole row groups
+            row_groups: list[int] = []
+
+            while num_rows > 0:
+                num_rows -= parquet_file.metadata.row_group(row_group).num_rows
+                row_groups.append(row_group)
+                row_group += 1
+
+            runs.append(
+                ensure_dataframe(pl.from_arrow(batch))
+                for batch in parquet_file.iter_batches(
+                    batch_size=SORT_MERGE_CHUNK_SIZE, row_groups=row_groups
+                )
+            )
+
+        # the rows of the current chunk of each batch that weren't yielded yet
+        heads: dict[int, pl.DataFrame] = {}
+
+        def read_next(run: int):
+            df = next(runs[run], None)
+
+            if df is not None:
+                heads[run] = df
+
+        for run in range(len(runs)):
+            read_next(run)
+
+        while heads:
+            bound = self._sorted(
+                pl.concat(
+                    [
+                        heads[run].tail(1).with_columns(pl.lit(run).alias("__run"))
+                        for run in sorted(heads)
+                    ]
+                )
+            ).row(0, named=True)
+            bound_run: int = bound["__run"]
+            rows: list[pl.DataFrame] = []
+
+            for run in sorted(heads):
+                head = heads[run]
+                # the rows equal to the bound come before it in earlier batches, and after it in later ones
+                num_rows: int = head.select(
+                    _sorts_before(
+                        self.sort_by,
+                        self.sort_descending,
+                        bound,
+                        head.schema,
+                        inclusive=run <= bound_run,
+                    ).sum()
+                ).item()
+
+                rows.append(head.head(num_rows))
+
+                if num_rows == head.height:
+                    del heads[run]
+                    read_next(run)
+                else:
+                    heads[run] = head.slice(num_rows)
+
+            yield self._sorted(pl.concat(rows))
+
+    def _merge_rewrite(self):
+        """
+        Rewrite the temporary file with the sorted rows of its batches merged, one row group at a time.
+        """
+        merged_filepath = f"{self.filepath}.sorted.tmp"
+        row_group_size = (
+            self.layout.row_group_size if self.layout else DEFAULT_ROW_GROUP_SIZE
+        )
+        writer: pq.ParquetWriter | None = None
+        schema: pa.Schema | None = None
+        pending: list[pl.DataFrame] = []
+        num_pending = 0
+
+        def write_row_group(rows: pl.DataFrame):
+            nonlocal writer, schema
+            table = rows.to_arrow()
+
+            if writer is None or schema is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(
+                    merged_filepath,
+                    table.schema,
+                    **self._writer_options(table.schema),
+                )
+            elif table.schema != schema:
+                table = table.cast(schema)
+
+            writer.write_table(table, row_group_size=row_group_size)
+
+        try:
+            with pq.ParquetFile(self.temp_filepath) as parquet_file:
+                for df in self._merged_batches(parquet_file):
+                    pending.append(df)
+                    num_pending += df.height
+
+                    # the rows are written in full row groups, as if they were written at once
+                    while num_pending >= row_group_size:
+                        rows = pl.concat(pending)
+                        write_row_group(rows.head(row_group_size))
+                        pending = [rows.slice(row_group_size)]
+                        num_pending -= row_group_size
+
+            if num_pending:
+                write_row_group(pl.concat(pending))
+        except Exception:
+            if writer is not None:
+                writer.close()
+
+            if os.path.exists(merged_filepath):
+                os.remove(merged_filepath)
+            raise
+
+        if writer is not None:
+            writer.close()
+            os.replace(merged_filepath, self.temp_filepath)
+
+    def close(self) -> int:
+        """
+        Finish writing the file, and move it into place.
+
+        :return: The number of rows written.
+        """
+        if self._writer is None:
+            if self.write_empty and self._empty_table is not None:
+                os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+                pq.write_table(
+                    self._empty_table,
+                    self.temp_filepath,
+                    **self._writer_options(),
+                )
+                os.replace(self.temp_filepath, self.filepath)
+            return self.num_rows
+
+        self._writer.close()
+        self._writer = None
+
+        # a single batch is already sorted
+        if self.sort_by and self.num_batches > 1:
+            self._merge_rewrite()
+
+        os.replace(self.temp_filepath, self.filepath)
+
+        return self.num_rows
+
+    def abort(self):
+        """
+        Discard the data written so far, leaving any existing file in place.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        if os.path.exists(self.temp_filepath):
+            os.remove(self.temp_filepath)
+
+
 @final
 class StorageClient:
     def __init__(
@@ -71,13 +386,28 @@ class StorageClient:
         data_dir: str,
         sample_dir: str,
         remote_storage_type: Literal["azure"] | Literal["s3"],
+        max_transfer_concurrency: int = 8,
+        remote_cache_dir: str | None = None,
     ):
+        """
+        :param data_dir: The local directory for the full data.
+        :param sample_dir: The local directory for the sample data.
+        :param remote_storage_type: The remote storage backend.
+        :param max_transfer_concurrency: The maximum number of concurrent file uploads/downloads.
+        :param remote_cache_dir: A local directory to cache the blocks read when scanning remote files.
+        """
         self.data_dir = data_dir
         self.sample_dir = sample_dir
+        self.remote_cache_dir = remote_cache_dir
 
         self.remote_storage = RemoteStorageConfig(remote_storage_type)
         self.remote_fs = self.remote_storage.fs
         self.remote_container = self.remote_storage.remote_container
+        self.transfers = TransferEngine(
+            self.remote_fs, max_concurrency=max_transfer_concurrency
+        )
+        # the current remote snapshot, by sample, read once
+        self._remote_snapshots: dict[bool, Snapshot | None] = {}
 
     def target_dirpath(self, sample: bool = False, remote: bool = False) -> str:
         rel_path = self.sample_dir if sample else self.data_dir
@@ -116,32 +446,211 @@ class StorageClient:
         if not os.path.exists(local_dir_path):
             raise FileNotFoundError(f"Local directory {local_dir_path} does not exist.")
 
-        filepath_tuples = (
-            [(local_dir_path, None, fp) for fp in filepaths] if filepaths else None
+        if filepaths:
+            local_paths = [os.path.join(local_dir_path, fp) for fp in filepaths]
+        else:
+            # not the snapshots, which link to the same files
+            local_paths = [
+                os.path.join(local_dir_path, path)
+                for path in data_files(local_dir_path)
+            ]
+
+        pairs = [
+            (
+                local_path,
+                self.target_filepath(
+                    os.path.relpath(local_path, local_dir_path),
+                    sample=sample,
+                    remote=True,
+                ),
+            )
+            for local_path in local_paths
+        ]
+
+        # a single listing is much faster than looking up each file, unless there are only a few
+        remote_infos = (
+            None
+            if filepaths and len(filepaths) < 20
+            else self.transfers.list_remote(
+                self.target_dirpath(sample=sample, remote=True)
+            )
         )
 
-        for root, _, files in filepath_tuples or os.walk(local_dir_path):
-            for file in files:
-                if file.endswith(".parquet"):
-                    # may need a different root if using explicit filepaths?
-                    local_path = os.path.join(root, file)
+        stats = self.transfers.upload(pairs, remote_infos)
 
-                    remote_filepath = local_path.replace(f"{local_dir_path}/", "")
+        if cleanup_local:
+            for local_path in local_paths:
+                print(f"🗑️  Deleting local file: {local_path}")
+                os.remove(local_path)
 
-                    remote_path = self.target_filepath(
-                        remote_filepath, sample=sample, remote=True
-                    )
+        print(f"Uploaded {stats}")
+        print("✅ All Parquet files uploaded.")
+
+    def delete_from_remote(self, filepaths: list[str], sample: bool = False):
+        """
+        Delete files from remote storage, ignoring those that don't exist.
+
+        :param filepaths: The file paths, relative to the data directory.
+        :param sample: Whether to delete from the sample directory.
+        """
+        for filepath in filepaths:
+            remote_path = self.target_filepath(filepath, sample=sample, remote=True)
 
-                    print(f"⬆️  Uploading: {local_path} → {remote_path}")
+            if self.remote_fs.exists(remote_path):
+                print(f"🗑️  Deleting remote file: {remote_path}")
+                self.remote_fs.rm(remote_path)
 
-                    with open(local_path, "rb") as f:
-                        self.remote_fs.pipe_file(remote_path, f.read())
+    def upload_snapshot(
+        self, snapshot: Snapshot, manifest_path: str, sample: bool = False
+    ):
+        """
+        Upload the manifest of a snapshot, and make it the current remote snapshot, so that
+        remote readers get the files with a single read instead of listing the partition directories.
 
-                    if cleanup_local:
-                        print(f"🗑️  Deleting local file: {local_path}")
-                        os.remove(local_path)
+        Must be called after the snapshot's files were uploaded, and before files it doesn't
+        include are deleted from remote storage.
 
-        print("✅ All Parquet files uploaded.")
+        :param snapshot: The snapshot, committed locally.
+        :param manifest_path: The local path of the snapshot's manifest.
+        :param sample: Whether to upload to the sample directory.
+        """
+        remote_dir_path = self.target_filepath(
+            SNAPSHOTS_DIR_NAME, sample=sample, remote=True
+        )
+
+        print(f"☁️ Uploading snapshot {snapshot.id} to {remote_dir_path}...")
+
+        self.remote_fs.put_file(
+            manifest_path, os.path.join(remote_dir_path, f"{snapshot.id}.json")
+        )
+        self._set_remote_snapshot(snapshot.id, sample)
+
+    def upload_listed_snapshot(
+        self,
+        entries: dict[str, Any],
+        exclude: Collection[str] = (),
+        sample: bool = False,
+    ) -> Snapshot:
+        """
+        Upload the manifest of a snapshot of the files listed in remote storage, and make it the current
+        remote snapshot. Unlike `upload_snapshot`, the remote files don't have to match the local ones,
+        e.g. after uploading only some of the files, or deleting the local files once uploaded.
+
+        Must be called after the files were uploaded, and before files it doesn't include are deleted
+        from remote storage.
+
+        :param entries: The manifest entries of the files, e.g. from a local snapshot. The files without
+                        an entry keep the one of the current remote snapshot, if they have one.
+        :param exclude: The files to leave out, relative to the data directory, e.g. the ones about to be deleted.
+        :param sample: Whether to upload to the sample directory.
+        :return: The uploaded snapshot.
+        """
+        root_path = strip_protocol(
+            self.remote_fs, self.target_dirpath(sample=sample, remote=True)
+        )
+        previous = self.remote_snapshot(sample)
+        files: dict[str, Any] = {}
+
+        for file in find_parquet_files(self.remote_fs, root_path):
+            path = os.path.relpath(file, root_path)
+
+            # e.g. the files of the catalog and of the URL index
+            if path.startswith(("_", ".")) or path in exclude:
+                continue
+
+            files[path] = (
+                entries.get(path)
+                or (previous.entries.get(path) if previous is not None else None)
+                or {}
+            )
+
+        remote_dir_path = self.target_filepath(
+            SNAPSHOTS_DIR_NAME, sample=sample, remote=True
+        )
+        snapshot = Snapshot(new_snapshot_id(), remote_dir_path, files)
+
+        print(
+            f"☁️ Uploading snapshot {snapshot.id} of {len(files)} remote files to {remote_dir_path}..."
+        )
+
+        self.remote_fs.pipe_file(
+            os.path.join(remote_dir_path, f"{snapshot.id}.json"),
+            json.dumps({"files": files}, indent=1, sort_keys=True).encode(),
+        )
+        self._set_remote_snapshot(snapshot.id, sample)
+
+        return snapshot
+
+    def _set_remote_snapshot(self, snapshot_id: str, sample: bool):
+        remote_dir_path = self.target_filepath(
+            SNAPSHOTS_DIR_NAME, sample=sample, remote=True
+        )
+
+        self.remote_fs.pipe_file(
+            os.path.join(remote_dir_path, CURRENT_FILENAME), snapshot_id.encode()
+        )
+        self._remote_snapshots.pop(sample, None)
+
+    def remote_snapshot(self, sample: bool = False) -> Snapshot | None:
+        """
+        Get the current remote snapshot, or None if none was uploaded.
+        """
+        if sample in self._remote_snapshots:
+            return self._remote_snapshots[sample]
+
+        remote_dir_path = self.target_filepath(
+            SNAPSHOTS_DIR_NAME, sample=sample, remote=True
+        )
+        snapshot: Snapshot | None = None
+
+        try:
+            snapshot_id = (
+                cast(
+                    bytes,
+                    self.remote_fs.cat_file(
+                        os.path.join(remote_dir_path, CURRENT_FILENAME)
+                    ),
+                )
+                .decode()
+                .strip()
+            )
+            manifest = json.loads(
+                self.remote_fs.cat_file(
+                    os.path.join(remote_dir_path, f"{snapshot_id}.json")
+                )
+            )
+            snapshot = Snapshot(snapshot_id, remote_dir_path, manifest.get("files", {}))
+        except FileNotFoundError:
+            pass
+
+        self._remote_snapshots[sample] = snapshot
+
+        return snapshot
+
+    def remote_files(self, filename: str, sample: bool = False) -> list[str]:
+        """
+        Get the remote Parquet files of a file or partitioned directory, from the current remote snapshot
+        if there is one, otherwise by listing the directory.
+
+        :param filename: The file path, relative to the data directory.
+        :param sample: Whether to read from the sample directory.
+        :return: The paths of the files, without the protocol.
+        """
+        root_path = strip_protocol(
+            self.remote_fs, self.target_filepath(filename, sample=sample, remote=True)
+        )
+        snapshot = self.remote_snapshot(sample)
+
+        if snapshot is not None and (files := snapshot.files(filename)):
+            return [
+                strip_protocol(
+                    self.remote_fs,
+                    self.target_filepath(file, sample=sample, remote=True),
+                )
+                for file in files
+            ]
+
+        return find_parquet_files(self.remote_fs, root_path)
 
     def scan_parquet(
         self,
@@ -151,16 +660,54 @@ class StorageClient:
         hive_partitioning: bool = False,
         min_date: datetime | None = None,
     ) -> pl.LazyFrame:
-        print(f"📥 Reading {filename}...")
-        local_filepath = self.target_filepath(filename, sample=sample, remote=False)
+        """
+        Lazily scan a Parquet file, or a directory of partitioned Parquet files.
+
+        Remote files are scanned in place rather than downloaded: partitions before `min_date`
+        are skipped, and only the footers and matching row groups of the others are read.
 
+        :param filename: The file path, relative to the data directory.
+        :param sample: Whether to read from the sample directory.
+        :param remote: Whether to read from remote storage.
+        :param hive_partitioning: Whether to add the partition columns.
+        :param min_date: Only include rows on or after this date.
+        """
         if remote:
-            self.download_from_remote([filename], sample=sample)
+            remote_path = self.target_filepath(filename, sample=sample, remote=True)
+            print(f"📥 Scanning {remote_path} from remote storage...")
+
+            lf = scan_remote_parquet(
+                self.remote_fs,
+                remote_path,
+                hive_partitioning=hive_partitioning,
+                min_date=min_date,
+                cache_dir=self.remote_cache_dir,
+                files=self.remote_files(filename, sample=sample),
+            )
+
+            if lf is None:
+                raise FileNotFoundError(f"Remote file {remote_path} does not exist.")
+
+            return lf
+
+        print(f"📥 Reading {filename}...")
+        local_filepath = self.target_filepath(filename, sample=sample, remote=False)
 
         if not os.path.exists(local_filepath):
             raise FileNotFoundError(f"Local file {local_filepath} does not exist.")
 
-        lf = pl.scan_parquet(local_filepath, hive_partitioning=hive_partitioning)
+        source: str | list[str] = local_filepath
+
+        if hive_partitioning and min_date and os.path.isdir(local_filepath):
+            files = list_parquet_files(local_filepath)
+            # if every partition is pruned, keep one for the schema: the date filter excludes its rows
+            source = (
+                prune_partitions(files, local_filepath, min_date)
+                or files[-1:]
+                or local_filepath
+            )
+
+        lf = pl.scan_parquet(source, hive_partitioning=hive_partitioning)
 
         if min_date and "date" in lf.columns:
             lf = lf.filter(
@@ -170,6 +717,38 @@ class StorageClient:
 
         return lf
 
+    def partition_values(
+        self,
+        filename: str,
+        partition_by: Literal["month", "year"],
+        sample: bool = False,
+        remote: bool = False,
+        min_date: datetime | None = None,
+    ) -> list[dict[str, int]]:
+        """
+        Get the partition values of a partitioned Parquet directory from its file listing,
+        without reading any of the files.
+
+        :param filename: The directory path, relative to the data directory.
+        :param partition_by: "month" for year/month partitions, or "year".
+        :param sample: Whether to read from the sample directory.
+        :param remote: Whether to list remote storage.
+        :param min_date: Only include the partitions that can contain data on or after this date.
+        """
+        if remote:
+            root_path = strip_protocol(
+                self.remote_fs,
+                self.target_filepath(filename, sample=sample, remote=True),
+            )
+            files = self.remote_files(filename, sample=sample)
+        else:
+            root_path = self.target_filepath(filename, sample=sample, remote=False)
+            files = list_parquet_files(root_path)
+
+        return partition_values_from_paths(
+            prune_partitions(files, root_path, min_date), root_path, partition_by
+        )
+
     def read_parquet(
         self,
         filename: str,
@@ -192,13 +771,103 @@ class StorageClient:
         filename: str,
         sample: bool = False,
         compression_level: int = 7,
+        layout: ParquetLayout | None = None,
     ):
+        """
+        Write a DataFrame to a Parquet file.
+
+        :param layout: The layout to write the file with, sorting the rows. Overrides `compression_level`.
+        """
         local_path = self.target_filepath(filename, sample=sample, remote=False)
+        # replace the file instead of overwriting it, so snapshots linking to it keep their contents
+        temp_path = re.sub(r"\.parquet$", ".tmp.parquet", local_path)
 
         print(f"📤 Writing {local_path}...")
 
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        df.write_parquet(local_path, compression_level=compression_level)
+        if layout is not None:
+            layout.write(df, temp_path)
+        else:
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            df.write_parquet(temp_path, compression_level=compression_level)
+
+        os.replace(temp_path, local_path)
+
+    def batch_writer(
+        self,
+        filename: str,
+        sample: bool = False,
+        compression_level: int = 7,
+        write_empty: bool = True,
+        layout: ParquetLayout | None = None,
+        sort_by: list[str] | None = None,
+        sort_descending: bool | list[bool] = False,
+    ) -> ParquetBatchWriter:
+        """
+        Create a writer for writing a Parquet file incrementally.
+
+        :param filename: The file path, relative to the data directory.
+        :param sample: Whether to write to the sample directory.
+        :param write_empty: Whether to write a file if no rows were written.
+        :param layout: The row group sizes and indexes to write.
+        :param sort_by: The columns the rows of the batches are sorted by, to merge them once they're written.
+                        See `ParquetBatchWriter`.
+        :param sort_descending: Whether each of the `sort_by` columns is sorted in descending order.
+        """
+        local_path = self.target_filepath(filename, sample=sample, remote=False)
+
+        return ParquetBatchWriter(
+            local_path,
+            compression_level=compression_level,
+            write_empty=write_empty,
+            layout=layout,
+            sort_by=sort_by,
+            sort_descending=sort_descending,
+        )
+
+    def write_parquet_batches(
+        self,
+        batches: Iterable[pl.DataFrame],
+        filename: str,
+        sample: bool = False,
+        compression_level: int = 7,
+        write_empty: bool = True,
+        layout: ParquetLayout | None = None,
+        sort_by: list[str] | None = None,
+        sort_descending: bool | list[bool] = False,
+    ) -> int:
+        """
+        Write batches of data to a Parquet file, one batch at a time.
+
+        :param batches: The batches of data to write.
+        :param filename: The file path, relative to the data directory.
+        :param sample: Whether to write to the sample directory.
+        :param write_empty: Whether to write a file if there is no data.
+        :param layout: The row group sizes and indexes to write.
+        :param sort_by: The columns the rows of the batches are sorted by, to merge them once they're written.
+                        See `ParquetBatchWriter`.
+        :param sort_descending: Whether each of the `sort_by` columns is sorted in descending order.
+        :return: The number of rows written.
+        """
+        writer = self.batch_writer(
+            filename,
+            sample=sample,
+            compression_level=compression_level,
+            write_empty=write_empty,
+            layout=layout,
+            sort_by=sort_by,
+            sort_descending=sort_descending,
+        )
+
+        print(f"📤 Writing {writer.filepath}...")
+
+        try:
+            for batch in batches:
+                writer.write(batch)
+        except Exception:
+            writer.abort()
+            raise
+
+        return writer.close()
 
     def download_from_remote(self, files: list[str], sample: bool = False):
         local_dir_path = self.target_dirpath(sample=sample, remote=False)
@@ -207,37 +876,41 @@ class StorageClient:
             f"☁️ Downloading Parquet files from remote storage `{self.remote_container}/{local_dir_path}`..."
         )
 
+        pairs: list[tuple[str, str]] = []
+        remote_infos: dict[str, dict[str, Any]] = {}
+
         for file in files:
             remote_path = self.target_filepath(file, sample=sample, remote=True)
-
-            local_dirpath = self.target_dirpath(sample=sample, remote=False)
             local_filepath = self.target_filepath(file, sample=sample, remote=False)
 
-            if not self.remote_fs.exists(remote_path):
+            # in the case of a directory of partitioned Parquet files, this lists all of them
+            file_infos = self.transfers.list_remote(remote_path)
+            remote_root = strip_protocol(self.remote_fs, remote_path)
+
+            if len(file_infos) == 0:
                 print(f"❌ Remote file {remote_path} does not exist.")
                 continue
 
-            print(f"⬇️  Downloading: {remote_path} to {local_filepath}")
-
-            if self.remote_fs.isdir(remote_path):
-                # in this case, the "filepath" is a directory of partitioned Parquet files
-                os.makedirs(local_filepath, exist_ok=True)
+            for key, info in file_infos.items():
+                if not key.endswith(".parquet"):
+                    continue
 
-                dir_glob = os.path.normpath(f"{remote_path}/**/*.parquet")
+                relative_path = os.path.relpath(key, remote_root)
+                pairs.append(
+                    (
+                        key,
+                        os.path.normpath(os.path.join(local_filepath, relative_path)),
+                    )
+                )
+                remote_infos[key] = info
 
-                dirname = os.path.basename(remote_path)
+        stats = self.transfers.download(pairs, remote_infos)
 
-                self.remote_fs.get(
-                    dir_glob,
-                    f"{local_dirpath}/{dirname}/",
-                    recursive=True,
-                )
-            else:
-                os.makedirs(os.path.dirname(local_filepath), exist_ok=True)
-                self.remote_fs.get(remote_path, local_filepath)
+        print(f"Downloaded {stats}")
 
 
 __all__ = [
+    "ParquetBatchWriter",
     "RemoteStorageConfig",
     "StorageClient",
 ]
@@ -0,0 +1,180 @@
+"""Tests for the batched Parquet writer and the remote snapshots."""
+
+import os
+import random
+import uuid
+from datetime import datetime
+from typing import Any
+import polars as pl
+import pyarrow.parquet as pq
+import fsspec
+from bson import ObjectId, encode
+import pytest
+from polars.testing import assert_frame_equal
+from pymongo import MongoClient
+from . import storage
+from .mongo import iter_polars_batches
+from .schemas.gsc_searchterms import GSCSearchTerms
+from .storage import ParquetBatchWriter, StorageClient
+
+
+def raw_batches(docs: list[dict[str, Any]], batch_size: int) -> list[bytes]:
+    """Encode documents as the raw BSON batches of a cursor."""
+    return [
+        b"".join(encode(doc) for doc in docs[i : i + batch_size])
+        for i in range(0, len(docs), batch_size)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [storage.SORT_MERGE_CHUNK_SIZE, 5])
+def test_batched_export_matches_single_shot(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(storage, "SORT_MERGE_CHUNK_SIZE", chunk_size)
+    model = GSCSearchTerms(str(tmp_path))
+    collection = MongoClient(connect=False)["test"][model.collection]
+    rng = random.Random(0)
+
+    docs = [
+        {
+            "_id": ObjectId(),
+            "date": datetime(2024, 1, rng.randint(1, 3)),
+            "url": f"https://www.canada.ca/{rng.randint(1, 5)}",
+            "page": ObjectId(),
+            "tasks": [],
+            "projects": [ObjectId()],
+            "ux_tests": [],
+            "gsc_searchterms": [
+                {
+                    "clicks": rng.randint(0, 3),
+                    "ctr": 0.1,
+                    "impressions": 10,
+                    "position": 1.5,
+                    "term": f"term {i}",
+                    "_id": ObjectId(),
+                }
+                for i in range(rng.randint(0, 4))
+            ],
+        }
+        for _ in range(200)
+    ]
+
+    single_shot = os.path.join(tmp_path, "single.parquet")
+    model.layout.write(
+        model.transform(
+            pl.concat(
+                iter_polars_batches(collection, raw_batches(docs, 200), model.schema)
+            )
+        ),
+        single_shot,
+    )
+
+    batched = os.path.join(tmp_path, "batched.parquet")
+    sorted_heights: list[int] = []
+    sorted_rows = ParquetBatchWriter._sorted  # pyright: ignore[reportPrivateUsage]
+
+    def record_sort(writer: ParquetBatchWriter, df: pl.DataFrame) -> pl.DataFrame:
+        sorted_heights.append(df.height)
+        return sorted_rows(writer, df)
+
+    monkeypatch.setattr(ParquetBatchWriter, "_sorted", record_sort)
+
+    writer = ParquetBatchWriter(
+        batched,
+        layout=model.layout,
+        sort_by=model.sort_by,
+        sort_descending=model.sort_descending,
+    )
+
+    for df in iter_polars_batches(collection, raw_batches(docs, 30), model.schema):
+        writer.write(model.transform(df))
+
+    assert writer.close() > 0
+    assert writer.num_batches == 7
+    assert not os.path.exists(writer.temp_filepath)
+    # at most one chunk of each batch is sorted at once, and each row is only sorted once,
+    # besides the last rows of the chunks, which are sorted to find the rows that can be written
+    assert max(sorted_heights) <= writer.num_batches * chunk_size
+    assert sum(sorted_heights) <= writer.num_rows + writer.num_batches * len(
+        sorted_heights
+    )
+
+    assert_frame_equal(pl.read_parquet(batched), pl.read_parquet(single_shot))
+    assert model.layout.is_applied(batched)
+    assert pq.read_metadata(batched).num_row_groups == 1
+
+
+def test_merged_batches_with_nulls_and_equal_rows(tmp_path, monkeypatch):
+    """Batches merge like a single sort, with nulls first and equal rows in the order of their batches."""
+    monkeypatch.setattr(storage, "SORT_MERGE_CHUNK_SIZE", 3)
+    rng = random.Random(0)
+    sort_by = ["day", "clicks"]
+    sort_descending = [False, True]
+
+    batches = [
+        pl.DataFrame(
+            {
+                "day": [rng.choice([None, 1, 2, 3]) for _ in range(size)],
+                "clicks": [rng.choice([None, 0, 1]) for _ in range(size)],
+            },
+            schema={"day": pl.Int32, "clicks": pl.Int64},
+        )
+        .with_row_index("row")
+        .with_columns(pl.lit(batch).alias("batch"))
+        .sort(sort_by, descending=sort_descending, maintain_order=True)
+        for batch, size in enumerate([10, 1, 25, 7])
+    ]
+
+    filepath = os.path.join(tmp_path, "merged.parquet")
+    writer = ParquetBatchWriter(
+        filepath, sort_by=sort_by, sort_descending=sort_descending
+    )
+
+    for df in batches:
+        writer.write(df)
+
+    assert writer.close() == 43
+    assert_frame_equal(
+        pl.read_parquet(filepath),
+        pl.concat(batches).sort(
+            sort_by, descending=sort_descending, maintain_order=True
+        ),
+    )
+
+
+def test_listed_snapshot_includes_files_only_in_remote_storage(monkeypatch):
+    storage = StorageClient("data", "sample", "s3")
+    fs = fsspec.filesystem("memory")
+    monkeypatch.setattr(storage, "remote_fs", fs)
+    monkeypatch.setattr(storage, "remote_container", f"bucket-{uuid.uuid4().hex}")
+
+    def put(path: str):
+        fs.pipe_file(storage.target_filepath(path, remote=True), b"")
+
+    partition = os.path.join("pages_metrics.parquet", "year=2024", "month=1")
+    put(os.path.join(partition, "0.parquet"))
+    put("pages.parquet")
+
+    _ = storage.upload_listed_snapshot({"pages.parquet": {"num_rows": 2}})
+
+    # e.g. uploaded with `cleanup_local`, so not in any local snapshot
+    put(os.path.join(partition, "1.parquet"))
+    put(os.path.join("_catalog", "urls.parquet"))
+    put("feedback.parquet")
+
+    snapshot = storage.upload_listed_snapshot(
+        {os.path.join(partition, "1.parquet"): {"num_rows": 1}},
+        exclude=["feedback.parquet"],
+    )
+
+    assert sorted(snapshot.entries) == [
+        "pages.parquet",
+        os.path.join(partition, "0.parquet"),
+        os.path.join(partition, "1.parquet"),
+    ]
+    # the entries of the previous snapshot are kept
+    assert snapshot.entries["pages.parquet"] == {"num_rows": 2}
+
+    assert [
+        os.path.basename(file) for file in storage.remote_files("pages_metrics.parquet")
+    ] == ["0.parquet", "1.parquet"]
+    remote_snapshot = storage.remote_snapshot()
+    assert remote_snapshot is not None and remote_snapshot.id == snapshot.id
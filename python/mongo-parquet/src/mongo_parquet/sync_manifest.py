@@ -0,0 +1,203 @@
+import json
+import os
+import zlib
+from datetime import datetime
+from threading import Lock
+from typing import Any, final
+from .parquet_stats import footer_stats
+
+
+def crc32_file(filepath: str, chunk_size: int = 8 * 1024**2) -> str:
+    """
+    Generate a CRC32 checksum for a file. Much faster than a cryptographic hash,
+    and good enough to tell whether a file was changed when combined with its size and row count.
+
+    :param filepath: Path to the file to hash.
+    :return: The checksum as a hex string.
+    """
+    checksum = 0
+
+    with open(filepath, "rb") as f:
+        while chunk := f.read(chunk_size):
+            checksum = zlib.crc32(chunk, checksum)
+
+    return f"{checksum:08x}"
+
+
+@final
+class SyncManifest:
+    """
+    Persistent record of the state of every Parquet file in a directory, used to tell
+    which files were changed by a sync without re-reading unchanged files.
+
+    Each entry has the file's size and mtime, its footer metadata (row counts and `date` statistics),
+    and optionally a CRC32 checksum. A file whose size and mtime match its entry is unchanged,
+    which only takes a `stat` call. Otherwise, the footer (and checksum if enabled) tell whether
+    the rewritten file actually has different contents.
+    """
+
+    version = 1
+
+    def __init__(
+        self, root_dir_path: str, manifest_path: str, use_checksums: bool = False
+    ):
+        """
+        :param root_dir_path: The directory the file paths are relative to.
+        :param manifest_path: Where to persist the manifest.
+        :param use_checksums: Whether to compute a checksum for rewritten files, to avoid
+                              false positives when a file is rewritten with the same contents.
+        """
+        self.root_dir_path = os.path.abspath(root_dir_path)
+        self.manifest_path = os.path.abspath(manifest_path)
+        self.use_checksums = use_checksums
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.pending_uploads: list[str] = []
+        # files deleted locally (e.g. compacted segments) that still have to be deleted remotely
+        self.pending_deletes: list[str] = []
+        self._lock = Lock()
+
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+
+        try:
+            with open(self.manifest_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not read sync manifest {self.manifest_path}: {e}")
+            return
+
+        if data.get("version") != self.version:
+            print("⚠️ Sync manifest version mismatch, starting a new one.")
+            return
+
+        self.entries = data.get("files", {})
+        self.pending_uploads = data.get("pending_uploads", [])
+        self.pending_deletes = data.get("pending_deletes", [])
+
+    def save(self):
+        """
+        Write the manifest to disk, atomically replacing the previous version.
+        """
+        with self._lock:
+            data = {
+                "version": self.version,
+                "updated": datetime.now().isoformat(),
+                "files": self.entries,
+                "pending_uploads": self.pending_uploads,
+                "pending_deletes": self.pending_deletes,
+            }
+
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            temp_path = f"{self.manifest_path}.tmp"
+
+            with open(temp_path, "w") as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+
+            os.replace(temp_path, self.manifest_path)
+
+    def relative_path(self, filepath: str) -> str:
+        """
+        Get the path of a file relative to the root directory, used as its key in the manifest.
+        """
+        return os.path.relpath(os.path.abspath(filepath), self.root_dir_path)
+
+    def _stat(self, filepath: str) -> dict[str, int] | None:
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _compute_entry(self, filepath: str, stat: dict[str, int]) -> dict[str, Any]:
+        entry: dict[str, Any] = {**stat, **footer_stats(filepath)}
+
+        if self.use_checksums:
+            entry["crc32"] = crc32_file(filepath)
+
+        return entry
+
+    def _check(self, filepath: str) -> tuple[bool, dict[str, Any] | None]:
+        """
+        Compare a file with its recorded entry.
+
+        :return: Whether the file changed, and its current entry. (None if it doesn't exist)
+        """
+        key = self.relative_path(filepath)
+        stat = self._stat(filepath)
+
+        with self._lock:
+            previous = self.entries.get(key)
+
+        if stat is None:
+            return previous is not None, None
+
+        if (
+            previous is not None
+            and previous["size"] == stat["size"]
+            and previous["mtime_ns"] == stat["mtime_ns"]
+        ):
+            return False, previous
+
+        current = self._compute_entry(filepath, stat)
+
+        if previous is None:
+            return True, current
+
+        # Without checksums, a rewritten file can't be confirmed to be the same, so assume it changed
+        same_contents = (
+            "crc32" in previous
+            and "crc32" in current
+            and all(
+                previous.get(field) == current.get(field)
+                for field in set(previous) | set(current)
+                if field != "mtime_ns"
+            )
+        )
+
+        return not same_contents, current
+
+    def record(self, filepath: str):
+        """
+        Make sure a file's entry is up to date, without reading it if its size and mtime haven't changed.
+        If `filepath` is a directory, all Parquet files in it are recorded.
+        """
+        if os.path.isdir(filepath):
+            for root, _, files in os.walk(filepath):
+                for file in files:
+                    if file.endswith(".parquet") and not file.endswith(".tmp.parquet"):
+                        self.record(os.path.join(root, file))
+            return
+
+        self.update(filepath)
+
+    def has_changed(self, filepath: str) -> bool:
+        """
+        Check whether a file is different from its recorded entry, without updating the entry.
+        """
+        changed, _ = self._check(filepath)
+
+        return changed
+
+    def update(self, filepath: str) -> bool:
+        """
+        Update a file's entry.
+
+        :return: True if the file is new, or has changed since it was last recorded.
+        """
+        changed, entry = self._check(filepath)
+        key = self.relative_path(filepath)
+
+        with self._lock:
+            if entry is None:
+                self.entries.pop(key, None)
+            else:
+                self.entries[key] = entry
+
+        return changed
+
+
+__all__ = ["crc32_file", "SyncManifest"]
@@ -0,0 +1,102 @@
+"""Tests for the sync manifest."""
+
+import os
+import pytest
+from . import sync_manifest
+from .sync_manifest import SyncManifest
+
+JANUARY = os.path.join("metrics.parquet", "year=2024", "month=1", "0.parquet")
+FEBRUARY = os.path.join("metrics.parquet", "year=2024", "month=2", "0.parquet")
+
+
+def bump_mtime(path: str):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestSyncManifest:
+    """Test that the manifest records the state of files, only reading changed ones."""
+
+    @pytest.fixture(autouse=True)
+    def partitions(self, write_days):
+        """Write two partitions of `metrics.parquet`."""
+        write_days(JANUARY, 3)
+        write_days(FEBRUARY, 2)
+
+    @pytest.fixture
+    def manifest_path(self, parquet_dir) -> str:
+        return os.path.join(parquet_dir, "manifest.json")
+
+    def test_unchanged_files_are_not_read(
+        self, parquet_dir, manifest_path, monkeypatch
+    ):
+        """Files whose size and mtime match their entry are never opened."""
+        manifest = SyncManifest(parquet_dir, manifest_path)
+        manifest.record(os.path.join(parquet_dir, "metrics.parquet"))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("file was read")
+
+        monkeypatch.setattr(sync_manifest, "footer_stats", fail)
+        monkeypatch.setattr(sync_manifest, "crc32_file", fail)
+
+        partition = os.path.join(parquet_dir, JANUARY)
+
+        assert not manifest.has_changed(partition)
+        assert not manifest.update(partition)
+
+    def test_footer_stats_are_recorded(self, parquet_dir, manifest_path):
+        manifest = SyncManifest(parquet_dir, manifest_path)
+        manifest.record(os.path.join(parquet_dir, "metrics.parquet"))
+
+        entry = manifest.entries[JANUARY]
+
+        assert entry["num_rows"] == 3
+        assert entry["date_min"] == "2024-01-01T00:00:00"
+        assert entry["date_max"] == "2024-01-03T00:00:00"
+
+    def test_rewritten_files(self, parquet_dir, manifest_path, write_days):
+        """
+        Rewritten files with different contents are changed. Rewritten files with the same contents
+        are only considered unchanged when checksums are enabled.
+        """
+        partition = os.path.join(parquet_dir, JANUARY)
+
+        for use_checksums in (False, True):
+            write_days(JANUARY, 3)
+
+            manifest = SyncManifest(
+                parquet_dir, manifest_path, use_checksums=use_checksums
+            )
+            manifest.record(partition)
+
+            write_days(JANUARY, 3)
+            bump_mtime(partition)
+
+            assert manifest.update(partition) != use_checksums
+
+            write_days(JANUARY, 4)
+            bump_mtime(partition)
+
+            assert manifest.update(partition)
+
+    def test_persisted_across_runs(self, parquet_dir, manifest_path):
+        partition = os.path.join(parquet_dir, FEBRUARY)
+
+        manifest = SyncManifest(parquet_dir, manifest_path)
+        manifest.record(os.path.join(parquet_dir, "metrics.parquet"))
+        manifest.pending_uploads.append("metrics.parquet/year=2024/month=2/0.parquet")
+        manifest.save()
+
+        reloaded = SyncManifest(parquet_dir, manifest_path)
+
+        assert reloaded.entries == manifest.entries
+        assert reloaded.pending_uploads == [
+            "metrics.parquet/year=2024/month=2/0.parquet"
+        ]
+        assert not reloaded.has_changed(partition)
+
+        os.remove(partition)
+
+        assert reloaded.update(partition)
+        assert reloaded.relative_path(partition) not in reloaded.entries
@@ -0,0 +1,292 @@
+import hashlib
+import os
+import re
+import shutil
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+from typing import Any, cast, final
+from fsspec import AbstractFileSystem
+from fsspec.spec import AbstractBufferedFile
+
+
+def remote_md5(info: dict[str, Any]) -> str | None:
+    """
+    Get the MD5 of a remote file from its metadata, if the backend provides one:
+    the ETag of single-part S3 uploads, or the Content-MD5 property of Azure blobs.
+    """
+    etag = info.get("ETag")
+
+    if isinstance(etag, str):
+        etag = etag.strip('"')
+        # multipart ETags look like "<md5 of the part md5s>-<number of parts>"
+        if re.fullmatch(r"[0-9a-f]{32}", etag):
+            return etag
+
+    content_settings = info.get("content_settings")
+    content_md5 = (
+        content_settings.get("content_md5")
+        if content_settings is not None and hasattr(content_settings, "get")
+        else None
+    )
+
+    if content_md5:
+        return bytes(content_md5).hex()
+
+    return None
+
+
+def remote_mtime(info: dict[str, Any]) -> float | None:
+    """
+    Get the last modified time of a remote file as a timestamp, for any of the supported backends.
+    """
+    for key in ("LastModified", "last_modified", "mtime"):
+        value = info.get(key)
+
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, (int, float)):
+            return float(value)
+
+    return None
+
+
+def strip_protocol(fs: AbstractFileSystem, path: str) -> str:
+    """
+    Get a remote path without its protocol, as it's listed by the filesystem.
+    """
+    # only lists of paths are stripped to lists
+    return cast(str, fs._strip_protocol(path))  # pyright: ignore[reportPrivateUsage]
+
+
+def md5_file(filepath: str) -> str:
+    with open(filepath, "rb") as f:
+        return hashlib.file_digest(f, "md5").hexdigest()
+
+
+@final
+class TransferStats:
+    def __init__(self):
+        self.files = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.elapsed_secs = 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.bytes / self.elapsed_secs if self.elapsed_secs > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} files ({self.bytes / 1024**2:,.1f} MB) in {self.elapsed_secs:.1f}s "
+            f"({self.bytes_per_sec / 1024**2:,.1f} MB/sec), {self.skipped} unchanged files skipped"
+        )
+
+
+@final
+class TransferEngine:
+    """
+    Transfers files to and from a remote fsspec filesystem (`abfs` or `s3`) concurrently.
+
+    Large files are streamed in parts (multipart uploads on S3, staged blocks on Azure)
+    instead of being read into memory, and files that are already identical on the
+    destination are skipped.
+
+    A file is considered identical if the sizes match, and either the MD5 matches
+    (when the backend provides one), or the destination is at least as recent as the source.
+    """
+
+    def __init__(
+        self,
+        fs: AbstractFileSystem,
+        max_concurrency: int = 8,
+        part_size: int = 64 * 1024**2,
+    ):
+        """
+        :param fs: The remote filesystem.
+        :param max_concurrency: The maximum number of concurrent file transfers.
+        :param part_size: The size of each part for files larger than a single part.
+        """
+        self.fs = fs
+        self.max_concurrency = max(1, max_concurrency)
+        self.part_size = part_size
+
+    def list_remote(self, remote_path: str) -> dict[str, dict[str, Any]]:
+        """
+        List all files under a remote path (or the file itself) in a single listing,
+        keyed by path without the protocol.
+        """
+        try:
+            files: dict[str, dict[str, Any]] = self.fs.find(
+                remote_path, withdirs=False, detail=True
+            )  # pyright: ignore[reportAssignmentType]
+        except FileNotFoundError:
+            return {}
+
+        return files
+
+    def remote_info(self, remote_path: str) -> dict[str, Any] | None:
+        try:
+            return self.fs.info(remote_path)
+        except FileNotFoundError:
+            return None
+
+    def _is_identical(
+        self, local_path: str, info: dict[str, Any] | None, remote_is_newer: bool
+    ) -> bool:
+        if info is None or not os.path.exists(local_path):
+            return False
+
+        if info.get("size") != os.path.getsize(local_path):
+            return False
+
+        md5 = remote_md5(info)
+
+        if md5 is not None:
+            return md5 == md5_file(local_path)
+
+        mtime = remote_mtime(info)
+
+        if mtime is None:
+            return False
+
+        local_mtime = os.path.getmtime(local_path)
+
+        return mtime >= local_mtime if remote_is_newer else local_mtime >= mtime
+
+    def _upload(self, local_path: str, remote_path: str):
+        size = os.path.getsize(local_path)
+
+        if size <= self.part_size:
+            with open(local_path, "rb") as f:
+                self.fs.pipe_file(remote_path, f.read())
+            return
+
+        with (
+            open(local_path, "rb") as src,
+            # binary modes open buffered files
+            cast(
+                AbstractBufferedFile,
+                self.fs.open(remote_path, "wb", block_size=self.part_size),
+            ) as dst,
+        ):
+            shutil.copyfileobj(src, dst, self.part_size)
+
+    def _download(self, remote_path: str, local_path: str):
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        temp_path = f"{local_path}.tmp"
+
+        with (
+            cast(
+                AbstractBufferedFile,
+                self.fs.open(remote_path, "rb", block_size=self.part_size),
+            ) as src,
+            open(temp_path, "wb") as dst,
+        ):
+            shutil.copyfileobj(src, dst, self.part_size)
+
+        os.replace(temp_path, local_path)
+
+    def _run(
+        self,
+        label: str,
+        pairs: list[tuple[str, str]],
+        transfer: Callable[[str, str], None],
+        is_identical: Callable[[str, str], bool],
+        size_of: Callable[[str, str], int],
+    ) -> TransferStats:
+        stats = TransferStats()
+        lock = Lock()
+        start = perf_counter()
+
+        def run_one(pair: tuple[str, str]):
+            source, destination = pair
+
+            if is_identical(source, destination):
+                with lock:
+                    stats.skipped += 1
+                return
+
+            transfer(source, destination)
+            size = size_of(source, destination)
+
+            with lock:
+                stats.files += 1
+                stats.bytes += size
+
+            print(f"{label} {source} → {destination} ({size / 1024**2:,.1f} MB)")
+
+        if self.max_concurrency == 1 or len(pairs) <= 1:
+            for pair in pairs:
+                run_one(pair)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="transfer"
+            ) as executor:
+                # list() to raise the first error, if any
+                list(executor.map(run_one, pairs))
+
+        stats.elapsed_secs = perf_counter() - start
+
+        return stats
+
+    def upload(
+        self,
+        pairs: list[tuple[str, str]],
+        remote_infos: dict[str, dict[str, Any]] | None = None,
+    ) -> TransferStats:
+        """
+        Upload local files to the remote filesystem.
+
+        :param pairs: (local path, remote path) tuples.
+        :param remote_infos: The remote files' metadata, from `list_remote`. If not provided, each file is looked up.
+        :return: The transfer stats.
+        """
+
+        def is_identical(local_path: str, remote_path: str) -> bool:
+            key = strip_protocol(self.fs, remote_path)
+            info = (
+                remote_infos.get(key)
+                if remote_infos is not None
+                else self.remote_info(remote_path)
+            )
+            return self._is_identical(local_path, info, remote_is_newer=True)
+
+        return self._run(
+            "⬆️ ",
+            pairs,
+            self._upload,
+            is_identical,
+            lambda local_path, _: os.path.getsize(local_path),
+        )
+
+    def download(
+        self,
+        pairs: list[tuple[str, str]],
+        remote_infos: dict[str, dict[str, Any]],
+    ) -> TransferStats:
+        """
+        Download remote files to the local filesystem.
+
+        :param pairs: (remote path, local path) tuples.
+        :param remote_infos: The remote files' metadata, from `list_remote`.
+        :return: The transfer stats.
+        """
+
+        def info_for(remote_path: str) -> dict[str, Any] | None:
+            return remote_infos.get(strip_protocol(self.fs, remote_path))
+
+        return self._run(
+            "⬇️ ",
+            pairs,
+            self._download,
+            lambda remote_path, local_path: self._is_identical(
+                local_path, info_for(remote_path), remote_is_newer=False
+            ),
+            lambda _, local_path: os.path.getsize(local_path),
+        )
+
+
+__all__ = ["TransferEngine", "TransferStats", "strip_protocol"]
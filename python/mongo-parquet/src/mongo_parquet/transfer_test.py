@@ -0,0 +1,92 @@
+"""Tests for the transfer engine, using the local filesystem as the "remote"."""
+
+import os
+import fsspec
+from .transfer import TransferEngine, remote_md5
+
+
+def write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def upload_pairs(local_dir: str, remote_dir: str) -> list[tuple[str, str]]:
+    return [
+        (
+            os.path.join(root, file),
+            os.path.join(
+                remote_dir, os.path.relpath(os.path.join(root, file), local_dir)
+            ),
+        )
+        for root, _, files in os.walk(local_dir)
+        for file in files
+    ]
+
+
+def test_upload_and_skip_unchanged(tmp_path):
+    local_dir = str(tmp_path / "local")
+    remote_dir = str(tmp_path / "remote")
+    write(os.path.join(local_dir, "a.parquet"), b"a" * 100)
+    write(os.path.join(local_dir, "b.parquet", "year=2024", "0.parquet"), b"b" * 1000)
+
+    engine = TransferEngine(
+        fsspec.filesystem("file", auto_mkdir=True), max_concurrency=4, part_size=64
+    )
+
+    stats = engine.upload(
+        upload_pairs(local_dir, remote_dir), engine.list_remote(remote_dir)
+    )
+
+    assert (stats.files, stats.skipped, stats.bytes) == (2, 0, 1100)
+
+    with open(
+        os.path.join(remote_dir, "b.parquet", "year=2024", "0.parquet"), "rb"
+    ) as f:
+        assert f.read() == b"b" * 1000
+
+    stats = engine.upload(
+        upload_pairs(local_dir, remote_dir), engine.list_remote(remote_dir)
+    )
+
+    assert (stats.files, stats.skipped) == (0, 2)
+
+    # same size, but newer
+    write(os.path.join(local_dir, "a.parquet"), b"c" * 100)
+    os.utime(os.path.join(local_dir, "a.parquet"), (2e9, 2e9))
+
+    stats = engine.upload(upload_pairs(local_dir, remote_dir))
+
+    assert (stats.files, stats.skipped) == (1, 1)
+
+
+def test_download(tmp_path):
+    local_dir = str(tmp_path / "local")
+    remote_dir = str(tmp_path / "remote")
+    write(os.path.join(remote_dir, "x.parquet", "year=2024", "0.parquet"), b"x" * 500)
+
+    engine = TransferEngine(fsspec.filesystem("file", auto_mkdir=True), part_size=64)
+    remote_infos = engine.list_remote(os.path.join(remote_dir, "x.parquet"))
+    pairs = [
+        (key, os.path.join(local_dir, os.path.relpath(key, remote_dir)))
+        for key in remote_infos
+    ]
+
+    stats = engine.download(pairs, remote_infos)
+
+    assert stats.files == 1
+    with open(
+        os.path.join(local_dir, "x.parquet", "year=2024", "0.parquet"), "rb"
+    ) as f:
+        assert f.read() == b"x" * 500
+
+    assert engine.download(pairs, remote_infos).skipped == 1
+
+
+def test_remote_md5():
+    md5 = "0cc175b9c0f1b6a831c399e269772661"
+
+    assert remote_md5({"ETag": f'"{md5}"'}) == md5
+    assert remote_md5({"ETag": f'"{md5}-3"'}) is None
+    assert remote_md5({"content_settings": {"content_md5": bytes.fromhex(md5)}}) == md5
+    assert remote_md5({"etag": "0x8DC0A1B2C3D4E5F"}) is None
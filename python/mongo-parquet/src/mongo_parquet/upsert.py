@@ -0,0 +1,168 @@
+"""
+Keyed merges of the documents changed since the last sync into the Parquet file of a simple collection,
+instead of exporting the whole collection again.
+
+The documents changed since the last sync are found using a change field (e.g. `lastModified`) and the
+ObjectIds of new documents, both compared to their maximum in the existing file. Their rows replace
+the existing rows with the same `_id`, or are inserted if there are none. Deleted documents don't
+show up in either, so their rows are found by diffing the `_id`s of the file and the collection.
+"""
+
+from copy import deepcopy
+from datetime import datetime
+from typing import Any
+import polars as pl
+import pyarrow.parquet as pq
+from bson import ObjectId
+from .layout import ParquetLayout
+from .parquet_stats import file_min_max
+from .schemas import ObjectIdFormat
+
+
+def stored_watermark(
+    filepath: str, change_field: str
+) -> tuple[datetime, ObjectId] | None:
+    """
+    Get the latest change date and ObjectId of the documents in a Parquet file, from its footer statistics.
+
+    :param filepath: The path to the Parquet file.
+    :param change_field: The date field updated whenever a document changes.
+    :return: (latest change date, latest ObjectId), or None if the file is empty or has no statistics for them.
+    """
+    metadata = pq.read_metadata(filepath)
+
+    if metadata.num_rows == 0:
+        return None
+
+    _, last_changed = file_min_max(metadata, change_field)
+    _, last_id = file_min_max(metadata, "_id")
+
+    if not isinstance(last_changed, datetime) or last_id is None:
+        return None
+
+    # ObjectIds are stored either as hex strings or as their raw bytes
+    return last_changed, ObjectId(last_id)
+
+
+def stored_ids(ids: list[ObjectId], id_format: ObjectIdFormat) -> pl.Series:
+    """
+    Convert ObjectIds to an `_id` Series in the format they are stored in.
+    """
+    if id_format == "hex":
+        return pl.Series("_id", [str(id) for id in ids], dtype=pl.String)
+
+    return pl.Series("_id", [id.binary for id in ids], dtype=pl.Binary)
+
+
+def changed_since_filter(
+    base_filter: dict[str, Any] | None,
+    change_field: str,
+    last_changed: datetime,
+    last_id: ObjectId,
+) -> dict[str, Any]:
+    """
+    Combine a query filter with a condition matching the documents changed or created since the watermark.
+
+    The latest change date is included, as other documents may have been changed in the same millisecond.
+    The documents already stored at that date match too, so their rows are dropped with `drop_unchanged`.
+    """
+    changed = {
+        "$or": [
+            {change_field: {"$gte": last_changed}},
+            {"_id": {"$gt": last_id}},
+        ]
+    }
+
+    if not base_filter:
+        return changed
+
+    return {"$and": [deepcopy(base_filter), changed]}
+
+
+def drop_unchanged(existing: pl.LazyFrame, changes: pl.DataFrame) -> pl.DataFrame:
+    """
+    Drop the changed rows that are identical to the existing rows with the same `_id`,
+    e.g. the rows of the documents at the watermark, which are matched by every sync.
+
+    :param existing: The existing data, with ObjectIds in the stored format.
+    :param changes: The transformed rows of the changed documents, in the same format.
+    :return: The rows that are new or differ from the existing rows.
+    """
+    columns = [column for column in changes.columns if column != "_id"]
+
+    # rows can only be identical if both have the same columns
+    if changes.is_empty() or set(existing.collect_schema().names()) != set(
+        changes.columns
+    ):
+        return changes
+
+    stored = existing.filter(pl.col("_id").is_in(changes["_id"].implode())).select(
+        "_id",
+        *[
+            pl.col(column)
+            .cast(changes.schema[column], strict=False)
+            .alias(f"{column}_stored")
+            for column in columns
+        ],
+    )
+
+    unchanged_ids = (
+        changes.lazy()
+        .join(stored, on="_id", how="inner")
+        .filter(
+            pl.struct(columns).eq_missing(
+                pl.struct(
+                    [pl.col(f"{column}_stored").alias(column) for column in columns]
+                )
+            )
+        )
+        .select("_id")
+        .collect()["_id"]
+    )
+
+    return changes.filter(~pl.col("_id").is_in(unchanged_ids.implode()))
+
+
+def upsert_by_id(
+    existing: pl.LazyFrame,
+    changes: pl.DataFrame,
+    layout: ParquetLayout,
+    deleted_ids: pl.Series | None = None,
+) -> pl.DataFrame:
+    """
+    Merge changed rows into existing data by `_id`: the existing rows of changed or deleted documents
+    are removed, and the changed rows are inserted.
+
+    The result is sorted by the layout's sort columns, or by `_id` (i.e. in the order of a full export) if it has none.
+
+    :param existing: The existing data, with ObjectIds in the stored format.
+    :param changes: The transformed rows of the changed documents, in the same format.
+    :param layout: The layout of the Parquet model.
+    :param deleted_ids: The `_id`s of the deleted documents, in the stored format.
+    """
+    removed_ids = changes["_id"]
+
+    if deleted_ids is not None and len(deleted_ids) > 0:
+        removed_ids = pl.concat([removed_ids, deleted_ids.cast(removed_ids.dtype)])
+
+    merged = pl.concat(
+        [
+            existing.filter(~pl.col("_id").is_in(removed_ids.implode())),
+            changes.lazy(),
+        ],
+        how="diagonal_relaxed",
+    ).collect()
+
+    if layout.sort_columns(merged.columns):
+        return layout.sort(merged)
+
+    return merged.sort("_id", maintain_order=True)
+
+
+__all__ = [
+    "changed_since_filter",
+    "drop_unchanged",
+    "stored_ids",
+    "stored_watermark",
+    "upsert_by_id",
+]
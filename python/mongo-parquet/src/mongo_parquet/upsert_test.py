@@ -0,0 +1,107 @@
+"""Tests for the keyed merges of simple collections."""
+
+from datetime import datetime
+import polars as pl
+from bson import ObjectId
+from polars.testing import assert_frame_equal
+from .layout import DEFAULT_LAYOUT, ParquetLayout
+from .upsert import (
+    changed_since_filter,
+    drop_unchanged,
+    stored_watermark,
+    upsert_by_id,
+)
+
+ids = [str(ObjectId()) for _ in range(4)]
+
+existing = pl.DataFrame(
+    {
+        "_id": ids[:3],
+        "title": ["a", "b", "c"],
+        "lastModified": [datetime(2024, 1, day) for day in range(1, 4)],
+    }
+)
+
+
+def test_stored_watermark(tmp_path):
+    path = str(tmp_path / "pages.parquet")
+    existing.write_parquet(path)
+
+    assert stored_watermark(path, "lastModified") == (
+        datetime(2024, 1, 3),
+        ObjectId(ids[2]),
+    )
+    assert stored_watermark(path, "updatedAt") is None
+
+    existing.with_columns(pl.col("_id").str.decode("hex")).write_parquet(path)
+
+    assert stored_watermark(path, "lastModified") == (
+        datetime(2024, 1, 3),
+        ObjectId(ids[2]),
+    )
+
+
+def test_changed_since_filter():
+    last_changed, last_id = datetime(2024, 1, 3), ObjectId(ids[2])
+    changed = {
+        "$or": [
+            {"lastModified": {"$gte": last_changed}},
+            {"_id": {"$gt": last_id}},
+        ]
+    }
+
+    assert changed_since_filter(None, "lastModified", last_changed, last_id) == changed
+    assert changed_since_filter(
+        {"url": {"$exists": True}}, "lastModified", last_changed, last_id
+    ) == {"$and": [{"url": {"$exists": True}}, changed]}
+
+
+def test_drop_unchanged():
+    changes = pl.DataFrame(
+        {
+            "_id": [ids[2], ids[1], ids[3]],
+            "title": ["c", "b2", "d"],
+            "lastModified": [datetime(2024, 1, 3)] * 3,
+        }
+    )
+
+    # the document at the watermark is unchanged, but not the one changed in the same millisecond
+    assert_frame_equal(drop_unchanged(existing.lazy(), changes), changes.slice(1))
+    assert drop_unchanged(existing.lazy(), changes.slice(0, 1)).is_empty()
+    # rows with other columns are never identical
+    assert_frame_equal(
+        drop_unchanged(existing.lazy(), changes.drop("title")), changes.drop("title")
+    )
+
+
+def test_upsert_by_id():
+    changes = pl.DataFrame(
+        {
+            "_id": [ids[3], ids[0]],
+            "title": ["d", "a2"],
+            "lastModified": [datetime(2024, 1, 4), datetime(2024, 1, 5)],
+        }
+    )
+
+    merged = upsert_by_id(existing.lazy(), changes, DEFAULT_LAYOUT, pl.Series([ids[1]]))
+
+    assert_frame_equal(
+        merged,
+        pl.DataFrame(
+            {
+                "_id": [ids[0], ids[2], ids[3]],
+                "title": ["a2", "c", "d"],
+                "lastModified": [
+                    datetime(2024, 1, 5),
+                    datetime(2024, 1, 3),
+                    datetime(2024, 1, 4),
+                ],
+            }
+        ),
+    )
+
+    by_date = upsert_by_id(
+        existing.lazy(), changes, ParquetLayout(sort_by=["lastModified"])
+    )
+
+    assert by_date["title"].to_list() == ["b", "c", "d", "a2"]
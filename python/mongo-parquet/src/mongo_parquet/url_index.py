@@ -0,0 +1,326 @@
+"""
+A sidecar index of where each URL's rows are in the partitions of the per-page models,
+so that one page's history can be read without scanning every partition.
+
+The partitions are sorted by date, then URL, so a URL's rows are spread over all their row groups.
+The index keeps a copy of each partition sorted by URL instead, in which they're in one or two row groups.
+As the copies double the disk space of these models, the index is only refreshed by syncs with `index_urls`.
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import cast, final
+import polars as pl
+import pyarrow.parquet as pq
+from .catalog import DictionaryCatalog
+from .layout import ParquetLayout
+from .schemas import ParquetModel, ParquetModels, ids_to_hex
+from .utils import list_parquet_files
+
+INDEXED_MODELS = ("page_metrics", "gsc_searchterms", "activity_map")
+
+ENTRY_SCHEMA = pl.Schema(
+    {
+        "url": pl.UInt32,
+        "file": pl.Categorical(),
+        "row_group": pl.UInt32,
+        "first_row": pl.UInt32,
+        "last_row": pl.UInt32,
+        "min_date": pl.Datetime("ms"),
+        "max_date": pl.Datetime("ms"),
+    }
+)
+"""
+One entry per URL, file and row group of the file's copy: the range of rows of the row group that contains
+all of the URL's rows, and their dates. URLs are stored as their code in the dictionary catalog.
+"""
+
+CLUSTERED_LAYOUT = ParquetLayout(sort_by=["url", "date"], row_group_size=8 * 1024)
+"""The layout of the copies of the indexed files, with each URL's rows next to each other"""
+
+
+def _file_state(filepath: str) -> dict[str, int]:
+    stat = os.stat(filepath)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _model_files(parquet_model: ParquetModel) -> list[str]:
+    path = os.path.join(parquet_model.dir_path, parquet_model.parquet_filename)
+
+    if not os.path.isdir(path):
+        return [path] if os.path.exists(path) else []
+
+    return list_parquet_files(path)
+
+
+@final
+class UrlIndex:
+    """
+    Maps URLs to the row groups and row ranges of the Parquet files containing them.
+
+    The row groups are those of copies of the files sorted by URL, which are stored with the index.
+
+    Like the dictionary catalog, the index keeps track of the size and mtime of the files it has read:
+    `refresh` only indexes new or rewritten files, and `lookup` scans the files that changed
+    since they were indexed instead of trusting stale entries.
+    """
+
+    dir_name = "_url_index"
+    version = 2
+
+    def __init__(self, parquet_dir_path: str, catalog: DictionaryCatalog | None = None):
+        """
+        :param parquet_dir_path: The directory of the Parquet files. The index is stored in a subdirectory.
+        :param catalog: The dictionary catalog, whose URL codes are stored in the index.
+        """
+        self.parquet_dir_path = os.path.abspath(parquet_dir_path)
+        self.dir_path = os.path.join(self.parquet_dir_path, self.dir_name)
+        self.sources_path = os.path.join(self.dir_path, "sources.json")
+        self.catalog = catalog or DictionaryCatalog(parquet_dir_path)
+        # parquet filename -> relative path -> size and mtime of the indexed files
+        self.sources: dict[str, dict[str, dict[str, int]]] = self._load_sources()
+
+    def _load_sources(self) -> dict[str, dict[str, dict[str, int]]]:
+        if not os.path.exists(self.sources_path):
+            return {}
+
+        with open(self.sources_path, "r") as f:
+            data = json.load(f)
+
+        if data.get("version") != self.version:
+            return {}
+
+        return data.get("files", {})
+
+    def entries_path(self, parquet_model: ParquetModel) -> str:
+        name = parquet_model.parquet_filename.removesuffix(".parquet")
+        return os.path.join(self.dir_path, f"{name}.arrow")
+
+    def entries(self, parquet_model: ParquetModel) -> pl.DataFrame:
+        """
+        Get the index entries of a model's files, sorted by URL code.
+        """
+        path = self.entries_path(parquet_model)
+
+        if not os.path.exists(path):
+            return pl.DataFrame(schema=ENTRY_SCHEMA)
+
+        return pl.read_ipc(path, memory_map=False)
+
+    def clustered_path(self, key: str) -> str:
+        """
+        Get the path of the copy of an indexed file, sorted by URL.
+
+        :param key: The path of the file, relative to the Parquet directory.
+        """
+        return os.path.join(self.dir_path, key)
+
+    def index_file(self, filepath: str) -> pl.DataFrame:
+        """
+        Write a copy of a Parquet file sorted by URL, and get the index entries of the copy,
+        adding its URLs to the catalog.
+        """
+        key = os.path.relpath(filepath, self.parquet_dir_path)
+        clustered_path = self.clustered_path(key)
+
+        CLUSTERED_LAYOUT.write(
+            pl.read_parquet(filepath, hive_partitioning=False), f"{clustered_path}.tmp"
+        )
+        os.replace(f"{clustered_path}.tmp", clustered_path)
+
+        parquet_file = pq.ParquetFile(clustered_path)
+        row_groups: list[pl.DataFrame] = []
+
+        for row_group in range(parquet_file.metadata.num_row_groups):
+            df = cast(
+                pl.DataFrame,
+                pl.from_arrow(
+                    parquet_file.read_row_group(row_group, columns=["url", "date"])
+                ),
+            )
+
+            row_groups.append(
+                df.with_row_index("row")
+                .filter(pl.col("url").is_not_null())
+                .group_by("url")
+                .agg(
+                    pl.col("row").min().alias("first_row"),
+                    pl.col("row").max().alias("last_row"),
+                    pl.col("date").min().alias("min_date"),
+                    pl.col("date").max().alias("max_date"),
+                )
+                .with_columns(pl.lit(row_group).alias("row_group"))
+            )
+
+        if not row_groups:
+            return pl.DataFrame(schema=ENTRY_SCHEMA)
+
+        entries = pl.concat(row_groups)
+
+        # the codes of new URLs are only final once saved
+        if self.catalog.add("urls", entries["url"]):
+            self.catalog.save()
+
+        return entries.with_columns(
+            pl.col("url").cast(self.catalog.enum("urls")).to_physical(),
+            pl.lit(key).alias("file"),
+        ).select([pl.col(name).cast(dtype) for name, dtype in ENTRY_SCHEMA.items()])
+
+    def refresh(self, parquet_models: ParquetModels) -> int:
+        """
+        Index the new or rewritten files of the indexed models, drop the entries of deleted files,
+        and save the index.
+
+        :param parquet_models: The models of the Parquet files.
+        :return: The number of files indexed.
+        """
+        indexed = 0
+
+        for model_name in INDEXED_MODELS:
+            parquet_model = cast(ParquetModel, parquet_models[model_name])
+            previous_sources = self.sources.get(parquet_model.parquet_filename, {})
+
+            sources = {
+                os.path.relpath(filepath, self.parquet_dir_path): _file_state(filepath)
+                for filepath in _model_files(parquet_model)
+            }
+            changed = [
+                key
+                for key, state in sources.items()
+                if previous_sources.get(key) != state
+            ]
+
+            if not changed and sources.keys() == previous_sources.keys():
+                continue
+
+            for key in previous_sources.keys() - sources.keys():
+                if os.path.exists(self.clustered_path(key)):
+                    os.remove(self.clustered_path(key))
+
+            print(
+                f"Indexing {len(changed)} files of {parquet_model.parquet_filename}..."
+            )
+
+            kept = self.entries(parquet_model).filter(
+                pl.col("file").cast(pl.String).is_in(list(sources))
+                & pl.col("file").cast(pl.String).is_in(changed).not_()
+            )
+
+            entries = pl.concat(
+                [kept]
+                + [
+                    self.index_file(os.path.join(self.parquet_dir_path, key))
+                    for key in changed
+                ]
+            ).sort("url", "file", "row_group")
+
+            os.makedirs(self.dir_path, exist_ok=True)
+            path = self.entries_path(parquet_model)
+            entries.write_ipc(f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+
+            self.sources[parquet_model.parquet_filename] = sources
+            indexed += len(changed)
+
+        # the entries refer to the URL codes, so the catalog is saved first
+        self.catalog.save()
+        self.save()
+
+        return indexed
+
+    def save(self):
+        os.makedirs(self.dir_path, exist_ok=True)
+
+        with open(f"{self.sources_path}.tmp", "w") as f:
+            json.dump(
+                {"version": self.version, "files": self.sources},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+
+        os.replace(f"{self.sources_path}.tmp", self.sources_path)
+
+    def lookup(
+        self,
+        parquet_model: ParquetModel,
+        url: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> pl.DataFrame:
+        """
+        Read the rows of a URL, only reading the row groups of the files' copies that contain it.
+        Files that aren't indexed, or changed since they were indexed, are scanned instead.
+
+        :param parquet_model: The model of the Parquet files.
+        :param url: The URL.
+        :param start: Only include rows on or after this date.
+        :param end: Only include rows on or before this date.
+        :return: The rows of the URL, sorted by date, with ObjectIds as hex strings.
+        """
+        predicate = pl.col("url") == url
+
+        if start is not None:
+            predicate = predicate & (pl.col("date") >= start)
+        if end is not None:
+            predicate = predicate & (pl.col("date") <= end)
+
+        indexed_sources = self.sources.get(parquet_model.parquet_filename, {})
+        indexed_files: set[str] = set()
+        frames: list[pl.LazyFrame] = []
+
+        for filepath in _model_files(parquet_model):
+            key = os.path.relpath(filepath, self.parquet_dir_path)
+
+            if indexed_sources.get(key) == _file_state(filepath):
+                indexed_files.add(key)
+            else:
+                frames.append(
+                    ids_to_hex(
+                        pl.scan_parquet(filepath, hive_partitioning=False)
+                    ).filter(predicate)
+                )
+
+        urls = self.catalog.values("urls")
+        codes = (urls == url).arg_true()
+
+        if indexed_files and codes.len() > 0:
+            entries = self.entries(parquet_model).filter(
+                (pl.col("url") == codes[0])
+                & pl.col("file").cast(pl.String).is_in(indexed_files)
+            )
+
+            if start is not None:
+                entries = entries.filter(pl.col("max_date") >= start)
+            if end is not None:
+                entries = entries.filter(pl.col("min_date") <= end)
+
+            for (file,), file_entries in entries.group_by("file", maintain_order=True):
+                parquet_file = pq.ParquetFile(self.clustered_path(str(file)))
+
+                for entry in file_entries.iter_rows(named=True):
+                    row_group = cast(
+                        pl.DataFrame,
+                        pl.from_arrow(parquet_file.read_row_group(entry["row_group"])),
+                    )
+                    frames.append(
+                        ids_to_hex(
+                            row_group.slice(
+                                entry["first_row"],
+                                entry["last_row"] - entry["first_row"] + 1,
+                            ).lazy()
+                        ).filter(predicate)
+                    )
+
+        if not frames:
+            return pl.DataFrame()
+
+        return (
+            pl.concat(frames, how="vertical_relaxed")
+            .sort("date", maintain_order=True)
+            .collect()
+        )
+
+
+__all__ = ["CLUSTERED_LAYOUT", "ENTRY_SCHEMA", "INDEXED_MODELS", "UrlIndex"]
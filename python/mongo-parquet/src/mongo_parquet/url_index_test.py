@@ -0,0 +1,103 @@
+"""Tests for the URL index."""
+
+import os
+from datetime import datetime
+import polars as pl
+import pyarrow.parquet as pq
+import pytest
+from polars.testing import assert_frame_equal
+from . import url_index
+from .layout import ParquetLayout
+from .schemas import get_parquet_models
+from .url_index import UrlIndex
+
+layout = ParquetLayout(sort_by=["date", "url"], row_group_size=4)
+
+
+def scan(dir_path: str, url: str) -> pl.DataFrame:
+    return (
+        pl.scan_parquet(
+            os.path.join(dir_path, "pages_metrics.parquet", "**", "*.parquet"),
+            hive_partitioning=False,
+        )
+        .filter(pl.col("url") == url)
+        .sort("date")
+        .collect()
+    )
+
+
+class TestUrlIndex:
+    """Test that lookups read the indexed row groups of a URL, and changed files."""
+
+    @pytest.fixture(autouse=True)
+    def clustered_layout(self, monkeypatch):
+        # small row groups, so that the rows of a URL can be in more than one
+        monkeypatch.setattr(
+            url_index,
+            "CLUSTERED_LAYOUT",
+            ParquetLayout(sort_by=["url", "date"], row_group_size=4),
+        )
+
+    def test_lookup(self, parquet_dir, write_metrics):
+        write_metrics(1, ["/a", "/b", "/c"], layout)
+        write_metrics(2, ["/b", "/d"], layout)
+
+        models = get_parquet_models(parquet_dir)
+        page_metrics = models["page_metrics"]
+
+        assert UrlIndex(parquet_dir).refresh(models) == 2
+        assert UrlIndex(parquet_dir).refresh(models) == 0
+
+        index = UrlIndex(parquet_dir)
+
+        assert index.entries(page_metrics)["row_group"].max() == 2
+        assert_frame_equal(index.lookup(page_metrics, "/b"), scan(parquet_dir, "/b"))
+        assert index.lookup(page_metrics, "/b", start=datetime(2024, 1, 3)).height == 4
+        assert index.lookup(page_metrics, "/b", end=datetime(2024, 1, 1)).height == 1
+        assert index.lookup(page_metrics, "/e").is_empty()
+
+    def test_lookup_reads_changed_files(self, parquet_dir, write_metrics):
+        write_metrics(1, ["/a", "/b"], layout)
+
+        models = get_parquet_models(parquet_dir)
+        assert UrlIndex(parquet_dir).refresh(models) == 1
+
+        # rewritten after indexing, with rows in different places
+        write_metrics(1, ["/0", "/c", "/b", "/a"], layout)
+
+        index = UrlIndex(parquet_dir)
+
+        assert_frame_equal(
+            index.lookup(models["page_metrics"], "/a"), scan(parquet_dir, "/a")
+        )
+        assert index.lookup(models["page_metrics"], "/c").height == 3
+
+    def test_lookup_reads_the_row_groups_of_the_url(
+        self, parquet_dir, write_metrics, monkeypatch
+    ):
+        urls = [f"/{i}" for i in range(10)]
+        filepath = write_metrics(1, urls, layout)
+
+        models = get_parquet_models(parquet_dir)
+        _ = UrlIndex(parquet_dir).refresh(models)
+
+        read_row_groups: list[int] = []
+        read_row_group = pq.ParquetFile.read_row_group
+
+        def counted_read_row_group(
+            parquet_file: pq.ParquetFile, i: int, *args, **kwargs
+        ):
+            read_row_groups.append(i)
+            return read_row_group(parquet_file, i, *args, **kwargs)
+
+        monkeypatch.setattr(pq.ParquetFile, "read_row_group", counted_read_row_group)
+
+        index = UrlIndex(parquet_dir)
+
+        assert_frame_equal(
+            index.lookup(models["page_metrics"], "/5"), scan(parquet_dir, "/5")
+        )
+        # the file has a row of the URL in 3 of its 8 row groups,
+        # the copy has its 3 rows in at most 2
+        assert pq.read_metadata(filepath).num_row_groups == 8
+        assert len(read_row_groups) <= 2
@@ -5,8 +5,9 @@ import re
 import shutil
 from typing import Any, Literal, final
 import polars as pl
-import hashlib
+from threading import Lock
 from pymongoarrow.types import ObjectId
+from .sync_manifest import SyncManifest
 
 
 def last_day_of_month(any_day: datetime) -> datetime:
@@ -58,6 +59,30 @@ def year_range(
         start = next_year
 
 
+def partition_range(
+    partition_by: Literal["month", "year"],
+    start: str | datetime,
+    end: str | datetime,
+    exact_start_date: bool = False,
+):
+    """
+    Iterate over the (start, end) date windows of a partitioned parquet model.
+
+    :param partition_by: The partitioning type of the model.
+    :param start: The start date of the range.
+    :param end: The end date of the range.
+    :param exact_start_date: Whether to keep the start date as-is instead of
+        snapping it to the start of the partition.
+    """
+    if partition_by == "month":
+        return month_range(start, end, exact_start_date=exact_start_date)
+
+    if partition_by == "year":
+        return year_range(start, end, exact_start_date=exact_start_date)
+
+    raise ValueError(f"Unsupported partitioning type: {partition_by}")
+
+
 def format_timedelta(td: timedelta) -> str:
     if td.total_seconds() < 1:
         return str(td)
@@ -127,15 +152,19 @@ def get_partition_values(
     )
 
 
-def hash_file(filepath: str) -> str:
+def list_parquet_files(path: str) -> list[str]:
     """
-    Generate a MD5 hash for a file.
+    List the Parquet files of a partitioned dataset directory, excluding temporary files.
 
-    :param filepath: Path to the file to hash.
-    :return: MD5 hash of the file's contents.
+    :param path: Path to the dataset directory.
+    :return: The sorted file paths.
     """
-    with open(filepath, "rb") as f:
-        return hashlib.file_digest(f, "md5").hexdigest()
+    return sorted(
+        os.path.join(root, file)
+        for root, _, files in os.walk(path)
+        for file in files
+        if file.endswith(".parquet") and not file.endswith(".tmp.parquet")
+    )
 
 
 # Currently unused
@@ -227,83 +256,126 @@ class SyncUtils:
     """
     Utilities for syncing data between MongoDB and Parquet files, such as:
 
-    - Hashing before and after, to skip uploading unchanged files.
+    - Tracking file state before and after in a persistent manifest, to skip uploading unchanged files.
     - Partition helpers for generating partitioned file paths for partial uploads.
     - Other helpers as needed.
     """
 
-    file_hashes: dict[str, str] = {}
-    new_data_hashes: dict[str, str] = {}
+    manifest_filename = "_sync_manifest.json"
 
-    upload_queue: list[str] = []
-
-    partition_overlaps: dict[str, list[str]] = {}
-
-    def __init__(self, parquet_dir_path: str, temp_dir_name: str = ".sync_temp"):
+    def __init__(
+        self,
+        parquet_dir_path: str,
+        temp_dir_name: str = ".sync_temp",
+        use_checksums: bool = False,
+        append_segments: bool = False,
+    ):
+        """
+        :param parquet_dir_path: The root directory of the Parquet files.
+        :param temp_dir_name: The name of the temp directory, next to the root directory.
+        :param use_checksums: Whether to checksum rewritten files, to avoid re-uploading files rewritten with the same contents.
+        :param append_segments: Whether to write the new data of partitioned models to new segment files,
+                                instead of rewriting the partitions. See `segments`.
+        """
         temp_dir_str = os.path.join(parquet_dir_path, "..", temp_dir_name)
         self.parquet_dir_path: str = os.path.abspath(parquet_dir_path)
         self.temp_dir_path: str = os.path.abspath(temp_dir_str)
         self.backup_dir_path: str = os.path.join(self.temp_dir_path, "backup")
         self.incremental_dir_path: str = os.path.join(self.temp_dir_path, "incremental")
 
+        self.manifest = SyncManifest(
+            self.parquet_dir_path,
+            os.path.join(self.parquet_dir_path, self.manifest_filename),
+            use_checksums=use_checksums,
+        )
+
+        self.append_segments = append_segments
+
+        # uploads and deletes that didn't complete in a previous run are still pending
+        self.upload_queue: list[str] = self.manifest.pending_uploads
+        self.delete_queue: list[str] = self.manifest.pending_deletes
+        self.partition_overlaps: dict[str, list[str]] = {}
+        self._queue_lock = Lock()
+
         self.ensure_temp_dirs()
 
     def file_has_changed(self, filepath: str) -> bool:
         """
-        Check if a file has changed since the last hash check.
+        Check if a file has changed since its state was last recorded.
 
         :param filepath: Path to the file to check.
         :return: True if the file has changed, False otherwise.
         """
-        absolute_path = os.path.abspath(filepath)
-
-        previous_hash = self.file_hashes.get(absolute_path)
+        return self.manifest.has_changed(filepath)
 
-        if previous_hash is None:
-            return True
-
-        current_hash = hash_file(absolute_path)
+    def record_file_state(self, filepath: str):
+        """
+        Record the current state of a file or partition folder, only reading files
+        whose size or modification time changed since they were last recorded.
 
-        return previous_hash != current_hash
+        :param filepath: Path to the file or partition folder.
+        """
+        self.manifest.record(filepath)
 
-    def add_hash(self, filepath: str):
+    def queue_file_upload(self, file_path: str):
         """
-        Add or update the hash of a file or partition folder.
+        Queue a file for upload. A file that was queued to be deleted, then written again, is uploaded instead.
 
-        :param filepath: Path to the file or partition folder to hash.
+        :param file_path: Path to the file, stored relative to the root sync directory.
         """
-        if os.path.isdir(filepath):
-            for root, _, files in os.walk(filepath):
-                for file in files:
-                    if file.endswith(".parquet"):
-                        partition_filepath = os.path.join(root, file)
+        relative_path = self.manifest.relative_path(file_path)
 
-                        self.add_hash(partition_filepath)
-            return
-        absolute_path = os.path.abspath(filepath)
+        with self._queue_lock:
+            if relative_path in self.delete_queue:
+                self.delete_queue.remove(relative_path)
+            if relative_path not in self.upload_queue:
+                self.upload_queue.append(relative_path)
 
-        if self.file_hashes.get(absolute_path) is not None:
-            raise ValueError(f"Hash for {absolute_path} already exists.")
+    def queue_upload_if_changed(self, file_path: str):
+        """
+        Add a file to the upload queue if it has changed, and record its new state.
 
-        self.file_hashes[absolute_path] = hash_file(absolute_path)
+        :param file_path: Path to the file.
+        """
+        if self.manifest.update(file_path):
+            self.queue_file_upload(file_path)
 
-    def queue_file_upload(self, file_path: str):
+    def queue_file_delete(self, file_path: str):
         """
-        Queue a file for upload.
+        Forget a file that was deleted locally, and queue it to be deleted from remote storage.
 
-        :param file_path: File path, relative to the root sync directory.
+        :param file_path: Path to the file, stored relative to the root sync directory.
         """
-        if file_path in self.upload_queue:
-            raise ValueError(f"Upload path for {file_path} already exists.")
+        relative_path = self.manifest.relative_path(file_path)
+        _ = self.manifest.update(file_path)
 
-    def queue_upload_if_changed(self, file_path: str):
+        with self._queue_lock:
+            if relative_path in self.upload_queue:
+                self.upload_queue.remove(relative_path)
+            if relative_path not in self.delete_queue:
+                self.delete_queue.append(relative_path)
+
+    def save_manifest(self):
+        self.manifest.save()
+
+    def clear_upload_queue(self):
         """
-        Add a file to the upload queue if it has changed.
+        Clear the upload queue once the files have been uploaded (or won't be), and save the manifest.
+        """
+        with self._queue_lock:
+            self.upload_queue.clear()
+
+        self.save_manifest()
 
-        :param file_path: File path, relative to the root sync directory.
+    def clear_delete_queue(self):
         """
-        if self.file_has_changed(file_path):
-            self.queue_file_upload(file_path)
+        Clear the delete queue once the files have been deleted from remote storage, and save the manifest.
+        Unlike uploads, deletes are kept until they are done, as remote readers would otherwise see duplicate rows.
+        """
+        with self._queue_lock:
+            self.delete_queue.clear()
+
+        self.save_manifest()
 
     def ensure_temp_dirs(self):
         os.makedirs(self.temp_dir_path, exist_ok=True)
@@ -338,16 +410,21 @@ class SyncUtils:
             raise FileNotFoundError(f"Backup file {backup_path} does not exist.")
 
         filepath = os.path.join(self.parquet_dir_path, filename)
-        shutil.copy(backup_path, filepath)
+        temp_path = re.sub(r"\.parquet$", ".tmp.parquet", filepath)
+
+        # replace the file instead of overwriting it, so snapshots linking to it keep their contents
+        shutil.copy(backup_path, temp_path)
+        os.replace(temp_path, filepath)
 
 
 __all__ = [
     "last_day_of_month",
     "month_range",
     "year_range",
+    "partition_range",
     "ensure_dataframe",
     "convert_objectids",
     "get_partition_values",
-    "hash_file",
+    "list_parquet_files",
     "SyncUtils",
 ]
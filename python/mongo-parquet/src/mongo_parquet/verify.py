@@ -0,0 +1,235 @@
+"""
+Drift detection for incremental models. Syncs only fetch the documents dated after the latest date
+in Parquet, so corrections to days that were already synced never reach it.
+
+The row counts and the sums of some numeric fields are aggregated per month with a `$group` in MongoDB,
+and from the Parquet files (the counts of monthly partitions from their footers), so that only
+the months whose aggregates differ need to be synced again.
+"""
+
+import os
+from datetime import datetime
+from typing import Any
+import polars as pl
+import pyarrow.parquet as pq
+from pymongo.collection import Collection
+from .layout import ParquetLayout
+from .remote_scan import hive_partition_values
+from .schemas import ParquetModel
+from .utils import list_parquet_files
+
+type Month = tuple[int, int]
+"""A (year, month) pair"""
+
+type Aggregates = dict[Month, dict[str, int | float]]
+"""The `count` of rows and the sums of the checksum fields, by month"""
+
+
+def next_month(year: int, month: int) -> datetime:
+    return datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+
+
+def month_filter(months: list[Month]) -> dict[str, Any]:
+    """
+    A query filter for the documents dated in any of the months.
+    """
+    windows = [
+        {"date": {"$gte": datetime(year, month, 1), "$lt": next_month(year, month)}}
+        for year, month in sorted(months)
+    ]
+
+    return windows[0] if len(windows) == 1 else {"$or": windows}
+
+
+def in_months(months: list[Month]) -> pl.Expr:
+    """
+    An expression for the rows dated in any of the months.
+    """
+    return (
+        pl.col("date").dt.year().cast(pl.Int64) * 100 + pl.col("date").dt.month()
+    ).is_in([year * 100 + month for year, month in months])
+
+
+def mongo_aggregates(
+    collection: Collection[Any],
+    base_filter: dict[str, Any] | None,
+    sum_fields: list[str],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Aggregates:
+    """
+    Aggregate the documents of a collection by month, in MongoDB.
+
+    :param collection: The collection.
+    :param base_filter: The filter of the documents exported to Parquet, without any date condition.
+    :param sum_fields: The numeric fields to sum.
+    :param start: Only include documents on or after this date.
+    :param end: Only include documents before this date.
+    """
+    date_filter: dict[str, Any] = {"$type": "date"}
+
+    if start is not None:
+        date_filter["$gte"] = start
+
+    if end is not None:
+        date_filter["$lt"] = end
+
+    results = collection.aggregate(
+        [
+            {"$match": {**(base_filter or {}), "date": date_filter}},
+            {
+                "$group": {
+                    "_id": {"year": {"$year": "$date"}, "month": {"$month": "$date"}},
+                    "count": {"$sum": 1},
+                    **{field: {"$sum": f"${field}"} for field in sum_fields},
+                }
+            },
+        ]
+    )
+
+    return {
+        (result["_id"]["year"], result["_id"]["month"]): {
+            "count": result["count"],
+            **{field: result[field] for field in sum_fields},
+        }
+        for result in results
+    }
+
+
+def parquet_aggregates(
+    parquet_model: ParquetModel,
+    sum_fields: list[str],
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> Aggregates:
+    """
+    Aggregate the rows of a Parquet model by month. The counts of monthly partitions are read from
+    their footers, and their data is only read for the sums, one partition and column at a time.
+
+    :param parquet_model: The model, whose rows must have a `date`.
+    :param sum_fields: The numeric columns to sum.
+    :param start: Only include rows on or after this date.
+    :param end: Only include rows before this date.
+    """
+    read_path = os.path.join(parquet_model.dir_path, parquet_model.parquet_filename)
+
+    if not os.path.exists(read_path):
+        return {}
+
+    if parquet_model.partition_by != "month" or not os.path.isdir(read_path):
+        lf = parquet_model.lf(hex_ids=False, start=start)
+
+        if end is not None:
+            lf = lf.filter(pl.col("date") < end)
+
+        results = (
+            lf.filter(pl.col("date").is_not_null())
+            .group_by(
+                pl.col("date").dt.year().alias("year"),
+                pl.col("date").dt.month().alias("month"),
+            )
+            .agg(
+                pl.len().alias("count"), *[pl.col(field).sum() for field in sum_fields]
+            )
+            .collect()
+        )
+
+        return {
+            (row["year"], row["month"]): {
+                "count": row["count"],
+                **{field: row[field] for field in sum_fields},
+            }
+            for row in results.iter_rows(named=True)
+        }
+
+    files_by_month: dict[Month, list[str]] = {}
+
+    for file in list_parquet_files(read_path):
+        partition = hive_partition_values(os.path.relpath(file, read_path))
+        month = (partition.get("year", 0), partition.get("month", 0))
+
+        if (start is not None and next_month(*month) <= start) or (
+            end is not None and datetime(*month, 1) >= end
+        ):
+            continue
+
+        files_by_month.setdefault(month, []).append(file)
+
+    aggregates: Aggregates = {}
+
+    for month, files in files_by_month.items():
+        count = sum(pq.read_metadata(file).num_rows for file in files)
+
+        if count == 0:
+            continue
+
+        sums = (
+            pl.scan_parquet(files, hive_partitioning=False)
+            .select([pl.col(field).sum() for field in sum_fields])
+            .collect()
+            .row(0, named=True)
+            if sum_fields
+            else {}
+        )
+
+        aggregates[month] = {"count": count, **sums}
+
+    return aggregates
+
+
+def drifted_months(
+    mongo: Aggregates, parquet: Aggregates, tolerance: float = 1e-9
+) -> list[Month]:
+    """
+    Get the months whose aggregates differ between MongoDB and Parquet.
+
+    :param tolerance: The relative difference allowed between sums, as floating point sums depend on the order of the values.
+    """
+
+    def differs(a: int | float | None, b: int | float | None) -> bool:
+        a, b = a or 0, b or 0
+        return abs(a - b) > tolerance * max(1, abs(a), abs(b))
+
+    return sorted(
+        month
+        for month in mongo.keys() | parquet.keys()
+        if any(
+            differs(mongo.get(month, {}).get(key), parquet.get(month, {}).get(key))
+            for key in mongo.get(month, {}).keys() | parquet.get(month, {}).keys()
+        )
+    )
+
+
+def replace_months(
+    existing: pl.LazyFrame,
+    rows: pl.DataFrame,
+    months: list[Month],
+    layout: ParquetLayout,
+) -> pl.DataFrame:
+    """
+    Replace the rows of some months with the rows read again from MongoDB.
+
+    The result is sorted by the layout's sort columns, or by `date` if it has none, as incremental syncs append by date.
+    """
+    merged = pl.concat(
+        [existing.filter(~in_months(months).fill_null(False)), rows.lazy()],
+        how="diagonal_relaxed",
+    ).collect()
+
+    if layout.sort_columns(merged.columns):
+        return layout.sort(merged)
+
+    return merged.sort("date", maintain_order=True)
+
+
+__all__ = [
+    "Aggregates",
+    "Month",
+    "drifted_months",
+    "in_months",
+    "mongo_aggregates",
+    "month_filter",
+    "next_month",
+    "parquet_aggregates",
+    "replace_months",
+]
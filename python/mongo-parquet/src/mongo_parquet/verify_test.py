@@ -0,0 +1,107 @@
+"""Tests for the drift detection of incremental models."""
+
+import os
+from datetime import datetime
+import polars as pl
+from polars.testing import assert_frame_equal
+from .layout import DEFAULT_LAYOUT
+from .schemas import get_parquet_models
+from .verify import (
+    Aggregates,
+    drifted_months,
+    month_filter,
+    parquet_aggregates,
+    replace_months,
+)
+
+
+def metrics(dates: list[datetime], visits: int = 1) -> pl.DataFrame:
+    return pl.DataFrame(
+        {"date": dates, "visits": [visits] * len(dates)},
+        schema={"date": pl.Datetime("ms"), "visits": pl.Int32},
+    )
+
+
+def write(dir_path: str, path: str, df: pl.DataFrame):
+    filepath = os.path.join(dir_path, path)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    df.write_parquet(filepath)
+
+
+def test_parquet_aggregates(tmp_path):
+    dir_path = str(tmp_path)
+    partition = os.path.join("pages_metrics.parquet", "year=2024", "month={}")
+
+    write(
+        dir_path,
+        os.path.join(partition.format(1), "0.parquet"),
+        metrics([datetime(2024, 1, 1)] * 3),
+    )
+    write(
+        dir_path,
+        os.path.join(partition.format(1), "1.parquet"),
+        metrics([datetime(2024, 1, 31)], 5),
+    )
+    write(
+        dir_path,
+        os.path.join(partition.format(2), "0.parquet"),
+        metrics([datetime(2024, 2, 1)]),
+    )
+    write(
+        dir_path,
+        "overall_metrics.parquet",
+        metrics(
+            [datetime(2024, 1, 1), datetime(2024, 1, 31, 12), datetime(2024, 3, 1)]
+        ),
+    )
+
+    models = get_parquet_models(dir_path)
+
+    assert parquet_aggregates(models["page_metrics"], ["visits"]) == {
+        (2024, 1): {"count": 4, "visits": 8},
+        (2024, 2): {"count": 1, "visits": 1},
+    }
+    assert parquet_aggregates(
+        models["page_metrics"], [], start=datetime(2024, 2, 1)
+    ) == {
+        (2024, 2): {"count": 1},
+    }
+    assert parquet_aggregates(
+        models["overall_metrics"], ["visits"], end=datetime(2024, 3, 1)
+    ) == {
+        (2024, 1): {"count": 2, "visits": 2},
+    }
+
+
+def test_drifted_months():
+    mongo: Aggregates = {
+        (2024, 1): {"count": 4, "visits": 8.0},
+        (2024, 2): {"count": 1, "visits": 2},
+        (2024, 3): {"count": 1, "visits": 1},
+    }
+    parquet: Aggregates = {
+        (2024, 1): {"count": 4, "visits": 8.000000000001},
+        (2024, 2): {"count": 1, "visits": 1},
+        (2023, 12): {"count": 1, "visits": 1},
+    }
+
+    assert drifted_months(mongo, parquet) == [(2023, 12), (2024, 2), (2024, 3)]
+
+
+def test_month_filter():
+    assert month_filter([(2024, 12)]) == {
+        "date": {"$gte": datetime(2024, 12, 1), "$lt": datetime(2025, 1, 1)}
+    }
+    assert len(month_filter([(2024, 2), (2024, 1)])["$or"]) == 2
+
+
+def test_replace_months():
+    existing = metrics(
+        [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)]
+    )
+    rows = metrics([datetime(2024, 2, 1), datetime(2024, 2, 2)], 2)
+
+    assert_frame_equal(
+        replace_months(existing.lazy(), rows, [(2024, 2)], DEFAULT_LAYOUT),
+        pl.concat([existing[0], rows, existing[2]]),
+    )
@@ -0,0 +1,199 @@
+"""
+Utilities to recalculate only the view date ranges affected by changed Parquet files.
+"""
+
+import os
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+from pymongo.client_session import ClientSession
+from pymongo.collection import Collection
+from .daterange_utils import DateRange, DateRangesWithComparisons
+from ..snapshots import data_files
+from ..sync_manifest import SyncManifest
+
+
+def date_range_key(date_range: DateRange) -> str:
+    """
+    Get a key identifying a date range, which is also used in the names of temp files.
+    """
+    return f"{date_range['start'].date()}_{date_range['end'].date()}"
+
+
+def unique_date_ranges(
+    date_ranges_with_comparisons: DateRangesWithComparisons,
+) -> list[DateRange]:
+    """
+    Get the distinct date ranges (including comparison date ranges) of all the preset date ranges.
+    """
+    date_ranges: dict[str, DateRange] = {}
+
+    for dr in date_ranges_with_comparisons.values():  # pyright: ignore[reportAssignmentType]
+        for date_range in [dr["date_range"], dr["comparison_date_range"]]:  # pyright: ignore[reportIndexIssue]
+            date_ranges.setdefault(date_range_key(date_range), date_range)
+
+    return list(date_ranges.values())
+
+
+def _parse_date(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def changed_date_spans(
+    manifest: SyncManifest,
+) -> list[tuple[datetime | None, datetime | None]]:
+    """
+    Update the manifest with the current state of the Parquet files,
+    and get the `date` span of every file that changed since it was last recorded.
+
+    A file's span covers the dates of both its previous and current versions.
+    Files without `date` statistics (e.g. pages, tasks) have a span of (None, None).
+    """
+    keys = set(manifest.entries)
+
+    keys.update(data_files(manifest.root_dir_path))
+
+    spans: list[tuple[datetime | None, datetime | None]] = []
+
+    for key in sorted(keys):
+        previous = manifest.entries.get(key)
+
+        if not manifest.update(os.path.join(manifest.root_dir_path, key)):
+            continue
+
+        versions = [entry for entry in (previous, manifest.entries.get(key)) if entry]
+        mins = [_parse_date(entry.get("date_min")) for entry in versions]
+        maxes = [_parse_date(entry.get("date_max")) for entry in versions]
+
+        if any(value is None for value in mins + maxes):
+            spans.append((None, None))
+        else:
+            spans.append((min(mins), max(maxes)))  # pyright: ignore[reportArgumentType]
+
+    return spans
+
+
+def affected_date_ranges(
+    date_ranges: list[DateRange],
+    spans: list[tuple[datetime | None, datetime | None]],
+) -> list[DateRange]:
+    """
+    Get the date ranges that overlap any of the changed date spans.
+    A span of (None, None) affects every date range.
+    """
+    return [
+        date_range
+        for date_range in date_ranges
+        if any(
+            span_min is None
+            or span_max is None
+            or (span_min <= date_range["end"] and span_max >= date_range["start"])
+            for span_min, span_max in spans
+        )
+    ]
+
+
+def existing_date_range_keys(collection: Collection[Any]) -> set[str]:
+    """
+    Get the keys of the date ranges that have documents in a view collection.
+    """
+    return {
+        date_range_key(date_range)
+        for date_range in collection.distinct("dateRange")
+        if date_range
+    }
+
+
+def swap_date_range(
+    collection: Collection[Any],
+    date_range: DateRange,
+    last_updated: datetime,
+    session: ClientSession | None = None,
+) -> int:
+    """
+    Delete the previous documents of a date range, once its new documents (with `last_updated`) were inserted.
+
+    :param session: The session of the transaction the new documents were inserted in, see `replace_date_range`.
+    :return: The number of documents deleted.
+    """
+    result = collection.delete_many(
+        {
+            "dateRange.start": date_range["start"],
+            "dateRange.end": date_range["end"],
+            "lastUpdated": {"$ne": last_updated},
+        },
+        session=session,
+    )
+
+    return result.deleted_count
+
+
+def replace_date_range(
+    collection: Collection[Any],
+    date_range: DateRange,
+    last_updated: datetime,
+    insert: Callable[[ClientSession], None],
+) -> int:
+    """
+    Insert the new documents of a date range and delete its previous documents in a single transaction,
+    so that readers see either the previous or the new documents of the date range, never both.
+
+    Transactions need a replica set, which watching for changes already requires.
+
+    :param insert: Inserts the new documents (with `last_updated`) using the session of the transaction.
+                   It's called again if the transaction is retried, after the previous attempt was rolled back.
+    :return: The number of documents deleted.
+    """
+
+    def swap(session: ClientSession) -> int:
+        insert(session)
+        return swap_date_range(collection, date_range, last_updated, session=session)
+
+    with collection.database.client.start_session() as session:
+        return session.with_transaction(swap)
+
+
+def delete_stale_date_ranges(
+    collection: Collection[Any], date_ranges: list[DateRange]
+) -> int:
+    """
+    Delete the documents of date ranges that are no longer current.
+
+    :return: The number of documents deleted.
+    """
+    if len(date_ranges) == 0:
+        return collection.delete_many({}).deleted_count
+
+    result = collection.delete_many(
+        {
+            "$nor": [
+                {
+                    "dateRange.start": date_range["start"],
+                    "dateRange.end": date_range["end"],
+                }
+                for date_range in date_ranges
+            ]
+        }
+    )
+
+    return result.deleted_count
+
+
+def truncate_to_ms(value: datetime) -> datetime:
+    """
+    Truncate a datetime to the precision stored by MongoDB, so it can be matched exactly.
+    """
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+__all__ = [
+    "affected_date_ranges",
+    "changed_date_spans",
+    "date_range_key",
+    "delete_stale_date_ranges",
+    "existing_date_range_keys",
+    "replace_date_range",
+    "swap_date_range",
+    "truncate_to_ms",
+    "unique_date_ranges",
+]
@@ -0,0 +1,171 @@
+"""Tests for incremental view recalculation."""
+
+import os
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Self
+import polars as pl
+from .daterange_utils import DateRange, get_date_ranges_with_comparisons
+from .incremental import (
+    affected_date_ranges,
+    changed_date_spans,
+    date_range_key,
+    replace_date_range,
+    truncate_to_ms,
+    unique_date_ranges,
+)
+from ..sync_manifest import SyncManifest
+
+
+def write(path: str, dates: list[datetime]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pl.DataFrame({"date": dates}).write_parquet(path)
+
+
+def bump_mtime(path: str):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_unique_date_ranges():
+    date_ranges = unique_date_ranges(
+        get_date_ranges_with_comparisons(datetime(2025, 1, 1))
+    )
+    keys = [date_range_key(date_range) for date_range in date_ranges]
+
+    assert len(keys) == len(set(keys))
+    assert "2024-12-22_2024-12-28" in keys
+
+
+def test_affected_date_ranges():
+    week = DateRange(start=datetime(2024, 12, 22), end=datetime(2024, 12, 28))
+    year = DateRange(start=datetime(2024, 1, 1), end=datetime(2024, 12, 31))
+
+    assert affected_date_ranges([week, year], []) == []
+    assert affected_date_ranges(
+        [week, year], [(datetime(2024, 12, 29), datetime(2024, 12, 31))]
+    ) == [year]
+    assert affected_date_ranges(
+        [week, year], [(datetime(2024, 12, 28), datetime(2024, 12, 28))]
+    ) == [week, year]
+    assert affected_date_ranges([week, year], [(None, None)]) == [week, year]
+
+
+def test_changed_date_spans(tmp_path):
+    metrics = str(tmp_path / "metrics.parquet" / "year=2024" / "month=12" / "0.parquet")
+    pages = str(tmp_path / "pages.parquet")
+
+    write(metrics, [datetime(2024, 12, 1), datetime(2024, 12, 20)])
+    pl.DataFrame({"url": ["a", "b"]}).write_parquet(pages)
+
+    manifest = SyncManifest(
+        str(tmp_path), str(tmp_path / "manifest.json"), use_checksums=True
+    )
+
+    # everything is new
+    assert len(changed_date_spans(manifest)) == 2
+    assert changed_date_spans(manifest) == []
+
+    # rewritten with the same contents
+    pl.DataFrame({"url": ["a", "b"]}).write_parquet(pages)
+    bump_mtime(pages)
+
+    assert changed_date_spans(manifest) == []
+
+    # the span covers both the previous and current versions
+    write(metrics, [datetime(2024, 12, 15), datetime(2024, 12, 31)])
+    bump_mtime(metrics)
+
+    assert changed_date_spans(manifest) == [
+        (datetime(2024, 12, 1), datetime(2024, 12, 31))
+    ]
+
+    pl.DataFrame({"url": ["a", "b", "c"]}).write_parquet(pages)
+    bump_mtime(pages)
+
+    assert changed_date_spans(manifest) == [(None, None)]
+
+
+class FakeSession:
+    """Records the transactions run in a session."""
+
+    def __init__(self):
+        self.transactions = 0
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: Any):
+        pass
+
+    def with_transaction(self, callback: Any) -> Any:
+        self.transactions += 1
+        return callback(self)
+
+
+class FakeCollection:
+    """Deletes the documents of a date range, recording the session of each operation."""
+
+    def __init__(self, docs: list[dict[str, Any]]):
+        self.docs = docs
+        self.session = FakeSession()
+        self.database = SimpleNamespace(
+            client=SimpleNamespace(start_session=lambda: self.session)
+        )
+        self.sessions: list[Any] = []
+
+    def delete_many(self, filter: dict[str, Any], session: Any = None):
+        self.sessions.append(session)
+        deleted = [
+            doc
+            for doc in self.docs
+            if doc["dateRange"]["start"] == filter["dateRange.start"]
+            and doc["dateRange"]["end"] == filter["dateRange.end"]
+            and doc["lastUpdated"] != filter["lastUpdated"]["$ne"]
+        ]
+        self.docs = [doc for doc in self.docs if doc not in deleted]
+        return SimpleNamespace(deleted_count=len(deleted))
+
+
+def test_replace_date_range_in_a_transaction():
+    date_range: DateRange = {
+        "start": datetime(2024, 1, 1),
+        "end": datetime(2024, 1, 31),
+    }
+    other_date_range: DateRange = {
+        "start": datetime(2024, 2, 1),
+        "end": datetime(2024, 2, 29),
+    }
+    previous, last_updated = datetime(2024, 2, 1), datetime(2024, 3, 1)
+    collection = FakeCollection(
+        [
+            {"dateRange": date_range, "lastUpdated": previous},
+            {"dateRange": other_date_range, "lastUpdated": previous},
+        ]
+    )
+
+    def insert(session: Any):
+        collection.sessions.append(session)
+        collection.docs.append({"dateRange": date_range, "lastUpdated": last_updated})
+
+    deleted = replace_date_range(
+        collection,  # pyright: ignore[reportArgumentType]
+        date_range,
+        last_updated,
+        insert,
+    )
+
+    assert deleted == 1
+    assert collection.session.transactions == 1
+    # the documents are inserted and deleted in the transaction
+    assert collection.sessions == [collection.session, collection.session]
+    assert collection.docs == [
+        {"dateRange": other_date_range, "lastUpdated": previous},
+        {"dateRange": date_range, "lastUpdated": last_updated},
+    ]
+
+
+def test_truncate_to_ms():
+    assert truncate_to_ms(datetime(2024, 1, 1, 12, 0, 0, 123456)) == datetime(
+        2024, 1, 1, 12, 0, 0, 123000
+    )
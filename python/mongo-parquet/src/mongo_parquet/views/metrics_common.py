@@ -91,3 +91,19 @@ metrics_common_top_level_aggregations_expr = [
     pl.col("visits_device_mobile").sum(),
     pl.col("visits_device_tablet").sum(),
 ]
+
+# the columns of `metrics_common_top_level_aggregations_expr` that are averaged, the others are summed
+metrics_common_top_level_mean_columns = [
+    "average_time_spent",
+    "bouncerate",
+    "gsc_total_position",
+    "gsc_total_ctr",
+]
+
+metrics_common_top_level_sum_columns = [
+    name
+    for name in (
+        expr.meta.output_name() for expr in metrics_common_top_level_aggregations_expr
+    )
+    if name not in metrics_common_top_level_mean_columns
+]
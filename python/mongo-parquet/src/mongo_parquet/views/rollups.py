@@ -0,0 +1,235 @@
+"""
+Monthly rollups of the metrics used by the views, stored as mergeable partial aggregates
+(sums, and sums/counts for means), so any date range can be aggregated exactly from
+the rollups of the months it fully covers, plus the raw daily rows of the remaining days.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import final
+import polars as pl
+from .daterange_utils import DateRange
+from ..schemas import ParquetModel
+from ..utils import list_parquet_files
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+def _next_month(year: int, month: int) -> tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def full_months(date_range: DateRange) -> list[tuple[int, int]]:
+    """
+    Get the (year, month) of every month entirely within a date range (inclusive of the end date).
+    """
+    start = date_range["start"]
+    end = date_range["end"]
+    months: list[tuple[int, int]] = []
+
+    year, month = start.year, start.month
+
+    # a month starting before the start date isn't fully covered
+    if start > datetime(year, month, 1):
+        year, month = _next_month(year, month)
+
+    while True:
+        next_year, next_month = _next_month(year, month)
+
+        if datetime(next_year, next_month, 1) - timedelta(days=1) > end:
+            return months
+
+        months.append((year, month))
+        year, month = next_year, next_month
+
+
+def _month_index_expr(date_col: str = "date") -> pl.Expr:
+    return pl.col(date_col).dt.year().cast(pl.Int32) * 12 + (
+        pl.col(date_col).dt.month().cast(pl.Int32) - 1
+    )
+
+
+@final
+class Rollup:
+    """
+    Monthly partial aggregates of a Parquet model, grouped by `keys`.
+
+    Each source file (i.e. each month partition) has its own rollup file, which is rebuilt
+    whenever the source file is newer, so only changed months are aggregated again.
+
+    Assumes `date` values are days (midnight), as the view date ranges include their end date.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: ParquetModel,
+        keys: list[pl.Expr],
+        sums: list[str] | None = None,
+        means: list[str] | None = None,
+        count: str | None = None,
+    ):
+        """
+        :param name: The name of the rollup, used for its directory.
+        :param model: The source model. Its rows must have a `date` column.
+        :param keys: The expressions to group by.
+        :param sums: The columns to sum.
+        :param means: The columns to average. (nulls are ignored, like `Expr.mean`)
+        :param count: The name of the row count column, if any.
+        """
+        self.name = name
+        self.model = model
+        self.keys = keys
+        self.key_names = [key.meta.output_name() for key in keys]
+        self.sums = sums or []
+        self.means = means or []
+        self.count = count
+        self.rollup_files: list[str] = []
+
+    def source_path(self) -> str:
+        return os.path.join(self.model.dir_path, self.model.parquet_filename)
+
+    def source_files(self) -> list[str]:
+        source_path = self.source_path()
+
+        if not os.path.isdir(source_path):
+            return [source_path] if os.path.exists(source_path) else []
+
+        return list_parquet_files(source_path)
+
+    def partial_aggregations(self) -> list[pl.Expr]:
+        return [
+            *[pl.col(column).sum() for column in self.sums],
+            *[
+                expr
+                for column in self.means
+                for expr in (
+                    # summed as f64 so that merging partials doesn't lose precision
+                    pl.col(column).cast(pl.Float64).sum().alias(f"{column}__sum"),
+                    pl.col(column).count().alias(f"{column}__count"),
+                )
+            ],
+            *([pl.len().alias(self.count)] if self.count else []),
+        ]
+
+    def partial_columns(self) -> list[str]:
+        return [
+            *self.sums,
+            *[
+                f"{column}__{part}"
+                for column in self.means
+                for part in ("sum", "count")
+            ],
+            *([self.count] if self.count else []),
+        ]
+
+    def partials(self, lf: pl.LazyFrame, by_month: bool = False) -> pl.LazyFrame:
+        """
+        Aggregate raw rows into partials, optionally per month.
+        """
+        month_keys = [_month_index_expr().alias("month_index")] if by_month else []
+
+        return lf.group_by(*month_keys, *self.keys).agg(self.partial_aggregations())
+
+    def merge(self, partials: pl.LazyFrame) -> pl.LazyFrame:
+        """
+        Merge partials into final aggregates, by key.
+        """
+        return (
+            partials.group_by(self.key_names)
+            .agg([pl.col(column).sum() for column in self.partial_columns()])
+            .with_columns(
+                [
+                    pl.when(pl.col(f"{column}__count") > 0)
+                    .then(pl.col(f"{column}__sum") / pl.col(f"{column}__count"))
+                    .alias(column)
+                    for column in self.means
+                ]
+            )
+            .select(
+                *self.key_names,
+                *self.sums,
+                *self.means,
+                *([self.count] if self.count else []),
+            )
+        )
+
+    def rollup_path(self, rollups_dir: str, source_file: str) -> str:
+        return os.path.join(
+            rollups_dir,
+            self.name,
+            os.path.relpath(source_file, self.model.dir_path),
+        )
+
+    def refresh(self, rollups_dir: str) -> list[str]:
+        """
+        Rebuild the rollups of new or changed source files, and delete those of deleted source files.
+
+        :param rollups_dir: The directory where rollups are stored.
+        :return: The paths of the rollup files.
+        """
+        rollup_files: list[str] = []
+
+        for source_file in self.source_files():
+            rollup_file = self.rollup_path(rollups_dir, source_file)
+            rollup_files.append(rollup_file)
+
+            if os.path.exists(rollup_file) and os.path.getmtime(
+                rollup_file
+            ) >= os.path.getmtime(source_file):
+                continue
+
+            print(f"  Rolling up {os.path.relpath(source_file, self.model.dir_path)}")
+
+            os.makedirs(os.path.dirname(rollup_file), exist_ok=True)
+            temp_file = f"{rollup_file}.tmp"
+
+            self.partials(
+                pl.scan_parquet(source_file, hive_partitioning=False), by_month=True
+            ).sink_parquet(temp_file, compression_level=5)
+
+            os.replace(temp_file, rollup_file)
+
+        expected = set(rollup_files)
+
+        for root, _, files in os.walk(os.path.join(rollups_dir, self.name)):
+            for file in files:
+                if os.path.join(root, file) not in expected:
+                    os.remove(os.path.join(root, file))
+
+        self.rollup_files = rollup_files
+
+        return rollup_files
+
+    def scan(self, date_range: DateRange) -> pl.LazyFrame:
+        """
+        Aggregate a date range, from the rollups of the months it fully covers,
+        and the raw rows of the remaining days. `refresh` must be called first.
+
+        :return: The final aggregates by key: sums, means and count.
+        """
+        months = [_month_index(year, month) for year, month in full_months(date_range)]
+        rollup_files = self.rollup_files
+
+        partials: list[pl.LazyFrame] = []
+
+        if months and rollup_files:
+            partials.append(
+                pl.scan_parquet(rollup_files, hive_partitioning=False)
+                .filter(pl.col("month_index").is_in(months))
+                .drop("month_index")
+            )
+
+        raw = self.model.lf(start=date_range["start"], end=date_range["end"])
+
+        if months and rollup_files:
+            raw = raw.filter(_month_index_expr().is_in(months).not_())
+
+        partials.append(self.partials(raw))
+
+        return self.merge(pl.concat(partials, how="vertical_relaxed"))
+
+
+__all__ = ["full_months", "Rollup"]
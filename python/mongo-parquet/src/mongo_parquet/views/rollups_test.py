@@ -0,0 +1,122 @@
+"""Tests for the monthly view rollups."""
+
+import os
+import random
+from datetime import datetime, timedelta
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from .rollups import Rollup, full_months
+from ..schemas import AASearchTerms
+
+
+def test_full_months():
+    assert full_months(
+        {"start": datetime(2024, 1, 1), "end": datetime(2024, 3, 31)}
+    ) == [(2024, 1), (2024, 2), (2024, 3)]
+    assert full_months(
+        {"start": datetime(2024, 1, 2), "end": datetime(2024, 3, 30)}
+    ) == [(2024, 2)]
+    assert full_months(
+        {"start": datetime(2024, 11, 1), "end": datetime(2025, 1, 31)}
+    ) == [(2024, 11), (2024, 12), (2025, 1)]
+    assert (
+        full_months({"start": datetime(2024, 3, 3), "end": datetime(2024, 3, 9)}) == []
+    )
+
+
+@pytest.fixture
+def model(tmp_path):
+    rng = random.Random(0)
+    start = datetime(2023, 11, 1)
+
+    rows = [
+        {
+            "date": start + timedelta(days=day),
+            "url": f"/page-{rng.randrange(5)}",
+            "term": rng.choice(["Tax", "tax", "benefits", "CRA"]),
+            "clicks": rng.randrange(100),
+            "position": rng.choice([None, rng.random() * 10]),
+        }
+        for day in range(120)
+        for _ in range(20)
+    ]
+
+    df = pl.DataFrame(rows)
+
+    for (year, month), partition in df.group_by(
+        pl.col("date").dt.year().alias("year"), pl.col("date").dt.month().alias("month")
+    ):
+        path = os.path.join(
+            tmp_path,
+            "pages_metrics_aa_searchterms.parquet",
+            f"year={year}",
+            f"month={month}",
+            "0.parquet",
+        )
+        os.makedirs(os.path.dirname(path))
+        partition.write_parquet(path)
+
+    return AASearchTerms(str(tmp_path))
+
+
+def raw_aggregate(model: AASearchTerms, start: datetime, end: datetime):
+    return (
+        model.lf()
+        .filter(pl.col("date").is_between(start, end))
+        .group_by(pl.col("url"), pl.col("term").str.to_lowercase())
+        .agg(
+            pl.col("clicks").sum(),
+            pl.col("position").mean(),
+            pl.len().alias("count"),
+        )
+        .sort("url", "term")
+        .collect()
+    )
+
+
+@pytest.mark.parametrize(
+    "start,end",
+    [
+        (datetime(2023, 11, 1), datetime(2024, 2, 28)),
+        (datetime(2023, 11, 15), datetime(2024, 1, 31)),
+        (datetime(2023, 12, 24), datetime(2023, 12, 30)),
+        (datetime(2023, 12, 1), datetime(2023, 12, 31)),
+    ],
+)
+def test_rollup_matches_raw_aggregation(model, tmp_path, start, end):
+    rollup = Rollup(
+        "aa_searchterms",
+        model,
+        keys=[pl.col("url"), pl.col("term").str.to_lowercase()],
+        sums=["clicks"],
+        means=["position"],
+        count="count",
+    )
+    rollup.refresh(str(tmp_path / "rollups"))
+
+    result = rollup.scan({"start": start, "end": end}).sort("url", "term").collect()
+
+    assert_frame_equal(
+        result,
+        raw_aggregate(model, start, end),
+        check_dtypes=False,
+        check_exact=False,
+    )
+
+
+def test_refresh_only_rebuilds_changed_files(model, tmp_path):
+    rollup = Rollup("aa_searchterms", model, keys=[pl.col("url")], sums=["clicks"])
+    rollups_dir = str(tmp_path / "rollups")
+
+    files = rollup.refresh(rollups_dir)
+    mtimes = [os.path.getmtime(file) for file in files]
+
+    assert len(files) == 4
+    assert [os.path.getmtime(file) for file in rollup.refresh(rollups_dir)] == mtimes
+
+    source = rollup.source_files()[0]
+    os.remove(source)
+
+    assert len(rollup.refresh(rollups_dir)) == 3
+    assert not os.path.exists(files[0])
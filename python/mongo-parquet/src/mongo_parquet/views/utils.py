@@ -5,10 +5,21 @@ from datetime import timedelta
 
 
 class ViewsUtils:
-    def __init__(self, parquet_dir_path: str, temp_dir_name: str = ".views_temp"):
+    def __init__(
+        self,
+        parquet_dir_path: str,
+        temp_dir_name: str = ".views_temp",
+        rollups_dir_name: str = ".views_rollups",
+        read_dir_path: str | None = None,
+    ):
         temp_dir_str = os.path.join(parquet_dir_path, "..", temp_dir_name)
+        rollups_dir_str = os.path.join(parquet_dir_path, "..", rollups_dir_name)
         self.parquet_dir_path: str = os.path.abspath(parquet_dir_path)
+        # where the source Parquet files are read from, e.g. a pinned snapshot of the data directory
+        self.read_dir_path: str = os.path.abspath(read_dir_path or parquet_dir_path)
         self.temp_dir_path: str = os.path.abspath(temp_dir_str)
+        # unlike the temp dir, rollups are kept between runs
+        self.rollups_dir_path: str = os.path.abspath(rollups_dir_str)
 
     def ensure_temp_dir(self):
         if not os.path.exists(self.temp_dir_path):
@@ -36,6 +47,23 @@ class ViewsUtils:
         temp_file_path = os.path.join(self.temp_dir_path, file_name)
         lf.sink_parquet(temp_file_path, compression_level=5)
 
+    def lazy_sink_temp(self, lf: pl.LazyFrame, file_name: str) -> pl.LazyFrame:
+        """
+        Same as `sink_temp`, but only returns the plan, to be executed by `sink_temp_all`.
+        """
+        self.ensure_temp_dir()
+        temp_file_path = os.path.join(self.temp_dir_path, file_name)
+        return lf.sink_parquet(temp_file_path, compression_level=5, lazy=True)
+
+    def sink_temp_all(self, sinks: list[pl.LazyFrame]):
+        """
+        Execute the plans from `lazy_sink_temp` together, so that the subplans they have
+        in common (e.g. scans of the same files) are only executed once.
+        """
+        _ = pl.collect_all(
+            sinks, optimizations=pl.QueryOptFlags(comm_subplan_elim=True)
+        )
+
 
 def format_timedelta(td: timedelta) -> str:
     if td.total_seconds() < 1:
@@ -1,25 +1,37 @@
 from datetime import datetime
+from functools import partial
 from typing import Any, final, override
 import polars as pl
 from pyarrow import float64, string, struct, timestamp, list_, int32
+from pymongo.client_session import ClientSession
 from pymongo.database import Database
 from pymongoarrow.api import Schema
 from pymongoarrow.types import ObjectIdType
 from .metrics_common import (
     metrics_common_schema,
     metrics_common_top_level_aggregations_expr,
+    metrics_common_top_level_mean_columns,
+    metrics_common_top_level_sum_columns,
 )
 from .daterange_utils import (
     DateRange,
-    DateRangeWithComparison,
     get_date_ranges_with_comparisons,
 )
+from .incremental import (
+    date_range_key,
+    delete_stale_date_ranges,
+    replace_date_range,
+    truncate_to_ms,
+    unique_date_ranges,
+)
 from ..schemas import (
     AnyFrame,
     MongoCollection,
     ParquetModel,
 )
 from ..schemas import get_parquet_models, ParquetModels
+from ..catalog import DictionaryCatalog
+from .rollups import Rollup
 from .utils import format_timedelta, ViewsUtils
 from ..utils import objectid
 
@@ -102,8 +114,14 @@ class PagesViewContext:
     def __init__(
         self,
         parquet_models: ParquetModels,
+        catalog: DictionaryCatalog,
     ):
+        """
+        :param parquet_models: The models of the Parquet files the view is calculated from.
+        :param catalog: The dictionaries of URLs and links, up to date with the Parquet files.
+        """
         self.parquet_models: ParquetModels = parquet_models
+        self.catalog = catalog
         self.page_urls_enum = self.get_page_urls_enum()
         self.pages = self.get_pages()
         self.activity_map_links_enum = self.get_activity_map_links_enum()
@@ -137,66 +155,98 @@ class PagesViewContext:
         )
 
     def get_activity_map_links_enum(self) -> pl.Enum:
-        unique_links = (
-            self.parquet_models["activity_map"]
-            .lf()
-            .select(pl.col("link").unique())
-            .collect()
-        )
-
-        return pl.Enum(unique_links["link"])
+        return self.catalog.enum("links")
 
     def get_page_urls_enum(self) -> pl.Enum:
-        unique_metrics_urls = (
-            self.parquet_models["page_metrics"].lf().select(pl.col("url").unique())
-        )
-        unique_page_urls = (
-            self.parquet_models["pages"].lf().select(pl.col("url").unique())
-        )
-        unique_activity_map_urls = (
-            self.parquet_models["activity_map"].lf().select(pl.col("url").unique())
-        )
-        unique_gsc_searchterms_urls = (
-            self.parquet_models["gsc_searchterms"].lf().select(pl.col("url").unique())
-        )
-        unique_feedback_urls = (
-            self.parquet_models["feedback"].lf().select(pl.col("url").unique())
-        )
-        unique_combined = (
-            pl.concat(
-                [
-                    unique_metrics_urls,
-                    unique_page_urls,
-                    unique_activity_map_urls,
-                    unique_gsc_searchterms_urls,
-                    unique_feedback_urls,
-                ]
-            )
-            .select(pl.col("url").unique())
-            .collect()
-        )
-
-        return pl.Enum(unique_combined["url"])
+        return self.catalog.enum("urls")
 
 
 @final
 class PagesViewService:
-    def __init__(self, db: Database, views_utils: ViewsUtils):
+    def __init__(
+        self,
+        db: Database,
+        views_utils: ViewsUtils,
+        use_rollups: bool = True,
+        catalog: DictionaryCatalog | None = None,
+    ):
+        """
+        :param db: The database to write the view to.
+        :param views_utils: The views utils, with the Parquet and temp directories.
+        :param catalog: The dictionaries of URLs and links. If not provided, they are loaded and refreshed.
+        :param use_rollups: Whether to aggregate metrics from monthly rollups instead of
+                            re-aggregating the raw data of every date range.
+        """
         self.mongo_model = PagesViewModel(
             db, parquet_dir_path=views_utils.parquet_dir_path
         )
         self.parquet_model = self.mongo_model.primary_model
-        self.dependencies: ParquetModels = get_parquet_models(
-            views_utils.parquet_dir_path
-        )
+        self.dependencies: ParquetModels = get_parquet_models(views_utils.read_dir_path)
         self.date_ranges_with_comparisons = get_date_ranges_with_comparisons()
+        if catalog is None:
+            catalog = DictionaryCatalog(
+                views_utils.parquet_dir_path, read_dir_path=views_utils.read_dir_path
+            )
+            _ = catalog.refresh(self.dependencies)
+
         self.context = PagesViewContext(
             parquet_models=self.dependencies,
+            catalog=catalog,
         )
         self.views_utils = views_utils
         self.temp_dir = self.views_utils.temp_dir_path
+        self.use_rollups = use_rollups
+        self.rollups = {
+            "page_metrics": Rollup(
+                "page_metrics",
+                self.dependencies["page_metrics"],
+                keys=[pl.col("url")],
+                sums=metrics_common_top_level_sum_columns,
+                means=metrics_common_top_level_mean_columns,
+            ),
+            "feedback": Rollup(
+                "feedback",
+                self.dependencies["feedback"],
+                keys=[pl.col("url")],
+                count="numComments",
+            ),
+            "aa_searchterms": Rollup(
+                "aa_searchterms",
+                self.dependencies["aa_searchterms"],
+                keys=[pl.col("url"), pl.col("term").str.to_lowercase()],
+                sums=["clicks"],
+                means=["position"],
+            ),
+            "gsc_searchterms": Rollup(
+                "gsc_searchterms",
+                self.dependencies["gsc_searchterms"],
+                keys=[pl.col("url"), pl.col("term").str.to_lowercase()],
+                sums=["clicks", "impressions"],
+                means=["ctr", "position"],
+            ),
+            "activity_map": Rollup(
+                "activity_map",
+                self.dependencies["activity_map"],
+                keys=[pl.col("url"), pl.col("link")],
+                sums=["clicks"],
+            ),
+        }
+
+    def refresh_rollups(self):
+        """
+        Bring the monthly rollups up to date with the Parquet files.
+        """
+        start_time = datetime.now()
+        print("Refreshing view rollups...")
 
-    def insert_batch(self, df: pl.DataFrame) -> bool | None:
+        for rollup in self.rollups.values():
+            _ = rollup.refresh(self.views_utils.rollups_dir_path)
+
+        print(f"  Finished in {format_timedelta(datetime.now() - start_time)}")
+
+    def insert_batch(
+        self, df: pl.DataFrame, session: ClientSession | None = None
+    ) -> bool | None:
         transformed_df = self.parquet_model.reverse_transform(df)
 
         rows = self.mongo_model.prepare_for_insert(transformed_df, sort_id=False)
@@ -206,64 +256,129 @@ class PagesViewService:
 
         print(f"  Writing batch of {len(df)} rows...")
 
-        results = self.mongo_model.client.insert_many(rows, ordered=False)
+        results = self.mongo_model.client.insert_many(
+            rows, ordered=False, session=session
+        )
 
         print(f"  Wrote batch: Inserted {len(results.inserted_ids)} rows")
 
-    def recalculate_pages_view(self):
+    def recalculate_pages_view(
+        self, date_ranges: list[DateRange] | None = None, batched: bool = False
+    ):
+        """
+        Recalculate the pages view for the given date ranges, replacing the documents of each
+        date range only once its new documents are inserted, so the view is never empty.
+        Documents of date ranges that are no longer current are deleted.
+
+        :param date_ranges: The date ranges to recalculate. Defaults to all of them.
+        :param batched: Whether to execute the plans of all date ranges together, instead of one by one.
+        """
         start_time = datetime.now()
         print(f"Recalculating pages view at {start_time.isoformat()}")
 
-        _ = self.mongo_model.client.delete_many({})
+        current_date_ranges = unique_date_ranges(self.date_ranges_with_comparisons)
+        last_updated = truncate_to_ms(start_time)
+
+        if date_ranges is None:
+            date_ranges = current_date_ranges
 
-        self.calculate_and_write_pages_view_files()
-        self.insert_pages_view_from_temp()
+        if self.use_rollups:
+            self.refresh_rollups()
+
+        self.calculate_and_write_pages_view_files(
+            date_ranges, last_updated, batched=batched
+        )
+        self.insert_pages_view_from_temp(date_ranges, last_updated)
+
+        deleted = delete_stale_date_ranges(self.mongo_model.client, current_date_ranges)
+
+        if deleted > 0:
+            print(
+                f"Deleted {deleted} documents from date ranges that are no longer current"
+            )
 
         print(
             f"Finished recalculating pages view in {format_timedelta(datetime.now() - start_time)}"
         )
 
-    def calculate_and_write_pages_view_files(self):
-        for dr in self.date_ranges_with_comparisons.values():  # pyright: ignore[reportAssignmentType]
-            dr: DateRangeWithComparison = dr
-            for date_range in [dr["date_range"], dr["comparison_date_range"]]:
-                lf = self.get_view_date_range_data(date_range)
+    def calculate_and_write_pages_view_files(
+        self,
+        date_ranges: list[DateRange],
+        last_updated: datetime,
+        batched: bool = False,
+    ):
+        if batched:
+            return self.batch_write_pages_view_files(date_ranges, last_updated)
 
-                date_range_start_time = datetime.now()
-                print(
-                    f"Writing pages view for {date_range['start']} to {date_range['end']}..."
-                )
+        for date_range in date_ranges:
+            lf = self.get_view_date_range_data(date_range, last_updated)
 
-                output_filename = f"view_pages_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+            date_range_start_time = datetime.now()
+            print(
+                f"Writing pages view for {date_range['start']} to {date_range['end']}..."
+            )
 
-                self.views_utils.sink_temp(lf, output_filename)
+            output_filename = f"view_pages_{date_range_key(date_range)}.parquet"
 
-                print(
-                    f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}"
-                )
+            self.views_utils.sink_temp(lf, output_filename)
+
+            print(
+                f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}"
+            )
+
+    def batch_write_pages_view_files(
+        self, date_ranges: list[DateRange], last_updated: datetime
+    ):
+        """
+        Write the pages view files of all date ranges in one execution,
+        so the sources shared by the date ranges are only scanned once.
+        """
+        start_time = datetime.now()
+        print(f"Writing pages view for {len(date_ranges)} date ranges in one batch...")
 
-    def insert_pages_view_from_temp(self):
-        for dr in self.date_ranges_with_comparisons.values():  # pyright: ignore[reportAssignmentType]
-            dr: DateRangeWithComparison = dr
-            for date_range in [dr["date_range"], dr["comparison_date_range"]]:
-                date_range_start_time = datetime.now()
-                print(
-                    f"Inserting pages view for {date_range['start']} to {date_range['end']}..."
+        self.views_utils.sink_temp_all(
+            [
+                self.views_utils.lazy_sink_temp(
+                    self.get_view_date_range_data(date_range, last_updated),
+                    f"view_pages_{date_range_key(date_range)}.parquet",
                 )
+                for date_range in date_ranges
+            ]
+        )
 
-                filename = f"view_pages_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+        print(f"  Finished in {format_timedelta(datetime.now() - start_time)}")
 
+    def insert_pages_view_from_temp(
+        self, date_ranges: list[DateRange], last_updated: datetime
+    ):
+        for date_range in date_ranges:
+            date_range_start_time = datetime.now()
+            print(
+                f"Inserting pages view for {date_range['start']} to {date_range['end']}..."
+            )
+
+            filename = f"view_pages_{date_range_key(date_range)}.parquet"
+
+            def insert(session: ClientSession):
                 self.views_utils.scan_temp(filename).sink_batches(
-                    self.insert_batch, chunk_size=20_000, lazy=False
+                    partial(self.insert_batch, session=session),
+                    chunk_size=20_000,
+                    lazy=False,
                 )
 
-                print(
-                    f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}"
-                )
+            # the previous documents are replaced by the new ones all at once
+            deleted = replace_date_range(
+                self.mongo_model.client, date_range, last_updated, insert
+            )
+
+            print(
+                f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}, replaced {deleted} documents"
+            )
 
     def get_view_date_range_data(
         self,
         date_range: DateRange,
+        last_updated: datetime | None = None,
     ) -> pl.LazyFrame:
         num_pages = self.context.pages.select(pl.len()).collect().item()
 
@@ -287,7 +402,7 @@ class PagesViewService:
             pl.col("tasks"),
             pl.col("projects"),
             pl.col("pageStatus"),
-            pl.lit(datetime.now()).alias("lastUpdated"),
+            pl.lit(last_updated or datetime.now()).alias("lastUpdated"),
         )
 
         top_level_metrics = self.get_top_level_page_metrics(date_range)
@@ -304,81 +419,140 @@ class PagesViewService:
         )
 
     def get_top_level_page_metrics(self, date_range: DateRange) -> pl.LazyFrame:
+        if self.use_rollups:
+            return (
+                self.rollups["page_metrics"]
+                .scan(date_range)
+                .with_columns(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    *[
+                        pl.col(column).round_sig_figs(5)
+                        for column in metrics_common_top_level_mean_columns
+                    ],
+                )
+                .select(
+                    "url",
+                    *[
+                        expr.meta.output_name()
+                        for expr in metrics_common_top_level_aggregations_expr
+                    ],
+                )
+            )
+
         return (
             self.dependencies["page_metrics"]
-            .lf()
-            .filter(
-                (pl.col("date") >= date_range["start"]),
-                (pl.col("date") <= date_range["end"]),
-            )
+            .lf(start=date_range["start"], end=date_range["end"])
             .with_columns(pl.col("url").cast(self.context.page_urls_enum))
             .group_by("url")
             .agg(metrics_common_top_level_aggregations_expr)
         )
 
     def get_num_comments(self, date_range: DateRange) -> pl.LazyFrame:
-        return (
-            self.dependencies["feedback"]
-            .lf()
-            .select(["date", pl.col("url").cast(self.context.page_urls_enum)])
-            .filter(
-                pl.col("date") >= date_range["start"],
-                pl.col("date") <= date_range["end"],
+        if self.use_rollups:
+            num_comments = (
+                self.rollups["feedback"]
+                .scan(date_range)
+                .with_columns(pl.col("url").cast(self.context.page_urls_enum))
             )
-            .group_by("url")
-            .agg(pl.len().alias("numComments"))
-            .with_columns(pl.col("numComments").fill_null(0).cast(pl.Int32))
+        else:
+            num_comments = (
+                self.dependencies["feedback"]
+                .lf(start=date_range["start"], end=date_range["end"])
+                .select(["date", pl.col("url").cast(self.context.page_urls_enum)])
+                .group_by("url")
+                .agg(pl.len().alias("numComments"))
+            )
+
+        return num_comments.with_columns(
+            pl.col("numComments").fill_null(0).cast(pl.Int32)
         )
 
     def get_aa_searchterms(self, date_range: DateRange) -> pl.LazyFrame:
-        return (
-            self.dependencies["aa_searchterms"]
-            .lf()
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
-            .with_columns(
-                pl.col("url").cast(self.context.page_urls_enum),
-                pl.col("term").str.to_lowercase(),
+        if self.use_rollups:
+            terms = (
+                self.rollups["aa_searchterms"]
+                .scan(date_range)
+                .with_columns(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    pl.col("position").round_sig_figs(3),
+                )
             )
-            .group_by(["url", "term"])
-            .agg(
-                pl.col("clicks").sum(),
-                pl.col("position").mean().round_sig_figs(3),
+        else:
+            terms = (
+                self.dependencies["aa_searchterms"]
+                .lf(start=date_range["start"], end=date_range["end"])
+                .with_columns(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    pl.col("term").str.to_lowercase(),
+                )
+                .group_by(["url", "term"])
+                .agg(
+                    pl.col("clicks").sum(),
+                    pl.col("position").mean().round_sig_figs(3),
+                )
             )
-            .group_by("url")
-            .agg(pl.struct(pl.all().top_k_by("clicks", 200)).alias("aa_searchterms"))
+
+        return terms.group_by("url").agg(
+            pl.struct(pl.all().top_k_by("clicks", 200)).alias("aa_searchterms")
         )
 
     def get_gsc_searchterms(self, date_range: DateRange) -> pl.LazyFrame:
-        return (
-            self.dependencies["gsc_searchterms"]
-            .lf()
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
-            .with_columns(
-                pl.col("url").cast(self.context.page_urls_enum),
-                pl.col("term").str.to_lowercase(),
+        if self.use_rollups:
+            terms = (
+                self.rollups["gsc_searchterms"]
+                .scan(date_range)
+                .select(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    pl.col("term"),
+                    pl.col("clicks"),
+                    pl.col("ctr").round_sig_figs(3),
+                    pl.col("impressions"),
+                    pl.col("position").round_sig_figs(3),
+                )
             )
-            .group_by(["url", "term"])
-            .agg(
-                pl.col("clicks").sum(),
-                pl.col("ctr").mean().round_sig_figs(3),
-                pl.col("impressions").sum(),
-                pl.col("position").mean().round_sig_figs(3),
+        else:
+            terms = (
+                self.dependencies["gsc_searchterms"]
+                .lf(start=date_range["start"], end=date_range["end"])
+                .with_columns(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    pl.col("term").str.to_lowercase(),
+                )
+                .group_by(["url", "term"])
+                .agg(
+                    pl.col("clicks").sum(),
+                    pl.col("ctr").mean().round_sig_figs(3),
+                    pl.col("impressions").sum(),
+                    pl.col("position").mean().round_sig_figs(3),
+                )
             )
-            .group_by("url")
-            .agg(pl.struct(pl.all().top_k_by("clicks", 200)).alias("gsc_searchterms"))
+
+        return terms.group_by("url").agg(
+            pl.struct(pl.all().top_k_by("clicks", 200)).alias("gsc_searchterms")
         )
 
     def get_activity_map(self, date_range: DateRange) -> pl.LazyFrame:
-        return (
-            self.dependencies["activity_map"]
-            .lf()
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
-            .with_columns(
-                pl.col("url").cast(self.context.page_urls_enum),
-                pl.col("link").cast(self.context.activity_map_links_enum),
+        if self.use_rollups:
+            links = (
+                self.rollups["activity_map"]
+                .scan(date_range)
+                .with_columns(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    pl.col("link").cast(self.context.activity_map_links_enum),
+                )
             )
-            .group_by(["url", "link"])
-            .agg(pl.col("clicks").sum())
-            .group_by(["url"])
-            .agg(pl.struct(pl.all().top_k_by("clicks", 100)).alias("activity_map"))
+        else:
+            links = (
+                self.dependencies["activity_map"]
+                .lf(start=date_range["start"], end=date_range["end"])
+                .with_columns(
+                    pl.col("url").cast(self.context.page_urls_enum),
+                    pl.col("link").cast(self.context.activity_map_links_enum),
+                )
+                .group_by(["url", "link"])
+                .agg(pl.col("clicks").sum())
+            )
+
+        return links.group_by(["url"]).agg(
+            pl.struct(pl.all().top_k_by("clicks", 100)).alias("activity_map")
         )
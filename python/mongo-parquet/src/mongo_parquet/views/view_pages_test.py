@@ -0,0 +1,188 @@
+"""Tests for writing the pages view files."""
+
+import os
+import random
+from datetime import datetime, timedelta
+import polars as pl
+import pytest
+from polars.testing import assert_frame_equal
+from pymongo import MongoClient
+from .daterange_utils import DateRange
+from .incremental import date_range_key
+from .metrics_common import (
+    metrics_common_top_level_mean_columns,
+    metrics_common_top_level_sum_columns,
+)
+from .utils import ViewsUtils
+from .view_pages import PagesViewService
+from ..catalog import DictionaryCatalog
+
+URLS = [f"https://www.canada.ca/page-{i}" for i in range(6)]
+LINKS = [f"link {i}" for i in range(4)]
+TERMS = ["tax", "benefits", "cra", "passport"]
+
+
+@pytest.fixture
+def parquet_dir(tmp_path) -> str:
+    """Only the columns of the sources that the pages view reads."""
+    rng = random.Random(0)
+    parquet_dir = os.path.join(tmp_path, "data")
+    os.makedirs(parquet_dir)
+
+    def write(df: pl.DataFrame, parquet_filename: str):
+        df.write_parquet(os.path.join(parquet_dir, parquet_filename))
+
+    days = [datetime(2024, 1, 1) + timedelta(days=day) for day in range(90)]
+
+    write(
+        pl.DataFrame(
+            {
+                "_id": [f"{i:024x}" for i in range(len(URLS))],
+                "url": URLS,
+                "title": [f"Page {i}" for i in range(len(URLS))],
+                "lang": ["en", "fr"] * (len(URLS) // 2),
+                "redirect": [None] * (len(URLS) - 1) + [URLS[0]],
+                "is_404": [False] * (len(URLS) - 2) + [True, False],
+                "owners": ["owner"] * len(URLS),
+                "sections": ["section"] * len(URLS),
+                "tasks": [[f"{i:024x}"] for i in range(len(URLS))],
+                "projects": [[] for _ in URLS],
+            },
+            schema_overrides={"projects": pl.List(pl.String)},
+        ),
+        "pages.parquet",
+    )
+    write(
+        pl.DataFrame(
+            [
+                {
+                    "date": date,
+                    "url": url,
+                    **{
+                        column: rng.randrange(100)
+                        for column in metrics_common_top_level_sum_columns
+                    },
+                    **{
+                        column: rng.random()
+                        for column in metrics_common_top_level_mean_columns
+                    },
+                }
+                for date in days
+                for url in URLS[:-1]
+            ]
+        ),
+        "pages_metrics.parquet",
+    )
+    write(
+        pl.DataFrame(
+            [
+                {"date": date, "url": rng.choice(URLS)}
+                for date in days
+                for _ in range(rng.randrange(3))
+            ]
+        ),
+        "feedback.parquet",
+    )
+
+    # the clicks are distinct so that the top terms and links are the same however ties are broken
+    clicks = iter(rng.sample(range(100_000), 10_000))
+
+    searchterms = pl.DataFrame(
+        [
+            {
+                "date": date,
+                "url": url,
+                "term": term,
+                "clicks": next(clicks),
+                "ctr": rng.random(),
+                "impressions": rng.randrange(1000),
+                "position": rng.random() * 10,
+            }
+            for date in days[::3]
+            for url in URLS
+            for term in rng.sample(TERMS, 2)
+        ]
+    )
+    write(
+        searchterms.select("date", "url", "term", "clicks", "position"),
+        "pages_metrics_aa_searchterms.parquet",
+    )
+    write(searchterms, "pages_metrics_gsc_searchterms.parquet")
+    write(
+        pl.DataFrame(
+            [
+                {
+                    "date": date,
+                    "url": url,
+                    "link": link,
+                    "clicks": next(clicks),
+                }
+                for date in days[::3]
+                for url in URLS
+                for link in rng.sample(LINKS, 2)
+            ]
+        ),
+        "pages_metrics_activity_map.parquet",
+    )
+
+    return parquet_dir
+
+
+@pytest.mark.parametrize("use_rollups", [False, True])
+def test_batched_view_files_match_per_range(parquet_dir, use_rollups):
+    catalog = DictionaryCatalog(parquet_dir)
+    _ = catalog.add("urls", pl.Series(URLS))
+    _ = catalog.add("links", pl.Series(LINKS))
+
+    date_ranges: list[DateRange] = [
+        DateRange(start=datetime(2024, 1, 1), end=datetime(2024, 1, 31)),
+        DateRange(start=datetime(2024, 1, 15), end=datetime(2024, 2, 29)),
+        DateRange(start=datetime(2024, 1, 1), end=datetime(2024, 3, 30, 23, 59, 59)),
+    ]
+    last_updated = datetime(2024, 4, 1)
+
+    def write_view_files(temp_dir_name: str, batched: bool) -> list[pl.DataFrame]:
+        views_utils = ViewsUtils(parquet_dir, temp_dir_name=temp_dir_name)
+        service = PagesViewService(
+            MongoClient(connect=False)["test"],
+            views_utils,
+            use_rollups=use_rollups,
+            catalog=catalog,
+        )
+
+        if use_rollups:
+            service.refresh_rollups()
+
+        service.calculate_and_write_pages_view_files(
+            date_ranges, last_updated, batched=batched
+        )
+
+        return [
+            # the document ids are generated for each run
+            views_utils.scan_temp(f"view_pages_{date_range_key(date_range)}.parquet")
+            .drop("_id")
+            .sort("url")
+            .collect()
+            for date_range in date_ranges
+        ]
+
+    per_range = write_view_files(".views_temp_per_range", batched=False)
+    batched = write_view_files(".views_temp_batched", batched=True)
+
+    for per_range_df, batched_df in zip(per_range, batched, strict=True):
+        assert per_range_df.height == len(URLS)
+        assert_frame_equal(batched_df, per_range_df)
+
+
+def test_default_catalog_is_read_from_the_read_dir(parquet_dir, tmp_path):
+    """The catalog is stored in the data directory, but built from the files that the view reads."""
+    data_dir = os.path.join(tmp_path, "empty")
+    service = PagesViewService(
+        MongoClient(connect=False)["test"],
+        ViewsUtils(data_dir, read_dir_path=parquet_dir),
+    )
+
+    assert sorted(service.context.catalog.values("urls").to_list()) == sorted(URLS)
+    assert sorted(service.context.catalog.values("links").to_list()) == sorted(LINKS)
+    assert os.path.isdir(os.path.join(data_dir, DictionaryCatalog.dir_name))
+    assert not os.path.exists(os.path.join(parquet_dir, DictionaryCatalog.dir_name))
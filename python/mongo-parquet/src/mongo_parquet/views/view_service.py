@@ -1,27 +1,123 @@
+import os
 from typing import final
 from mongo_parquet.views.view_tasks import TasksViewService
 from pymongo.database import Database
+from .daterange_utils import DateRange
+from .incremental import (
+    affected_date_ranges,
+    changed_date_spans,
+    date_range_key,
+    existing_date_range_keys,
+    unique_date_ranges,
+)
 from .view_pages import PagesViewService
 from .utils import ViewsUtils
+from ..catalog import DictionaryCatalog
+from ..schemas import get_parquet_models
+from ..sync_manifest import SyncManifest
 
 
 @final
 class ViewService:
+    # the state of the Parquet files when the views were last calculated
+    manifest_filename = "_views_manifest.json"
+
     def __init__(
         self,
         db: Database,
         parquet_dir_path: str,
         temp_dir_name: str,
+        read_dir_path: str | None = None,
     ):
+        """
+        :param db: The database to write the views to.
+        :param parquet_dir_path: The data directory.
+        :param temp_dir_name: The name of the temp directory, next to the data directory.
+        :param read_dir_path: The directory to read the Parquet files from, e.g. a pinned snapshot
+                              of the data directory, so that a concurrent sync doesn't change them mid-calculation.
+        """
         self.parquet_dir_path: str = parquet_dir_path
-        self.utils: ViewsUtils = ViewsUtils(parquet_dir_path, temp_dir_name)
-        self.pages_view_service: PagesViewService = PagesViewService(db, self.utils)
-        self.tasks_view_service = TasksViewService(db, self.utils)
+        self.utils: ViewsUtils = ViewsUtils(
+            parquet_dir_path, temp_dir_name, read_dir_path=read_dir_path
+        )
+        # shared by both views, so the catalog is only refreshed once
+        self.catalog = DictionaryCatalog(
+            parquet_dir_path, read_dir_path=self.utils.read_dir_path
+        )
+        _ = self.catalog.refresh(get_parquet_models(self.utils.read_dir_path))
+        self.pages_view_service: PagesViewService = PagesViewService(
+            db, self.utils, catalog=self.catalog
+        )
+        self.tasks_view_service = TasksViewService(db, self.utils, catalog=self.catalog)
+        # checksums are needed so that collections re-exported by every sync (e.g. pages, tasks)
+        # are only considered changed when their contents actually changed
+        self.manifest = SyncManifest(
+            self.utils.read_dir_path,
+            os.path.join(parquet_dir_path, self.manifest_filename),
+            use_checksums=True,
+        )
 
-    def recalculate_pages_view(self):
+    def recalculate_pages_view(
+        self, date_ranges: list[DateRange] | None = None, batched: bool = False
+    ):
         self.utils.ensure_temp_dir()
-        self.pages_view_service.recalculate_pages_view()
+        self.pages_view_service.recalculate_pages_view(date_ranges, batched=batched)
 
-    def recalculate_tasks_view(self):
+    def recalculate_tasks_view(
+        self, date_ranges: list[DateRange] | None = None, batched: bool = False
+    ):
         self.utils.ensure_temp_dir()
-        self.tasks_view_service.recalculate_tasks_view()
+        self.tasks_view_service.recalculate_tasks_view(date_ranges, batched=batched)
+
+    def date_ranges_to_recalculate(self, incremental: bool = False) -> list[DateRange]:
+        """
+        Get the date ranges that need to be recalculated, and update the manifest with
+        the current state of the Parquet files.
+
+        :param incremental: Whether to only include the date ranges that overlap the data that
+                            changed since the views were last calculated, and those missing from either view.
+        """
+        date_ranges = unique_date_ranges(
+            self.pages_view_service.date_ranges_with_comparisons
+        )
+        spans = changed_date_spans(self.manifest)
+
+        if not incremental:
+            return date_ranges
+
+        affected = {
+            date_range_key(date_range)
+            for date_range in affected_date_ranges(date_ranges, spans)
+        }
+        existing = existing_date_range_keys(
+            self.pages_view_service.mongo_model.client
+        ) & existing_date_range_keys(self.tasks_view_service.mongo_model.client)
+
+        to_recalculate = [
+            date_range
+            for date_range in date_ranges
+            if date_range_key(date_range) in affected
+            or date_range_key(date_range) not in existing
+        ]
+
+        print(
+            f"{len(spans)} Parquet files changed, recalculating {len(to_recalculate)} of {len(date_ranges)} date ranges"
+        )
+
+        return to_recalculate
+
+    def recalculate_views(self, incremental: bool = False, batched: bool = False):
+        """
+        Recalculate the pages and tasks views.
+
+        :param incremental: Whether to only recalculate the date ranges affected by changed data.
+        :param batched: Whether to execute the plans of all date ranges together, instead of one by one.
+        """
+        date_ranges = self.date_ranges_to_recalculate(incremental)
+
+        # the tasks view is calculated from the pages view files, so both use the same date ranges
+        self.recalculate_pages_view(date_ranges, batched=batched)
+        self.recalculate_tasks_view(date_ranges, batched=batched)
+
+        # only saved once both views are up to date, so that a failed run is retried in full
+        self.manifest.save()
@@ -1,5 +1,6 @@
 from typing import final, override
 from datetime import datetime
+from functools import partial
 import polars as pl
 from mongo_parquet.schemas import (
     AnyFrame,
@@ -17,15 +18,23 @@ from pyarrow import (
     int32,
     bool_,
 )
+from pymongo.client_session import ClientSession
 from pymongo.database import Database
 from pymongoarrow.types import ObjectIdType
 from .utils import format_timedelta, ViewsUtils
 from .daterange_utils import (
     DateRange,
-    DateRangeWithComparison,
     get_date_ranges_with_comparisons,
 )
+from .incremental import (
+    date_range_key,
+    delete_stale_date_ranges,
+    replace_date_range,
+    truncate_to_ms,
+    unique_date_ranges,
+)
 from ..schemas import get_parquet_models, ParquetModels
+from ..catalog import DictionaryCatalog
 from ..utils import objectid
 
 
@@ -278,8 +287,14 @@ class TasksViewContext:
     def __init__(
         self,
         parquet_models: ParquetModels,
+        catalog: DictionaryCatalog,
     ):
+        """
+        :param parquet_models: The models of the Parquet files the view is calculated from.
+        :param catalog: The dictionary of URLs, up to date with the Parquet files.
+        """
         self.parquet_models = parquet_models
+        self.catalog = catalog
         self.tasks = self.get_tasks()
         self.page_urls_enum = self.get_page_urls_enum()
         self.pages = self.get_pages()
@@ -312,32 +327,7 @@ class TasksViewContext:
         )
 
     def get_page_urls_enum(self) -> pl.Enum:
-        unique_metrics_urls = (
-            self.parquet_models["page_metrics"].lf().select(pl.col("url").unique())
-        )
-        unique_page_urls = (
-            self.parquet_models["pages"].lf().select(pl.col("url").unique())
-        )
-        unique_gsc_searchterms_urls = (
-            self.parquet_models["gsc_searchterms"].lf().select(pl.col("url").unique())
-        )
-        unique_feedback_urls = (
-            self.parquet_models["feedback"].lf().select(pl.col("url").unique())
-        )
-        unique_combined = (
-            pl.concat(
-                [
-                    unique_metrics_urls,
-                    unique_page_urls,
-                    unique_gsc_searchterms_urls,
-                    unique_feedback_urls,
-                ]
-            )
-            .select(pl.col("url").unique())
-            .collect()
-        )
-
-        return pl.Enum(unique_combined["url"])
+        return self.catalog.enum("urls")
 
     def get_tasks(self) -> pl.DataFrame:
         projects_lf = self.get_projects_by_task()
@@ -394,26 +384,43 @@ class TasksViewContext:
 
 @final
 class TasksViewService:
-    def __init__(self, db: Database, views_utils: ViewsUtils):
+    def __init__(
+        self,
+        db: Database,
+        views_utils: ViewsUtils,
+        catalog: DictionaryCatalog | None = None,
+    ):
+        """
+        :param db: The database to write the view to.
+        :param views_utils: The views utils, with the Parquet and temp directories.
+        :param catalog: The dictionary of URLs. If not provided, it is loaded and refreshed.
+        """
         self.mongo_model = TasksViewModel(
             db, parquet_dir_path=views_utils.parquet_dir_path
         )
         self.parquet_model = self.mongo_model.primary_model
-        self.dependencies: ParquetModels = get_parquet_models(
-            views_utils.parquet_dir_path
-        )
+        self.dependencies: ParquetModels = get_parquet_models(views_utils.read_dir_path)
         self.date_ranges_with_comparisons = get_date_ranges_with_comparisons()
+        if catalog is None:
+            catalog = DictionaryCatalog(
+                views_utils.parquet_dir_path, read_dir_path=views_utils.read_dir_path
+            )
+            _ = catalog.refresh(self.dependencies)
+
         self.context = TasksViewContext(
             parquet_models=self.dependencies,
+            catalog=catalog,
         )
         self.views_utils = views_utils
         self.temp_dir = self.views_utils.temp_dir_path
 
     def scan_pages_view(self, date_range: DateRange) -> pl.LazyFrame:
-        filename = f"view_pages_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+        filename = f"view_pages_{date_range_key(date_range)}.parquet"
         return self.views_utils.scan_temp(filename)
 
-    def insert_batch(self, df: pl.DataFrame) -> bool | None:
+    def insert_batch(
+        self, df: pl.DataFrame, session: ClientSession | None = None
+    ) -> bool | None:
         transformed_df = self.parquet_model.reverse_transform(df)
 
         rows = self.mongo_model.prepare_for_insert(transformed_df, sort_id=False)
@@ -423,68 +430,155 @@ class TasksViewService:
 
         print(f"  Writing batch of {len(df)} rows...")
 
-        results = self.mongo_model.client.insert_many(rows, ordered=False)
+        results = self.mongo_model.client.insert_many(
+            rows, ordered=False, session=session
+        )
 
         print(f"  Wrote batch: Inserted {len(results.inserted_ids)} rows")
 
-    def recalculate_tasks_view(self):
+    def recalculate_tasks_view(
+        self, date_ranges: list[DateRange] | None = None, batched: bool = False
+    ):
+        """
+        Recalculate the tasks view for the given date ranges, replacing the documents of each
+        date range only once its new documents are inserted, so the view is never empty.
+        Documents of date ranges that are no longer current are deleted.
+
+        :param date_ranges: The date ranges to recalculate. Defaults to all of them.
+        :param batched: Whether to execute the plans of all date ranges together, instead of one by one.
+        """
         start_time = datetime.now()
         print(f"Recalculating tasks view at {start_time.isoformat()}")
 
-        _ = self.mongo_model.client.delete_many({})
+        current_date_ranges = unique_date_ranges(self.date_ranges_with_comparisons)
+        last_updated = truncate_to_ms(start_time)
+
+        if date_ranges is None:
+            date_ranges = current_date_ranges
+
+        self.calculate_and_write_tasks_view_files(
+            date_ranges, last_updated, batched=batched
+        )
+        self.insert_tasks_view_from_temp(date_ranges, last_updated)
+
+        deleted = delete_stale_date_ranges(self.mongo_model.client, current_date_ranges)
 
-        self.calculate_and_write_tasks_view_files()
-        self.insert_tasks_view_from_temp()
+        if deleted > 0:
+            print(
+                f"Deleted {deleted} documents from date ranges that are no longer current"
+            )
 
         print(
             f"Finished recalculating tasks view in {format_timedelta(datetime.now() - start_time)}"
         )
 
-    def calculate_and_write_tasks_view_files(self):
-        for dr in self.date_ranges_with_comparisons.values():  # pyright: ignore[reportAssignmentType]
-            dr: DateRangeWithComparison = dr
-            for date_range in [dr["date_range"], dr["comparison_date_range"]]:
-                lf = self.get_view_date_range_data(date_range)
+    def calculate_and_write_tasks_view_files(
+        self,
+        date_ranges: list[DateRange],
+        last_updated: datetime,
+        batched: bool = False,
+    ):
+        if batched:
+            return self.batch_write_tasks_view_files(date_ranges, last_updated)
 
-                date_range_start_time = datetime.now()
-                print(
-                    f"Writing tasks view for {date_range['start']} to {date_range['end']}..."
-                )
+        for date_range in date_ranges:
+            lf = self.get_view_date_range_data(date_range, last_updated)
+
+            date_range_start_time = datetime.now()
+            print(
+                f"Writing tasks view for {date_range['start']} to {date_range['end']}..."
+            )
 
-                output_filename = f"view_tasks_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+            output_filename = f"view_tasks_{date_range_key(date_range)}.parquet"
 
-                self.views_utils.sink_temp(lf, output_filename)
+            self.views_utils.sink_temp(lf, output_filename)
 
-                print(
-                    f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}"
+            print(
+                f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}"
+            )
+
+    def batch_write_tasks_view_files(
+        self, date_ranges: list[DateRange], last_updated: datetime
+    ):
+        """
+        Write the tasks view files of all date ranges in two executions, one for the intermediate
+        files read by the view plans, and one for the view files, so the sources shared by the
+        date ranges are only scanned once per execution.
+        """
+        start_time = datetime.now()
+        print(f"Writing tasks view for {len(date_ranges)} date ranges in one batch...")
+
+        self.views_utils.sink_temp_all(
+            [
+                sink
+                for date_range in date_ranges
+                for sink in (
+                    self.write_temp_aa_searchterms(date_range, lazy=True),
+                    self.write_temp_gsc_searchterms(date_range, lazy=True),
+                    self.write_temp_metrics_by_day(date_range, lazy=True),
                 )
+                if sink is not None
+            ]
+        )
+
+        print(
+            f"  Wrote intermediate files in {format_timedelta(datetime.now() - start_time)}"
+        )
 
-    def insert_tasks_view_from_temp(self):
-        for dr in self.date_ranges_with_comparisons.values():  # pyright: ignore[reportAssignmentType]
-            dr: DateRangeWithComparison = dr
-            for date_range in [dr["date_range"], dr["comparison_date_range"]]:
-                date_range_start_time = datetime.now()
-                print(
-                    f"Inserting tasks view for {date_range['start']} to {date_range['end']}..."
+        self.views_utils.sink_temp_all(
+            [
+                self.views_utils.lazy_sink_temp(
+                    self.get_view_date_range_data(
+                        date_range, last_updated, write_temp_files=False
+                    ),
+                    f"view_tasks_{date_range_key(date_range)}.parquet",
                 )
+                for date_range in date_ranges
+            ]
+        )
 
-                filename = f"view_tasks_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+        print(f"  Finished in {format_timedelta(datetime.now() - start_time)}")
 
+    def insert_tasks_view_from_temp(
+        self, date_ranges: list[DateRange], last_updated: datetime
+    ):
+        for date_range in date_ranges:
+            date_range_start_time = datetime.now()
+            print(
+                f"Inserting tasks view for {date_range['start']} to {date_range['end']}..."
+            )
+
+            filename = f"view_tasks_{date_range_key(date_range)}.parquet"
+
+            def insert(session: ClientSession):
                 self.views_utils.scan_temp(filename).sink_batches(
-                    self.insert_batch, chunk_size=1_000, lazy=False
+                    partial(self.insert_batch, session=session),
+                    chunk_size=1_000,
+                    lazy=False,
                 )
 
-                print(
-                    f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}"
-                )
+            # the previous documents are replaced by the new ones all at once
+            deleted = replace_date_range(
+                self.mongo_model.client, date_range, last_updated, insert
+            )
+
+            print(
+                f"  Finished in {format_timedelta(datetime.now() - date_range_start_time)}, replaced {deleted} documents"
+            )
 
     def get_view_date_range_data(
         self,
         date_range: DateRange,
+        last_updated: datetime | None = None,
+        write_temp_files: bool = True,
     ) -> pl.LazyFrame:
-        self.write_temp_aa_searchterms(date_range)
-        self.write_temp_gsc_searchterms(date_range)
-        self.write_temp_metrics_by_day(date_range)
+        """
+        :param write_temp_files: Whether to write the intermediate files read by the plan first.
+        """
+        if write_temp_files:
+            _ = self.write_temp_aa_searchterms(date_range)
+            _ = self.write_temp_gsc_searchterms(date_range)
+            _ = self.write_temp_metrics_by_day(date_range)
 
         top_level_metrics = self.get_top_level_metrics(date_range)
 
@@ -515,7 +609,7 @@ class TasksViewService:
                 pl.col("projects"),
                 pl.col("ux_tests"),
                 pl.lit(date_range).alias("dateRange"),
-                pl.lit(datetime.now()).alias("lastUpdated"),
+                pl.lit(last_updated or datetime.now()).alias("lastUpdated"),
             )
             .join(
                 top_level_metrics,
@@ -613,7 +707,7 @@ class TasksViewService:
 
         calls_by_topic_lf = (
             self.dependencies["calldrivers"]
-            .lf()
+            .lf(start=date_range["start"], end=date_range["end"])
             .select(
                 pl.col("date"),
                 pl.col("tpc_id"),
@@ -623,7 +717,6 @@ class TasksViewService:
                 pl.col("sub_subtopic"),
                 pl.col("calls"),
             )
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
             .group_by("tpc_id")
             .agg(
                 pl.col("enquiry_line").first().alias("enquiry_line"),
@@ -694,7 +787,7 @@ class TasksViewService:
         # logic from gc-tasks.schema.ts->getTotalEntries()
         gc_task_metrics = (
             self.dependencies["gc_tss"]
-            .lf()
+            .lf(start=date_range["start"], end=date_range["end"])
             .select(
                 pl.col("date"),
                 pl.col("gc_task"),
@@ -702,7 +795,6 @@ class TasksViewService:
                 pl.col("able_to_complete"),
             )
             .filter(
-                pl.col("date").is_between(date_range["start"], date_range["end"]),
                 pl.col("sampling_task").eq("y"),
                 pl.col("able_to_complete").is_in(["Yes", "No"]),
             )
@@ -736,7 +828,8 @@ class TasksViewService:
     def write_temp_aa_searchterms(
         self,
         date_range: DateRange,
-    ):
+        lazy: bool = False,
+    ) -> pl.LazyFrame | None:
         aa_searchterms = (
             self.scan_pages_view(date_range)
             .filter(
@@ -760,6 +853,9 @@ class TasksViewService:
         )
 
         filename = f"tasks_aa_searchterms_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+        if lazy:
+            return self.views_utils.lazy_sink_temp(aa_searchterms, filename)
+
         self.views_utils.sink_temp(aa_searchterms, filename)
 
     def get_aa_searchterms(
@@ -772,7 +868,8 @@ class TasksViewService:
     def write_temp_gsc_searchterms(
         self,
         date_range: DateRange,
-    ):
+        lazy: bool = False,
+    ) -> pl.LazyFrame | None:
         gsc_searchterms = (
             self.scan_pages_view(date_range)
             .select(
@@ -798,6 +895,9 @@ class TasksViewService:
         )
 
         filename = f"tasks_gsc_searchterms_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+        if lazy:
+            return self.views_utils.lazy_sink_temp(gsc_searchterms, filename)
+
         self.views_utils.sink_temp(gsc_searchterms, filename)
 
     def get_gsc_searchterms(
@@ -810,11 +910,11 @@ class TasksViewService:
     def write_temp_metrics_by_day(
         self,
         date_range: DateRange,
-    ):
+        lazy: bool = False,
+    ) -> pl.LazyFrame | None:
         num_comments_by_page = (
             self.dependencies["feedback"]
-            .lf()
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
+            .lf(start=date_range["start"], end=date_range["end"])
             .select("date", pl.col("url").cast(self.context.page_urls_enum))
             .group_by("date", "url")
             .agg(pl.len().alias("numComments"))
@@ -835,13 +935,12 @@ class TasksViewService:
 
         calls_by_day = (
             self.dependencies["calldrivers"]
-            .lf()
+            .lf(start=date_range["start"], end=date_range["end"])
             .select(
                 pl.col("date"),
                 pl.col("tpc_id"),
                 pl.col("calls"),
             )
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
             .group_by("tpc_id", "date")
             .agg(
                 pl.col("calls").sum().alias("calls"),
@@ -861,7 +960,7 @@ class TasksViewService:
 
         metrics_by_day = (
             self.dependencies["page_metrics"]
-            .lf()
+            .lf(start=date_range["start"], end=date_range["end"])
             .select(
                 pl.col("date"),
                 pl.col("url").cast(self.context.page_urls_enum),
@@ -869,7 +968,6 @@ class TasksViewService:
                 pl.col("dyf_no"),
                 pl.col("dyf_yes"),
             )
-            .filter(pl.col("date").is_between(date_range["start"], date_range["end"]))
             .group_by("date", "url")
             .agg(
                 pl.col("visits").sum().alias("visits"),
@@ -948,6 +1046,9 @@ class TasksViewService:
         )
 
         filename = f"tasks_metrics_by_day_{date_range['start'].date()}_{date_range['end'].date()}.parquet"
+        if lazy:
+            return self.views_utils.lazy_sink_temp(full_by_day, filename)
+
         self.views_utils.sink_temp(full_by_day, filename)
 
     def get_metrics_by_day(
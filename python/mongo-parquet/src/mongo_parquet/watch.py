@@ -0,0 +1,242 @@
+"""
+Continuous sync from MongoDB change streams: the `_id`s of the inserted, updated and deleted documents
+are buffered per collection, and flushed to Parquet as micro-batches once enough changes are buffered,
+or the oldest buffered change is old enough.
+
+The resume token of the last flushed change is persisted after each flush, so a restarted watch
+continues where the last one stopped, and replays at most the changes of a micro-batch that wasn't
+fully flushed. Flushing the same change twice is harmless, as documents are read again from MongoDB
+and merged by `_id`.
+"""
+
+import os
+import threading
+from collections.abc import Callable, Mapping
+from datetime import datetime, timedelta
+from typing import Any, Literal, Protocol, final
+from bson import json_util
+
+WATCH_DIR_NAME = "_watch"
+RESUME_TOKEN_FILENAME = "resume_token.json"
+
+type ChangeType = Literal["insert"] | Literal["update"] | Literal["delete"]
+
+type Changes = dict[str, dict[ChangeType, list[Any]]]
+"""The `_id`s of the changed documents, by collection and type of change."""
+
+WATCHED_OPERATIONS = ["insert", "update", "replace", "delete"]
+
+
+def watch_pipeline(collections: list[str]) -> list[dict[str, Any]]:
+    """
+    The change stream pipeline for the changes of some collections, keeping only the keys of the documents,
+    as the changed documents are read again from MongoDB when they're flushed.
+    """
+    return [
+        {
+            "$match": {
+                "ns.coll": {"$in": collections},
+                "operationType": {"$in": [*WATCHED_OPERATIONS, "invalidate"]},
+            }
+        },
+        {"$project": {"operationType": 1, "ns": 1, "documentKey": 1}},
+    ]
+
+
+class ChangeStream(Protocol):
+    """The parts of pymongo's `ChangeStream` that are used."""
+
+    @property
+    def resume_token(self) -> Mapping[str, Any] | None: ...
+
+    def try_next(self) -> Mapping[str, Any] | None: ...
+
+
+@final
+class ChangeBuffer:
+    """
+    The changes waiting to be flushed, keeping only the latest type of change of each document.
+    """
+
+    def __init__(
+        self,
+        max_changes: int = 10_000,
+        max_delay: timedelta = timedelta(seconds=30),
+    ):
+        """
+        :param max_changes: The number of buffered documents that triggers a flush.
+        :param max_delay: How long a change can be buffered before it triggers a flush.
+        """
+        self.max_changes = max_changes
+        self.max_delay = max_delay
+        self.changes: dict[str, dict[Any, ChangeType]] = {}
+        self.first_change_at: datetime | None = None
+        self.resume_token: Mapping[str, Any] | None = None
+
+    def __len__(self) -> int:
+        return sum(len(changes) for changes in self.changes.values())
+
+    def add(self, event: Mapping[str, Any]) -> bool:
+        """
+        Buffer a change event.
+
+        :return: Whether the event is a change to a document, i.e. not e.g. an invalidate event.
+        """
+        self.resume_token = event["_id"]
+        operation = event.get("operationType")
+
+        if operation not in WATCHED_OPERATIONS:
+            return False
+
+        collection = event["ns"]["coll"]
+        document_id = event["documentKey"]["_id"]
+        changes = self.changes.setdefault(collection, {})
+        previous = changes.get(document_id)
+
+        if operation == "delete":
+            changes[document_id] = "delete"
+        elif operation == "insert":
+            # an _id deleted and inserted again still has rows to replace
+            changes[document_id] = "update" if previous == "delete" else "insert"
+        else:
+            # the rows of a document inserted in the same batch don't exist yet
+            changes[document_id] = "insert" if previous == "insert" else "update"
+
+        if self.first_change_at is None:
+            self.first_change_at = datetime.now()
+
+        return True
+
+    def is_due(self, now: datetime | None = None) -> bool:
+        """
+        Whether the buffered changes should be flushed.
+        """
+        if self.first_change_at is None:
+            return False
+
+        return (
+            len(self) >= self.max_changes
+            or (now or datetime.now()) - self.first_change_at >= self.max_delay
+        )
+
+    def drain(self) -> Changes:
+        """
+        Take the buffered changes, emptying the buffer.
+        """
+        drained: Changes = {}
+
+        for collection, changes in self.changes.items():
+            by_type: dict[ChangeType, list[Any]] = {}
+
+            for document_id, change_type in changes.items():
+                by_type.setdefault(change_type, []).append(document_id)
+
+            drained[collection] = by_type
+
+        self.changes = {}
+        self.first_change_at = None
+
+        return drained
+
+
+@final
+class ResumeTokenStore:
+    """
+    The resume token of the last flushed change, stored in the `_watch` subdirectory of the data directory.
+    """
+
+    def __init__(self, parquet_dir_path: str):
+        self.path = os.path.join(
+            parquet_dir_path, WATCH_DIR_NAME, RESUME_TOKEN_FILENAME
+        )
+
+    def load(self) -> Mapping[str, Any] | None:
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, "r") as f:
+            return json_util.loads(f.read())
+
+    def save(self, resume_token: Mapping[str, Any]):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with open(f"{self.path}.tmp", "w") as f:
+            f.write(json_util.dumps(resume_token))
+
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def consume(
+    stream: ChangeStream,
+    buffer: ChangeBuffer,
+    flush: Callable[[Changes], None],
+    token_store: ResumeTokenStore,
+    stop: threading.Event | None = None,
+) -> bool:
+    """
+    Buffer the events of a change stream, flushing them when the buffer is due, until stopped.
+    The buffered changes are flushed before returning, including on KeyboardInterrupt.
+
+    :param stream: The change stream, e.g. from `Database.watch`.
+    :param buffer: The buffer of the changes to flush.
+    :param flush: Writes a micro-batch of changes to Parquet.
+    :param token_store: Where to persist the resume token after each flush.
+    :param stop: An event to set to stop consuming.
+    :return: False if the stream was invalidated (e.g. the database was dropped), True if it was stopped.
+    """
+    token_saved_at = datetime.now()
+
+    def flush_buffer():
+        nonlocal token_saved_at
+
+        if len(buffer) > 0:
+            resume_token = buffer.resume_token
+            flush(buffer.drain())
+        else:
+            # nothing to flush, but the stream moved past the changes of other collections
+            resume_token = stream.resume_token or buffer.resume_token
+
+        if resume_token is not None:
+            token_store.save(resume_token)
+
+        token_saved_at = datetime.now()
+
+    try:
+        while stop is None or not stop.is_set():
+            event = stream.try_next()
+
+            if event is not None and event.get("operationType") == "invalidate":
+                print("⚠️ The change stream was invalidated, stopping.")
+                flush_buffer()
+                return False
+
+            if event is not None:
+                _ = buffer.add(event)
+
+            if buffer.is_due() or (
+                len(buffer) == 0 and datetime.now() - token_saved_at >= buffer.max_delay
+            ):
+                flush_buffer()
+    except KeyboardInterrupt:
+        print("Stopping the watch...")
+
+    flush_buffer()
+
+    return True
+
+
+__all__ = [
+    "ChangeBuffer",
+    "ChangeStream",
+    "ChangeType",
+    "Changes",
+    "RESUME_TOKEN_FILENAME",
+    "ResumeTokenStore",
+    "WATCH_DIR_NAME",
+    "consume",
+    "watch_pipeline",
+]
@@ -0,0 +1,111 @@
+"""Tests for the change stream sync."""
+
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any
+from bson import ObjectId
+from .watch import ChangeBuffer, Changes, ResumeTokenStore, consume
+
+ids = [ObjectId() for _ in range(4)]
+
+
+def event(number: int, operation: str, document_id: ObjectId, collection="pages"):
+    return {
+        "_id": {"_data": f"token-{number}"},
+        "operationType": operation,
+        "ns": {"db": "upd-test", "coll": collection},
+        "documentKey": {"_id": document_id},
+    }
+
+
+class FakeStream:
+    def __init__(self, events: list[dict[str, Any]], stop: threading.Event):
+        self.events = events
+        self.stop = stop
+        self.resume_token: Mapping[str, Any] | None = None
+
+    def try_next(self) -> Mapping[str, Any] | None:
+        if not self.events:
+            self.stop.set()
+            return None
+
+        next_event = self.events.pop(0)
+        self.resume_token = next_event["_id"]
+        return next_event
+
+
+def test_buffer_keeps_latest_change():
+    buffer = ChangeBuffer(max_changes=10, max_delay=timedelta(seconds=30))
+
+    assert not buffer.is_due()
+
+    for number, (operation, document_id) in enumerate(
+        [
+            ("insert", ids[0]),
+            ("update", ids[0]),
+            ("update", ids[1]),
+            ("delete", ids[1]),
+            ("delete", ids[2]),
+            ("insert", ids[2]),
+            ("replace", ids[3]),
+        ]
+    ):
+        assert buffer.add(event(number, operation, document_id))
+
+    assert not buffer.add(event(7, "drop", ids[0]))
+    assert len(buffer) == 4
+    assert buffer.resume_token == {"_data": "token-7"}
+    assert not buffer.is_due()
+    assert buffer.is_due(datetime.now() + timedelta(seconds=30))
+
+    assert buffer.drain() == {
+        "pages": {
+            "insert": [ids[0]],
+            "delete": [ids[1]],
+            "update": [ids[2], ids[3]],
+        }
+    }
+    assert len(buffer) == 0
+    assert not buffer.is_due(datetime.now() + timedelta(seconds=30))
+
+
+def test_consume_flushes_micro_batches(tmp_path):
+    stop = threading.Event()
+    stream = FakeStream(
+        [
+            event(0, "insert", ids[0]),
+            event(1, "insert", ids[1], collection="tasks"),
+            event(2, "update", ids[2]),
+        ],
+        stop,
+    )
+    token_store = ResumeTokenStore(str(tmp_path))
+    flushed: list[Changes] = []
+
+    assert consume(
+        stream,
+        ChangeBuffer(max_changes=2),
+        flushed.append,
+        token_store,
+        stop=stop,
+    )
+
+    assert flushed == [
+        {"pages": {"insert": [ids[0]]}, "tasks": {"insert": [ids[1]]}},
+        {"pages": {"update": [ids[2]]}},
+    ]
+    assert token_store.load() == {"_data": "token-2"}
+
+
+def test_consume_stops_when_invalidated(tmp_path):
+    stream = FakeStream(
+        [event(0, "insert", ids[0]), event(1, "invalidate", ids[0])],
+        threading.Event(),
+    )
+    token_store = ResumeTokenStore(str(tmp_path))
+    flushed: list[Changes] = []
+
+    assert not consume(stream, ChangeBuffer(), flushed.append, token_store)
+    assert flushed == [{"pages": {"insert": [ids[0]]}}]
+    assert token_store.load() == {"_data": "token-0"}